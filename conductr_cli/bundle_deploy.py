@@ -1,9 +1,8 @@
-from conductr_cli import bundle_utils, conduct_request, conduct_url, sse_client
+from conductr_cli import bundle_utils, conduct_request, conduct_url, sse_hub, timings
 from conductr_cli.exceptions import ContinuousDeliveryError, WaitTimeoutError
 from datetime import datetime
 
 import hmac
-import json
 import logging
 import base64
 
@@ -21,16 +20,17 @@ def generate_hmac_signature(secret_key, text):
 
 def get_deployment_state(deployment_id, args):
     deployment_state_url = conduct_url.url('deployments/{}'.format(deployment_id), args)
-    response = conduct_request.get(args.dcos_mode, conduct_url.conductr_host(args), deployment_state_url,
-                                   auth=args.conductr_auth, verify=args.server_verification_file)
+    response = conduct_request.conditional_get(args.dcos_mode, conduct_url.conductr_host(args), deployment_state_url,
+                                               auth=args.conductr_auth, verify=args.server_verification_file)
     if response.status_code == 404:
         return None
     else:
         response.raise_for_status()
-        deployment_state = json.loads(response.text)
+        deployment_state = conduct_request.response_json(response)
         return deployment_state
 
 
+@timings.timed('wait for deployment')
 def wait_for_deployment_complete(deployment_id, resolved_version, args):
     log = logging.getLogger(__name__)
     start_time = datetime.now()
@@ -94,51 +94,51 @@ def wait_for_deployment_complete(deployment_id, resolved_version, args):
         sse_heartbeat_count_after_event = 0
 
         deployment_events_url = conduct_url.url('deployments/events', args)
-        sse_events = sse_client.get_events(args.dcos_mode, conduct_url.conductr_host(args), deployment_events_url,
-                                           auth=args.conductr_auth, verify=args.server_verification_file)
-        last_deployment_state = None
-        last_log_message = None
-        for event in sse_events:
-            sse_heartbeat_count_after_event += 1
-
-            elapsed = (datetime.now() - start_time).total_seconds()
-            if elapsed > args.wait_timeout:
-                raise WaitTimeoutError('Deployment is still waiting to be completed')
-
-            # Check for deployment state every 3 heartbeats from the last received event.
-            if event.event or (sse_heartbeat_count_after_event % 3 == 0):
-                if event.event:
-                    sse_heartbeat_count_after_event = 0
-
-                deployment_state = get_deployment_state(deployment_id, args)
-
-                if is_completed_with_success(deployment_state):
-                    # Reprint previous message with flush to go to next line
-                    if last_log_message:
-                        log.progress(last_log_message, flush=True)
-
-                    log.info(log_message(deployment_state))
-                    return
-
-                elif is_completed_with_failure(deployment_state):
-                    # Reprint previous message with flush to go to next line
-                    if last_log_message:
-                        log.progress(last_log_message, flush=True)
-
-                    raise ContinuousDeliveryError('Unable to deploy {} - {}'.format(bundle_shorthand,
-                                                                                    log_message(deployment_state)))
-                else:
-                    if deployment_state != last_deployment_state:
-                        last_deployment_state = deployment_state
+        with sse_hub.subscribe(args.dcos_mode, conduct_url.conductr_host(args), deployment_events_url,
+                               auth=args.conductr_auth, verify=args.server_verification_file) as sse_events:
+            last_deployment_state = None
+            last_log_message = None
+            for event in sse_events:
+                sse_heartbeat_count_after_event += 1
 
+                elapsed = (datetime.now() - start_time).total_seconds()
+                if elapsed > args.wait_timeout:
+                    raise WaitTimeoutError('Deployment is still waiting to be completed')
+
+                # Check for deployment state every 3 heartbeats from the last received event.
+                if event.event or (sse_heartbeat_count_after_event % 3 == 0):
+                    if event.event:
+                        sse_heartbeat_count_after_event = 0
+
+                    deployment_state = get_deployment_state(deployment_id, args)
+
+                    if is_completed_with_success(deployment_state):
+                        # Reprint previous message with flush to go to next line
+                        if last_log_message:
+                            log.progress(last_log_message, flush=True)
+
+                        log.info(log_message(deployment_state))
+                        return
+
+                    elif is_completed_with_failure(deployment_state):
                         # Reprint previous message with flush to go to next line
                         if last_log_message:
                             log.progress(last_log_message, flush=True)
 
-                        last_log_message = log_message(deployment_state)
-                        log.progress(last_log_message, flush=False)
+                        raise ContinuousDeliveryError('Unable to deploy {} - {}'.format(bundle_shorthand,
+                                                                                        log_message(deployment_state)))
                     else:
-                        last_log_message = '{}.'.format(last_log_message)
-                        log.progress(last_log_message, flush=False)
+                        if deployment_state != last_deployment_state:
+                            last_deployment_state = deployment_state
+
+                            # Reprint previous message with flush to go to next line
+                            if last_log_message:
+                                log.progress(last_log_message, flush=True)
+
+                            last_log_message = log_message(deployment_state)
+                            log.progress(last_log_message, flush=False)
+                        else:
+                            last_log_message = '{}.'.format(last_log_message)
+                            log.progress(last_log_message, flush=False)
 
-        raise WaitTimeoutError('Deployment for {} is still waiting to be completed')
+            raise WaitTimeoutError('Deployment for {} is still waiting to be completed')
@@ -1,17 +1,21 @@
 from __future__ import unicode_literals
-from conductr_cli import conduct_request, conduct_url, sse_client
-from conductr_cli.exceptions import WaitTimeoutError
-from datetime import datetime
-import json
+from conductr_cli import bundle_utils, conduct_request, conduct_url, sse_hub, timings
 import logging
 
 
+# Changes to the number of installations of the bundle identified by the event data.
+INSTALLATION_DELTAS = {
+    'bundleInstallationAdded': 1,
+    'bundleInstallationRemoved': -1
+}
+
+
 def count_installations(bundle_id, args):
     bundles_url = conduct_url.url('bundles', args)
-    response = conduct_request.get(args.dcos_mode, conduct_url.conductr_host(args), bundles_url,
-                                   auth=args.conductr_auth, verify=args.server_verification_file)
+    response = conduct_request.conditional_get(args.dcos_mode, conduct_url.conductr_host(args), bundles_url,
+                                               auth=args.conductr_auth, verify=args.server_verification_file)
     response.raise_for_status()
-    bundles = json.loads(response.text)
+    bundles = conduct_request.response_json(response)
     matching_bundles = [bundle for bundle in bundles if bundle['bundleId'] == bundle_id]
     if matching_bundles:
         matching_bundle = matching_bundles[0]
@@ -21,59 +25,148 @@ def count_installations(bundle_id, args):
     return 0
 
 
+def count_all_installations(bundle_ids, args):
+    bundles_url = conduct_url.url('bundles', args)
+    response = conduct_request.conditional_get(args.dcos_mode, conduct_url.conductr_host(args), bundles_url,
+                                               auth=args.conductr_auth, verify=args.server_verification_file)
+    response.raise_for_status()
+    bundles = conduct_request.response_json(response)
+    installations = {bundle_id: 0 for bundle_id in bundle_ids}
+    for bundle in bundles:
+        if bundle['bundleId'] in installations and 'bundleInstallations' in bundle:
+            installations[bundle['bundleId']] = len(bundle['bundleInstallations'])
+
+    return installations
+
+
+@timings.timed('wait for uninstallation')
 def wait_for_uninstallation(bundle_id, args):
     return wait_for_condition(bundle_id, is_uninstalled, 'uninstalled', args)
 
 
+@timings.timed('wait for installation')
 def wait_for_installation(bundle_id, args):
     return wait_for_condition(bundle_id, is_installed, 'installed', args)
 
 
 def wait_for_condition(bundle_id, condition, condition_name, args):
     log = logging.getLogger(__name__)
-    start_time = datetime.now()
 
     installed_bundles = count_installations(bundle_id, args)
-    last_log_message = None
     if condition(installed_bundles):
         log.info('Bundle {} is {}'.format(bundle_id, condition_name))
         return
-    else:
-        sse_heartbeat_count_after_event = 0
-
-        log.info('Bundle {} waiting to be {}'.format(bundle_id, condition_name))
-        bundle_events_url = conduct_url.url('bundles/events', args)
-        sse_events = sse_client.get_events(args.dcos_mode, conduct_url.conductr_host(args), bundle_events_url,
-                                           auth=args.conductr_auth, verify=args.server_verification_file)
-        for event in sse_events:
-            sse_heartbeat_count_after_event += 1
-
-            elapsed = (datetime.now() - start_time).total_seconds()
-            if elapsed > args.wait_timeout:
-                raise WaitTimeoutError('Bundle {} waiting to be {}'.format(bundle_id, condition_name))
-
-            # Check for installed bundles every 3 heartbeats from the last received event.
-            if event.event or (sse_heartbeat_count_after_event % 3 == 0):
-                if event.event:
-                    sse_heartbeat_count_after_event = 0
-
-                installed_bundles = count_installations(bundle_id, args)
-                if condition(installed_bundles):
-                    # Reprint previous message with flush to go to next line
-                    if last_log_message:
-                        log.progress(last_log_message, flush=True)
-
-                    log.info('Bundle {} {}'.format(bundle_id, condition_name))
-                    return
-                else:
-                    if last_log_message:
-                        last_log_message = '{}.'.format(last_log_message)
-                    else:
-                        last_log_message = 'Bundle {} still waiting to be {}'.format(bundle_id, condition_name)
-
-                    log.progress(last_log_message, flush=False)
-
-        raise WaitTimeoutError('Bundle {} waiting to be {}'.format(bundle_id, condition_name))
+
+    log.info('Bundle {} waiting to be {}'.format(bundle_id, condition_name))
+    progress = {'last_log_message': None}
+
+    def log_progress(installed_bundles):
+        if progress['last_log_message']:
+            progress['last_log_message'] = '{}.'.format(progress['last_log_message'])
+        else:
+            progress['last_log_message'] = 'Bundle {} still waiting to be {}'.format(bundle_id, condition_name)
+
+        log.progress(progress['last_log_message'], flush=False)
+
+    bundle_events_url = conduct_url.url('bundles/events', args)
+    with sse_hub.subscribe(args.dcos_mode, conduct_url.conductr_host(args), bundle_events_url,
+                           auth=args.conductr_auth, verify=args.server_verification_file) as sse_events:
+        future = sse_events.when(installation_predicate(bundle_id, installed_bundles, condition, args,
+                                                        on_progress=log_progress))
+        timeout_message = 'Bundle {} waiting to be {}'.format(bundle_id, condition_name)
+        sse_hub.wait_for_all(sse_events, [future], args.wait_timeout, timeout_message)
+
+    # Reprint previous message with flush to go to next line
+    if progress['last_log_message']:
+        log.progress(progress['last_log_message'], flush=True)
+
+    log.info('Bundle {} {}'.format(bundle_id, condition_name))
+
+
+@timings.timed('wait for installation')
+def wait_for_installations(bundle_ids, args):
+    """
+    Waits for all of the bundles to be installed over a single stream of bundle events, with one timeout budget
+    shared between them.
+    """
+    log = logging.getLogger(__name__)
+
+    installations = count_all_installations(bundle_ids, args)
+    pending_bundle_ids = [bundle_id for bundle_id in bundle_ids if not is_installed(installations[bundle_id])]
+    for bundle_id in bundle_ids:
+        if bundle_id not in pending_bundle_ids:
+            log.info('Bundle {} is installed'.format(bundle_id))
+
+    if not pending_bundle_ids:
+        return
+
+    log.info('Bundles {} waiting to be installed'.format(', '.join(pending_bundle_ids)))
+    bundle_events_url = conduct_url.url('bundles/events', args)
+    with sse_hub.subscribe(args.dcos_mode, conduct_url.conductr_host(args), bundle_events_url,
+                           auth=args.conductr_auth, verify=args.server_verification_file) as sse_events:
+        # Installations may have completed before subscribing, so count them again before tracking the events.
+        installations = count_all_installations(pending_bundle_ids, args)
+        waiting_bundle_ids = [bundle_id for bundle_id in pending_bundle_ids if not is_installed(installations[bundle_id])]
+        futures = [sse_events.when(installation_predicate(bundle_id, installations[bundle_id], is_installed, args,
+                                                          is_event_data_driven=True))
+                   for bundle_id in waiting_bundle_ids]
+
+        timeout_message = 'Bundles {} waiting to be installed'.format(', '.join(pending_bundle_ids))
+        sse_hub.wait_for_all(sse_events, futures, args.wait_timeout, timeout_message)
+
+    for bundle_id in pending_bundle_ids:
+        log.info('Bundle {} installed'.format(bundle_id))
+
+
+def installation_predicate(bundle_id, installed_bundles, condition, args, is_event_data_driven=False,
+                           on_progress=None):
+    """
+    Returns a predicate of bundle events checking the number of installations of the bundle against the condition.
+    Once events identifying their bundle are received, the number of installations is tracked using the event data,
+    and the bundles are only fetched again when the event data doesn't state it, or to reconcile after a reconnection.
+    Until then, the bundles are fetched upon each event and every 3 heartbeats.
+    :param is_event_data_driven: whether the installations were counted after subscribing to the events, in which
+                                 case no event may have been missed and the event data is used straight away.
+    :param on_progress: called with the number of installations each time it is checked and found not to meet the
+                        condition.
+    """
+    state = {'installed_bundles': installed_bundles, 'heartbeat_count': 0, 'is_event_data_driven': is_event_data_driven}
+
+    def is_condition_met(event, is_reconnected):
+        state['heartbeat_count'] += 1
+        event_bundle_id, event_bundle = bundle_utils.bundle_event_data(event) if event.event else (None, None)
+        if event_bundle_id and state['is_event_data_driven'] and not is_reconnected:
+            state['heartbeat_count'] = 0
+            if event_bundle_id != bundle_id:
+                return False
+            elif event_bundle and 'bundleInstallations' in event_bundle:
+                state['installed_bundles'] = len(event_bundle['bundleInstallations'])
+            elif event.event in INSTALLATION_DELTAS:
+                state['installed_bundles'] = max(0, state['installed_bundles'] + INSTALLATION_DELTAS[event.event])
+            else:
+                state['installed_bundles'] = count_installations(bundle_id, args)
+
+        # Check for installed bundles every 3 heartbeats from the last received event.
+        elif event.event or is_reconnected or \
+                (not state['is_event_data_driven'] and state['heartbeat_count'] % 3 == 0):
+            if event.event:
+                state['heartbeat_count'] = 0
+
+            # Events may have been missed prior to the first event identifying a bundle, or while reconnecting.
+            state['is_event_data_driven'] = state['is_event_data_driven'] or event_bundle_id is not None
+            state['installed_bundles'] = count_installations(bundle_id, args)
+
+        else:
+            return False
+
+        if condition(state['installed_bundles']):
+            return True
+
+        if on_progress:
+            on_progress(state['installed_bundles'])
+        return False
+
+    return is_condition_met
 
 
 def is_installed(number_of_installations):
@@ -1,78 +1,158 @@
 from __future__ import unicode_literals
-from conductr_cli import conduct_request, conduct_url, sse_client
-from conductr_cli.exceptions import WaitTimeoutError
-from datetime import datetime
-import json
+from conductr_cli import bundle_utils, conduct_request, conduct_url, sse_hub, timings
 import logging
 
 
 def get_scale(bundle_id, args):
     bundles_url = conduct_url.url('bundles', args)
-    response = conduct_request.get(args.dcos_mode, conduct_url.conductr_host(args), bundles_url,
-                                   auth=args.conductr_auth, verify=args.server_verification_file)
+    response = conduct_request.conditional_get(args.dcos_mode, conduct_url.conductr_host(args), bundles_url,
+                                               auth=args.conductr_auth, verify=args.server_verification_file)
     response.raise_for_status()
-    bundles = json.loads(response.text)
+    bundles = conduct_request.response_json(response)
     matching_bundles = [bundle for bundle in bundles if bundle['bundleId'] == bundle_id]
     if matching_bundles:
         matching_bundle = matching_bundles[0]
         if 'bundleExecutions' in matching_bundle:
-            started_executions = [bundle_execution
-                                  for bundle_execution in matching_bundle['bundleExecutions']
-                                  if bundle_execution['isStarted']]
-            return len(started_executions)
+            return count_started_executions(matching_bundle)
 
     return 0
 
 
+def count_all_scales(bundle_ids, args):
+    bundles_url = conduct_url.url('bundles', args)
+    response = conduct_request.conditional_get(args.dcos_mode, conduct_url.conductr_host(args), bundles_url,
+                                               auth=args.conductr_auth, verify=args.server_verification_file)
+    response.raise_for_status()
+    bundles = conduct_request.response_json(response)
+    scales = {bundle_id: 0 for bundle_id in bundle_ids}
+    for bundle in bundles:
+        if bundle['bundleId'] in scales and 'bundleExecutions' in bundle:
+            scales[bundle['bundleId']] = count_started_executions(bundle)
+
+    return scales
+
+
+def count_started_executions(bundle):
+    return len([bundle_execution for bundle_execution in bundle['bundleExecutions'] if bundle_execution['isStarted']])
+
+
+@timings.timed('wait for scale')
 def wait_for_scale(bundle_id, expected_scale, args):
     log = logging.getLogger(__name__)
-    start_time = datetime.now()
 
     bundle_scale = get_scale(bundle_id, args)
     if bundle_scale == expected_scale:
         log.info('Bundle {} expected scale {} is met'.format(bundle_id, expected_scale))
         return
-    else:
-        sse_heartbeat_count_after_event = 0
-
-        log.info('Bundle {} waiting to reach expected scale {}'.format(bundle_id, expected_scale))
-        bundle_events_url = conduct_url.url('bundles/events', args)
-        sse_events = sse_client.get_events(args.dcos_mode, conduct_url.conductr_host(args), bundle_events_url,
-                                           auth=args.conductr_auth, verify=args.server_verification_file)
-        last_scale = -1
-        last_log_message = None
-        for event in sse_events:
-            sse_heartbeat_count_after_event += 1
-
-            elapsed = (datetime.now() - start_time).total_seconds()
-            if elapsed > args.wait_timeout:
-                raise WaitTimeoutError('Bundle {} waiting to reach expected scale {}'.format(bundle_id, expected_scale))
-
-            # Check for bundle scale every 3 heartbeats from the last received event.
-            if event.event or (sse_heartbeat_count_after_event % 3 == 0):
-                if event.event:
-                    sse_heartbeat_count_after_event = 0
 
+    log.info('Bundle {} waiting to reach expected scale {}'.format(bundle_id, expected_scale))
+    progress = {'last_scale': -1, 'last_log_message': None}
+
+    def log_progress(bundle_scale):
+        if bundle_scale > progress['last_scale']:
+            progress['last_scale'] = bundle_scale
+
+            # Reprint previous message with flush to go to next line
+            if progress['last_log_message']:
+                log.progress(progress['last_log_message'], flush=True)
+
+            progress['last_log_message'] = 'Bundle {} has scale {}, expected {}'.format(
+                bundle_id, bundle_scale, expected_scale)
+        else:
+            progress['last_log_message'] = '{}.'.format(progress['last_log_message'])
+
+        log.progress(progress['last_log_message'], flush=False)
+
+    bundle_events_url = conduct_url.url('bundles/events', args)
+    with sse_hub.subscribe(args.dcos_mode, conduct_url.conductr_host(args), bundle_events_url,
+                           auth=args.conductr_auth, verify=args.server_verification_file) as sse_events:
+        future = sse_events.when(scale_predicate(bundle_id, expected_scale, args, on_progress=log_progress))
+        timeout_message = 'Bundle {} waiting to reach expected scale {}'.format(bundle_id, expected_scale)
+        sse_hub.wait_for_all(sse_events, [future], args.wait_timeout, timeout_message)
+
+    # Reprint previous message with flush to go to next line
+    if progress['last_log_message']:
+        log.progress(progress['last_log_message'], flush=True)
+
+    log.info('Bundle {} expected scale {} is met'.format(bundle_id, expected_scale))
+
+
+@timings.timed('wait for scale')
+def wait_for_scales(expected_scales, args):
+    """
+    Waits for all of the bundles to reach their expected scale over a single stream of bundle events, with one timeout
+    budget shared between them.
+    :param expected_scales: the expected scale of each bundle keyed by bundle id, in the order to report them.
+    """
+    log = logging.getLogger(__name__)
+
+    scales = count_all_scales(list(expected_scales), args)
+    pending_bundle_ids = [bundle_id for bundle_id, expected_scale in expected_scales.items()
+                          if scales[bundle_id] != expected_scale]
+    for bundle_id, expected_scale in expected_scales.items():
+        if bundle_id not in pending_bundle_ids:
+            log.info('Bundle {} expected scale {} is met'.format(bundle_id, expected_scale))
+
+    if not pending_bundle_ids:
+        return
+
+    log.info('Bundles {} waiting to reach their expected scale'.format(', '.join(pending_bundle_ids)))
+    bundle_events_url = conduct_url.url('bundles/events', args)
+    with sse_hub.subscribe(args.dcos_mode, conduct_url.conductr_host(args), bundle_events_url,
+                           auth=args.conductr_auth, verify=args.server_verification_file) as sse_events:
+        # Executions may have started before subscribing, so count them again before tracking the events.
+        scales = count_all_scales(pending_bundle_ids, args)
+        futures = [sse_events.when(scale_predicate(bundle_id, expected_scales[bundle_id], args))
+                   for bundle_id in pending_bundle_ids if scales[bundle_id] != expected_scales[bundle_id]]
+
+        timeout_message = 'Bundles {} waiting to reach their expected scale'.format(', '.join(pending_bundle_ids))
+        sse_hub.wait_for_all(sse_events, futures, args.wait_timeout, timeout_message)
+
+    for bundle_id in pending_bundle_ids:
+        log.info('Bundle {} expected scale {} is met'.format(bundle_id, expected_scales[bundle_id]))
+
+
+def scale_predicate(bundle_id, expected_scale, args, on_progress=None):
+    """
+    Returns a predicate of bundle events checking the scale of the bundle. Once events identifying their bundle are
+    received, events of other bundles are ignored, and the bundles are only fetched again when the event relates to
+    this bundle without stating its executions, or to reconcile after a reconnection. Until then, the bundles are
+    fetched upon each event and every 3 heartbeats.
+    :param on_progress: called with the scale of the bundle each time it is checked and found not to be met.
+    """
+    state = {'heartbeat_count': 0, 'is_event_data_driven': False}
+
+    def is_scale_met(event, is_reconnected):
+        state['heartbeat_count'] += 1
+        event_bundle_id, event_bundle = bundle_utils.bundle_event_data(event) if event.event else (None, None)
+        if event_bundle_id and state['is_event_data_driven'] and not is_reconnected:
+            state['heartbeat_count'] = 0
+            if event_bundle_id != bundle_id:
+                return False
+            elif event_bundle and 'bundleExecutions' in event_bundle:
+                bundle_scale = count_started_executions(event_bundle)
+            else:
+                # Execution events do not state whether the execution has started, so fetch the bundles instead.
                 bundle_scale = get_scale(bundle_id, args)
-                if bundle_scale == expected_scale:
-                    # Reprint previous message with flush to go to next line
-                    if last_log_message:
-                        log.progress(last_log_message, flush=True)
-
-                    log.info('Bundle {} expected scale {} is met'.format(bundle_id, expected_scale))
-                    return
-                else:
-                    if bundle_scale > last_scale:
-                        last_scale = bundle_scale
-
-                        # Reprint previous message with flush to go to next line
-                        if last_log_message:
-                            log.progress(last_log_message, flush=True)
-
-                        last_log_message = 'Bundle {} has scale {}, expected {}'.format(bundle_id, bundle_scale, expected_scale)
-                        log.progress(last_log_message, flush=False)
-                    else:
-                        last_log_message = '{}.'.format(last_log_message)
-                        log.progress(last_log_message, flush=False)
-
-        raise WaitTimeoutError('Bundle {} waiting to reach expected scale {}'.format(bundle_id, expected_scale))
+
+        # Check for bundle scale every 3 heartbeats from the last received event.
+        elif event.event or is_reconnected or \
+                (not state['is_event_data_driven'] and state['heartbeat_count'] % 3 == 0):
+            if event.event:
+                state['heartbeat_count'] = 0
+
+            # Events may have been missed prior to the first event identifying a bundle, or while reconnecting.
+            state['is_event_data_driven'] = state['is_event_data_driven'] or event_bundle_id is not None
+            bundle_scale = get_scale(bundle_id, args)
+
+        else:
+            return False
+
+        if bundle_scale == expected_scale:
+            return True
+
+        if on_progress:
+            on_progress(bundle_scale)
+        return False
+
+    return is_scale_met
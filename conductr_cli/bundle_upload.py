@@ -0,0 +1,263 @@
+from conductr_cli import conduct_request, conduct_url, timings, validation
+from conductr_cli.conduct_url import conductr_host
+from conductr_cli.http import DEFAULT_HTTP_TIMEOUT, DEFAULT_UPLOAD_CHUNK_SIZE, DEFAULT_UPLOAD_CHUNK_TIMEOUT, \
+    DEFAULT_UPLOAD_RETRIES
+from requests.exceptions import ConnectionError, Timeout
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib.parse import urljoin, urlparse
+from urllib3.fields import RequestField
+import json
+import logging
+import threading
+import time
+import uuid
+
+
+# The responses of a ConductR which doesn't support resumable uploads.
+UNSUPPORTED_STATUSES = (404, 405, 501)
+
+# The ConductR endpoints keyed by (scheme, host, port) which don't support resumable uploads, so that the bundles of
+# a batch are uploaded in a single request straight away once the first of them has been declined.
+UNSUPPORTED_ENDPOINTS = set()
+UNSUPPORTED_ENDPOINTS_LOCK = threading.Lock()
+
+# The number of bytes read from a file at once when streaming a multipart body.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class MultipartBody:
+    """
+    The multipart body of a bundle upload, read chunk by chunk at the offsets acknowledged by ConductR.
+    The last chunk read is kept so that it can be sent again in part. Should ConductR acknowledge fewer bytes than
+    that, the body is encoded again from the start using the same boundary.
+    """
+    def __init__(self, files):
+        self.files = files
+        self.boundary = uuid.uuid4().hex
+        self.encoder = MultipartEncoder(files, boundary=self.boundary)
+        self.len = self.encoder.len
+        self.content_type = self.encoder.content_type
+        # The bytes read from the encoder, of which the chunk holds those from the chunk offset onwards
+        self.position = 0
+        self.chunk_offset = 0
+        self.chunk = b''
+
+    def read(self, offset, size):
+        if offset < self.chunk_offset:
+            self.rewind()
+
+        if offset <= self.position:
+            self.chunk = self.chunk[offset - self.chunk_offset:]
+        else:
+            self.chunk = b''
+            while self.position < offset:
+                if not self.read_encoder(min(size, offset - self.position)):
+                    break
+        self.chunk_offset = offset
+
+        while len(self.chunk) < size:
+            data = self.read_encoder(size - len(self.chunk))
+            if not data:
+                break
+            self.chunk += data
+
+        return self.chunk[:size]
+
+    def read_encoder(self, size):
+        data = self.encoder.read(size)
+        self.position += len(data)
+        return data
+
+    def rewind(self):
+        for field, value in self.files:
+            if isinstance(value, tuple) and hasattr(value[1], 'seek'):
+                value[1].seek(0)
+        self.encoder = MultipartEncoder(self.files, boundary=self.boundary)
+        self.position = 0
+        self.chunk_offset = 0
+        self.chunk = b''
+
+
+class MultipartStream:
+    """
+    A multipart body which is sent with chunked transfer encoding, reading each part only as it is sent. Unlike with
+    the MultipartEncoder, the length of the parts needn't be known upfront, and the content of a part given as a
+    function is only obtained once the preceding parts have been sent.
+    """
+    def __init__(self, fields):
+        self.fields = fields
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def __iter__(self):
+        for name, value in self.fields:
+            file_name, data = value if isinstance(value, tuple) else (None, value)
+            # The part headers are those written by the MultipartEncoder
+            field = RequestField(name=name, data=None, filename=file_name)
+            field.make_multipart()
+            yield '--{}\r\n{}'.format(self.boundary, field.render_headers()).encode('utf-8')
+
+            if callable(data) and not hasattr(data, 'read'):
+                data = data()
+
+            if hasattr(data, 'read'):
+                chunk = data.read(STREAM_CHUNK_SIZE)
+                while chunk:
+                    yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+                    chunk = data.read(STREAM_CHUNK_SIZE)
+            else:
+                yield data.encode('utf-8') if isinstance(data, str) else data
+
+            yield b'\r\n'
+
+        yield '--{}--\r\n'.format(self.boundary).encode('utf-8')
+
+
+def upload(args, files, progress=None, chunk_size=DEFAULT_UPLOAD_CHUNK_SIZE):
+    """
+    Uploads a bundle larger than a chunk in chunks, if ConductR supports resumable uploads:
+
+    1. `POST bundles/uploads` with the `Upload-Length` and `Upload-Content-Type` of the multipart body is answered
+       with `201 Created` and the `Location` of the upload, or with 404, 405 or 501 if resumable uploads are not
+       supported.
+    2. `PATCH <location>` with a chunk of the body starting at `Upload-Offset` is answered with `204 No Content` and
+       the new `Upload-Offset`, or with `409 Conflict` if the offset doesn't match. Once all bytes have been received,
+       the response is that of loading the bundle in a single request.
+    3. `HEAD <location>` is answered with the `Upload-Offset` acknowledged so far, from which the upload is resumed
+       after a failed chunk.
+
+    :param progress: called with the number of bytes acknowledged by ConductR and the total number of bytes.
+    :return: the JSON response of ConductR, containing the `bundleId`, or None if the bundle is to be uploaded in a
+             single request instead.
+    """
+    log = logging.getLogger(__name__)
+
+    body = MultipartBody(files)
+    if body.len <= chunk_size:
+        return None
+
+    upload_url = create_upload(args, body)
+    if upload_url is None:
+        log.debug('Resumable uploads are not supported by ConductR, uploading the bundle in a single request')
+        return None
+
+    with timings.phase('upload'):
+        response = send_chunks(args, upload_url, body, chunk_size, progress)
+
+    if log.is_verbose_enabled():
+        log.verbose(validation.pretty_json(response.text))
+
+    return json.loads(response.text)
+
+
+def create_upload(args, body):
+    url = conduct_url.url('bundles/uploads', args)
+    endpoint = endpoint_key(url)
+    with UNSUPPORTED_ENDPOINTS_LOCK:
+        if endpoint in UNSUPPORTED_ENDPOINTS:
+            return None
+
+    response = conduct_request.post(args.dcos_mode, conductr_host(args), url,
+                                    auth=args.conductr_auth,
+                                    verify=args.server_verification_file,
+                                    headers={'Upload-Length': str(body.len),
+                                             'Upload-Content-Type': body.content_type},
+                                    timeout=DEFAULT_HTTP_TIMEOUT,
+                                    **dcos_success_statuses(args, UNSUPPORTED_STATUSES))
+    if response.status_code in UNSUPPORTED_STATUSES:
+        with UNSUPPORTED_ENDPOINTS_LOCK:
+            UNSUPPORTED_ENDPOINTS.add(endpoint)
+        return None
+
+    validation.raise_for_status_inc_3xx(response)
+    return urljoin(url, response.headers['Location'])
+
+
+def send_chunks(args, upload_url, body, chunk_size, progress):
+    """
+    Sends the body chunk by chunk, resuming from the offset acknowledged by ConductR whenever a chunk fails.
+    :return: the response to the last chunk.
+    """
+    log = logging.getLogger(__name__)
+
+    offset = 0
+    is_offset_known = True
+    failures = 0
+    while True:
+        try:
+            if not is_offset_known:
+                offset = get_upload_offset(args, upload_url)
+                is_offset_known = True
+
+            chunk = body.read(offset, chunk_size)
+            # ConductR loads the bundle once the last chunk has been received, which takes as long as it takes
+            is_last_chunk = offset + len(chunk) >= body.len
+            response = conduct_request.request('patch', args.dcos_mode, conductr_host(args), upload_url, retry=False,
+                                               data=chunk,
+                                               auth=args.conductr_auth,
+                                               verify=args.server_verification_file,
+                                               headers={'Upload-Offset': str(offset),
+                                                        'Content-Type': 'application/offset+octet-stream'},
+                                               timeout=None if is_last_chunk else DEFAULT_UPLOAD_CHUNK_TIMEOUT,
+                                               **dcos_success_statuses(args, [409]))
+        except (ConnectionError, Timeout) as e:
+            if failures >= DEFAULT_UPLOAD_RETRIES:
+                raise
+            reason = e
+        else:
+            if response.status_code == 204:
+                acknowledged_offset = int(response.headers['Upload-Offset'])
+                if acknowledged_offset > offset:
+                    offset = acknowledged_offset
+                    failures = 0
+                    if progress:
+                        progress(offset, body.len)
+                    continue
+                reason = 'no bytes acknowledged at offset {}'.format(offset)
+            elif response.status_code == 409 and failures < DEFAULT_UPLOAD_RETRIES:
+                reason = '{} {}'.format(response.status_code, response.reason)
+            else:
+                validation.raise_for_status_inc_3xx(response)
+                if progress:
+                    progress(body.len, body.len)
+                return response
+
+        if failures >= DEFAULT_UPLOAD_RETRIES:
+            raise ConnectionError('Unable to resume the upload at {}: {}'.format(upload_url, reason))
+
+        delay = conduct_request.RETRY_POLICIES['patch'].delay(failures)
+        log.info('Resuming upload at byte {} of {} in {:.1f}s: {}'.format(offset, body.len, delay, reason))
+        time.sleep(delay)
+        failures += 1
+        is_offset_known = False
+
+
+def get_upload_offset(args, upload_url):
+    response = conduct_request.request('head', args.dcos_mode, conductr_host(args), upload_url,
+                                       auth=args.conductr_auth,
+                                       verify=args.server_verification_file,
+                                       timeout=DEFAULT_HTTP_TIMEOUT)
+    validation.raise_for_status_inc_3xx(response)
+    return int(response.headers['Upload-Offset'])
+
+
+def dcos_success_statuses(args, statuses):
+    """
+    In DC/OS mode, `dcos.http` raises an exception for the responses which aren't successful. The statuses handled
+    by the upload are returned as responses instead.
+    :return: the keyword arguments of the request.
+    """
+    if not args.dcos_mode:
+        return {}
+
+    return {'is_success': lambda status_code: 200 <= status_code < 300 or status_code in statuses}
+
+
+def endpoint_key(url):
+    parsed = urlparse(url)
+    return parsed.scheme, parsed.hostname, parsed.port
+
+
+def reset_unsupported_endpoints():
+    with UNSUPPORTED_ENDPOINTS_LOCK:
+        UNSUPPORTED_ENDPOINTS.clear()
@@ -1,11 +1,78 @@
+from conductr_cli import timings
+from functools import partial
 from zipfile import ZipFile
+import hashlib
+import json
+import re
+
+
+BUNDLE_ID_RE = re.compile(r'^[0-9a-f]+(-[0-9a-f]+)?$')
+
+# The SHA-256 digest carried by the file names of bundles and configurations created by `shazar`.
+DIGEST_FILE_NAME_RE = re.compile(r'-([0-9a-f]{64})\.zip$')
+
+DIGEST_CHUNK_SIZE = 64 * 1024
 
 
 def short_id(bundle_id):
     return '-'.join([part[:7] for part in bundle_id.split('-')])
 
 
+@timings.timed('read bundle')
 def conf(bundle_path):
     bundle_zip = ZipFile(bundle_path)
     bundle_configuration = [bundle_zip.read(name) for name in bundle_zip.namelist() if name.endswith('bundle.conf')]
     return bundle_configuration[0].decode('utf-8') if len(bundle_configuration) == 1 else ''
+
+
+def digest(file_name, file):
+    """
+    Returns the SHA-256 digest of a bundle or configuration, as used by ConductR to derive bundle ids.
+    The digest is read from the file name if given by `shazar`, and otherwise computed from the file, which is then
+    rewound so that it can be uploaded.
+    """
+    file_digest = file_name_digest(file_name)
+    if file_digest:
+        return file_digest
+
+    file_digest = hash_file(file)
+    file.seek(0)
+    return file_digest
+
+
+def file_name_digest(file_name):
+    """
+    :return: the SHA-256 digest given by the name of a file created by `shazar`, or None.
+    """
+    match = DIGEST_FILE_NAME_RE.search(file_name)
+    return match.group(1) if match else None
+
+
+def hash_file(file):
+    sha256 = hashlib.sha256()
+    for chunk in iter(partial(file.read, DIGEST_CHUNK_SIZE), b''):
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def bundle_event_data(event):
+    """
+    Obtains the bundle which an event of the `bundles/events` stream relates to.
+    The event data is either the bundle id, or a JSON object containing the `bundleId` and optionally the
+    `bundleInstallations` and `bundleExecutions` of the bundle.
+    :param event: the SSE event
+    :return: a tuple of (bundle_id, bundle) where bundle is the JSON object carried by the event, if any.
+             Both are `None` if the event data does not identify a bundle.
+    """
+    data = event.data.strip() if isinstance(event.data, str) else ''
+    if data.startswith('{'):
+        try:
+            bundle = json.loads(data)
+            if isinstance(bundle, dict) and 'bundleId' in bundle:
+                return bundle['bundleId'], bundle
+        except ValueError:
+            pass
+    elif BUNDLE_ID_RE.match(data):
+        return data, None
+
+    return None, None
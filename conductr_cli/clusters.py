@@ -0,0 +1,124 @@
+from conductr_cli import conduct_request, conduct_request_async, conduct_url, custom_settings, validation
+from conductr_cli.conduct_url import conductr_host
+from requests.exceptions import ConnectionError, HTTPError
+from urllib.parse import urlparse
+import asyncio
+import copy
+import logging
+
+
+CLUSTER_COLUMN_FORMAT = '{cluster: <{cluster_width}}{padding}'
+
+
+def is_fan_out(args):
+    return bool(vars(args).get('hosts'))
+
+
+def resolve_clusters(args):
+    """
+    Returns the args to address each of the clusters given by `--hosts`. Each cluster is either named after a cluster
+    defined in the custom settings, e.g.
+
+        conductr.clusters {
+          prod-eu { host = "10.0.1.10", port = 9005, scheme = "https" }
+        }
+
+    or given as `host[:port]`, using the scheme, port and base path of the command otherwise.
+    """
+    clusters = []
+    for name in args.hosts:
+        cluster_args = copy.copy(args)
+        cluster_args.cluster = name
+        cluster_args.ip = None
+
+        cluster_config = custom_settings.get_config(args.custom_settings, 'conductr.clusters.\"{}\"'.format(name))
+        if cluster_config:
+            cluster_args.host = custom_settings.get_config_value(cluster_config, 'host')
+            cluster_args.port = custom_settings.get_config_value(cluster_config, 'port') or args.port
+            cluster_args.scheme = custom_settings.get_config_value(cluster_config, 'scheme') or args.scheme
+            cluster_args.base_path = custom_settings.get_config_value(cluster_config, 'base-path') or args.base_path
+        else:
+            address = urlparse('//{}'.format(name))
+            cluster_args.host = address.hostname
+            cluster_args.port = address.port or args.port
+
+        cluster_args.conductr_auth = custom_settings.load_conductr_credentials(cluster_args)
+        cluster_args.server_verification_file = custom_settings.load_server_ssl_verification_file(cluster_args)
+        if cluster_args.conductr_auth and cluster_args.scheme != 'https':
+            cluster_args.scheme = 'https'
+
+        clusters.append(cluster_args)
+
+    return clusters
+
+
+def get_bundles(args):
+    """
+    Fetches the bundles of all clusters given by `--hosts` concurrently. Each cluster has `--cluster-timeout` seconds
+    to respond, so that a slow or unreachable cluster doesn't hold up the report of the others.
+    :return: a list of (cluster name, bundles) for the clusters which responded, and whether all clusters responded.
+    """
+    log = logging.getLogger(__name__)
+    clusters = resolve_clusters(args)
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(get_all_bundles(clusters))
+    finally:
+        loop.close()
+
+    bundles_by_cluster = []
+    for cluster_args, result in zip(clusters, results):
+        if isinstance(result, Exception):
+            reason = failure_reason(result, cluster_args)
+            log.error('Unable to get bundles of cluster {}: {}'.format(cluster_args.cluster, reason))
+        else:
+            bundles_by_cluster.append((cluster_args.cluster, result))
+
+    return bundles_by_cluster, len(bundles_by_cluster) == len(clusters)
+
+
+async def get_all_bundles(clusters):
+    return await asyncio.gather(*[fetch_bundles(cluster_args) for cluster_args in clusters], return_exceptions=True)
+
+
+async def fetch_bundles(cluster_args):
+    log = logging.getLogger(__name__)
+    url = conduct_url.url('bundles', cluster_args)
+    # The cluster timeout bounds the whole request, leaving no time for retries
+    response = await asyncio.wait_for(
+        conduct_request_async.conditional_get(cluster_args.dcos_mode, conductr_host(cluster_args), url,
+                                              auth=cluster_args.conductr_auth,
+                                              verify=cluster_args.server_verification_file,
+                                              timeout=cluster_args.cluster_timeout, retry=False),
+        cluster_args.cluster_timeout)
+    validation.raise_for_status_inc_3xx(response)
+
+    if log.is_verbose_enabled():
+        log.verbose(validation.pretty_json(response.text))
+
+    return conduct_request.response_json(response)
+
+
+def failure_reason(error, cluster_args):
+    if isinstance(error, asyncio.TimeoutError):
+        return 'no response within {}s'.format(cluster_args.cluster_timeout)
+    elif isinstance(error, HTTPError):
+        return '{} {}'.format(error.response.status_code, error.response.reason)
+    elif isinstance(error, ConnectionError):
+        return 'unable to contact ConductR at {}'.format(conduct_url.url('bundles', cluster_args))
+    else:
+        return str(error)
+
+
+def sort_by_cluster(rows, args):
+    """
+    Groups the rows by cluster in the order the clusters were given, retaining the order of rows within each cluster.
+    """
+    if not is_fan_out(args):
+        return rows
+    return sorted(rows, key=lambda row: args.hosts.index(row['cluster']))
+
+
+def column_format(args):
+    return CLUSTER_COLUMN_FORMAT if is_fan_out(args) else ''
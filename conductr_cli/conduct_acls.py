@@ -1,6 +1,5 @@
-from conductr_cli import bundle_utils, conduct_request, conduct_url, validation, screen_utils
+from conductr_cli import bundle_utils, clusters, conduct_request, conduct_url, validation, screen_utils
 from conductr_cli.conduct_url import conductr_host
-import json
 import logging
 import re
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
@@ -19,12 +18,18 @@ def acls(args):
     """`conduct acls` command"""
 
     log = logging.getLogger(__name__)
-    url = conduct_url.url('bundles', args)
-    response = conduct_request.get(args.dcos_mode, conductr_host(args), url, timeout=DEFAULT_HTTP_TIMEOUT)
-    validation.raise_for_status_inc_3xx(response)
+    if clusters.is_fan_out(args):
+        bundles_by_cluster, is_all_fetched = clusters.get_bundles(args)
+    else:
+        url = conduct_url.url('bundles', args)
+        response = conduct_request.conditional_get(args.dcos_mode, conductr_host(args), url,
+                                                   timeout=DEFAULT_HTTP_TIMEOUT)
+        validation.raise_for_status_inc_3xx(response)
 
-    if log.is_verbose_enabled():
-        log.verbose(validation.pretty_json(response.text))
+        if log.is_verbose_enabled():
+            log.verbose(validation.pretty_json(response.text))
+
+        bundles_by_cluster, is_all_fetched = [(None, conduct_request.response_json(response))], True
 
     def get_system_version(bundle):
         if 'systemVersion' in bundle['attributes']:
@@ -40,6 +45,7 @@ def acls(args):
 
     all_acls = [
         {
+            'cluster': cluster,
             'acl': acl,
             'system': bundle['attributes']['system'],
             'system_version': get_system_version(bundle),
@@ -48,28 +54,30 @@ def acls(args):
             'bundle_name': bundle['attributes']['bundleName'],
             'status': is_started(bundle['bundleExecutions'])
         }
-        for bundle in json.loads(response.text) if bundle['bundleExecutions']
+        for cluster, bundles in bundles_by_cluster
+        for bundle in bundles if bundle['bundleExecutions']
         for endpoint_name, endpoint in bundle['bundleConfig']['endpoints'].items() if 'acls' in endpoint
         for acl in endpoint['acls']
     ]
 
     if args.protocol_family == 'http':
         http_acls = [acl for acl in all_acls if 'http' in acl['acl']]
-        display_http_acls(log, http_acls)
+        display_http_acls(log, http_acls, args)
 
     elif args.protocol_family == 'tcp':
         tcp_acls = [acl for acl in all_acls if 'tcp' in acl['acl']]
-        display_tcp_acls(log, tcp_acls)
+        display_tcp_acls(log, tcp_acls, args)
 
-    return True
+    return is_all_fetched
 
 
-def display_tcp_acls(log, tcp_acls):
+def display_tcp_acls(log, tcp_acls, args):
     def tcp_port_value(line):
         return int(line['tcp_port'])
 
     data = [
         {
+            'cluster': 'CLUSTER',
             'tcp_port': 'TCP/PORT',
             'system': 'SYSTEM',
             'system_version': 'SYSTEM VERSION',
@@ -78,8 +86,9 @@ def display_tcp_acls(log, tcp_acls):
             'bundle_name': 'BUNDLE NAME',
             'status': 'STATUS'
         }
-    ] + sorted([
+    ] + clusters.sort_by_cluster(sorted([
         {
+            'cluster': tcp_acl['cluster'],
             'tcp_port': tcp_port,
             'system': tcp_acl['system'],
             'system_version': tcp_acl['system_version'],
@@ -90,24 +99,26 @@ def display_tcp_acls(log, tcp_acls):
         }
         for tcp_acl in tcp_acls
         for tcp_port in tcp_acl['acl']['tcp']['requests']
-    ], key=tcp_port_value)
+    ], key=tcp_port_value), args)
 
     padding = 2
     column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
     for row in data:
         log.screen(
-            '{tcp_port: <{tcp_port_width}}{padding}'
-            '{system: <{system_width}}{padding}'
-            '{system_version: <{system_version_width}}{padding}'
-            '{endpoint_name: <{endpoint_name_width}}{padding}'
-            '{bundle_id: <{bundle_id_width}}{padding}'
-            '{bundle_name: <{bundle_name_width}}{padding}'
-            '{status: <{status_width}}'.format(**dict(row, **column_widths)).rstrip())
+            (clusters.column_format(args) +
+             '{tcp_port: <{tcp_port_width}}{padding}'
+             '{system: <{system_width}}{padding}'
+             '{system_version: <{system_version_width}}{padding}'
+             '{endpoint_name: <{endpoint_name_width}}{padding}'
+             '{bundle_id: <{bundle_id_width}}{padding}'
+             '{bundle_name: <{bundle_name_width}}{padding}'
+             '{status: <{status_width}}').format(**dict(row, **column_widths)).rstrip())
 
 
-def display_http_acls(log, http_acls):
+def display_http_acls(log, http_acls, args):
     http_request_mappings = [
         {
+            'cluster': http_acl['cluster'],
             'http_method': http_request_mapping['method'] if 'method' in http_request_mapping else ALL_HTTP_METHOD,
             'http_rewrite': http_request_mapping['rewrite'] if 'rewrite' in http_request_mapping else '',
             'http_acl': get_http_acl(http_request_mapping),
@@ -145,6 +156,7 @@ def display_http_acls(log, http_acls):
     ], key=path_depth_reverse)
 
     data = [{
+        'cluster': 'CLUSTER',
         'http_method': 'METHOD',
         'http_acl': 'PATH',
         'http_rewrite': 'REWRITE',
@@ -154,21 +166,22 @@ def display_http_acls(log, http_acls):
         'bundle_id': 'BUNDLE ID',
         'bundle_name': 'BUNDLE NAME',
         'status': 'STATUS'
-    }] + http_path_regex_sorted + http_path_beg_sorted + http_path_sorted
+    }] + clusters.sort_by_cluster(http_path_regex_sorted + http_path_beg_sorted + http_path_sorted, args)
 
     padding = 2
     column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
     for row in data:
         log.screen(
-            '{http_method: <{http_method_width}}{padding}'
-            '{http_acl: <{http_acl_width}}{padding}'
-            '{http_rewrite: <{http_rewrite_width}}{padding}'
-            '{system: <{system_width}}{padding}'
-            '{system_version: <{system_version_width}}{padding}'
-            '{endpoint_name: <{endpoint_name_width}}{padding}'
-            '{bundle_id: <{bundle_id_width}}{padding}'
-            '{bundle_name: <{bundle_name_width}}{padding}'
-            '{status: <{status_width}}'.format(**dict(row, **column_widths)).rstrip())
+            (clusters.column_format(args) +
+             '{http_method: <{http_method_width}}{padding}'
+             '{http_acl: <{http_acl_width}}{padding}'
+             '{http_rewrite: <{http_rewrite_width}}{padding}'
+             '{system: <{system_width}}{padding}'
+             '{system_version: <{system_version_width}}{padding}'
+             '{endpoint_name: <{endpoint_name_width}}{padding}'
+             '{bundle_id: <{bundle_id_width}}{padding}'
+             '{bundle_name: <{bundle_name_width}}{padding}'
+             '{status: <{status_width}}').format(**dict(row, **column_widths)).rstrip())
 
 
 def get_http_acl(http_request_mapping):
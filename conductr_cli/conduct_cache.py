@@ -0,0 +1,78 @@
+from conductr_cli import bundle_utils, resolve_cache, screen_utils
+import logging
+import os
+import time
+
+
+def cache(args):
+    """`conduct cache` command"""
+
+    log = logging.getLogger(__name__)
+
+    cache_dir = args.resolve_cache_dir
+    if not os.path.isdir(cache_dir):
+        log.screen('The cache {} is empty'.format(cache_dir))
+        return True
+
+    records = resolve_cache.list_files(cache_dir)
+
+    is_verified = True
+    if args.verify:
+        is_verified = verify(log, cache_dir, records)
+
+    if args.prune:
+        for file in resolve_cache.evict(cache_dir, args.max_size):
+            log.info('Evicted {}'.format(file))
+
+    if args.verify or args.prune:
+        records = resolve_cache.list_files(cache_dir)
+
+    report(log, cache_dir, records, args.max_size)
+
+    return is_verified
+
+
+def verify(log, cache_dir, records):
+    """
+    Reads every cached file again, recording its digest. Files which don't match the digest of their name are removed.
+    :return: whether all files matched the digest of their name.
+    """
+    is_verified = True
+    for record in records:
+        file_path = os.path.join(cache_dir, record['file_name'])
+        with open(file_path, 'rb') as f:
+            digest = bundle_utils.hash_file(f)
+
+        expected_digest = bundle_utils.file_name_digest(record['file_name'])
+        if expected_digest and digest != expected_digest:
+            log.warning('Removing {} as it does not match the digest of its name'.format(file_path))
+            resolve_cache.remove(file_path)
+            is_verified = False
+        else:
+            resolve_cache.record_digest(file_path, digest)
+
+    return is_verified
+
+
+def report(log, cache_dir, records, max_size):
+    data = [
+        {
+            'file_name': record['file_name'],
+            'size': screen_utils.format_size(record['size']),
+            'last_used': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['last_used'])),
+            'verified': 'Yes' if record['verified'] else 'No'
+        } for record in records
+    ]
+    data.insert(0, {'file_name': 'FILE', 'size': 'SIZE', 'last_used': 'LAST USED', 'verified': 'VERIFIED'})
+
+    padding = 2
+    column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
+    for row in data:
+        log.screen('{file_name: <{file_name_width}}{padding}'
+                   '{size: >{size_width}}{padding}'
+                   '{last_used: <{last_used_width}}{padding}'
+                   '{verified: <{verified_width}}'.format(**dict(row, **column_widths)).rstrip())
+
+    total_size = sum(record['size'] for record in records)
+    log.screen('{} files, {} of {} in {}'.format(
+        len(records), screen_utils.format_size(total_size), screen_utils.format_size(max_size) if max_size else 'unlimited', cache_dir))
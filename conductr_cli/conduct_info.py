@@ -1,6 +1,5 @@
-from conductr_cli import bundle_utils, conduct_request, conduct_url, validation, screen_utils
+from conductr_cli import bundle_utils, clusters, conduct_request, conduct_url, validation, screen_utils
 from conductr_cli.conduct_url import conductr_host
-import json
 import logging
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 
@@ -11,39 +10,48 @@ def info(args):
     """`conduct info` command"""
 
     log = logging.getLogger(__name__)
-    url = conduct_url.url('bundles', args)
-    response = conduct_request.get(args.dcos_mode, conductr_host(args), url, auth=args.conductr_auth,
-                                   verify=args.server_verification_file, timeout=DEFAULT_HTTP_TIMEOUT)
-    validation.raise_for_status_inc_3xx(response)
+    if clusters.is_fan_out(args):
+        bundles_by_cluster, is_all_fetched = clusters.get_bundles(args)
+    else:
+        url = conduct_url.url('bundles', args)
+        response = conduct_request.conditional_get(args.dcos_mode, conductr_host(args), url, auth=args.conductr_auth,
+                                                   verify=args.server_verification_file, timeout=DEFAULT_HTTP_TIMEOUT)
+        validation.raise_for_status_inc_3xx(response)
 
-    if log.is_verbose_enabled():
-        log.verbose(validation.pretty_json(response.text))
+        if log.is_verbose_enabled():
+            log.verbose(validation.pretty_json(response.text))
+
+        bundles_by_cluster, is_all_fetched = [(None, conduct_request.response_json(response))], True
 
     data = [
         {
+            'cluster': cluster,
             'id': ('! ' if bundle.get('hasError', False) else '') +
                   (bundle['bundleId'] if args.long_ids else bundle_utils.short_id(bundle['bundleId'])),
             'name': bundle['attributes']['bundleName'],
             'replications': len(bundle['bundleInstallations']),
             'starting': sum([not execution['isStarted'] for execution in bundle['bundleExecutions']]),
             'executions': sum([execution['isStarted'] for execution in bundle['bundleExecutions']])
-        } for bundle in json.loads(response.text)
+        }
+        for cluster, bundles in bundles_by_cluster
+        for bundle in bundles
     ]
-    data.insert(0, {'id': 'ID', 'name': 'NAME', 'replications': '#REP', 'starting': '#STR', 'executions': '#RUN'})
+    data.insert(0, {'cluster': 'CLUSTER', 'id': 'ID', 'name': 'NAME', 'replications': '#REP', 'starting': '#STR',
+                    'executions': '#RUN'})
 
     padding = 2
     column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
     has_error = False
     for row in data:
         has_error |= '!' in row['id']
-        log.screen('''\
+        log.screen((clusters.column_format(args) + '''\
 {id: <{id_width}}{padding}\
 {name: <{name_width}}{padding}\
 {replications: >{replications_width}}{padding}\
 {starting: >{starting_width}}{padding}\
-{executions: >{executions_width}}'''.format(**dict(row, **column_widths)).rstrip())
+{executions: >{executions_width}}''').format(**dict(row, **column_widths)).rstrip())
 
     if has_error:
         log.screen('There are errors: use `conduct events` or `conduct logs` for further information')
 
-    return True
+    return is_all_fetched
@@ -1,14 +1,16 @@
 from pyhocon import ConfigFactory, ConfigTree
 from pyhocon.exceptions import ConfigMissingException
-from conductr_cli import bundle_utils, conduct_request, conduct_url, screen_utils, validation
+from conductr_cli import bundle_upload, bundle_utils, conduct_request, conduct_url, screen_utils, timings, validation
 from conductr_cli.exceptions import MalformedBundleError, InsecureFilePermissions
-from conductr_cli import resolver, bundle_installation
-from conductr_cli.constants import DEFAULT_BUNDLE_RESOLVE_CACHE_DIR
+from conductr_cli import resolve_cache, resolver, bundle_installation
+from conductr_cli.constants import DEFAULT_BUNDLE_RESOLVE_CACHE_DIR, DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE
 from conductr_cli.conduct_url import conductr_host
+from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
+from dcos.errors import DCOSHTTPException
 from functools import partial
+from requests.exceptions import ConnectionError, HTTPError
 from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
 
-import glob
 import io
 import os
 import stat
@@ -64,7 +66,6 @@ def load_v1(args):
 
     with_bundle_configurations = partial(apply_to_configurations, bundle_conf, overlay_bundle_conf)
 
-    url = conduct_url.url('bundles', args)
     files = get_payload(bundle_file_name, bundle_file, with_bundle_configurations)
     if configuration_file is not None:
         files.append(('configuration', (configuration_file_name, open(configuration_file, 'rb'))))
@@ -76,25 +77,14 @@ def load_v1(args):
     # if configuration_file and os.path.exists(configuration_file):
     #    os.remove(configuration_file)
 
-    log.info('Loading bundle to ConductR..')
-    multipart = create_multipart(log, files)
-    response = conduct_request.post(args.dcos_mode, conductr_host(args), url,
-                                    data=multipart,
-                                    auth=args.conductr_auth,
-                                    verify=args.server_verification_file,
-                                    headers={'Content-Type': multipart.content_type})
-    validation.raise_for_status_inc_3xx(response)
-
-    if log.is_verbose_enabled():
-        log.verbose(validation.pretty_json(response.text))
-
-    response_json = json.loads(response.text)
+    response_json = upload(args, files)
     bundle_id = response_json['bundleId'] if args.long_ids else bundle_utils.short_id(response_json['bundleId'])
 
     if not args.no_wait:
         bundle_installation.wait_for_installation(response_json['bundleId'], args)
 
-    cleanup_old_bundles(resolve_cache_dir, bundle_file_name, excluded=bundle_file)
+    cleanup_old_bundles(resolve_cache_dir, bundle_file_name, excluded=bundle_file,
+                        configuration_file=configuration_file)
 
     log.info('Bundle loaded.')
     if not args.disable_instructions:
@@ -147,74 +137,207 @@ def load_v2(args):
     log = logging.getLogger(__name__)
 
     log.info('Retrieving bundle..')
-    custom_settings = args.custom_settings
-    resolve_cache_dir = args.resolve_cache_dir
+    validate_cache_dir_permissions(args.resolve_cache_dir, log)
 
-    validate_cache_dir_permissions(resolve_cache_dir, log)
+    if vars(args).get('stream'):
+        bundle_file_name, bundle_file, configuration_file, response_json = stream_v2(args)
+    else:
+        bundle_file_name, bundle_file, configuration_file, files = resolve_v2(args, args.bundle, args.configuration)
+        response_json = upload(args, files)
 
-    bundle_file_name, bundle_file = resolver.resolve_bundle(custom_settings, resolve_cache_dir,
-                                                            args.bundle, args.offline_mode)
+    bundle_id = response_json['bundleId'] if args.long_ids else bundle_utils.short_id(response_json['bundleId'])
+
+    if not args.no_wait:
+        bundle_installation.wait_for_installation(response_json['bundleId'], args)
+
+    cleanup_old_bundles(args.resolve_cache_dir, bundle_file_name, excluded=bundle_file,
+                        configuration_file=configuration_file)
+
+    log.info('Bundle loaded.')
+    if not args.disable_instructions:
+        log.info('Start bundle with: {} run{} {}'.format(args.command, args.cli_parameters, bundle_id))
+        log.info('Unload bundle with: {} unload{} {}'.format(args.command, args.cli_parameters, bundle_id))
+        log.info('Print ConductR info with: {} info{}'.format(args.command, args.cli_parameters))
+
+    if not log.is_info_enabled() and log.is_quiet_enabled():
+        log.quiet(response_json['bundleId'])
+
+    return True
+
+
+def resolve_v2(args, bundle, configuration):
+    """
+    Resolves the bundle and its optional configuration.
+    :return: the bundle file name, the bundle file, the configuration file if any, and the files to be uploaded to
+             ConductR.
+    """
+    bundle_file_name, bundle_file = resolver.resolve_bundle(args.custom_settings, args.resolve_cache_dir,
+                                                            bundle, args.offline_mode)
+    configuration_file, files = payload_v2(args, bundle_file_name, bundle_file, configuration)
+    return bundle_file_name, bundle_file, configuration_file, files
+
+
+def payload_v2(args, bundle_file_name, bundle_file, configuration):
+    bundle_conf = read_bundle_conf(bundle_file)
+
+    configuration_file_name, configuration_file = resolve_configuration_v2(args, configuration)
+    bundle_conf_overlay = None if configuration_file is None else bundle_utils.conf(configuration_file)
+
+    files = [('bundleConf', ('bundle.conf', string_io(bundle_conf)))]
+    if bundle_conf_overlay is not None:
+        files.append(('bundleConfOverlay', ('bundle.conf', string_io(bundle_conf_overlay))))
+    files.append(('bundle', (bundle_file_name, open(bundle_file, 'rb'))))
+    if configuration_file is not None:
+        files.append(('configuration', (configuration_file_name, open(configuration_file, 'rb'))))
+
+    # TODO: Delete the bundle configuration file.
+    # Currently, this results into a permission error on Windows.
+    # Therefore, the deletion is disabled for now.
+    # Issue: https://github.com/typesafehub/conductr-cli/issues/175
+    # if configuration_file and os.path.exists(configuration_file):
+    #     os.remove(configuration_file)
+
+    return configuration_file, files
+
+
+def stream_v2(args):
+    """
+    Resolves and uploads the bundle like `resolve_v2` and `upload`, except that a remote bundle is uploaded while it is
+    being downloaded rather than afterwards. The bundle.conf within the bundle is read upfront from the remote bundle,
+    see `uri_resolver.stream_bundle`, so that it is sent to ConductR ahead of the bundle as with `payload_v2`.
+    :return: the bundle file name, the bundle file, the configuration file if any, and the JSON response of ConductR.
+    """
+    log = logging.getLogger(__name__)
+
+    bundle_file_name, bundle_file, download = resolver.stream_bundle(args.custom_settings, args.resolve_cache_dir,
+                                                                     args.bundle, args.offline_mode)
+    if download is None:
+        configuration_file, files = payload_v2(args, bundle_file_name, bundle_file, args.configuration)
+        return bundle_file_name, bundle_file, configuration_file, upload(args, files)
+
+    files = [('bundleConf', ('bundle.conf', string_io(download.bundle_conf))),
+             ('bundle', (bundle_file_name, download))]
+    try:
+        configuration_file_name, configuration_file = resolve_configuration_v2(args, args.configuration)
+        if configuration_file is not None:
+            files.insert(1, ('bundleConfOverlay', ('bundle.conf', string_io(bundle_utils.conf(configuration_file)))))
+            files.append(('configuration', (configuration_file_name, open(configuration_file, 'rb'))))
+
+        # The bundle isn't downloaded at all if ConductR holds it already, provided its digest is given by its name
+        if bundle_utils.DIGEST_FILE_NAME_RE.search(bundle_file_name):
+            loaded_bundle_id = find_loaded_bundle(args, files)
+            if loaded_bundle_id:
+                log.info('Bundle is already loaded, skipping upload..')
+                return bundle_file_name, bundle_file, configuration_file, {'bundleId': loaded_bundle_id}
+
+        log.info('Loading bundle to ConductR while retrieving it..')
+        response_json = post_bundle(args, bundle_upload.MultipartStream(files))
+        return bundle_file_name, bundle_file, configuration_file, response_json
+    finally:
+        close_files(files)
+
+
+def resolve_configuration_v2(args, configuration):
+    if configuration is None:
+        return None, None
+
+    log = logging.getLogger(__name__)
+    log.info('Retrieving configuration..')
+    return resolver.resolve_bundle_configuration(args.custom_settings, args.resolve_cache_dir, configuration,
+                                                 args.offline_mode)
+
+
+def read_bundle_conf(bundle_file):
     bundle_conf = bundle_utils.conf(bundle_file)
 
     if bundle_conf is None:
         raise MalformedBundleError('Unable to find bundle.conf within the bundle file')
-    else:
-        configuration_file_name, configuration_file, bundle_conf_overlay = (None, None, None)
-        if args.configuration is not None:
-            log.info('Retrieving configuration..')
-            configuration_file_name, configuration_file = resolver.resolve_bundle_configuration(custom_settings,
-                                                                                                resolve_cache_dir,
-                                                                                                args.configuration,
-                                                                                                args.offline_mode)
-            bundle_conf_overlay = bundle_utils.conf(configuration_file)
-
-        files = [('bundleConf', ('bundle.conf', string_io(bundle_conf)))]
-        if bundle_conf_overlay is not None:
-            files.append(('bundleConfOverlay', ('bundle.conf', string_io(bundle_conf_overlay))))
-        files.append(('bundle', (bundle_file_name, open(bundle_file, 'rb'))))
-        if configuration_file is not None:
-            files.append(('configuration', (configuration_file_name, open(configuration_file, 'rb'))))
 
-        # TODO: Delete the bundle configuration file.
-        # Currently, this results into a permission error on Windows.
-        # Therefore, the deletion is disabled for now.
-        # Issue: https://github.com/typesafehub/conductr-cli/issues/175
-        # if configuration_file and os.path.exists(configuration_file):
-        #     os.remove(configuration_file)
+    return bundle_conf
+
+
+def upload(args, files):
+    """
+    Uploads the bundle to ConductR, unless ConductR already holds the same bundle and configuration.
+    :return: the JSON response of ConductR, containing the `bundleId`.
+    """
+    log = logging.getLogger(__name__)
 
-        url = conduct_url.url('bundles', args)
+    loaded_bundle_id = find_loaded_bundle(args, files)
+    if loaded_bundle_id:
+        log.info('Bundle is already loaded, skipping upload..')
+        close_files(files)
+        return {'bundleId': loaded_bundle_id}
 
-        log.info('Loading bundle to ConductR..')
+    log.info('Loading bundle to ConductR..')
+    response_json = bundle_upload.upload(args, files, upload_progress(log))
+    if response_json is None:
         multipart = create_multipart(log, files)
+        response_json = post_bundle(args, multipart)
 
-        response = conduct_request.post(args.dcos_mode, conductr_host(args), url,
-                                        data=multipart,
-                                        auth=args.conductr_auth,
-                                        verify=args.server_verification_file,
-                                        headers={'Content-Type': multipart.content_type})
+    return response_json
+
+
+def find_loaded_bundle(args, files):
+    """
+    Checks whether ConductR already holds the bundle and configuration about to be uploaded. ConductR derives the id of
+    a bundle from the digests of the bundle and of its configuration, so that it is known ahead of the upload.
+    A failure to obtain the bundles of ConductR doesn't prevent the upload.
+    :return: the id of the loaded bundle, or None.
+    """
+    log = logging.getLogger(__name__)
+
+    digests = [file_digest(*value) for field, value in files if field in ['bundle', 'configuration']]
+    bundle_id = '-'.join(digests)
+
+    url = conduct_url.url('bundles', args)
+    try:
+        response = conduct_request.conditional_get(args.dcos_mode, conductr_host(args), url,
+                                                   auth=args.conductr_auth,
+                                                   verify=args.server_verification_file,
+                                                   timeout=DEFAULT_HTTP_TIMEOUT)
         validation.raise_for_status_inc_3xx(response)
+        bundles = conduct_request.response_json(response)
+    except (ConnectionError, HTTPError, DCOSHTTPException, ValueError) as e:
+        log.debug('Unable to check whether bundle {} is already loaded: {}'.format(bundle_id, e))
+        return None
 
-        if log.is_verbose_enabled():
-            log.verbose(validation.pretty_json(response.text))
+    return bundle_id if any(bundle['bundleId'] == bundle_id for bundle in bundles) else None
 
-        response_json = json.loads(response.text)
-        bundle_id = response_json['bundleId'] if args.long_ids else bundle_utils.short_id(response_json['bundleId'])
 
-        if not args.no_wait:
-            bundle_installation.wait_for_installation(response_json['bundleId'], args)
+def file_digest(file_name, file):
+    # The digest recorded when the file was resolved spares reading the file again
+    file_path = getattr(file, 'name', None)
+    recorded_digest = resolve_cache.recorded_digest(file_path) if isinstance(file_path, str) else None
+    return recorded_digest or bundle_utils.digest(file_name, file)
 
-        cleanup_old_bundles(resolve_cache_dir, bundle_file_name, excluded=bundle_file)
 
-        log.info('Bundle loaded.')
-        if not args.disable_instructions:
-            log.info('Start bundle with: {} run{} {}'.format(args.command, args.cli_parameters, bundle_id))
-            log.info('Unload bundle with: {} unload{} {}'.format(args.command, args.cli_parameters, bundle_id))
-            log.info('Print ConductR info with: {} info{}'.format(args.command, args.cli_parameters))
+def close_files(files):
+    for field, value in files:
+        if isinstance(value, tuple) and hasattr(value[1], 'close'):
+            value[1].close()
 
-        if not log.is_info_enabled() and log.is_quiet_enabled():
-            log.quiet(response_json['bundleId'])
 
-    return True
+def post_bundle(args, multipart):
+    """
+    Uploads the bundle to ConductR.
+    :return: the JSON response of ConductR, containing the `bundleId`.
+    """
+    log = logging.getLogger(__name__)
+    url = conduct_url.url('bundles', args)
+
+    with timings.phase('upload'):
+        response = conduct_request.post(args.dcos_mode, conductr_host(args), url,
+                                        data=multipart,
+                                        auth=args.conductr_auth,
+                                        verify=args.server_verification_file,
+                                        headers={'Content-Type': multipart.content_type})
+    validation.raise_for_status_inc_3xx(response)
+
+    if log.is_verbose_enabled():
+        log.verbose(validation.pretty_json(response.text))
+
+    return json.loads(response.text)
 
 
 def create_multipart(log, files):
@@ -243,29 +366,34 @@ def conduct_load_progress_monitor(log):
     return continue_logging
 
 
+def upload_progress(log):
+    def log_progress(uploaded, total):
+        log.progress(screen_utils.progress_bar(uploaded, total), flush=uploaded >= total)
+
+    return log_progress
+
+
 def string_io(input_text):
     return io.StringIO(input_text)
 
 
-def cleanup_old_bundles(cache_dir, bundle_file_name, excluded):
-    bundle_name_parts = bundle_file_name.split('-')
-    # Remove digest, keeping only bundle name and compatible version
-    bundle_name = '-'.join(bundle_name_parts[:-1])
-
-    # List of bundle files having the same name and compatibility version, sorted from oldest to latest.
-    # This list excludes the file specified as `excluded`, and normally the `excluded` file is the recently loaded
-    # bundle.
-    older_bundle_files = sorted([
+def cleanup_old_bundles(cache_dir, bundle_file_name, excluded, configuration_file=None):
+    # The bundle files having the same name and compatibility version, from the latest to the oldest, are looked up
+    # in the index of the cache. This list excludes the file specified as `excluded`, and normally the `excluded` file
+    # is the recently loaded bundle. Neither it nor its `configuration_file` are evicted from the cache.
+    name, compatibility_version = resolve_cache.parse_file_name(bundle_file_name)
+    older_bundle_files = [
         file
-        for file in glob.glob('{}/*.zip'.format(cache_dir))
-        if os.path.isfile(file) and
-        os.path.basename(file).startswith(bundle_name) and
-        not is_same_path(file, excluded)
-    ], key=lambda f: os.path.getmtime(f))
+        for file in resolve_cache.find_files(cache_dir, name, compatibility_version)
+        if not is_same_path(file, excluded)
+    ]
 
-    bundle_files_to_delete = older_bundle_files[:(-1 * KEEP_BUNDLE_VERSIONS)]
+    bundle_files_to_delete = older_bundle_files[KEEP_BUNDLE_VERSIONS:]
     for file in bundle_files_to_delete:
-        os.remove(file)
+        resolve_cache.remove(file)
+
+    evict_excluded = [excluded] if configuration_file is None else [excluded, configuration_file]
+    resolve_cache.evict(cache_dir, DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE, excluded=evict_excluded)
 
 
 def is_same_path(a, b):
@@ -0,0 +1,258 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from conductr_cli import bundle_installation, bundle_scale, bundle_upload, bundle_utils, conduct_load, \
+    conduct_request, conduct_url, custom_settings, screen_utils, validation
+from conductr_cli.conduct_url import conductr_host
+from conductr_cli.exceptions import MalformedManifestError, WaitTimeoutError
+from conductr_cli.screen_utils import format_size
+from pyhocon import ConfigFactory
+from pyparsing import ParseBaseException
+from requests.exceptions import HTTPError
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+import logging
+import time
+
+
+# The number of bundles resolved, and uploaded to ConductR, at once.
+DEFAULT_RESOLVE_JOBS = 4
+DEFAULT_UPLOAD_JOBS = 2
+
+
+@validation.handle_connection_error
+@validation.handle_http_error
+@validation.handle_invalid_config
+@validation.handle_malformed_manifest
+@validation.handle_no_file
+@validation.handle_insecure_file_permissions
+def load_batch(args):
+    """`conduct load-batch` command"""
+
+    log = logging.getLogger(__name__)
+
+    if args.api_version == '1':
+        log.error('Loading bundles from a manifest is only available for v2 onwards of ConductR')
+        return False
+
+    results = parse_manifest(args.manifest)
+    conduct_load.validate_cache_dir_permissions(args.resolve_cache_dir, log)
+
+    log.info('Loading {} bundles..'.format(len(results)))
+    start_time = time.monotonic()
+
+    # Each bundle is uploaded as soon as it has been resolved, while the remaining bundles are still being resolved.
+    # A bundle listed more than once with the same configuration is only resolved and uploaded once.
+    results_by_uri = OrderedDict()
+    for result in results:
+        results_by_uri.setdefault((result['bundle'], result['configuration']), result)
+    with ThreadPoolExecutor(max_workers=args.resolve_jobs) as resolve_executor, \
+            ThreadPoolExecutor(max_workers=args.upload_jobs) as upload_executor:
+        resolve_futures = [resolve_executor.submit(resolve, args, result) for result in results_by_uri.values()]
+        upload_futures = [upload_executor.submit(upload, args, future.result())
+                          for future in as_completed(resolve_futures)]
+        for future in upload_futures:
+            future.result()
+
+    for result in results:
+        loaded_result = results_by_uri[(result['bundle'], result['configuration'])]
+        if result is not loaded_result:
+            copy_duplicate(result, loaded_result)
+
+    upload_time = time.monotonic() - start_time
+    loaded = [result for result in results if result['bundle_id']]
+
+    is_completed_without_error = len(loaded) == len(results)
+    if loaded and not args.no_wait:
+        is_completed_without_error &= wait(args, loaded)
+
+    for result in loaded:
+        conduct_load.cleanup_old_bundles(args.resolve_cache_dir, result['bundle_file_name'],
+                                         excluded=result['bundle_file'],
+                                         configuration_file=result['configuration_file'])
+
+    report(log, args, results, upload_time)
+
+    return is_completed_without_error
+
+
+def parse_manifest(manifest_file):
+    """
+    Parses the manifest listing the bundles to be loaded, in HOCON or JSON, e.g.
+
+        bundles = [
+          { bundle = "visualizer", configuration = "visualizer-config.zip", scale = 2 },
+          { bundle = "eslite" }
+        ]
+
+    :return: the result of loading each bundle, yet to be filled in.
+    """
+    try:
+        manifest = ConfigFactory.parse_file(manifest_file)
+    except ParseBaseException as e:
+        raise MalformedManifestError('Unable to parse {}: {}'.format(manifest_file, e))
+
+    entries = custom_settings.get_config_value(manifest, 'bundles')
+    if not entries:
+        raise MalformedManifestError('No bundles listed in {}'.format(manifest_file))
+
+    results = []
+    for entry in entries:
+        bundle = custom_settings.get_config_value(entry, 'bundle') if hasattr(entry, 'get') else None
+        if not bundle:
+            raise MalformedManifestError('Each bundle of {} requires a `bundle`'.format(manifest_file))
+
+        scale = custom_settings.get_config_value(entry, 'scale')
+        if scale is not None and (isinstance(scale, bool) or not isinstance(scale, int) or scale < 1):
+            raise MalformedManifestError('The scale of {} in {} must be a positive integer'
+                                         .format(bundle, manifest_file))
+
+        results.append({
+            'bundle': bundle,
+            'configuration': custom_settings.get_config_value(entry, 'configuration'),
+            'scale': scale,
+            'bundle_file_name': None,
+            'bundle_file': None,
+            'configuration_file': None,
+            'files': None,
+            'bundle_id': None,
+            'size': 0,
+            'resolve_time': 0.0,
+            'upload_time': 0.0,
+            'status': None,
+            'error': None
+        })
+
+    return results
+
+
+def resolve(args, result):
+    start_time = time.monotonic()
+    try:
+        result['bundle_file_name'], result['bundle_file'], result['configuration_file'], result['files'] = \
+            conduct_load.resolve_v2(args, result['bundle'], result['configuration'])
+    except Exception as e:
+        result['error'] = 'Unable to resolve: {}'.format(error_reason(e))
+    finally:
+        result['resolve_time'] = time.monotonic() - start_time
+
+    return result
+
+
+def upload(args, result):
+    if result['error']:
+        return result
+
+    log = logging.getLogger(__name__)
+    start_time = time.monotonic()
+    try:
+        loaded_bundle_id = conduct_load.find_loaded_bundle(args, result['files'])
+        if loaded_bundle_id:
+            result['bundle_id'] = loaded_bundle_id
+            result['status'] = 'Already loaded'
+            log.info('Bundle {} already loaded as {}'.format(result['bundle'], result['bundle_id']))
+        else:
+            # No progress bar is shown, as the progress of concurrent uploads would be interleaved
+            multipart = MultipartEncoder(result['files'])
+            result['size'] = multipart.len
+            response_json = bundle_upload.upload(args, result['files']) or conduct_load.post_bundle(args, multipart)
+            result['bundle_id'] = response_json['bundleId']
+            result['status'] = 'Loaded'
+            log.info('Bundle {} loaded as {}'.format(result['bundle'], result['bundle_id']))
+    except Exception as e:
+        result['error'] = 'Unable to upload: {}'.format(error_reason(e))
+    finally:
+        result['upload_time'] = time.monotonic() - start_time
+        conduct_load.close_files(result['files'])
+
+    return result
+
+
+def copy_duplicate(result, loaded_result):
+    for key in ['bundle_file_name', 'bundle_file', 'configuration_file', 'bundle_id', 'resolve_time', 'error']:
+        result[key] = loaded_result[key]
+    if result['bundle_id']:
+        result['status'] = 'Already loaded'
+
+
+def unique(values):
+    return list(OrderedDict.fromkeys(values))
+
+
+def wait(args, loaded):
+    """
+    Waits for the loaded bundles to be installed over a single stream of bundle events, and then for the bundles with
+    a scale to be started.
+    :return: whether all bundles have been installed and scaled.
+    """
+    log = logging.getLogger(__name__)
+    try:
+        bundle_installation.wait_for_installations(unique([result['bundle_id'] for result in loaded]), args)
+    except WaitTimeoutError as e:
+        log.error('Timed out: {}'.format(e.args[0]))
+        return False
+
+    for result in loaded:
+        result['status'] = 'Installed'
+
+    # All bundles are scaled at once, and then waited for over the same stream of bundle events
+    scaled = [result for result in loaded if result['scale']]
+    expected_scales = OrderedDict((result['bundle_id'], result['scale']) for result in scaled)
+    for bundle_id, scale in expected_scales.items():
+        url = conduct_url.url('bundles/{}?scale={}'.format(bundle_id, scale), args)
+        response = conduct_request.put(args.dcos_mode, conductr_host(args), url, auth=args.conductr_auth,
+                                       verify=args.server_verification_file)
+        validation.raise_for_status_inc_3xx(response)
+
+    if not expected_scales:
+        return True
+
+    try:
+        bundle_scale.wait_for_scales(expected_scales, args)
+    except WaitTimeoutError as e:
+        log.error('Timed out: {}'.format(e.args[0]))
+        return False
+
+    for result in scaled:
+        result['status'] = 'Running ({})'.format(expected_scales[result['bundle_id']])
+
+    return True
+
+
+def report(log, args, results, upload_time):
+    data = [
+        {
+            'bundle': result['bundle'],
+            'id': (result['bundle_id'] if args.long_ids else bundle_utils.short_id(result['bundle_id']))
+            if result['bundle_id'] else '',
+            'size': format_size(result['size']) if result['size'] else '',
+            'resolve_time': '{:.2f}s'.format(result['resolve_time']),
+            'upload_time': '{:.2f}s'.format(result['upload_time']) if result['files'] else '',
+            'status': result['error'] or result['status']
+        } for result in results
+    ]
+    data.insert(0, {'bundle': 'BUNDLE', 'id': 'ID', 'size': 'SIZE', 'resolve_time': 'RESOLVE',
+                    'upload_time': 'UPLOAD', 'status': 'STATUS'})
+
+    padding = 2
+    column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
+    for row in data:
+        log.screen('{bundle: <{bundle_width}}{padding}'
+                   '{id: <{id_width}}{padding}'
+                   '{size: >{size_width}}{padding}'
+                   '{resolve_time: >{resolve_time_width}}{padding}'
+                   '{upload_time: >{upload_time_width}}{padding}'
+                   '{status: <{status_width}}'.format(**dict(row, **column_widths)).rstrip())
+
+    loaded = [result for result in results if result['bundle_id']]
+    total_size = sum(result['size'] for result in loaded)
+    log.screen('Loaded {} of {} bundles, {} in {:.2f}s ({}/s)'.format(
+        len(loaded), len(results), format_size(total_size), upload_time,
+        format_size(total_size / upload_time if upload_time > 0 else 0)))
+
+
+def error_reason(error):
+    if isinstance(error, HTTPError) and error.response is not None:
+        return '{} {}'.format(error.response.status_code, error.response.reason)
+    elif error.args:
+        return str(error.args[0])
+    else:
+        return type(error).__name__
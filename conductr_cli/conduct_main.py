@@ -1,15 +1,17 @@
 import argcomplete
 import argparse
 from conductr_cli import \
-    conduct_deploy, conduct_info, conduct_load, conduct_run, conduct_service_names, \
-    conduct_stop, conduct_unload, version, conduct_logs, \
+    conduct_cache, conduct_deploy, conduct_info, conduct_load, conduct_load_batch, conduct_run, \
+    conduct_service_names, conduct_stop, conduct_unload, version, conduct_logs, \
     conduct_events, conduct_acls, conduct_dcos, host, logging_setup, \
-    conduct_url, custom_settings
+    conduct_url, custom_settings, timings
+from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 from conductr_cli.constants import \
     DEFAULT_SCHEME, DEFAULT_PORT, DEFAULT_BASE_PATH, \
     DEFAULT_API_VERSION, DEFAULT_DCOS_SERVICE, DEFAULT_CLI_SETTINGS_DIR, \
     DEFAULT_CUSTOM_SETTINGS_FILE, DEFAULT_CUSTOM_PLUGINS_DIR, \
-    DEFAULT_BUNDLE_RESOLVE_CACHE_DIR, DEFAULT_WAIT_TIMEOUT, DEFAULT_OFFLINE_MODE
+    DEFAULT_BUNDLE_RESOLVE_CACHE_DIR, DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE, DEFAULT_WAIT_TIMEOUT, \
+    DEFAULT_OFFLINE_MODE
 from dcos import config, constants
 
 from pathlib import Path
@@ -149,6 +151,37 @@ def add_no_wait(sub_parser):
                             action='store_true')
 
 
+def add_timings(sub_parser):
+    sub_parser.add_argument('--timings',
+                            help='Prints the time spent within each phase of the command and by each HTTP request '
+                                 'once the command has completed, defaults to False',
+                            default=False,
+                            dest='timings',
+                            action='store_true')
+    sub_parser.add_argument('--timings-format',
+                            help='The format of the timings printed by --timings, either `text` or `json`, '
+                                 'defaults to `text`',
+                            default='text',
+                            choices=timings.OUTPUT_FORMATS,
+                            dest='timings_format')
+
+
+def add_hosts(sub_parser):
+    sub_parser.add_argument('--hosts',
+                            help='Comma separated list of ConductR clusters to query concurrently, each given as '
+                                 '`host[:port]` or as the name of a cluster defined in the custom settings under '
+                                 '`conductr.clusters`. The results are merged into one table with a CLUSTER column',
+                            type=lambda value: [host for host in value.split(',') if host],
+                            default=None,
+                            dest='hosts')
+    sub_parser.add_argument('--cluster-timeout',
+                            help='Timeout in seconds for each cluster given by --hosts to respond, '
+                                 'defaults to {}'.format(DEFAULT_HTTP_TIMEOUT),
+                            type=float,
+                            default=DEFAULT_HTTP_TIMEOUT,
+                            dest='cluster_timeout')
+
+
 def add_dcos_mode_args(sub_parser, dcos_mode):
     if not dcos_mode:
         add_scheme_host_ip_port_and_base_path(sub_parser)
@@ -167,6 +200,7 @@ def add_default_arguments(sub_parser, dcos_mode):
     add_cli_settings_dir(sub_parser)
     add_custom_settings_file(sub_parser)
     add_custom_plugins_dir(sub_parser)
+    add_timings(sub_parser)
 
 
 def build_parser(dcos_mode):
@@ -189,12 +223,16 @@ def build_parser(dcos_mode):
     info_parser = subparsers.add_parser('info',
                                         help='print bundle information')
     add_default_arguments(info_parser, dcos_mode)
+    if not dcos_mode:
+        add_hosts(info_parser)
     info_parser.set_defaults(func=conduct_info.info)
 
     # Sub-parser for `service-names` sub-command
     service_names_parser = subparsers.add_parser('service-names',
                                                  help='print the service names available to the service locator')
     add_default_arguments(service_names_parser, dcos_mode)
+    if not dcos_mode:
+        add_hosts(service_names_parser)
     service_names_parser.set_defaults(func=conduct_service_names.service_names)
 
     # Sub-parser for `acls` sub-command
@@ -204,6 +242,8 @@ def build_parser(dcos_mode):
                              choices=conduct_acls.SUPPORTED_PROTOCOL_FAMILIES,
                              help='The protocol family of the ACL to be displayed, either http or tcp')
     add_default_arguments(acls_parser, dcos_mode)
+    if not dcos_mode:
+        add_hosts(acls_parser)
     acls_parser.set_defaults(func=conduct_acls.acls)
 
     # Sub-parser for `load` sub-command
@@ -223,12 +263,76 @@ def build_parser(dcos_mode):
                                   'either by file uri or from the cache directory. '
                                   'Defaults to environment variable CONDUCTR_OFFLINE_MODE. '
                                   'If not set the default is False.')
+    load_parser.add_argument('--stream',
+                             default=False,
+                             dest='stream',
+                             action='store_true',
+                             help='Uploads a remote bundle to ConductR while it is being downloaded rather than '
+                                  'afterwards, provided that the server of the bundle honours range requests. '
+                                  'Only applies to v2 onwards of ConductR')
     add_default_arguments(load_parser, dcos_mode)
     add_bundle_resolve_cache_dir(load_parser)
     add_wait_timeout(load_parser)
     add_no_wait(load_parser)
     load_parser.set_defaults(func=conduct_load.load)
 
+    # Sub-parser for `load-batch` sub-command
+    load_batch_parser = subparsers.add_parser('load-batch',
+                                              help='load the bundles listed by a manifest')
+    load_batch_parser.add_argument('manifest',
+                                   help='The path to the manifest, in HOCON or JSON, listing the `bundle`, and the '
+                                        'optional `configuration` and `scale` of each bundle under `bundles`')
+    load_batch_parser.add_argument('--offline',
+                                   default=DEFAULT_OFFLINE_MODE,
+                                   dest='offline_mode',
+                                   action='store_true',
+                                   help='Enables offline mode to resolve bundles only locally '
+                                        'either by file uri or from the cache directory. '
+                                        'Defaults to environment variable CONDUCTR_OFFLINE_MODE. '
+                                        'If not set the default is False.')
+    load_batch_parser.add_argument('--resolve-jobs',
+                                   type=int,
+                                   default=conduct_load_batch.DEFAULT_RESOLVE_JOBS,
+                                   dest='resolve_jobs',
+                                   help='The number of bundles to resolve at once, defaults to {}'.format(
+                                       conduct_load_batch.DEFAULT_RESOLVE_JOBS))
+    load_batch_parser.add_argument('--upload-jobs',
+                                   type=int,
+                                   default=conduct_load_batch.DEFAULT_UPLOAD_JOBS,
+                                   dest='upload_jobs',
+                                   help='The number of bundles to upload at once, defaults to {}'.format(
+                                       conduct_load_batch.DEFAULT_UPLOAD_JOBS))
+    add_default_arguments(load_batch_parser, dcos_mode)
+    add_bundle_resolve_cache_dir(load_batch_parser)
+    add_wait_timeout(load_batch_parser)
+    add_no_wait(load_batch_parser)
+    load_batch_parser.set_defaults(func=conduct_load_batch.load_batch)
+
+    # Sub-parser for `cache` sub-command
+    cache_parser = subparsers.add_parser('cache',
+                                         help='inspect, verify and prune the cache of resolved bundles')
+    cache_parser.add_argument('--verify',
+                              default=False,
+                              dest='verify',
+                              action='store_true',
+                              help='Reads every cached bundle again, removing those not matching their digest')
+    cache_parser.add_argument('--prune',
+                              default=False,
+                              dest='prune',
+                              action='store_true',
+                              help='Evicts the least recently used bundles until the cache fits in --max-size')
+    cache_parser.add_argument('--max-size',
+                              type=int,
+                              default=DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE,
+                              dest='max_size',
+                              help='The size of the cache in bytes, 0 for no limit. '
+                                   'Defaults to environment variable CONDUCTR_BUNDLE_RESOLVE_CACHE_MAX_SIZE. '
+                                   'If not set the default is {}'.format(DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE))
+    add_bundle_resolve_cache_dir(cache_parser)
+    add_verbose(cache_parser)
+    add_quiet_flag(cache_parser)
+    cache_parser.set_defaults(func=conduct_cache.cache)
+
     # Sub-parser for `run` sub-command
     run_parser = subparsers.add_parser('run',
                                        help='run a bundle')
@@ -394,6 +498,9 @@ def run(_args=[], configure_logging=True):
     argcomplete.autocomplete(parser)
     args = parser.parse_args(_args)
     args.dcos_mode = dcos_mode
+    if vars(args).get('timings'):
+        timings.enable()
+
     if not vars(args).get('func'):
         if vars(args).get('dcos_info'):
             print('Lightbend ConductR sub commands. Type \'dcos conduct\' to see more.')
@@ -403,7 +510,7 @@ def run(_args=[], configure_logging=True):
     else:
         # Offline functions are the functions which do not require network to run, e.g. `conduct version` or
         # `conduct setup-dcos`.
-        offline_functions = ['version', 'setup']
+        offline_functions = ['version', 'setup', 'cache']
 
         # Only setup network related args (i.e. host, bundle resolvers, basic auth, etc) for functions which requires
         # connectivity to ConductR.
@@ -466,5 +573,8 @@ def run(_args=[], configure_logging=True):
             logging_setup.configure_logging(args)
 
         is_completed_without_error = args.func(args)
+        if vars(args).get('timings'):
+            timings.log_summary(args.timings_format)
+
         if not is_completed_without_error:
             exit(1)
@@ -1,37 +1,368 @@
-from dcos import http
+from conductr_cli import dcos_auth, timings
+from conductr_cli.constants import DEFAULT_HTTP_RESPONSE_CACHE_FILE
+from conductr_cli.exceptions import CircuitOpenError
+from conductr_cli.http import DEFAULT_HTTP_POOL_CONNECTIONS, DEFAULT_HTTP_POOL_MAXSIZE, DEFAULT_HTTP_RETRIES, \
+    DEFAULT_HTTP_RETRY_BACKOFF, DEFAULT_HTTP_RETRY_MAX_BACKOFF, DEFAULT_HTTP_CIRCUIT_BREAKER_THRESHOLD, \
+    DEFAULT_HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT
+from dcos.errors import DCOSException, DCOSHTTPException
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+from urllib.parse import urlparse
+import json
+import logging
+import os
+import random
 import requests
+import threading
+import time
+
+
+class RetryPolicy:
+    """
+    Describes which failures of a request are retried, and how often.
+    Retries are delayed by an exponential backoff with full jitter, so that concurrent clients don't retry in lockstep.
+    """
+    def __init__(self, retries=DEFAULT_HTTP_RETRIES, backoff=DEFAULT_HTTP_RETRY_BACKOFF,
+                 max_backoff=DEFAULT_HTTP_RETRY_MAX_BACKOFF, exceptions=(ConnectionError,),
+                 retry_statuses=(502, 503, 504), requires_replayable_body=False):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.exceptions = exceptions
+        self.retry_statuses = retry_statuses
+        self.requires_replayable_body = requires_replayable_body
+
+    def delay(self, retries):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** retries))
+
+
+class CircuitBreaker:
+    """
+    Fails requests to an endpoint fast once a number of consecutive requests to it have failed, rather than waiting on
+    the endpoint for each of them. A request is let through again once the reset timeout has passed.
+    The state of the breaker is kept within the process, so that it spares the many requests of a single command such
+    as `conduct load-batch` or a `--hosts` fan-out, but not consecutive commands.
+    """
+    def __init__(self, threshold=DEFAULT_HTTP_CIRCUIT_BREAKER_THRESHOLD,
+                 reset_timeout=DEFAULT_HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def check(self, method, url):
+        with self.lock:
+            if self.opened_at is not None:
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError('{} consecutive requests have failed, not retrying for {:.0f}s'
+                                           .format(self.failures, remaining),
+                                           request=requests.Request(method.upper(), url))
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+# Idempotent requests are retried upon failing to connect or upon a 502, 503 or 504, while a POST or PATCH is only
+# retried upon failing to connect, and only if its body can be sent again. Read timeouts aren't retried, as the server
+# may well be busy processing the request, and waiting on it again would only double the time until failing.
+RETRY_POLICIES = {
+    'get': RetryPolicy(),
+    'head': RetryPolicy(),
+    'put': RetryPolicy(),
+    'delete': RetryPolicy(),
+    'post': RetryPolicy(exceptions=(ConnectionError,), retry_statuses=(), requires_replayable_body=True),
+    'patch': RetryPolicy(exceptions=(ConnectionError,), retry_statuses=(), requires_replayable_body=True)
+}
+
+# Circuit breakers keyed by (scheme, host, port).
+CIRCUIT_BREAKERS = {}
+CIRCUIT_BREAKERS_LOCK = threading.Lock()
+
+
+# Sessions keyed by (scheme, host, port, auth key, verify) so that TCP and TLS connections are kept alive and reused by
+# every request made within the process, including the polls performed while waiting for bundle events.
+SESSIONS = {}
+SESSIONS_LOCK = threading.Lock()
+
+# The last response of each conditional GET keyed by url, e.g.
+# {url: {'etag': '"1b2c"', 'last_modified': None, 'text': '[...]', 'json': [...], 'response': <Response>}}
+# Loaded from the on-disk cache on first use, if enabled.
+RESPONSE_CACHE = None
+RESPONSE_CACHE_LOCK = threading.Lock()
 
 
 def delete(dcos_mode, host, url, **kwargs):
-    kwargs = enrich_args(host, **kwargs)
-    if dcos_mode:
-        return http.delete(url, **kwargs)
-    else:
-        return requests.delete(url, **kwargs)
+    return request('delete', dcos_mode, host, url, **kwargs)
 
 
 def get(dcos_mode, host, url, **kwargs):
-    kwargs = enrich_args(host, **kwargs)
-    if dcos_mode:
-        return http.get(url, **kwargs)
-    else:
-        return requests.get(url, **kwargs)
+    return request('get', dcos_mode, host, url, **kwargs)
 
 
 def post(dcos_mode, host, url, **kwargs):
-    kwargs = enrich_args(host, **kwargs)
-    if dcos_mode:
-        return http.post(url, **kwargs)
-    else:
-        return requests.post(url, **kwargs)
+    return request('post', dcos_mode, host, url, **kwargs)
 
 
 def put(dcos_mode, host, url, **kwargs):
+    return request('put', dcos_mode, host, url, **kwargs)
+
+
+def request(method, dcos_mode, host, url, retry=True, **kwargs):
+    """
+    Sends the request, retrying it according to the retry policy of the method unless `retry` is False.
+    :param retry: False for callers which handle failures themselves, e.g. the reconnection of event streams.
+    """
     kwargs = enrich_args(host, **kwargs)
+    policy = RETRY_POLICIES[method]
+    circuit_breaker = get_circuit_breaker(url)
+    is_retryable = retry and (not policy.requires_replayable_body or is_replayable_body(kwargs.get('data')))
+
+    with timings.request(method, url) as record:
+        retries = 0
+        while True:
+            circuit_breaker.check(method, url)
+            try:
+                response = send(method, dcos_mode, url, **kwargs)
+            except DCOSHTTPException as e:
+                # dcos.http raises upon an unsuccessful status rather than returning the response
+                response, error = e.response, e
+            except (ConnectionError, Timeout, DCOSException) as e:
+                # dcos.http wraps the connection failures and timeouts of requests in a DCOSException
+                cause = e.__context__ if isinstance(e, DCOSException) else e
+                if not isinstance(cause, (ConnectionError, Timeout)):
+                    raise
+                if not is_retryable or not isinstance(cause, policy.exceptions) or retries >= policy.retries:
+                    circuit_breaker.record_failure()
+                    raise
+                response, reason = None, cause
+            else:
+                error = None
+
+            if response is not None:
+                is_retried = response.status_code in policy.retry_statuses and is_retryable and \
+                    retries < policy.retries
+                if not is_retried:
+                    if response.status_code in policy.retry_statuses:
+                        circuit_breaker.record_failure()
+                    else:
+                        circuit_breaker.record_success()
+                    timings.record_response(record, response, stream=kwargs.get('stream', False))
+                    if error:
+                        raise error
+                    return response
+                reason = '{} {}'.format(response.status_code, response.reason)
+                response.close()
+
+            delay = policy.delay(retries)
+            log = logging.getLogger(__name__)
+            log.info('Retrying {} {} in {:.1f}s: {}'.format(method.upper(), url, delay, reason))
+            time.sleep(delay)
+            retries += 1
+            timings.record_retry()
+
+
+def send(method, dcos_mode, url, **kwargs):
     if dcos_mode:
-        return http.put(url, **kwargs)
+        return dcos_auth.request(method, url, **kwargs)
     else:
-        return requests.put(url, **kwargs)
+        return getattr(get_session(url, **kwargs), method)(url, **kwargs)
+
+
+def is_replayable_body(data):
+    # Streamed bodies such as the multipart encoder of `conduct load` can only be read once
+    return data is None or isinstance(data, (str, bytes, dict, list, tuple))
+
+
+def get_circuit_breaker(url):
+    parsed = urlparse(url)
+    key = (parsed.scheme, parsed.hostname, parsed.port)
+
+    with CIRCUIT_BREAKERS_LOCK:
+        circuit_breaker = CIRCUIT_BREAKERS.get(key)
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker()
+            CIRCUIT_BREAKERS[key] = circuit_breaker
+
+        return circuit_breaker
+
+
+def reset_circuit_breakers():
+    with CIRCUIT_BREAKERS_LOCK:
+        CIRCUIT_BREAKERS.clear()
+
+
+def conditional_get(dcos_mode, host, url, cache_file=DEFAULT_HTTP_RESPONSE_CACHE_FILE, **kwargs):
+    """
+    Sends a GET request which is revalidated against the last response from the url using its ETag and Last-Modified
+    headers. When the server replies with 304 Not Modified, the last response is returned instead, so that an unchanged
+    document is neither transferred nor parsed again by `response_json`.
+    Only to be used with idempotent requests whose response doesn't vary other than by the url.
+    """
+    with RESPONSE_CACHE_LOCK:
+        entry = load_response_cache(cache_file).get(url)
+
+    if entry:
+        headers = dict(kwargs.get('headers') or {})
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        kwargs = dict(kwargs, headers=headers)
+        if dcos_mode:
+            # dcos.http raises upon any status other than a success by default
+            kwargs['is_success'] = is_success_or_not_modified
+
+    response = get(dcos_mode, host, url, **kwargs)
+
+    if entry and response.status_code == 304:
+        with RESPONSE_CACHE_LOCK:
+            if entry['response'] is None:
+                entry['response'] = cached_response(url, entry)
+            return entry['response']
+
+    if response.status_code == 200:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if isinstance(etag, str) or isinstance(last_modified, str):
+            with RESPONSE_CACHE_LOCK:
+                response_cache = load_response_cache(cache_file)
+                response_cache[url] = {
+                    'etag': etag if isinstance(etag, str) else None,
+                    'last_modified': last_modified if isinstance(last_modified, str) else None,
+                    'text': response.text,
+                    'json': None,
+                    'response': response
+                }
+                write_response_cache(cache_file, response_cache)
+
+    return response
+
+
+def is_success_or_not_modified(status_code):
+    return 200 <= status_code < 300 or status_code == 304
+
+
+def response_json(response):
+    """
+    Returns the JSON body of the response, which is only parsed once for responses kept by `conditional_get`.
+    """
+    with RESPONSE_CACHE_LOCK:
+        entries = [entry for entry in (RESPONSE_CACHE or {}).values() if entry['response'] is response]
+        if entries:
+            if entries[0]['json'] is None:
+                entries[0]['json'] = json.loads(response.text)
+            return entries[0]['json']
+
+    return json.loads(response.text)
+
+
+def cached_response(url, entry):
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = entry['text'].encode('utf-8')
+    if entry['etag']:
+        response.headers['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response.headers['Last-Modified'] = entry['last_modified']
+    return response
+
+
+def load_response_cache(cache_file):
+    global RESPONSE_CACHE
+
+    if RESPONSE_CACHE is None:
+        RESPONSE_CACHE = {}
+        if cache_file:
+            try:
+                with open(cache_file, 'r') as f:
+                    for url, entry in json.load(f).items():
+                        RESPONSE_CACHE[url] = dict(entry, json=None, response=None)
+            except (OSError, ValueError):
+                pass
+
+    return RESPONSE_CACHE
+
+
+def write_response_cache(cache_file, response_cache):
+    if not cache_file:
+        return
+
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+
+        fd = os.open(cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({url: {'etag': entry['etag'], 'last_modified': entry['last_modified'], 'text': entry['text']}
+                       for url, entry in response_cache.items()}, f)
+    except OSError as e:
+        log = logging.getLogger(__name__)
+        log.debug('Unable to write HTTP response cache {}: {}'.format(cache_file, e))
+
+
+def clear_response_cache():
+    global RESPONSE_CACHE
+
+    with RESPONSE_CACHE_LOCK:
+        RESPONSE_CACHE = None
+
+
+def get_session(url, auth=None, verify=None, pool_connections=DEFAULT_HTTP_POOL_CONNECTIONS,
+                pool_maxsize=DEFAULT_HTTP_POOL_MAXSIZE, **kwargs):
+    parsed = urlparse(url)
+    key = (parsed.scheme, parsed.hostname, parsed.port, auth_key(auth), verify)
+
+    with SESSIONS_LOCK:
+        session = SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            SESSIONS[key] = session
+
+        return session
+
+
+def auth_key(auth):
+    """
+    :return: a hashable key for the credentials of a session. Auth objects such as `HTTPBasicAuth` define equality
+             without being hashable, so they're keyed by their credentials, or else by their identity.
+    """
+    if auth is None or isinstance(auth, (str, tuple)):
+        return auth
+
+    username = getattr(auth, 'username', None)
+    password = getattr(auth, 'password', None)
+    if username is not None or password is not None:
+        return type(auth).__name__, username, password
+
+    try:
+        hash(auth)
+        return auth
+    except TypeError:
+        return type(auth).__name__, id(auth)
+
+
+def close_sessions():
+    with SESSIONS_LOCK:
+        for session in SESSIONS.values():
+            session.close()
+        SESSIONS.clear()
 
 
 def enrich_args(host, **kwargs):
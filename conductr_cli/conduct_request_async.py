@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+from conductr_cli import conduct_request, sse_client, timings
+from conductr_cli.http import DEFAULT_HTTP_MAX_CONCURRENT_REQUESTS
+import asyncio
+import functools
+import threading
+
+
+# Executes the requests issued by coroutines, allowing as many requests to be in flight at once as there are workers.
+EXECUTOR = None
+EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor(max_workers=DEFAULT_HTTP_MAX_CONCURRENT_REQUESTS):
+    global EXECUTOR
+
+    with EXECUTOR_LOCK:
+        if EXECUTOR is None:
+            EXECUTOR = ThreadPoolExecutor(max_workers=max_workers)
+        return EXECUTOR
+
+
+def shutdown_executor():
+    global EXECUTOR
+
+    with EXECUTOR_LOCK:
+        if EXECUTOR is not None:
+            EXECUTOR.shutdown(wait=True)
+            EXECUTOR = None
+
+
+async def run_in_executor(executor, func, *args, **kwargs):
+    """
+    Runs the blocking function on the executor, attributing the requests it makes to the current timings phase.
+    """
+    phases = list(timings.current_phases())
+
+    def run():
+        timings.STATE.phases = phases
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.STATE.phases = []
+
+    return await asyncio.get_event_loop().run_in_executor(executor, run)
+
+
+async def request(method, dcos_mode, host, url, **kwargs):
+    """
+    Sends the request using the connections pooled by `conduct_request`, so that the Host header workaround, the
+    credentials, the SSL verification and the retry policies of `conduct_request` all apply.
+    """
+    return await run_in_executor(get_executor(), getattr(conduct_request, method), dcos_mode, host, url, **kwargs)
+
+
+async def delete(dcos_mode, host, url, **kwargs):
+    return await request('delete', dcos_mode, host, url, **kwargs)
+
+
+async def get(dcos_mode, host, url, **kwargs):
+    return await request('get', dcos_mode, host, url, **kwargs)
+
+
+async def conditional_get(dcos_mode, host, url, **kwargs):
+    return await request('conditional_get', dcos_mode, host, url, **kwargs)
+
+
+async def post(dcos_mode, host, url, **kwargs):
+    return await request('post', dcos_mode, host, url, **kwargs)
+
+
+async def put(dcos_mode, host, url, **kwargs):
+    return await request('put', dcos_mode, host, url, **kwargs)
+
+
+class Events:
+    """
+    Asynchronous iterator over the server sent events of the url, e.g.
+
+        async with conduct_request_async.get_events(dcos_mode, host, url) as events:
+            async for event in events:
+                ...
+
+    Each stream is read by a thread of its own, as waiting on the next event would otherwise hold on to a worker of
+    the executor shared by the requests for as long as the stream is open.
+    """
+    def __init__(self, dcos_mode, host, url, **kwargs):
+        self.connect = functools.partial(sse_client.get_events, dcos_mode, host, url, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.events = None
+
+    @property
+    def connection_count(self):
+        return sse_client.connection_count(self.events)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.events is None:
+            self.events = await run_in_executor(self.executor, self.connect)
+
+        event = await run_in_executor(self.executor, next, self.events, None)
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        if self.events is not None:
+            await run_in_executor(self.executor, self.events.close)
+        self.executor.shutdown(wait=False)
+
+
+def get_events(dcos_mode, host, url, **kwargs):
+    return Events(dcos_mode, host, url, **kwargs)
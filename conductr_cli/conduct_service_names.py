@@ -1,7 +1,6 @@
-from conductr_cli import bundle_utils, conduct_request, conduct_url, validation, screen_utils
+from conductr_cli import bundle_utils, clusters, conduct_request, conduct_url, validation, screen_utils
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 from conductr_cli.conduct_url import conductr_host
-import json
 import logging
 from urllib.parse import urlparse
 
@@ -12,12 +11,18 @@ def service_names(args):
     """`conduct service-names` command"""
 
     log = logging.getLogger(__name__)
-    url = conduct_url.url('bundles', args)
-    response = conduct_request.get(args.dcos_mode, conductr_host(args), url, timeout=DEFAULT_HTTP_TIMEOUT)
-    validation.raise_for_status_inc_3xx(response)
+    if clusters.is_fan_out(args):
+        bundles_by_cluster, is_all_fetched = clusters.get_bundles(args)
+    else:
+        url = conduct_url.url('bundles', args)
+        response = conduct_request.conditional_get(args.dcos_mode, conductr_host(args), url,
+                                                   timeout=DEFAULT_HTTP_TIMEOUT)
+        validation.raise_for_status_inc_3xx(response)
 
-    if log.is_verbose_enabled():
-        log.verbose(validation.pretty_json(response.text))
+        if log.is_verbose_enabled():
+            log.verbose(validation.pretty_json(response.text))
+
+        bundles_by_cluster, is_all_fetched = [(None, conduct_request.response_json(response))], True
 
     def execution_status(bundle_executions):
         for execution in bundle_executions:
@@ -35,6 +40,7 @@ def service_names(args):
     data_from_service_uri = [
         (
             {
+                'cluster': cluster,
                 'service_name': get_service_name_from_service_uri(service_uri),
                 'service_uri': service_uri,
                 'bundle_id': bundle['bundleId'] if args.long_ids else bundle_utils.short_id(
@@ -43,7 +49,8 @@ def service_names(args):
                 'status': execution_status(bundle['bundleExecutions'])
             }
         )
-        for bundle in json.loads(response.text) if bundle['bundleExecutions']
+        for cluster, bundles in bundles_by_cluster
+        for bundle in bundles if bundle['bundleExecutions']
         for endpoint_name, endpoint in bundle['bundleConfig']['endpoints'].items() if 'services' in endpoint
         for service_uri in endpoint['services']
     ]
@@ -51,6 +58,7 @@ def service_names(args):
     data_from_service_name = [
         (
             {
+                'cluster': cluster,
                 'service_name': endpoint['serviceName'],
                 'service_uri': None,
                 'bundle_id': bundle['bundleId'] if args.long_ids else bundle_utils.short_id(
@@ -59,38 +67,43 @@ def service_names(args):
                 'status': execution_status(bundle['bundleExecutions'])
             }
         )
-        for bundle in json.loads(response.text) if bundle['bundleExecutions']
+        for cluster, bundles in bundles_by_cluster
+        for bundle in bundles if bundle['bundleExecutions']
         for endpoint_name, endpoint in bundle['bundleConfig']['endpoints'].items() if 'serviceName' in endpoint
     ]
 
     data = data_from_service_uri + data_from_service_name
     data = sorted([entry for entry in data if entry['service_name']], key=lambda line: line['service_name'])
+    data = clusters.sort_by_cluster(data, args)
 
     service_endpoints = {}
     for service in data:
         url = urlparse(service['service_uri'])
         if not (url.path == '' or url.path == '/'):
+            # Services are only resolved within their own cluster
+            path = '{} ({})'.format(url.path, service['cluster']) if service['cluster'] else url.path
             try:
-                service_endpoints[url.path] |= {service['service_uri']}
+                service_endpoints[path] |= {service['service_uri']}
             except KeyError:
-                service_endpoints[url.path] = {service['service_uri']}
+                service_endpoints[path] = {service['service_uri']}
     duplicate_endpoints = [service for (service, endpoint) in service_endpoints.items() if len(endpoint) > 1] \
         if len(service_endpoints) > 0 else []
 
-    data.insert(0, {'service_name': 'SERVICE NAME', 'bundle_id': 'BUNDLE ID', 'bundle_name': 'BUNDLE NAME', 'status': 'STATUS'})
+    data.insert(0, {'cluster': 'CLUSTER', 'service_name': 'SERVICE NAME', 'bundle_id': 'BUNDLE ID', 'bundle_name': 'BUNDLE NAME', 'status': 'STATUS'})
 
     padding = 2
     column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
     for row in data:
         log.screen(
-            '{service_name: <{service_name_width}}{padding}'
-            '{bundle_id: <{bundle_id_width}}{padding}'
-            '{bundle_name: <{bundle_name_width}}{padding}'
-            '{status: <{status_width}}'.format(**dict(row, **column_widths)).rstrip())
+            (clusters.column_format(args) +
+             '{service_name: <{service_name_width}}{padding}'
+             '{bundle_id: <{bundle_id_width}}{padding}'
+             '{bundle_name: <{bundle_name_width}}{padding}'
+             '{status: <{status_width}}').format(**dict(row, **column_widths)).rstrip())
 
     if len(duplicate_endpoints) > 0:
         log.screen('')
         log.warning('Multiple endpoints found for the following services: {}'.format(', '.join(duplicate_endpoints)))
         log.warning('Service resolution for these services is undefined.')
 
-    return True
+    return is_all_fetched
@@ -10,6 +10,8 @@ DEFAULT_DCOS_SERVICE = os.getenv('CONDUCTR_DCOS_SERVICE', 'conductr')
 DEFAULT_CLI_SETTINGS_DIR = os.getenv('CONDUCTR_CLI_SETTINGS_DIR', '{}/.conductr'.format(os.path.expanduser('~')))
 DEFAULT_BUNDLE_RESOLVE_CACHE_DIR = os.getenv('CONDUCTR_BUNDLE_RESOLVE_CACHE_DIR',
                                              '{}/cache'.format(DEFAULT_CLI_SETTINGS_DIR))
+# The least recently used bundles are evicted from the resolve cache once it holds more bytes than this, 0 for no limit.
+DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE = int(os.getenv('CONDUCTR_BUNDLE_RESOLVE_CACHE_MAX_SIZE', str(10 * 1024 ** 3)))
 DEFAULT_CUSTOM_SETTINGS_FILE = os.getenv('CONDUCTR_CUSTOM_SETTINGS_FILE',
                                          '{}/settings.conf'.format(DEFAULT_CLI_SETTINGS_DIR))
 DEFAULT_CUSTOM_PLUGINS_DIR = os.getenv('CONDUCTR_CUSTOM_PLUGINS_DIR',
@@ -26,3 +28,18 @@ DEFAULT_SANDBOX_PROXY_CONTAINER_NAME = os.getenv('CONDUCTR_SANDBOX_PROXY_CONTAIN
 DEFAULT_ERROR_LOG_FILE = os.path.abspath(os.getenv('CONDUCTR_CLI_ERROR_LOG',
                                                    '{}/errors.log'.format(DEFAULT_CLI_SETTINGS_DIR)))
 DEFAULT_WAIT_TIMEOUT = 60  # seconds
+# The responses of conditional GETs are only kept on disk between invocations when CONDUCTR_HTTP_RESPONSE_CACHE is set.
+DEFAULT_HTTP_RESPONSE_CACHE_FILE = os.getenv('CONDUCTR_HTTP_RESPONSE_CACHE_FILE',
+                                             '{}/http-cache.json'.format(DEFAULT_CLI_SETTINGS_DIR)) \
+    if os.getenv('CONDUCTR_HTTP_RESPONSE_CACHE') else None
+DEFAULT_DCOS_AUTH_CACHE_FILE = os.getenv('CONDUCTR_DCOS_AUTH_CACHE_FILE',
+                                         '{}/dcos-auth.json'.format(DEFAULT_CLI_SETTINGS_DIR))
+DEFAULT_DCOS_AUTH_CACHE_TTL = int(os.getenv('CONDUCTR_DCOS_AUTH_CACHE_TTL', '3600'))  # seconds
+DEFAULT_BINTRAY_RESOLUTION_CACHE_FILE = os.getenv('CONDUCTR_BINTRAY_RESOLUTION_CACHE_FILE',
+                                                  '{}/bintray-resolution.json'.format(DEFAULT_CLI_SETTINGS_DIR))
+# The latest version of a bundle may change at any time, so that it is only cached within an invocation, whereas a
+# version with a digest never changes and is cached in DEFAULT_BINTRAY_RESOLUTION_CACHE_FILE.
+DEFAULT_BINTRAY_RESOLUTION_CACHE_TTL = int(os.getenv('CONDUCTR_BINTRAY_RESOLUTION_CACHE_TTL', '300'))  # seconds
+DEFAULT_BINTRAY_VERSION_CACHE_TTL = int(os.getenv('CONDUCTR_BINTRAY_VERSION_CACHE_TTL', '86400'))  # seconds
+DEFAULT_BINTRAY_FAILED_RESOLUTION_CACHE_TTL = int(os.getenv('CONDUCTR_BINTRAY_FAILED_RESOLUTION_CACHE_TTL',
+                                                            '30'))  # seconds
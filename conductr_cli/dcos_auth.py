@@ -0,0 +1,168 @@
+from collections.abc import Mapping
+from conductr_cli.constants import DEFAULT_DCOS_AUTH_CACHE_FILE, DEFAULT_DCOS_AUTH_CACHE_TTL
+from dcos import config, http
+from dcos.errors import DCOSAuthorizationException, DCOSBadRequest, DCOSHTTPException
+from urllib.parse import urlparse
+import json
+import logging
+import os
+import threading
+import time
+
+
+# The authentication scheme and realm discovered for each DC/OS host, e.g.
+# {'10.0.0.1': {'auth_scheme': 'acsjwt', 'realm': 'acsjwt', 'expires': 1476700000.0}}
+# The scheme of hosts which don't require authentication is None.
+# Loaded from the on-disk cache on first use.
+AUTH_SCHEMES = None
+AUTH_SCHEMES_LOCK = threading.Lock()
+
+DCOS_TOKEN_AUTH_SCHEMES = ['acsjwt', 'oauthjwt']
+
+
+def request(method, url, cache_file=DEFAULT_DCOS_AUTH_CACHE_FILE, cache_ttl=DEFAULT_DCOS_AUTH_CACHE_TTL, **kwargs):
+    """
+    Sends a request to DC/OS. The `dcos.http` functions send a HEAD request prior to each request in order to discover
+    the authentication scheme of the host. Once discovered, the scheme is cached so that subsequent requests to the
+    host are sent with the known credentials straight away, falling back to the discovery only upon a 401 response.
+
+    Requests with a body that can't be sent twice, e.g. a streamed bundle upload, always perform the discovery.
+    """
+    hostname = urlparse(url).hostname
+    is_cached, auth = get_cached_auth(hostname, cache_file) if is_replayable(kwargs) else (False, None)
+    if is_cached:
+        response = send(method, url, auth, **kwargs)
+        if response.status_code != 401:
+            return response
+
+        log = logging.getLogger(__name__)
+        log.debug('Cached DC/OS authentication of {} was rejected, discovering it again'.format(hostname))
+        remove_auth_scheme(hostname, cache_file)
+
+    response = getattr(http, method)(url, **kwargs)
+    save_auth_scheme(hostname, cache_file, cache_ttl, response)
+    return response
+
+
+def send(method, url, auth, timeout=None, verify=None, is_success=http._default_is_success, **kwargs):
+    # Equivalent of `dcos.http.request` once authenticated, without the HEAD request
+    if 'headers' not in kwargs:
+        kwargs['headers'] = {'Accept': 'application/json'}
+
+    verify = http._verify_ssl(verify)
+    if verify is not None:
+        http.silence_requests_warnings()
+
+    response = http._request(method, url, is_success, timeout, auth, verify, **kwargs)
+
+    if is_success(response.status_code) or response.status_code == 401:
+        return response
+    elif response.status_code == 403:
+        raise DCOSAuthorizationException(response)
+    elif response.status_code == 400:
+        raise DCOSBadRequest(response)
+    else:
+        raise DCOSHTTPException(response)
+
+
+def is_replayable(kwargs):
+    # Credentials supplied by the caller are passed through to dcos.http as they are
+    if kwargs.get('auth') or kwargs.get('files'):
+        return False
+
+    data = kwargs.get('data')
+    return data is None or isinstance(data, (str, bytes, dict, list, tuple))
+
+
+def get_cached_auth(hostname, cache_file):
+    """
+    Returns whether the authentication scheme of the host is cached, along with the credentials for the host based on
+    it, which are None for hosts not requiring authentication.
+    The ACS token is read from the DC/OS CLI configuration where it is kept by `dcos auth login`, and basic credentials
+    are only ever held in memory, so that no secrets are written to the cache file.
+    """
+    with AUTH_SCHEMES_LOCK:
+        entry = load_auth_schemes(cache_file).get(hostname)
+
+    if not entry or entry['expires'] <= time.time():
+        return False, None
+
+    auth_scheme = entry['auth_scheme']
+    if auth_scheme is None:
+        return True, None
+    elif auth_scheme in DCOS_TOKEN_AUTH_SCHEMES:
+        token = config.get_config_val('core.dcos_acs_token')
+        return (True, http.DCOSAcsAuth(token)) if token else (False, None)
+    else:
+        with http.lock:
+            auth = http.AUTH_CREDS.get((hostname, auth_scheme, entry['realm']))
+        return auth is not None, auth
+
+
+def save_auth_scheme(hostname, cache_file, cache_ttl, response):
+    """
+    Caches the authentication scheme discovered for the host, which is None if the response was obtained without
+    credentials, so that hosts not requiring authentication are spared the discovery as well.
+    """
+    # dcos.http only retains credentials which have been accepted
+    with http.lock:
+        schemes = [(auth_scheme, realm) for host, auth_scheme, realm in http.AUTH_CREDS
+                   if host == hostname and auth_scheme is not None]
+
+    if not schemes and is_unauthenticated(response):
+        schemes = [(None, None)]
+
+    if schemes:
+        auth_scheme, realm = schemes[0]
+        with AUTH_SCHEMES_LOCK:
+            auth_schemes = load_auth_schemes(cache_file)
+            auth_schemes[hostname] = {
+                'auth_scheme': auth_scheme,
+                'realm': realm,
+                'expires': time.time() + cache_ttl
+            }
+            write_auth_schemes(cache_file, auth_schemes)
+
+
+def is_unauthenticated(response):
+    headers = getattr(getattr(response, 'request', None), 'headers', None)
+    return isinstance(headers, Mapping) and 'Authorization' not in headers
+
+
+def remove_auth_scheme(hostname, cache_file):
+    with AUTH_SCHEMES_LOCK:
+        auth_schemes = load_auth_schemes(cache_file)
+        if auth_schemes.pop(hostname, None):
+            write_auth_schemes(cache_file, auth_schemes)
+
+
+def load_auth_schemes(cache_file):
+    global AUTH_SCHEMES
+
+    if AUTH_SCHEMES is None:
+        try:
+            with open(cache_file, 'r') as f:
+                AUTH_SCHEMES = json.load(f)
+        except (OSError, ValueError):
+            AUTH_SCHEMES = {}
+
+    return AUTH_SCHEMES
+
+
+def write_auth_schemes(cache_file, auth_schemes):
+    now = time.time()
+    unexpired_auth_schemes = {hostname: entry for hostname, entry in auth_schemes.items() if entry['expires'] > now}
+
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+
+        # The cache is only readable by the current user, as it describes how to authenticate against each host
+        fd = os.open(cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(unexpired_auth_schemes, f)
+        os.chmod(cache_file, 0o600)
+    except OSError as e:
+        log = logging.getLogger(__name__)
+        log.debug('Unable to write DC/OS authentication cache {}: {}'.format(cache_file, e))
@@ -1,3 +1,4 @@
+from requests.exceptions import ConnectionError
 import os
 
 # FileNotFoundError is only available on > python 3.3
@@ -12,6 +13,14 @@ class MalformedBundleError(Exception):
         return repr(self.value)
 
 
+class MalformedManifestError(Exception):
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
+
+
 class BundleResolutionError(Exception):
     def __init__(self, value):
         self.value = value
@@ -173,3 +182,23 @@ class SandboxUnsupportedOsArchError(Exception):
 
     def __str(self):
         return repr(self)
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    Raised without contacting an endpoint which has failed too many consecutive requests. Being a `ConnectionError`,
+    it is reported in the same way as the endpoint being unreachable.
+    """
+    pass
+
+
+class SegmentNotSupportedError(Exception):
+    """
+    Raised when a server doesn't serve a segment of a download as requested, in which case the download is retrieved
+    in a single stream instead, or a range of a remote bundle, in which case the bundle isn't streamed.
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
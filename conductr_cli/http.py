@@ -1 +1,36 @@
+import os
+
 DEFAULT_HTTP_TIMEOUT = 5
+
+# The number of connection pools to cache per session, i.e. the number of distinct hosts a session talks to.
+DEFAULT_HTTP_POOL_CONNECTIONS = int(os.getenv('CONDUCTR_HTTP_POOL_CONNECTIONS', '4'))
+# The maximum number of connections to keep alive within each connection pool.
+DEFAULT_HTTP_POOL_MAXSIZE = int(os.getenv('CONDUCTR_HTTP_POOL_MAXSIZE', '10'))
+
+# The number of times an idempotent request is retried when failing to connect or being answered with 502, 503 or 504,
+# e.g. while the ConductR leader changes, including requests to DC/OS. Requests which time out once connected are not
+# retried, as the server may have acted upon them. Requests with a body are only retried if it can be resent.
+DEFAULT_HTTP_RETRIES = int(os.getenv('CONDUCTR_HTTP_RETRIES', '3'))
+# The delay before the first retry in seconds, doubling with each retry up to the maximum, and randomised by jitter.
+DEFAULT_HTTP_RETRY_BACKOFF = float(os.getenv('CONDUCTR_HTTP_RETRY_BACKOFF', '0.5'))
+DEFAULT_HTTP_RETRY_MAX_BACKOFF = float(os.getenv('CONDUCTR_HTTP_RETRY_MAX_BACKOFF', '8'))
+# The number of consecutive failed requests to an endpoint after which further requests fail fast without contacting
+# the endpoint, until the reset timeout in seconds has passed.
+DEFAULT_HTTP_CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('CONDUCTR_HTTP_CIRCUIT_BREAKER_THRESHOLD', '5'))
+DEFAULT_HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.getenv('CONDUCTR_HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT', '30'))
+
+# The number of requests issued by the asyncio client which may be in flight at once.
+DEFAULT_HTTP_MAX_CONCURRENT_REQUESTS = int(os.getenv('CONDUCTR_HTTP_MAX_CONCURRENT_REQUESTS', '20'))
+
+# Bundles larger than a chunk are uploaded in chunks of this many bytes if ConductR supports resumable uploads, so that
+# an interrupted upload is resumed from the bytes acknowledged by ConductR rather than started again.
+DEFAULT_UPLOAD_CHUNK_SIZE = int(os.getenv('CONDUCTR_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+# The number of seconds to wait for a chunk to be acknowledged, and the number of times an upload is resumed without
+# making progress before giving up.
+DEFAULT_UPLOAD_CHUNK_TIMEOUT = float(os.getenv('CONDUCTR_UPLOAD_CHUNK_TIMEOUT', '60'))
+DEFAULT_UPLOAD_RETRIES = int(os.getenv('CONDUCTR_UPLOAD_RETRIES', '5'))
+
+# Downloads over http which are at least two segments large are split into up to this many segments of at least
+# DEFAULT_DOWNLOAD_MIN_SEGMENT_SIZE bytes, fetched at once with range requests.
+DEFAULT_DOWNLOAD_SEGMENTS = int(os.getenv('CONDUCTR_DOWNLOAD_SEGMENTS', '4'))
+DEFAULT_DOWNLOAD_MIN_SEGMENT_SIZE = int(os.getenv('CONDUCTR_DOWNLOAD_MIN_SEGMENT_SIZE', str(8 * 1024 * 1024)))
@@ -0,0 +1,279 @@
+from conductr_cli import bundle_utils
+from contextlib import closing
+import os
+import re
+import sqlite3
+import time
+
+
+# The index of the resolve cache is kept in the cache directory itself, next to the files it describes.
+INDEX_FILE_NAME = '.index.sqlite'
+
+# Waiting for concurrent writers of the index, e.g. the uploads of `conduct load-batch`.
+INDEX_LOCK_TIMEOUT = 30  # seconds
+
+# The name and compatibility version of a cached bundle or configuration, e.g. visualizer-v2-<digest>.zip
+CACHED_FILE_NAME_RE = re.compile(r'^(?P<name>.+)-(?P<compatibility_version>v[^-]+)-[^-]+\.zip$')
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS files (
+         file_name TEXT PRIMARY KEY,
+         name TEXT NOT NULL,
+         compatibility_version TEXT,
+         digest TEXT,
+         size INTEGER NOT NULL,
+         mtime_ns INTEGER NOT NULL,
+         last_used REAL NOT NULL,
+         verified INTEGER NOT NULL DEFAULT 0
+       )""",
+    'CREATE INDEX IF NOT EXISTS files_by_name ON files (name, compatibility_version)',
+    'CREATE INDEX IF NOT EXISTS files_by_last_used ON files (last_used)'
+]
+
+
+def parse_file_name(file_name):
+    """
+    :return: a tuple of (name, compatibility_version) of a cached file. Files without a compatibility version, e.g.
+             my-config-<digest>.zip, are indexed by the name without digest and extension.
+    """
+    match = CACHED_FILE_NAME_RE.match(file_name)
+    if match:
+        return match.group('name'), match.group('compatibility_version')
+    else:
+        digest_match = bundle_utils.DIGEST_FILE_NAME_RE.search(file_name)
+        if digest_match:
+            return file_name[:digest_match.start()], None
+        else:
+            return os.path.splitext(file_name)[0], None
+
+
+def index_path(cache_dir):
+    return os.path.join(cache_dir, INDEX_FILE_NAME)
+
+
+def connect(cache_dir, create=True):
+    """
+    Opens the index of the cache directory. A new index is populated with the files already in the cache, which is
+    the only time that the cache directory is listed.
+    :return: the connection, or None if there is no index and it isn't to be created.
+    """
+    path = index_path(cache_dir)
+    is_new = not os.path.exists(path)
+    if is_new:
+        if not create or not os.path.isdir(cache_dir):
+            return None
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+
+    connection = sqlite3.connect(path, timeout=INDEX_LOCK_TIMEOUT)
+    connection.row_factory = sqlite3.Row
+    if is_new:
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            for entry in os.scandir(cache_dir):
+                if entry.name.endswith('.zip') and entry.is_file():
+                    insert(connection, entry.name, entry.stat(), last_used=entry.stat().st_mtime)
+
+    return connection
+
+
+def insert(connection, file_name, stat, last_used, digest=None):
+    name, compatibility_version = parse_file_name(file_name)
+    connection.execute('INSERT OR REPLACE INTO files '
+                       '(file_name, name, compatibility_version, digest, size, mtime_ns, last_used, verified) '
+                       'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                       (file_name, name, compatibility_version, digest, stat.st_size, stat.st_mtime_ns, last_used,
+                        1 if digest else 0))
+
+
+def split_path(file_path):
+    return os.path.split(os.path.abspath(file_path))
+
+
+def record_digest(file_path, digest):
+    """
+    Records the SHA-256 digest of a cached file along with its size and modification time, so that the digest can be
+    trusted for as long as the file remains unchanged. Recording a file counts as using it. The record only spares
+    reading the file again, hence failing to write it is ignored.
+    """
+    cache_dir, file_name = split_path(file_path)
+    try:
+        stat = os.stat(file_path)
+        connection = connect(cache_dir)
+        if connection is not None:
+            with closing(connection), connection:
+                insert(connection, file_name, stat, last_used=time.time(), digest=digest)
+    except (OSError, sqlite3.Error):
+        pass
+
+
+def recorded_digest(file_path):
+    """
+    :return: the digest recorded for the file, or None if there is no record or the file has changed since.
+    """
+    cache_dir, file_name = split_path(file_path)
+    try:
+        stat = os.stat(file_path)
+        connection = connect(cache_dir, create=False)
+        if connection is None:
+            return None
+        with closing(connection):
+            row = connection.execute('SELECT digest, size, mtime_ns FROM files WHERE file_name = ? AND verified = 1',
+                                     (file_name,)).fetchone()
+    except (OSError, sqlite3.Error):
+        return None
+
+    if row and row['size'] == stat.st_size and row['mtime_ns'] == stat.st_mtime_ns:
+        return row['digest']
+    else:
+        return None
+
+
+def touch(file_path):
+    """
+    Marks a cached file as used, so that it is the last to be evicted.
+    """
+    cache_dir, file_name = split_path(file_path)
+    try:
+        connection = connect(cache_dir)
+        if connection is not None:
+            with closing(connection), connection:
+                updated = connection.execute('UPDATE files SET last_used = ? WHERE file_name = ?',
+                                             (time.time(), file_name)).rowcount
+                if not updated:
+                    insert(connection, file_name, os.stat(file_path), last_used=time.time())
+    except (OSError, sqlite3.Error):
+        pass
+
+
+def remove_record(file_path):
+    cache_dir, file_name = split_path(file_path)
+    try:
+        connection = connect(cache_dir, create=False)
+        if connection is not None:
+            with closing(connection), connection:
+                connection.execute('DELETE FROM files WHERE file_name = ?', (file_name,))
+    except sqlite3.Error:
+        pass
+
+
+def remove(file_path):
+    """
+    Removes a cached file along with its record.
+    """
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    remove_record(file_path)
+
+
+def verify_cached_file(file_path):
+    """
+    Verifies a cached file against the digest given by its name, if any. The recorded digest is trusted when current,
+    so that the file is only read should it not have been verified before.
+    :return: whether the file matches the digest given by its name.
+    """
+    expected_digest = bundle_utils.file_name_digest(os.path.basename(file_path))
+    if expected_digest is None:
+        return True
+
+    digest = recorded_digest(file_path)
+    if digest is None:
+        with open(file_path, 'rb') as f:
+            digest = bundle_utils.hash_file(f)
+        record_digest(file_path, digest)
+
+    return digest == expected_digest
+
+
+def find_files(cache_dir, name, compatibility_version=None):
+    """
+    Looks up the cached files of a bundle or configuration by its name, and optionally its compatibility version.
+    Records of files which no longer exist are removed.
+    :return: the paths of the files, from the most recently modified to the least.
+    """
+    connection = connect(cache_dir)
+    if connection is None:
+        return []
+
+    query = 'SELECT file_name FROM files WHERE name = ?'
+    parameters = (name,)
+    if compatibility_version:
+        query += ' AND compatibility_version = ?'
+        parameters += (compatibility_version,)
+
+    with closing(connection):
+        file_names = [row['file_name'] for row in
+                      connection.execute(query + ' ORDER BY mtime_ns DESC', parameters).fetchall()]
+        missing = [file_name for file_name in file_names if not os.path.isfile(os.path.join(cache_dir, file_name))]
+        if missing:
+            with connection:
+                connection.executemany('DELETE FROM files WHERE file_name = ?', [(m,) for m in missing])
+
+    return [os.path.join(cache_dir, file_name) for file_name in file_names if file_name not in missing]
+
+
+def list_files(cache_dir):
+    """
+    Brings the index in line with the files of the cache directory, which is listed to do so.
+    :return: the records of the cached files, from the most recently used to the least.
+    """
+    connection = connect(cache_dir)
+    if connection is None:
+        return []
+
+    with closing(connection), connection:
+        records = {row['file_name']: row for row in connection.execute('SELECT * FROM files').fetchall()}
+        file_names = set()
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith('.zip') and entry.is_file():
+                file_names.add(entry.name)
+                stat = entry.stat()
+                record = records.get(entry.name)
+                if record is None or record['size'] != stat.st_size or record['mtime_ns'] != stat.st_mtime_ns:
+                    insert(connection, entry.name, stat,
+                           last_used=record['last_used'] if record else stat.st_mtime)
+        connection.executemany('DELETE FROM files WHERE file_name = ?',
+                               [(file_name,) for file_name in records if file_name not in file_names])
+
+        return [dict(row) for row in connection.execute('SELECT * FROM files ORDER BY last_used DESC').fetchall()]
+
+
+def evict(cache_dir, max_size, excluded=()):
+    """
+    Removes the least recently used files until the cache holds no more than `max_size` bytes. The `excluded` files,
+    normally those just resolved, are kept regardless.
+    :return: the paths of the files removed.
+    """
+    if not max_size or max_size < 0:
+        return []
+
+    connection = connect(cache_dir, create=False)
+    if connection is None:
+        return []
+
+    excluded_file_names = [file_name for directory, file_name in [split_path(file) for file in excluded if file]
+                           if directory == os.path.abspath(cache_dir)]
+    removed = []
+    with closing(connection):
+        total_size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM files').fetchone()[0]
+        if total_size <= max_size:
+            return []
+
+        for row in connection.execute('SELECT file_name, size FROM files ORDER BY last_used').fetchall():
+            if total_size <= max_size:
+                break
+            if row['file_name'] in excluded_file_names:
+                continue
+
+            file_path = os.path.join(cache_dir, row['file_name'])
+            try:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            except OSError:
+                continue
+            with connection:
+                connection.execute('DELETE FROM files WHERE file_name = ?', (row['file_name'],))
+            total_size -= row['size']
+            removed.append(file_path)
+
+    return removed
@@ -1,3 +1,4 @@
+from conductr_cli import timings
 from conductr_cli.exceptions import BundleResolutionError, ContinuousDeliveryError
 from conductr_cli.resolvers import bintray_resolver, uri_resolver, offline_resolver
 import importlib
@@ -9,6 +10,7 @@ DEFAULT_RESOLVERS = [uri_resolver, bintray_resolver]
 OFFLINE_RESOLVERS = [offline_resolver]
 
 
+@timings.timed('resolve bundle')
 def resolve_bundle(custom_settings, cache_dir, uri, offline_mode=False):
     all_resolvers = resolver_chain(custom_settings, offline_mode)
 
@@ -25,6 +27,35 @@ def resolve_bundle(custom_settings, cache_dir, uri, offline_mode=False):
     raise BundleResolutionError('Unable to resolve bundle using {}'.format(uri))
 
 
+@timings.timed('resolve bundle')
+def stream_bundle(custom_settings, cache_dir, uri, offline_mode=False):
+    """
+    Resolves the bundle like `resolve_bundle`, except that the download of a remote bundle is opened rather than
+    completed, so that the bundle can be uploaded while it is being downloaded. Bundles which are cached, or resolved
+    by a resolver without a `stream_bundle` function, are resolved as usual.
+    :return: the bundle file name, the bundle file, and the download of the bundle file if it is yet to be read.
+    """
+    all_resolvers = resolver_chain(custom_settings, offline_mode)
+
+    for resolver in all_resolvers:
+        is_cached, bundle_file_name, cached_bundle = resolver.load_bundle_from_cache(cache_dir, uri)
+        if is_cached:
+            return bundle_file_name, cached_bundle, None
+
+    for resolver in all_resolvers:
+        if hasattr(resolver, 'stream_bundle'):
+            is_streamed, bundle_file_name, bundle_file, download = resolver.stream_bundle(cache_dir, uri)
+            if is_streamed:
+                return bundle_file_name, bundle_file, download
+
+        is_resolved, bundle_file_name, bundle_file = resolver.resolve_bundle(cache_dir, uri)
+        if is_resolved:
+            return bundle_file_name, bundle_file, None
+
+    raise BundleResolutionError('Unable to resolve bundle using {}'.format(uri))
+
+
+@timings.timed('resolve configuration')
 def resolve_bundle_configuration(custom_settings, cache_dir, uri, offline_mode=False):
     all_resolvers = resolver_chain(custom_settings, offline_mode)
 
@@ -43,6 +74,7 @@ def resolve_bundle_configuration(custom_settings, cache_dir, uri, offline_mode=F
     raise BundleResolutionError('Unable to resolve bundle using {}'.format(uri))
 
 
+@timings.timed('resolve version')
 def resolve_bundle_version(custom_settings, uri):
     all_resolvers = resolver_chain(custom_settings)
 
@@ -1,7 +1,9 @@
 from conductr_cli.exceptions import MalformedBundleUriError, BintrayResolutionError, \
     BintrayCredentialsNotFoundError, MalformedBintrayCredentialsError
 from conductr_cli.resolvers import uri_resolver
-from conductr_cli import bundle_shorthand
+from conductr_cli import bundle_shorthand, timings
+from conductr_cli.constants import DEFAULT_BINTRAY_RESOLUTION_CACHE_FILE, DEFAULT_BINTRAY_RESOLUTION_CACHE_TTL, \
+    DEFAULT_BINTRAY_VERSION_CACHE_TTL, DEFAULT_BINTRAY_FAILED_RESOLUTION_CACHE_TTL
 from requests.exceptions import HTTPError, ConnectionError
 from urllib.parse import urlparse
 import json
@@ -9,6 +11,8 @@ import logging
 import os
 import re
 import requests
+import threading
+import time
 
 BINTRAY_API_BASE_URL = 'https://api.bintray.com'
 BINTRAY_DOWNLOAD_BASE_URL = 'https://dl.bintray.com'
@@ -20,6 +24,19 @@ BINTRAY_CONDUCTR_REPO = 'commercial-releases'
 BINTRAY_CONDUCTR_CORE_PACKAGE_NAME = 'ConductR-Universal'
 BINTRAY_CONDUCTR_AGENT_PACKAGE_NAME = 'ConductR-Agent-Universal'
 
+# The versions resolved by `bintray_resolve_version`, keyed by what was resolved, e.g.
+# {'typesafe/bundle/visualizer:v1': {'resolved_version': {...}, 'error': None, 'expires': 1476700000.0,
+#                                    'persist': False}}
+# Loaded from RESOLUTION_CACHE_FILE on first use, which is None for the cache to only be kept in memory. Only the
+# entries flagged with `persist` are written back to RESOLUTION_CACHE_FILE.
+RESOLUTION_CACHE = None
+RESOLUTION_CACHE_FILE = DEFAULT_BINTRAY_RESOLUTION_CACHE_FILE
+RESOLUTION_CACHE_LOCK = threading.Lock()
+
+# The credentials are only read once per process.
+BINTRAY_CREDENTIALS = None
+BINTRAY_CREDENTIALS_LOCK = threading.Lock()
+
 
 def resolve_bundle(cache_dir, uri):
     log = logging.getLogger(__name__)
@@ -40,6 +57,28 @@ def resolve_bundle(cache_dir, uri):
         return False, None, None
 
 
+def stream_bundle(cache_dir, uri):
+    log = logging.getLogger(__name__)
+    try:
+        urn, org, repo, package_name, compatibility_version, digest = bundle_shorthand.parse_bundle(uri)
+        log.info(log_message('Resolving bundle', org, repo, package_name, compatibility_version, digest))
+
+        bintray_auth = load_bintray_credentials()
+        resolved_version = bintray_resolve_version(bintray_auth,
+                                                   org, repo, package_name,
+                                                   compatibility_version, digest)
+        if resolved_version:
+            return uri_resolver.stream_bundle(cache_dir, resolved_version['download_url'], bintray_auth)
+        else:
+            return False, None, None, None
+    except MalformedBundleUriError:
+        return False, None, None, None
+    except HTTPError:
+        return False, None, None, None
+    except ConnectionError:
+        return False, None, None, None
+
+
 def load_bundle_from_cache(cache_dir, uri):
     # When the supplied uri points to a local file, don't load from cache so file can be used as is.
     if is_local_file(uri):
@@ -151,6 +190,15 @@ def bintray_download_artefact(cache_dir, artefact, auth):
 
 
 def load_bintray_credentials():
+    global BINTRAY_CREDENTIALS
+
+    with BINTRAY_CREDENTIALS_LOCK:
+        if BINTRAY_CREDENTIALS is None:
+            BINTRAY_CREDENTIALS = read_bintray_credentials()
+        return BINTRAY_CREDENTIALS
+
+
+def read_bintray_credentials():
     log = logging.getLogger(__name__)
     if not os.path.exists(BINTRAY_CREDENTIAL_FILE_PATH):
         raise BintrayCredentialsNotFoundError(BINTRAY_CREDENTIAL_FILE_PATH)
@@ -176,6 +224,40 @@ def load_bintray_credentials():
 
 def bintray_resolve_version(bintray_auth, org, repo, package_name,
                             compatibility_version=None, digest=None):
+    """
+    Resolves the version of a package, caching the resolution so that it needn't be looked up with Bintray again.
+    Versions with a digest never change, so they are cached the longest and are shared with subsequent invocations.
+    The latest version of a package or of a compatibility version may change at any time, so that it, as well as
+    failed resolutions, i.e. packages or versions not found, are only cached briefly within this invocation.
+    """
+    key = resolution_key(org, repo, package_name, compatibility_version, digest)
+    entry = get_cached_resolution(key)
+    if entry is not None:
+        if entry['error']:
+            raise BintrayResolutionError(entry['error'])
+        return entry['resolved_version']
+
+    try:
+        resolved_version = resolve_version(bintray_auth, org, repo, package_name, compatibility_version, digest)
+    except BintrayResolutionError as e:
+        save_resolution(key, None, DEFAULT_BINTRAY_FAILED_RESOLUTION_CACHE_TTL, error=e.args[0])
+        raise
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            save_resolution(key, None, DEFAULT_BINTRAY_FAILED_RESOLUTION_CACHE_TTL)
+        raise
+
+    if not resolved_version:
+        save_resolution(key, None, DEFAULT_BINTRAY_FAILED_RESOLUTION_CACHE_TTL)
+    elif compatibility_version is not None and digest is not None:
+        save_resolution(key, resolved_version, DEFAULT_BINTRAY_VERSION_CACHE_TTL, persist=True)
+    else:
+        save_resolution(key, resolved_version, DEFAULT_BINTRAY_RESOLUTION_CACHE_TTL)
+
+    return resolved_version
+
+
+def resolve_version(bintray_auth, org, repo, package_name, compatibility_version, digest):
     if compatibility_version is None and digest is None:
         # Get latest version
         package_endpoint = '{}/packages/{}/{}/{}'.format(BINTRAY_API_BASE_URL, org, repo, package_name)
@@ -250,6 +332,91 @@ def bintray_resolve_version(bintray_auth, org, repo, package_name,
             return resolved_version
 
 
+def resolution_key(org, repo, package_name, compatibility_version, digest):
+    if compatibility_version is None and digest is None:
+        return '{}/{}/{}'.format(org, repo, package_name)
+    elif digest is None:
+        return '{}/{}/{}:{}'.format(org, repo, package_name, compatibility_version)
+    else:
+        return '{}/{}/{}:{}-{}'.format(org, repo, package_name, compatibility_version, digest)
+
+
+def get_cached_resolution(key):
+    """
+    :return: the cached resolution, or None when there is none or it has expired.
+    """
+    with RESOLUTION_CACHE_LOCK:
+        entry = load_resolution_cache().get(key)
+
+    if not entry or entry['expires'] <= time.time():
+        return None
+    else:
+        log = logging.getLogger(__name__)
+        log.debug('Resolved {} from cache'.format(key))
+        return entry
+
+
+def save_resolution(key, resolved_version, cache_ttl, error=None, persist=False):
+    if cache_ttl <= 0:
+        return
+
+    with RESOLUTION_CACHE_LOCK:
+        resolution_cache = load_resolution_cache()
+        resolution_cache[key] = {
+            'resolved_version': resolved_version,
+            'error': error,
+            'expires': time.time() + cache_ttl,
+            'persist': persist
+        }
+        if persist:
+            write_resolution_cache(resolution_cache)
+
+
+def load_resolution_cache():
+    global RESOLUTION_CACHE
+
+    if RESOLUTION_CACHE is None:
+        RESOLUTION_CACHE = {}
+        if RESOLUTION_CACHE_FILE:
+            try:
+                with open(RESOLUTION_CACHE_FILE, 'r') as f:
+                    RESOLUTION_CACHE = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    return RESOLUTION_CACHE
+
+
+def write_resolution_cache(resolution_cache):
+    if not RESOLUTION_CACHE_FILE:
+        return
+
+    now = time.time()
+    persisted_entries = {key: entry for key, entry in resolution_cache.items()
+                         if entry.get('persist') and entry['expires'] > now}
+
+    try:
+        cache_dir = os.path.dirname(RESOLUTION_CACHE_FILE)
+        if cache_dir:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+
+        fd = os.open(RESOLUTION_CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(persisted_entries, f)
+    except OSError as e:
+        log = logging.getLogger(__name__)
+        log.debug('Unable to write Bintray resolution cache {}: {}'.format(RESOLUTION_CACHE_FILE, e))
+
+
+def reset_caches():
+    global RESOLUTION_CACHE, BINTRAY_CREDENTIALS
+
+    with RESOLUTION_CACHE_LOCK:
+        RESOLUTION_CACHE = None
+    with BINTRAY_CREDENTIALS_LOCK:
+        BINTRAY_CREDENTIALS = None
+
+
 def bintray_artefacts_by_version(bintray_auth, org, repo, package_name, bintray_version):
     files_endpoint = '{}/packages/{}/{}/{}/versions/{}/files'.format(BINTRAY_API_BASE_URL, org, repo, package_name,
                                                                      bintray_version)
@@ -275,10 +442,12 @@ def bintray_artefacts_by_version(bintray_auth, org, repo, package_name, bintray_
 def get_json(auth, uri):
     realm, username, password = auth if auth else (None, None, None)
 
-    if username is not None and password is not None:
-        response = requests.get(uri, auth=(username, password))
-    else:
-        response = requests.get(uri)
+    with timings.request('get', uri) as record:
+        if username is not None and password is not None:
+            response = requests.get(uri, auth=(username, password))
+        else:
+            response = requests.get(uri)
+        timings.record_response(record, response)
     response.raise_for_status()
     return json.loads(response.text)
 
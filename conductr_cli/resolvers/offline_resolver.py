@@ -1,6 +1,11 @@
+from conductr_cli import resolve_cache
 import os
-import glob
 import logging
+import re
+
+
+# A bundle name which ends with its compatibility version, e.g. visualizer-v2
+COMPATIBILITY_VERSION_RE = re.compile(r'^(?P<name>.+)-(?P<compatibility_version>v[0-9]+)$')
 
 
 def resolve_bundle(cache_dir, uri, auth=None):
@@ -31,11 +36,12 @@ def load_bundle_from_cache(cache_dir, uri):
     """
     # When the supplied uri is a local filesystem, don't load from cache so file can be used as is
     if is_bundle_name(uri):
-        cached_bundles = glob.glob('{}/{}*'.format(cache_dir, uri))
+        cached_bundles = find_cached_files(cache_dir, uri)
         if cached_bundles:
             log = logging.getLogger(__name__)
-            latest_bundle_file = max(cached_bundles, key=os.path.getctime)
+            latest_bundle_file = cached_bundles[0]
             bundle_name = os.path.basename(latest_bundle_file)
+            resolve_cache.touch(latest_bundle_file)
             log.info('Retrieving from cache {}'.format(latest_bundle_file))
             return True, bundle_name, latest_bundle_file
 
@@ -58,5 +64,21 @@ def continuous_delivery_uri(resolved_version):
     return None
 
 
+def find_cached_files(cache_dir, uri):
+    """
+    Looks up the cached files of a bundle name, e.g. 'visualizer', or of a bundle name along with its compatibility
+    version, e.g. 'visualizer-v2', in the index of the cache directory. The name is matched exactly rather than as a
+    prefix of the file names, so that e.g. 'visualizer' no longer resolves to a cached 'visualizer-config' file.
+    :return: the cached files, from the most recently modified to the least.
+    """
+    cached_files = resolve_cache.find_files(cache_dir, uri)
+    if not cached_files:
+        match = COMPATIBILITY_VERSION_RE.match(uri)
+        if match:
+            cached_files = resolve_cache.find_files(cache_dir, match.group('name'),
+                                                    match.group('compatibility_version'))
+    return cached_files
+
+
 def is_bundle_name(uri):
     return uri.count('/') == 0 and uri.count('.') == 0
@@ -0,0 +1,201 @@
+from concurrent.futures import ThreadPoolExecutor
+from conductr_cli.exceptions import SegmentNotSupportedError
+from conductr_cli.http import DEFAULT_DOWNLOAD_MIN_SEGMENT_SIZE, DEFAULT_DOWNLOAD_SEGMENTS
+from contextlib import closing
+from urllib.error import ContentTooShortError
+from urllib.request import Request, build_opener
+import hashlib
+import re
+import threading
+
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(?:\d+|\*)$')
+
+
+class Progress:
+    """
+    The combined progress of the segments, reported through a `urlretrieve` style hook as if the content was being
+    downloaded in a single stream.
+    """
+    def __init__(self, size, reporthook, block_size):
+        self.size = size
+        self.reporthook = reporthook
+        self.block_size = block_size
+        self.size_read = 0
+        self.lock = threading.Lock()
+        self.report()
+
+    def add(self, size_read):
+        with self.lock:
+            self.size_read += size_read
+            self.report()
+
+    def report(self):
+        if self.reporthook:
+            self.reporthook(-(-self.size_read // self.block_size), self.block_size, self.size)
+
+
+class Segment:
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.size_written = 0
+
+    @property
+    def is_complete(self):
+        return self.start + self.size_written >= self.end
+
+
+class ContiguousHash:
+    """
+    Hashes the content in order while the segments are being written. The blocks written right after the bytes
+    hashed so far are hashed as they are written, and the blocks written ahead of them are read back from the file
+    once the bytes preceding them have been hashed, while the other segments are still being downloaded.
+    """
+    def __init__(self, file_path, segments, block_size):
+        self.file_path = file_path
+        self.segments = segments
+        self.block_size = block_size
+        self.sha256 = hashlib.sha256()
+        self.size_hashed = 0
+        self.lock = threading.Lock()
+
+    def written(self, offset, block):
+        """
+        Called once a block has been written at the offset, and added to the size written of its segment.
+        """
+        with self.lock:
+            if offset == self.size_hashed:
+                self.sha256.update(block)
+                self.size_hashed += len(block)
+            self.hash_written_ahead()
+
+    def hash_written_ahead(self):
+        for segment in self.segments:
+            size_written = segment.start + segment.size_written
+            if size_written > self.size_hashed:
+                with open(self.file_path, 'rb') as f:
+                    f.seek(self.size_hashed)
+                    while self.size_hashed < size_written:
+                        block = f.read(min(self.block_size, size_written - self.size_hashed))
+                        self.sha256.update(block)
+                        self.size_hashed += len(block)
+            if not segment.is_complete:
+                break
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def segment_count(response, validator, segments=DEFAULT_DOWNLOAD_SEGMENTS,
+                  min_segment_size=DEFAULT_DOWNLOAD_MIN_SEGMENT_SIZE):
+    """
+    :return: the number of segments to download the response in, 1 if it is to be downloaded in a single stream. Only
+             the complete responses of servers accepting ranges are segmented, provided that the content is identified
+             by a validator so that the segments are known to be of the same content.
+    """
+    content_length = response.headers.get('Content-Length')
+    if response.getcode() != 200 or not validator or not content_length or \
+            response.headers.get('Accept-Ranges', '').lower() != 'bytes':
+        return 1
+
+    return max(1, min(segments, int(content_length) // max(1, min_segment_size)))
+
+
+def download(url, file_path, response, validator, segments, reporthook=None, block_size=64 * 1024, opener=None):
+    """
+    Downloads the content of the response into the file in segments fetched at once. The first segment is read from
+    the response, and the others are requested with ranges conditional on the validator, into a file preallocated to
+    the size of the content.
+    Should a segment fail, the file is truncated to the bytes downloaded from its start onwards without any gap, so
+    that the download can be resumed from there.
+    The segments are requested with the opener of the response, if given.
+    :return: the SHA-256 digest of the content, see `ContiguousHash`.
+    :raises SegmentNotSupportedError: if the server doesn't serve a segment as requested.
+    """
+    opener = opener or build_opener()
+    size = int(response.headers['Content-Length'])
+    segment_size = -(-size // segments)
+    all_segments = [Segment(start, min(start + segment_size, size)) for start in range(0, size, segment_size)]
+    progress = Progress(size, reporthook, block_size)
+    content_hash = ContiguousHash(file_path, all_segments, block_size)
+    is_cancelled = threading.Event()
+
+    with open(file_path, 'wb') as f:
+        f.truncate(size)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(all_segments) - 1) as executor:
+            futures = [executor.submit(fetch_segment, opener, url, file_path, segment, validator, progress,
+                                       content_hash, block_size, is_cancelled)
+                       for segment in all_segments[1:]]
+            try:
+                write_segment(response, file_path, all_segments[0], progress, content_hash, block_size, is_cancelled)
+            except BaseException:
+                is_cancelled.set()
+                raise
+            finally:
+                response.close()
+                errors = [future.exception() for future in futures]
+                is_cancelled.set()
+
+            for error in errors:
+                if error is not None:
+                    raise error
+    except BaseException:
+        with open(file_path, 'r+b') as f:
+            f.truncate(contiguous_size(all_segments))
+        raise
+
+    return content_hash.hexdigest()
+
+
+def fetch_segment(opener, url, file_path, segment, validator, progress, content_hash, block_size, is_cancelled):
+    try:
+        request_segment(opener, url, file_path, segment, validator, progress, content_hash, block_size, is_cancelled)
+    except BaseException:
+        # The other segments are given up as well
+        is_cancelled.set()
+        raise
+
+
+def request_segment(opener, url, file_path, segment, validator, progress, content_hash, block_size, is_cancelled):
+    request = Request(url, headers={'Range': 'bytes={}-{}'.format(segment.start, segment.end - 1),
+                                    'If-Range': validator})
+    with closing(opener.open(request)) as response:
+        match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+        if response.getcode() != 206 or not match or int(match.group(1)) != segment.start or \
+                int(match.group(2)) != segment.end - 1:
+            raise SegmentNotSupportedError('Bytes {}-{} of {} were not served as requested'
+                                           .format(segment.start, segment.end - 1, url))
+
+        write_segment(response, file_path, segment, progress, content_hash, block_size, is_cancelled)
+
+
+def write_segment(response, file_path, segment, progress, content_hash, block_size, is_cancelled):
+    with open(file_path, 'r+b') as f:
+        f.seek(segment.start)
+        while not segment.is_complete and not is_cancelled.is_set():
+            block = response.read(min(block_size, segment.end - segment.start - segment.size_written))
+            if not block:
+                break
+            f.write(block)
+            # Flushed for the block to be read back by `content_hash`, if need be
+            f.flush()
+            offset = segment.start + segment.size_written
+            segment.size_written += len(block)
+            content_hash.written(offset, block)
+            progress.add(len(block))
+
+    if not segment.is_complete and not is_cancelled.is_set():
+        raise ContentTooShortError('retrieval incomplete: got only {} out of {} bytes of segment {}-{}'.format(
+            segment.size_written, segment.end - segment.start, segment.start, segment.end - 1), (file_path, None))
+
+
+def contiguous_size(segments):
+    size = 0
+    for segment in segments:
+        size += segment.size_written
+        if not segment.is_complete:
+            break
+    return size
@@ -1,15 +1,20 @@
-from unittest import TestCase
-from conductr_cli.test.cli_test_case import strip_margin
+from conductr_cli.test.cli_test_case import CliTestCase, strip_margin
 from conductr_cli.resolvers import bintray_resolver
 from conductr_cli.exceptions import MalformedBundleUriError, BintrayResolutionError, MalformedBintrayCredentialsError, \
     BintrayCredentialsNotFoundError
+from conductr_cli.constants import DEFAULT_BINTRAY_RESOLUTION_CACHE_TTL, DEFAULT_BINTRAY_FAILED_RESOLUTION_CACHE_TTL
 from requests.exceptions import HTTPError, ConnectionError
 import io
+import json
 import os
-from unittest.mock import call, patch, MagicMock, Mock
+import shutil
+import stat
+import tempfile
+import time
+from unittest.mock import call, patch, ANY, MagicMock, Mock
 
 
-class TestResolveBundle(TestCase):
+class TestResolveBundle(CliTestCase):
     bintray_auth = ('realm', 'username', 'password')
 
     def test_bintray_version_found(self):
@@ -109,7 +114,7 @@ class TestResolveBundle(TestCase):
                                                         'v1', 'digest')
 
 
-class TestResolveBundleConfiguration(TestCase):
+class TestResolveBundleConfiguration(CliTestCase):
     bintray_auth = ('realm', 'username', 'password')
 
     def test_bintray_version_found(self):
@@ -218,7 +223,7 @@ class TestResolveBundleConfiguration(TestCase):
                                                         'bundle-name', 'v1', 'digest')
 
 
-class TestLoadBundleFromCache(TestCase):
+class TestLoadBundleFromCache(CliTestCase):
     bintray_auth = ('realm', 'username', 'password')
 
     def test_file(self):
@@ -366,7 +371,7 @@ class TestLoadBundleFromCache(TestCase):
                                                         'v1', 'digest')
 
 
-class TestLoadBundleConfigurationFromCache(TestCase):
+class TestLoadBundleConfigurationFromCache(CliTestCase):
     bintray_auth = ('realm', 'username', 'password')
 
     def test_file(self):
@@ -505,7 +510,7 @@ class TestLoadBundleConfigurationFromCache(TestCase):
                                                         'bundle-name', 'v1', 'digest')
 
 
-class TestBintrayResolveVersion(TestCase):
+class TestBintrayResolveVersion(CliTestCase):
     bintray_auth = ('Bintray', 'username', 'password')
 
     def test_success(self):
@@ -588,7 +593,136 @@ class TestBintrayResolveVersion(TestCase):
             'https://api.bintray.com/packages/typesafe/bundle/reactive-maps-frontend/versions/v1-023f9da22/files')
 
 
-class TestBintrayResolveVersionLatest(TestCase):
+class TestBintrayResolutionCache(CliTestCase):
+    bintray_auth = ('Bintray', 'username', 'password')
+
+    files_endpoint_response = [
+        {
+            'owner': 'typesafe',
+            'repo': 'bundle',
+            'package': 'reactive-maps-frontend',
+            'version': 'v1-023f9da22',
+            'path': 'download/path.zip'
+        }
+    ]
+
+    attributes_endpoint_response = [
+        {
+            'name': 'latest-v1',
+            'type': 'version',
+            'values': ['v1-023f9da22']
+        }
+    ]
+
+    def setUp(self):  # noqa
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmpdir, 'settings', 'bintray-resolution.json')
+        cache_file_patch = patch.object(bintray_resolver, 'RESOLUTION_CACHE_FILE', self.cache_file)
+        cache_file_patch.start()
+        self.addCleanup(cache_file_patch.stop)
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.tmpdir)
+
+    def resolve_version(self, compatibility_version='v1', digest=None):
+        return bintray_resolver.bintray_resolve_version(self.bintray_auth,
+                                                        'typesafe', 'bundle', 'reactive-maps-frontend',
+                                                        compatibility_version, digest)
+
+    def test_resolved_once(self):
+        get_json_mock = MagicMock(side_effect=[self.attributes_endpoint_response, self.files_endpoint_response])
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            result = self.resolve_version()
+            self.assertEqual(result, self.resolve_version())
+            # The version resolved on the way is cached as well
+            self.assertEqual(result, self.resolve_version(digest='023f9da22'))
+
+        self.assertEqual('v1-023f9da22', result['version'])
+        self.assertEqual(2, get_json_mock.call_count)
+
+    def test_resolved_by_subsequent_invocation(self):
+        get_json_mock = MagicMock(side_effect=[self.attributes_endpoint_response, self.files_endpoint_response])
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            result = self.resolve_version()
+
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.cache_file).st_mode))
+        bintray_resolver.reset_caches()
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', MagicMock()) as get_json_mock:
+            self.assertEqual(result, self.resolve_version(digest='023f9da22'))
+        get_json_mock.assert_not_called()
+
+    def test_latest_version_not_persisted(self):
+        get_json_mock = MagicMock(side_effect=[self.attributes_endpoint_response, self.files_endpoint_response])
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            self.resolve_version()
+
+        with open(self.cache_file, 'r') as f:
+            self.assertEqual(['typesafe/bundle/reactive-maps-frontend:v1-023f9da22'], list(json.load(f)))
+        bintray_resolver.reset_caches()
+
+        # The latest version is looked up again, whereas the version it resolves to is read from the cache file
+        get_json_mock = MagicMock(return_value=self.attributes_endpoint_response)
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            self.assertEqual('v1-023f9da22', self.resolve_version()['version'])
+        get_json_mock.assert_called_once_with(self.bintray_auth, ANY)
+
+    def test_failed_resolution_not_persisted(self):
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', MagicMock(return_value=[])):
+            self.assertRaises(BintrayResolutionError, self.resolve_version, 'v1', '023f9da22')
+
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_expired(self):
+        get_json_mock = MagicMock(side_effect=[self.attributes_endpoint_response, self.files_endpoint_response,
+                                               self.attributes_endpoint_response])
+        now = time.time()
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            self.resolve_version()
+            # The latest version of a compatibility version expires before the version it was resolved to
+            with patch('time.time', MagicMock(return_value=now + DEFAULT_BINTRAY_RESOLUTION_CACHE_TTL + 1)):
+                result = self.resolve_version()
+
+        self.assertEqual('v1-023f9da22', result['version'])
+        self.assertEqual(3, get_json_mock.call_count)
+
+    def test_failed_resolution(self):
+        get_json_mock = MagicMock(return_value=[])
+        now = time.time()
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            self.assertRaises(BintrayResolutionError, self.resolve_version, 'v1', '023f9da22')
+            self.assertRaises(BintrayResolutionError, self.resolve_version, 'v1', '023f9da22')
+            self.assertEqual(1, get_json_mock.call_count)
+
+            with patch('time.time', MagicMock(return_value=now + DEFAULT_BINTRAY_FAILED_RESOLUTION_CACHE_TTL + 1)):
+                self.assertRaises(BintrayResolutionError, self.resolve_version, 'v1', '023f9da22')
+            self.assertEqual(2, get_json_mock.call_count)
+
+    def test_package_not_found(self):
+        get_json_mock = MagicMock(side_effect=HTTPError('test only', response=MagicMock(status_code=404)))
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            self.assertRaises(HTTPError, self.resolve_version)
+            self.assertIsNone(self.resolve_version())
+
+        self.assertEqual(1, get_json_mock.call_count)
+
+    def test_connection_error_not_cached(self):
+        get_json_mock = MagicMock(side_effect=[ConnectionError('test only'), self.attributes_endpoint_response,
+                                               self.files_endpoint_response])
+
+        with patch('conductr_cli.resolvers.bintray_resolver.get_json', get_json_mock):
+            self.assertRaises(ConnectionError, self.resolve_version)
+            self.assertEqual('v1-023f9da22', self.resolve_version()['version'])
+
+
+class TestBintrayResolveVersionLatest(CliTestCase):
     bintray_auth = ('Bintray', 'username', 'password')
 
     def test_success(self):
@@ -719,7 +853,7 @@ class TestBintrayResolveVersionLatest(TestCase):
                                          'https://api.bintray.com/packages/typesafe/bundle/reactive-maps-frontend')
 
 
-class TestBintrayResolveVersionLatestCompatibilityVersion(TestCase):
+class TestBintrayResolveVersionLatestCompatibilityVersion(CliTestCase):
     bintray_auth = ('Bintray', 'username', 'password')
 
     def test_success(self):
@@ -783,7 +917,7 @@ class TestBintrayResolveVersionLatestCompatibilityVersion(TestCase):
             'https://api.bintray.com/packages/typesafe/bundle/reactive-maps-frontend/attributes?names=latest-v1')
 
 
-class TestResolveBundleVersion(TestCase):
+class TestResolveBundleVersion(CliTestCase):
     bintray_auth = ('realm', 'username', 'password')
 
     def test_resolved_version_found(self):
@@ -860,7 +994,7 @@ class TestResolveBundleVersion(TestCase):
                                                         compatibility_version='v1', digest='digest')
 
 
-class TestContinuousDeliveryUri(TestCase):
+class TestContinuousDeliveryUri(CliTestCase):
     def test_return_uri(self):
         result = bintray_resolver.continuous_delivery_uri({
             'org': 'typesafe',
@@ -902,7 +1036,7 @@ class TestContinuousDeliveryUri(TestCase):
         self.assertIsNone(bintray_resolver.continuous_delivery_uri(None))
 
 
-class TestLoadBintrayCredentials(TestCase):
+class TestLoadBintrayCredentials(CliTestCase):
     def test_success(self):
         bintray_credential_file = strip_margin(
             """|user = user1
@@ -923,6 +1057,16 @@ class TestLoadBintrayCredentials(TestCase):
         exists_mock.assert_called_with('{}/.lightbend/commercial.credentials'.format(os.path.expanduser('~')))
         open_mock.assert_called_with('{}/.lightbend/commercial.credentials'.format(os.path.expanduser('~')), 'r')
 
+    def test_loaded_once(self):
+        open_mock = MagicMock(return_value=io.StringIO('user = user1\npassword = secret\n'))
+
+        with patch('os.path.exists', MagicMock(return_value=True)), \
+                patch('builtins.open', open_mock):
+            self.assertEqual(('Bintray', 'user1', 'secret'), bintray_resolver.load_bintray_credentials())
+            self.assertEqual(('Bintray', 'user1', 'secret'), bintray_resolver.load_bintray_credentials())
+
+        open_mock.assert_called_once_with('{}/.lightbend/commercial.credentials'.format(os.path.expanduser('~')), 'r')
+
     def test_credential_file_not_having_username_password(self):
         bintray_credential_file = strip_margin(
             """|dummy = yes
@@ -947,7 +1091,7 @@ class TestLoadBintrayCredentials(TestCase):
         exists_mock.assert_called_with('{}/.lightbend/commercial.credentials'.format(os.path.expanduser('~')))
 
 
-class TestGetJson(TestCase):
+class TestGetJson(CliTestCase):
     auth = ('realm', 'username', 'password')
 
     def test_get_json(self):
@@ -94,49 +94,62 @@ class TestLoadBundleFromCache(CliTestCase):
     cache_dir = '~/.conductr/cache'
 
     paths = [
-        '{}/path-1.zip'.format(cache_dir),
-        '{}/path-2.zip'.format(cache_dir),
-        '{}/path-3.zip'.format(cache_dir)
+        '{}/visualizer-v2-latest.zip'.format(cache_dir),
+        '{}/visualizer-v1-older.zip'.format(cache_dir)
     ]
 
     def test_cached_bundle_found(self):
         stdout = MagicMock()
 
-        mock_glob = MagicMock(return_value=self.paths)
-        mock_getctime = MagicMock(side_effect=[9, 10, 3])
+        mock_find_files = MagicMock(return_value=self.paths)
+        mock_touch = MagicMock()
 
         args = MagicMock(**{})
 
-        with patch('glob.glob', mock_glob), \
-                patch('os.path.getctime', mock_getctime):
+        with patch('conductr_cli.resolve_cache.find_files', mock_find_files), \
+                patch('conductr_cli.resolve_cache.touch', mock_touch):
             logging_setup.configure_logging(args, stdout)
-            self.assertEqual((True, 'path-2.zip', '~/.conductr/cache/path-2.zip'),
+            self.assertEqual((True, 'visualizer-v2-latest.zip', '~/.conductr/cache/visualizer-v2-latest.zip'),
                              offline_resolver.load_bundle_from_cache(self.cache_dir, 'visualizer'))
 
-        mock_glob.assert_called_once_with('~/.conductr/cache/visualizer*')
-        self.assertEqual([
-            call('~/.conductr/cache/path-1.zip'),
-            call('~/.conductr/cache/path-2.zip'),
-            call('~/.conductr/cache/path-3.zip')
-        ], mock_getctime.call_args_list)
+        mock_find_files.assert_called_once_with(self.cache_dir, 'visualizer')
+        mock_touch.assert_called_once_with('~/.conductr/cache/visualizer-v2-latest.zip')
 
-        expected_output = strip_margin("""|Retrieving from cache ~/.conductr/cache/path-2.zip
+        expected_output = strip_margin("""|Retrieving from cache ~/.conductr/cache/visualizer-v2-latest.zip
                                           |""")
         self.assertEqual(expected_output, self.output(stdout))
 
+    def test_cached_bundle_found_by_compatibility_version(self):
+        stdout = MagicMock()
+
+        mock_find_files = MagicMock(side_effect=[[], self.paths[1:]])
+
+        args = MagicMock(**{})
+
+        with patch('conductr_cli.resolve_cache.find_files', mock_find_files), \
+                patch('conductr_cli.resolve_cache.touch'):
+            logging_setup.configure_logging(args, stdout)
+            self.assertEqual((True, 'visualizer-v1-older.zip', '~/.conductr/cache/visualizer-v1-older.zip'),
+                             offline_resolver.load_bundle_from_cache(self.cache_dir, 'visualizer-v1'))
+
+        self.assertEqual([
+            call(self.cache_dir, 'visualizer-v1'),
+            call(self.cache_dir, 'visualizer', 'v1')
+        ], mock_find_files.call_args_list)
+
     def test_cached_bundle_not_found(self):
         stdout = MagicMock()
 
-        mock_glob = MagicMock(return_value=[])
+        mock_find_files = MagicMock(return_value=[])
 
         args = MagicMock(**{})
 
-        with patch('glob.glob', mock_glob):
+        with patch('conductr_cli.resolve_cache.find_files', mock_find_files):
             logging_setup.configure_logging(args, stdout)
             self.assertEqual((False, None, None),
                              offline_resolver.load_bundle_from_cache(self.cache_dir, 'visualizer'))
 
-        mock_glob.assert_called_once_with('~/.conductr/cache/visualizer*')
+        mock_find_files.assert_called_once_with(self.cache_dir, 'visualizer')
 
         self.assertEqual('', self.output(stdout))
 
@@ -150,52 +163,39 @@ class TestLoadBundleFromCache(CliTestCase):
 class TestLoadBundleConfigurationFromCache(CliTestCase):
     cache_dir = '~/.conductr/cache'
 
-    paths = [
-        '{}/path-1.zip'.format(cache_dir),
-        '{}/path-2.zip'.format(cache_dir),
-        '{}/path-3.zip'.format(cache_dir)
-    ]
-
     def test_cached_bundle_found(self):
         stdout = MagicMock()
 
-        mock_glob = MagicMock(return_value=self.paths)
-        mock_getctime = MagicMock(side_effect=[9, 10, 3])
+        cached_file = '{}/conductr-haproxy-dev-mode-v1-digest.zip'.format(self.cache_dir)
+        mock_find_files = MagicMock(return_value=[cached_file])
 
         args = MagicMock(**{})
 
-        with patch('glob.glob', mock_glob), \
-                patch('os.path.getctime', mock_getctime):
+        with patch('conductr_cli.resolve_cache.find_files', mock_find_files), \
+                patch('conductr_cli.resolve_cache.touch'):
             logging_setup.configure_logging(args, stdout)
-            self.assertEqual((True, 'path-2.zip', '~/.conductr/cache/path-2.zip'),
+            self.assertEqual((True, 'conductr-haproxy-dev-mode-v1-digest.zip', cached_file),
                              offline_resolver.load_bundle_configuration_from_cache(self.cache_dir,
                                                                                    'conductr-haproxy-dev-mode'))
 
-        mock_glob.assert_called_once_with('~/.conductr/cache/conductr-haproxy-dev-mode*')
-        self.assertEqual([
-            call('~/.conductr/cache/path-1.zip'),
-            call('~/.conductr/cache/path-2.zip'),
-            call('~/.conductr/cache/path-3.zip')
-        ], mock_getctime.call_args_list)
+        mock_find_files.assert_called_once_with(self.cache_dir, 'conductr-haproxy-dev-mode')
 
-        expected_output = strip_margin("""|Retrieving from cache ~/.conductr/cache/path-2.zip
-                                          |""")
-        self.assertEqual(expected_output, self.output(stdout))
+        self.assertEqual('Retrieving from cache {}\n'.format(cached_file), self.output(stdout))
 
     def test_cached_bundle_not_found(self):
         stdout = MagicMock()
 
-        mock_glob = MagicMock(return_value=[])
+        mock_find_files = MagicMock(return_value=[])
 
         args = MagicMock(**{})
 
-        with patch('glob.glob', mock_glob):
+        with patch('conductr_cli.resolve_cache.find_files', mock_find_files):
             logging_setup.configure_logging(args, stdout)
             self.assertEqual((False, None, None),
                              offline_resolver.load_bundle_configuration_from_cache(self.cache_dir,
                                                                                    'conductr-haproxy-dev-mode'))
 
-        mock_glob.assert_called_once_with('~/.conductr/cache/conductr-haproxy-dev-mode*')
+        mock_find_files.assert_called_once_with(self.cache_dir, 'conductr-haproxy-dev-mode')
 
         self.assertEqual('', self.output(stdout))
 
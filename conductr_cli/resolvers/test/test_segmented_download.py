@@ -0,0 +1,85 @@
+from unittest import TestCase
+from conductr_cli.resolvers import segmented_download
+from unittest.mock import MagicMock
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+class TestSegmentCount(TestCase):
+    def response(self, status=200, **headers):
+        headers = dict({'Content-Length': str(64 * 1024 * 1024), 'Accept-Ranges': 'bytes'}, **headers)
+        return MagicMock(headers=headers, **{'getcode.return_value': status})
+
+    def segment_count(self, response, validator='"v1"'):
+        return segmented_download.segment_count(response, validator, segments=4, min_segment_size=8 * 1024 * 1024)
+
+    def test_segmented(self):
+        self.assertEqual(4, self.segment_count(self.response()))
+
+    def test_segments_not_smaller_than_min_size(self):
+        self.assertEqual(2, self.segment_count(self.response(**{'Content-Length': str(20 * 1024 * 1024)})))
+        self.assertEqual(1, self.segment_count(self.response(**{'Content-Length': str(1024)})))
+
+    def test_single_stream(self):
+        self.assertEqual(1, self.segment_count(self.response(**{'Accept-Ranges': 'none'})))
+        self.assertEqual(1, self.segment_count(self.response(), validator=None))
+        self.assertEqual(1, self.segment_count(self.response(status=206)))
+
+
+class TestContiguousSize(TestCase):
+    def segment(self, start, end, size_written):
+        segment = segmented_download.Segment(start, end)
+        segment.size_written = size_written
+        return segment
+
+    def test_contiguous_size(self):
+        self.assertEqual(150, segmented_download.contiguous_size([
+            self.segment(0, 100, 100), self.segment(100, 200, 50), self.segment(200, 300, 100)
+        ]))
+        self.assertEqual(300, segmented_download.contiguous_size([
+            self.segment(0, 100, 100), self.segment(100, 200, 100), self.segment(200, 300, 100)
+        ]))
+        self.assertEqual(0, segmented_download.contiguous_size([
+            self.segment(0, 100, 0), self.segment(100, 200, 100)
+        ]))
+
+
+class TestContiguousHash(TestCase):
+    def setUp(self):  # noqa
+        self.tmpdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmpdir, 'bundle.zip.tmp')
+        self.content = os.urandom(300)
+        self.segments = [segmented_download.Segment(start, start + 100) for start in range(0, 300, 100)]
+        with open(self.file_path, 'wb') as f:
+            f.truncate(300)
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, content_hash, segment, size):
+        offset = segment.start + segment.size_written
+        block = self.content[offset:offset + size]
+        with open(self.file_path, 'r+b') as f:
+            f.seek(offset)
+            f.write(block)
+        segment.size_written += len(block)
+        content_hash.written(offset, block)
+
+    def test_hashed_in_order(self):
+        content_hash = segmented_download.ContiguousHash(self.file_path, self.segments, 16)
+        first, second, third = self.segments
+
+        # Blocks written ahead are hashed once the bytes preceding them are
+        self.write(content_hash, third, 100)
+        self.write(content_hash, second, 50)
+        self.assertEqual(0, content_hash.size_hashed)
+        self.write(content_hash, first, 60)
+        self.assertEqual(60, content_hash.size_hashed)
+        self.write(content_hash, first, 40)
+        self.assertEqual(150, content_hash.size_hashed)
+        self.write(content_hash, second, 50)
+
+        self.assertEqual(300, content_hash.size_hashed)
+        self.assertEqual(hashlib.sha256(self.content).hexdigest(), content_hash.hexdigest())
@@ -1,8 +1,19 @@
 from unittest import TestCase
-from urllib.error import URLError
-from conductr_cli.resolvers import uri_resolver
+from urllib.error import ContentTooShortError, URLError
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from conductr_cli.resolvers import segmented_download, uri_resolver
+from conductr_cli.exceptions import BundleResolutionError, MalformedBundleError
+from conductr_cli import resolve_cache
 from conductr_cli.test.cli_test_case import create_mock_logger
+import hashlib
+import io
 import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+import zipfile
 
 from unittest.mock import call, patch, MagicMock
 
@@ -15,7 +26,7 @@ class TestResolveBundle(TestCase):
         file_move_mock = MagicMock()
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        retrieve_mock = MagicMock()
 
         get_logger_mock, log_mock = create_mock_logger()
 
@@ -25,7 +36,7 @@ class TestResolveBundle(TestCase):
                 patch('shutil.move', file_move_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir', '/bundle-url')
             self.assertTrue(is_resolved)
@@ -33,13 +44,12 @@ class TestResolveBundle(TestCase):
             self.assertEqual('/bundle-cached-path', bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        os_remove_mock.assert_called_with('/bundle-cached-path.tmp')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
+        os_remove_mock.assert_not_called()
+        retrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp', auth=None)
         file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
@@ -52,7 +62,7 @@ class TestResolveBundle(TestCase):
         os_mkdirs_mock = MagicMock(return_value=())
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        retrieve_mock = MagicMock()
 
         get_logger_mock, log_mock = create_mock_logger()
 
@@ -62,7 +72,7 @@ class TestResolveBundle(TestCase):
                 patch('shutil.move', file_move_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir', '/bundle-url')
             self.assertTrue(is_resolved)
@@ -70,13 +80,12 @@ class TestResolveBundle(TestCase):
             self.assertEqual('/bundle-cached-path', bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         os_mkdirs_mock.assert_called_with('/cache-dir', mode=448)
         cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
+        retrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp', auth=None)
         file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
@@ -85,7 +94,7 @@ class TestResolveBundle(TestCase):
     def test_resolve_not_found(self):
         os_path_exists_mock = MagicMock(side_effect=[True, False])
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
-        urlretrieve_mock = MagicMock(side_effect=URLError('no_such.bundle'))
+        retrieve_mock = MagicMock(side_effect=URLError('no_such.bundle'))
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
 
         get_logger_mock, log_mock = create_mock_logger()
@@ -93,7 +102,7 @@ class TestResolveBundle(TestCase):
         with patch('os.path.exists', os_path_exists_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir', '/bundle-url')
             self.assertFalse(is_resolved)
@@ -101,12 +110,11 @@ class TestResolveBundle(TestCase):
             self.assertIsNone(bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
+        retrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp', auth=None)
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving /bundle-url-resolved')
@@ -120,7 +128,7 @@ class TestResolveBundleConfiguration(TestCase):
         file_move_mock = MagicMock()
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        retrieve_mock = MagicMock()
 
         get_logger_mock, log_mock = create_mock_logger()
 
@@ -130,7 +138,7 @@ class TestResolveBundleConfiguration(TestCase):
                 patch('shutil.move', file_move_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle_configuration('/cache-dir',
                                                                                               '/bundle-url')
@@ -139,13 +147,12 @@ class TestResolveBundleConfiguration(TestCase):
             self.assertEqual('/bundle-cached-path', bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        os_remove_mock.assert_called_with('/bundle-cached-path.tmp')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
+        os_remove_mock.assert_not_called()
+        retrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp', auth=None)
         file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
@@ -158,7 +165,7 @@ class TestResolveBundleConfiguration(TestCase):
         os_mkdirs_mock = MagicMock(return_value=())
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        retrieve_mock = MagicMock()
 
         get_logger_mock, log_mock = create_mock_logger()
 
@@ -168,7 +175,7 @@ class TestResolveBundleConfiguration(TestCase):
                 patch('shutil.move', file_move_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle_configuration('/cache-dir',
                                                                                               '/bundle-url')
@@ -177,13 +184,12 @@ class TestResolveBundleConfiguration(TestCase):
             self.assertEqual('/bundle-cached-path', bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         os_mkdirs_mock.assert_called_with('/cache-dir', mode=448)
         cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
+        retrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp', auth=None)
         file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
@@ -192,7 +198,7 @@ class TestResolveBundleConfiguration(TestCase):
     def test_resolve_not_found(self):
         os_path_exists_mock = MagicMock(side_effect=[True, False])
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
-        urlretrieve_mock = MagicMock(side_effect=URLError('no_such.bundle'))
+        retrieve_mock = MagicMock(side_effect=URLError('no_such.bundle'))
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
 
         get_logger_mock, log_mock = create_mock_logger()
@@ -200,7 +206,7 @@ class TestResolveBundleConfiguration(TestCase):
         with patch('os.path.exists', os_path_exists_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle_configuration('/cache-dir',
                                                                                               '/bundle-url')
@@ -209,12 +215,11 @@ class TestResolveBundleConfiguration(TestCase):
             self.assertIsNone(bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
+        retrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp', auth=None)
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving /bundle-url-resolved')
@@ -228,7 +233,7 @@ class TestResolveConductrBinary(TestCase):
         file_move_mock = MagicMock()
         cache_path_mock = MagicMock(return_value='/images/conductr-1.0.0.tgz')
         get_url_mock = MagicMock(return_value=('conductr-1.0.0.tgz', 'conductr-binary-uri'))
-        urlretrieve_mock = MagicMock()
+        retrieve_mock = MagicMock()
 
         get_logger_mock, log_mock = create_mock_logger()
 
@@ -238,7 +243,7 @@ class TestResolveConductrBinary(TestCase):
                 patch('shutil.move', file_move_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, file_name, cached_file = uri_resolver.resolve_file('/images', 'conductr-binary-uri')
             self.assertTrue(is_resolved)
@@ -246,13 +251,12 @@ class TestResolveConductrBinary(TestCase):
             self.assertEqual('/images/conductr-1.0.0.tgz', cached_file)
 
         self.assertEqual([
-            call('/images'),
-            call('/images/conductr-1.0.0.tgz.tmp')
+            call('/images')
         ], os_path_exists_mock.call_args_list)
         cache_path_mock.assert_called_with('/images', 'conductr-binary-uri')
         get_url_mock.assert_called_with('conductr-binary-uri')
-        os_remove_mock.assert_called_with('/images/conductr-1.0.0.tgz.tmp')
-        urlretrieve_mock.assert_called_with('conductr-binary-uri', '/images/conductr-1.0.0.tgz.tmp')
+        os_remove_mock.assert_not_called()
+        retrieve_mock.assert_called_with('conductr-binary-uri', '/images/conductr-1.0.0.tgz.tmp', auth=None)
         file_move_mock.assert_called_with('/images/conductr-1.0.0.tgz.tmp', '/images/conductr-1.0.0.tgz')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
@@ -276,7 +280,10 @@ class TestLoadBundleFromCache(TestCase):
 
         get_logger_mock, log_mock = create_mock_logger()
 
+        touch_mock = MagicMock()
+
         with patch('os.path.exists', exists_mock), \
+                patch('conductr_cli.resolve_cache.touch', touch_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.load_bundle_from_cache(
                 '/cache-dir',
@@ -286,6 +293,7 @@ class TestLoadBundleFromCache(TestCase):
             self.assertEqual('/cache-dir/bundle-file.zip', bundle_file)
 
         exists_mock.assert_called_with('/cache-dir/bundle-file.zip')
+        touch_mock.assert_called_once_with('/cache-dir/bundle-file.zip')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving from cache /cache-dir/bundle-file.zip')
@@ -322,7 +330,10 @@ class TestLoadBundleConfigurationFromCache(TestCase):
 
         get_logger_mock, log_mock = create_mock_logger()
 
+        touch_mock = MagicMock()
+
         with patch('os.path.exists', exists_mock), \
+                patch('conductr_cli.resolve_cache.touch', touch_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.load_bundle_configuration_from_cache(
                 '/cache-dir',
@@ -332,6 +343,7 @@ class TestLoadBundleConfigurationFromCache(TestCase):
             self.assertEqual('/cache-dir/bundle-file.zip', bundle_file)
 
         exists_mock.assert_called_with('/cache-dir/bundle-file.zip')
+        touch_mock.assert_called_once_with('/cache-dir/bundle-file.zip')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving from cache /cache-dir/bundle-file.zip')
@@ -403,7 +415,7 @@ class TestProgressBar(TestCase):
         file_move_mock = MagicMock()
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', 'http://site.com/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        retrieve_mock = MagicMock()
         report_hook_mock = MagicMock()
         show_progress_mock = MagicMock(return_value=report_hook_mock)
 
@@ -415,7 +427,7 @@ class TestProgressBar(TestCase):
                 patch('shutil.move', file_move_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.show_progress', show_progress_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir',
@@ -425,14 +437,13 @@ class TestProgressBar(TestCase):
             self.assertEqual('/bundle-cached-path', bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         cache_path_mock.assert_called_with('/cache-dir', 'http://site.com/bundle-url')
         get_url_mock.assert_called_with('http://site.com/bundle-url')
-        os_remove_mock.assert_called_with('/bundle-cached-path.tmp')
-        urlretrieve_mock.assert_called_with('http://site.com/bundle-url-resolved',
-                                            '/bundle-cached-path.tmp', reporthook=report_hook_mock)
+        os_remove_mock.assert_not_called()
+        retrieve_mock.assert_called_with('http://site.com/bundle-url-resolved',
+                                         '/bundle-cached-path.tmp', reporthook=report_hook_mock, auth=None)
         file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
@@ -445,7 +456,7 @@ class TestProgressBar(TestCase):
         file_move_mock = MagicMock()
         cache_path_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', 'http://site.com/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        retrieve_mock = MagicMock()
 
         get_logger_mock, log_mock = create_mock_logger()
         log_mock.is_progress_enabled = MagicMock(return_value=False)
@@ -456,7 +467,7 @@ class TestProgressBar(TestCase):
                 patch('shutil.move', file_move_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.retrieve', retrieve_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir',
                                                                                 'http://site.com/bundle-url')
@@ -465,19 +476,424 @@ class TestProgressBar(TestCase):
             self.assertEqual('/bundle-cached-path', bundle_file)
 
         self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir')
         ], os_path_exists_mock.call_args_list)
         cache_path_mock.assert_called_with('/cache-dir', 'http://site.com/bundle-url')
         get_url_mock.assert_called_with('http://site.com/bundle-url')
-        os_remove_mock.assert_called_with('/bundle-cached-path.tmp')
-        urlretrieve_mock.assert_called_with('http://site.com/bundle-url-resolved', '/bundle-cached-path.tmp')
+        os_remove_mock.assert_not_called()
+        retrieve_mock.assert_called_with('http://site.com/bundle-url-resolved', '/bundle-cached-path.tmp', auth=None)
         file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving http://site.com/bundle-url-resolved')
 
 
+class TestStreamBundle(TestCase):
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+        self.content = b'bundle contents' * 1000
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def create_response(self, content, content_length):
+        body = io.BytesIO(content)
+        return MagicMock(read=body.read, headers={'Content-Length': content_length} if content_length else {},
+                         **{'geturl.return_value': 'http://some-host/bundle.zip'})
+
+    def stream_bundle(self, response):
+        get_logger_mock, log_mock = create_mock_logger()
+        log_mock.is_progress_enabled = MagicMock(return_value=False)
+        with patch('urllib.request.OpenerDirector.open', MagicMock(return_value=response)), \
+                patch('conductr_cli.resolvers.uri_resolver.read_bundle_conf', MagicMock(return_value='name = test')), \
+                patch('logging.getLogger', get_logger_mock):
+            return uri_resolver.stream_bundle(self.cache_dir, 'http://some-host/bundle.zip')
+
+    def test_stream_into_cache(self):
+        is_streamed, bundle_name, cached_file, download = \
+            self.stream_bundle(self.create_response(self.content, str(len(self.content))))
+
+        self.assertTrue(is_streamed)
+        self.assertEqual('bundle.zip', bundle_name)
+        self.assertEqual(os.path.join(self.cache_dir, 'bundle.zip'), cached_file)
+        self.assertEqual(len(self.content), download.len)
+        self.assertEqual('name = test', download.bundle_conf)
+
+        data = b''.join(iter(lambda: download.read(4096), b''))
+        self.assertEqual(self.content, data)
+        with open(cached_file, 'rb') as f:
+            self.assertEqual(self.content, f.read())
+        self.assertEqual('600', oct(os.stat(cached_file).st_mode)[-3:])
+        self.assertFalse(os.path.exists('{}.tmp'.format(cached_file)))
+
+    def test_truncated_download(self):
+        is_streamed, bundle_name, cached_file, download = \
+            self.stream_bundle(self.create_response(self.content[:100], str(len(self.content))))
+
+        self.assertRaises(BundleResolutionError, lambda: [download.read(4096) for _ in range(2)])
+        download.close()
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_unknown_length(self):
+        response = self.create_response(self.content, None)
+        self.assertEqual((False, None, None, None), self.stream_bundle(response))
+        response.close.assert_called_once_with()
+
+    def test_local_file(self):
+        self.assertEqual((False, None, None, None), uri_resolver.stream_bundle(self.cache_dir, '/some/bundle.zip'))
+
+
+class TestVerifyDigest(TestCase):
+    def setUp(self):  # noqa
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        self.content = b'bundle contents' * 10000
+        self.digest = hashlib.sha256(self.content).hexdigest()
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.tmpdir)
+
+    def write_file(self, directory, file_name, content):
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, file_name)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return file_path
+
+    def resolve_file(self, uri):
+        get_logger_mock, log_mock = create_mock_logger()
+        log_mock.is_progress_enabled = MagicMock(return_value=False)
+        with patch('logging.getLogger', get_logger_mock):
+            return uri_resolver.resolve_file(self.cache_dir, uri)
+
+    def test_retrieve(self):
+        source = self.write_file(self.tmpdir, 'bundle.zip', self.content)
+        target = os.path.join(self.tmpdir, 'target.zip')
+        reporthook = MagicMock()
+
+        digest = uri_resolver.retrieve('file://{}'.format(source), target, reporthook=reporthook, block_size=4096)
+
+        self.assertEqual(self.digest, digest)
+        with open(target, 'rb') as f:
+            self.assertEqual(self.content, f.read())
+        self.assertEqual(call(0, 4096, len(self.content)), reporthook.call_args_list[0])
+        self.assertEqual(call(37, 4096, len(self.content)), reporthook.call_args_list[-1])
+
+    def test_resolve_verified_file(self):
+        file_name = 'bundle-v1-{}.zip'.format(self.digest)
+        source = self.write_file(self.tmpdir, file_name, self.content)
+
+        is_resolved, bundle_name, cached_file = self.resolve_file('file://{}'.format(source))
+
+        self.assertTrue(is_resolved)
+        self.assertEqual(os.path.join(self.cache_dir, file_name), cached_file)
+        self.assertEqual(self.digest, resolve_cache.recorded_digest(cached_file))
+
+    def test_resolve_mismatching_file(self):
+        file_name = 'bundle-v1-{}.zip'.format(self.digest)
+        source = self.write_file(self.tmpdir, file_name, b'corrupted')
+
+        self.assertRaises(MalformedBundleError, self.resolve_file, 'file://{}'.format(source))
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_discard_mismatching_cached_file(self):
+        file_name = 'bundle-v1-{}.zip'.format(self.digest)
+        cached_file = self.write_file(self.cache_dir, file_name, b'corrupted')
+
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('logging.getLogger', get_logger_mock):
+            result = uri_resolver.load_bundle_from_cache(self.cache_dir, 'http://some-host/{}'.format(file_name))
+
+        self.assertEqual((False, None, None), result)
+        self.assertFalse(os.path.exists(cached_file))
+        log_mock.warning.assert_called_once_with(
+            'Discarding {} from cache as it does not match the digest of its name'.format(cached_file))
+
+    def test_load_verified_cached_file(self):
+        file_name = 'bundle-v1-{}.zip'.format(self.digest)
+        cached_file = self.write_file(self.cache_dir, file_name, self.content)
+        resolve_cache.record_digest(cached_file, self.digest)
+
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('logging.getLogger', get_logger_mock), \
+                patch('conductr_cli.bundle_utils.hash_file') as hash_file_mock:
+            result = uri_resolver.load_bundle_from_cache(self.cache_dir, 'http://some-host/{}'.format(file_name))
+
+        self.assertEqual((True, file_name, cached_file), result)
+        hash_file_mock.assert_not_called()
+
+    def test_stream_mismatching_bundle(self):
+        file_name = 'bundle-v1-{}.zip'.format(self.digest)
+        body = io.BytesIO(b'corrupted')
+        response = MagicMock(read=body.read, headers={'Content-Length': '9'},
+                             **{'geturl.return_value': 'http://some-host/{}'.format(file_name)})
+
+        get_logger_mock, log_mock = create_mock_logger()
+        log_mock.is_progress_enabled = MagicMock(return_value=False)
+        with patch('urllib.request.OpenerDirector.open', MagicMock(return_value=response)), \
+                patch('conductr_cli.resolvers.uri_resolver.read_bundle_conf', MagicMock(return_value='name = test')), \
+                patch('logging.getLogger', get_logger_mock):
+            is_streamed, bundle_name, cached_file, download = \
+                uri_resolver.stream_bundle(self.cache_dir, 'http://some-host/{}'.format(file_name))
+
+        self.assertRaises(MalformedBundleError, download.read, 4096)
+        download.close()
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """
+    Serves the content of the server, honouring ranges unless told otherwise. The response to the first request is
+    cut short after `cut_after` bytes if given.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):  # noqa
+        with self.server.lock:
+            self.server.requests.append(dict(self.headers))
+        content = self.server.content
+        status = 200
+        start = 0
+
+        end = len(content) - 1
+
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if self.server.honours_ranges and range_header and (not if_range or if_range == self.server.etag):
+            start, range_end = range_header[len('bytes='):].split('-')
+            start = int(start)
+            end = min(int(range_end), end) if range_end else end
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+
+        body = content[start:end + 1]
+        self.send_response(status)
+        self.send_header('Accept-Ranges', 'bytes')
+        if self.server.etag:
+            self.send_header('ETag', self.server.etag)
+        if status == 206:
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end, len(content)))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        with self.server.lock:
+            cut_after = self.server.cut_after
+            self.server.cut_after = None
+        if cut_after is not None:
+            self.wfile.write(body[:cut_after])
+            self.close_connection = True
+        else:
+            self.wfile.write(body)
+
+
+class RangeServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class RangeServerTestCase(TestCase):
+    def setUp(self):  # noqa
+        self.server = RangeServer(('127.0.0.1', 0), RangeHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.content = os.urandom(256 * 1024)
+        self.server.etag = '"v1"'
+        self.server.honours_ranges = True
+        self.server.cut_after = 100 * 1024
+        self.server_thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05},
+                                              daemon=True)
+        self.server_thread.start()
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.url = 'http://127.0.0.1:{}/bundle.zip'.format(self.server.server_address[1])
+        self.file_path = os.path.join(self.tmpdir, 'bundle.zip.tmp')
+
+    def tearDown(self):  # noqa
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def retrieve(self):
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('logging.getLogger', get_logger_mock):
+            return uri_resolver.retrieve(self.url, self.file_path)
+
+    def interrupt(self):
+        self.assertRaises(ContentTooShortError, self.retrieve)
+        self.assertEqual(100 * 1024, os.path.getsize(self.file_path))
+
+    def assert_downloaded(self, digest):
+        with open(self.file_path, 'rb') as f:
+            self.assertEqual(self.server.content, f.read())
+        self.assertEqual(hashlib.sha256(self.server.content).hexdigest(), digest)
+        self.assertFalse(os.path.exists(uri_resolver.resume_record_path(self.file_path)))
+
+
+class TestResumeDownload(RangeServerTestCase):
+    def test_resume(self):
+        self.interrupt()
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+        self.assertEqual('bytes=102400-', self.server.requests[1]['Range'])
+        self.assertEqual('"v1"', self.server.requests[1]['If-Range'])
+
+    def test_ranges_not_honoured(self):
+        self.interrupt()
+        self.server.honours_ranges = False
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+
+    def test_content_changed(self):
+        self.interrupt()
+        self.server.content = os.urandom(200 * 1024)
+        self.server.etag = '"v2"'
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+
+    def test_partial_download_complete(self):
+        self.server.cut_after = None
+        with open(self.file_path, 'wb') as f:
+            f.write(self.server.content)
+        uri_resolver.record_resume_validator(self.url, self.file_path, {'ETag': '"v1"'})
+
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+        self.assertEqual(2, len(self.server.requests))
+
+    def test_not_resumable_without_validator(self):
+        self.server.etag = None
+        self.interrupt()
+        self.assertFalse(os.path.exists(uri_resolver.resume_record_path(self.file_path)))
+
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+        self.assertNotIn('Range', self.server.requests[1])
+
+
+class TestSegmentedDownload(RangeServerTestCase):
+    def setUp(self):  # noqa
+        super().setUp()
+        self.server.content = os.urandom(1024 * 1024)
+        self.server.cut_after = None
+        segment_count = segmented_download.segment_count
+        segment_count_patch = patch('conductr_cli.resolvers.segmented_download.segment_count',
+                                    lambda response, validator, segments: segment_count(response, validator, segments,
+                                                                                        min_segment_size=256 * 1024))
+        segment_count_patch.start()
+        self.addCleanup(segment_count_patch.stop)
+
+    def retrieve(self, reporthook=None):
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('logging.getLogger', get_logger_mock):
+            return uri_resolver.retrieve(self.url, self.file_path, reporthook=reporthook, block_size=4096, segments=4)
+
+    def test_download_in_segments(self):
+        reporthook = MagicMock()
+        # The content is hashed while it is being downloaded, rather than read again afterwards
+        with patch('conductr_cli.bundle_utils.hash_file') as hash_file_mock:
+            digest = self.retrieve(reporthook)
+        hash_file_mock.assert_not_called()
+
+        self.assert_downloaded(digest)
+        self.assertEqual(['bytes=262144-524287', 'bytes=524288-786431', 'bytes=786432-1048575'],
+                         sorted(request['Range'] for request in self.server.requests[1:]))
+        self.assertEqual(call(256, 4096, 1024 * 1024), reporthook.call_args_list[-1])
+
+    def test_ranges_not_honoured(self):
+        self.server.honours_ranges = False
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+        self.assertNotIn('Range', self.server.requests[-1])
+
+    def test_resume_failed_segment(self):
+        self.server.cut_after = 100 * 1024
+        self.interrupt()
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+        self.assertEqual('bytes=102400-', self.server.requests[-1]['Range'])
+
+    def test_not_resumable_without_validator(self):
+        self.server.etag = None
+        digest = self.retrieve()
+
+        self.assert_downloaded(digest)
+        self.assertEqual(1, len(self.server.requests))
+
+
+class TestStreamBundleConf(RangeServerTestCase):
+    def setUp(self):  # noqa
+        super().setUp()
+        self.server.cut_after = None
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, 'w') as bundle_zip:
+            bundle_zip.writestr('bundle/bundle.conf', 'name = test-bundle')
+            bundle_zip.writestr('bundle/lib/lib.jar', os.urandom(256 * 1024))
+        self.server.content = content.getvalue()
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+
+    def stream_bundle(self):
+        get_logger_mock, log_mock = create_mock_logger()
+        log_mock.is_progress_enabled = MagicMock(return_value=False)
+        with patch('logging.getLogger', get_logger_mock):
+            return uri_resolver.stream_bundle(self.cache_dir, self.url)
+
+    def test_read_bundle_conf_ahead(self):
+        is_streamed, bundle_name, cached_file, download = self.stream_bundle()
+
+        self.assertTrue(is_streamed)
+        self.assertEqual('name = test-bundle', download.bundle_conf)
+        ranges = [request['Range'] for request in self.server.requests[1:]]
+        self.assertTrue(ranges)
+        self.assertTrue(all(request['If-Range'] == '"v1"' for request in self.server.requests[1:]))
+
+        data = b''.join(iter(lambda: download.read(4096), b''))
+        download.close()
+        self.assertEqual(self.server.content, data)
+
+    def test_ranges_not_honoured(self):
+        self.server.honours_ranges = False
+
+        self.assertEqual((False, None, None, None), self.stream_bundle())
+
+    def test_not_resumable_without_validator(self):
+        self.server.etag = None
+
+        self.assertEqual((False, None, None, None), self.stream_bundle())
+        self.assertEqual(1, len(self.server.requests))
+
+
+class TestBuildOpener(TestCase):
+    def test_auth(self):
+        with patch('urllib.request.install_opener') as install_opener_mock:
+            opener = uri_resolver.build_opener('http://site.com/bundle.zip', ('Bintray', 'username', 'password'))
+
+        install_opener_mock.assert_not_called()
+        [auth_handler] = [handler for handler in opener.handlers
+                          if isinstance(handler, urllib.request.HTTPBasicAuthHandler)]
+        self.assertEqual(('username', 'password'),
+                         auth_handler.passwd.find_user_password('Bintray', 'http://site.com/bundle.zip'))
+        self.assertEqual((None, None), auth_handler.passwd.find_user_password('Bintray', 'http://other.com/'))
+
+    def test_no_auth(self):
+        opener = uri_resolver.build_opener('http://site.com/bundle.zip', None)
+
+        self.assertFalse([handler for handler in opener.handlers
+                          if isinstance(handler, urllib.request.HTTPBasicAuthHandler)])
+
+
 class TestResolveBundleVersion(TestCase):
     def test_return_none(self):
         self.assertIsNone(uri_resolver.resolve_bundle_version("bundle"))
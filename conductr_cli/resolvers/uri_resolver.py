@@ -1,14 +1,147 @@
-from urllib.request import urlretrieve
+from urllib.request import Request
 from urllib.parse import ParseResult, urlparse, urlunparse
-from urllib.error import URLError
+from urllib.error import ContentTooShortError, HTTPError, URLError
+from contextlib import closing
 from pathlib import Path
-from conductr_cli import screen_utils
+from zipfile import BadZipFile
+from conductr_cli import bundle_utils, resolve_cache, screen_utils, timings
+from conductr_cli.exceptions import BundleResolutionError, MalformedBundleError, SegmentNotSupportedError
+from conductr_cli.http import DEFAULT_DOWNLOAD_SEGMENTS
+from conductr_cli.resolvers import segmented_download
+import hashlib
+import json
 import os
 import logging
+import re
 import shutil
 import urllib
 
 
+# The validator of a partial download is recorded next to it, e.g. visualizer-v2-<digest>.zip.tmp.resume
+RESUME_RECORD_SUFFIX = '.resume'
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-\d+/(?:\d+|\*)$')
+
+
+class BundleDownload:
+    """
+    The download of a remote bundle, which is written to the cache as it is read so that the bundle can be uploaded
+    while it is still being downloaded. Once read completely, the download is verified and moved into the cache like
+    a bundle resolved by `resolve_file`.
+    The bundle.conf within the bundle is read ahead of the download, see `read_bundle_conf`.
+    """
+    def __init__(self, response, tmp_download_path, cached_file, bundle_conf):
+        self.response = response
+        self.bundle_conf = bundle_conf
+        self.tmp_download_path = tmp_download_path
+        self.cached_file = cached_file
+        self.len = int(response.headers['Content-Length'])
+        self.bytes_read = 0
+        self.sha256 = hashlib.sha256()
+        self.is_complete = False
+        self.tmp_file = open(os.open(tmp_download_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb')
+        remove_resume_record(tmp_download_path)
+
+        log = logging.getLogger(__name__)
+        self.progress = show_progress(log) if log.is_progress_enabled() else None
+
+    def read(self, size=-1):
+        if self.is_complete:
+            return b''
+
+        data = self.response.read(size)
+        self.sha256.update(data)
+        self.tmp_file.write(data)
+        self.bytes_read += len(data)
+
+        if self.progress:
+            self.progress(self.bytes_read, 1, self.len)
+
+        if not data or self.bytes_read >= self.len:
+            self.complete()
+
+        return data
+
+    def complete(self):
+        if self.is_complete:
+            return
+
+        self.response.close()
+        self.tmp_file.close()
+        if self.bytes_read < self.len:
+            raise BundleResolutionError('Download of {} ended after {} of {} bytes'
+                                        .format(self.response.geturl(), self.bytes_read, self.len))
+
+        digest = self.sha256.hexdigest()
+        verify_digest(self.response.geturl(), os.path.basename(self.cached_file), digest)
+        shutil.move(self.tmp_download_path, self.cached_file)
+        resolve_cache.record_digest(self.cached_file, digest)
+        self.is_complete = True
+
+    def close(self):
+        self.response.close()
+        self.tmp_file.close()
+        if not self.is_complete and os.path.exists(self.tmp_download_path):
+            os.remove(self.tmp_download_path)
+
+
+class RangeFile:
+    """
+    A read-only file of the content of a url, read with range requests conditional on the validator of the content.
+    Reads are rounded up to the block size, so that reading the central directory of a zip and then one of its
+    entries only takes a few requests.
+    """
+    def __init__(self, opener, url, size, validator, block_size=64 * 1024):
+        self.opener = opener
+        self.url = url
+        self.size = size
+        self.validator = validator
+        self.block_size = block_size
+        self.position = 0
+        self.buffer_offset = 0
+        self.buffer = b''
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def read(self, size=-1):
+        end = self.size if size is None or size < 0 else min(self.size, self.position + size)
+        if self.position < self.buffer_offset or end > self.buffer_offset + len(self.buffer):
+            self.fetch(self.position, max(end, min(self.size, self.position + self.block_size)))
+
+        data = self.buffer[self.position - self.buffer_offset:end - self.buffer_offset]
+        self.position += len(data)
+        return data
+
+    def fetch(self, start, end):
+        self.buffer_offset = start
+        self.buffer = b''
+        if start >= end:
+            return
+
+        request = Request(self.url, headers={'Range': 'bytes={}-{}'.format(start, end - 1), 'If-Range': self.validator})
+        with closing(self.opener.open(request)) as response:
+            match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+            if response.getcode() != 206 or not match or int(match.group(1)) != start:
+                raise SegmentNotSupportedError('Bytes {}-{} of {} were not served as requested'
+                                               .format(start, end - 1, self.url))
+            self.buffer = response.read(end - start)
+
+    def close(self):
+        pass
+
+
 def resolve_bundle(cache_dir, uri, auth=None):
     return resolve_file(cache_dir, uri, auth)
 
@@ -25,18 +158,78 @@ def resolve_file(cache_dir, uri, auth=None):
         cached_file = cache_path(cache_dir, uri)
         tmp_download_path = '{}.tmp'.format(cached_file)
 
-        if os.path.exists(tmp_download_path):
+        # An interrupted download of the same url is resumed by `retrieve`, and any other is started over
+        digest = download_bundle(log, file_url, tmp_download_path, auth)
+        try:
+            verify_digest(file_url, os.path.basename(cached_file), digest)
+        except MalformedBundleError:
             os.remove(tmp_download_path)
-
-        download_bundle(log, file_url, tmp_download_path, auth)
+            raise
 
         os.chmod(tmp_download_path, 0o600)
         shutil.move(tmp_download_path, cached_file)
+        resolve_cache.record_digest(cached_file, digest)
         return True, file_name, cached_file
     except URLError:
         return False, None, None
 
 
+def stream_bundle(cache_dir, uri, auth=None):
+    """
+    Opens the download of a remote bundle to be read while it is being downloaded, see `BundleDownload`.
+    Bundles which are local, or whose size isn't known upfront, are not streamed.
+    :return: a tuple of (is_streamed, bundle_name, cached_file, download)
+    """
+    log = logging.getLogger(__name__)
+
+    file_name, file_url = get_url(uri)
+    if urlparse(file_url).scheme not in ['http', 'https']:
+        return False, None, None, None
+
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, mode=0o700)
+
+    try:
+        log.info('Retrieving {}'.format(file_url))
+        opener = build_opener(file_url, auth)
+        response = opener.open(file_url)
+    except URLError:
+        return False, None, None, None
+
+    if response.headers.get('Content-Length') is None:
+        response.close()
+        return False, None, None, None
+
+    bundle_conf = read_bundle_conf(opener, file_url, response)
+    if bundle_conf is None:
+        response.close()
+        return False, None, None, None
+
+    cached_file = cache_path(cache_dir, uri)
+    return True, file_name, cached_file, BundleDownload(response, '{}.tmp'.format(cached_file), cached_file,
+                                                        bundle_conf)
+
+
+def read_bundle_conf(opener, url, response):
+    """
+    Reads the bundle.conf of a remote bundle with range requests conditional on the validator of the response, so that
+    it can be sent to ConductR ahead of the bundle while the bundle is yet to be downloaded.
+    :return: the bundle.conf, or None if the server doesn't serve ranges of the bundle.
+    """
+    log = logging.getLogger(__name__)
+
+    validator = response_validator(url, response.headers)
+    if not validator or response.headers.get('Accept-Ranges', '').lower() != 'bytes':
+        log.debug('Unable to read the bundle.conf of {} ahead of its download as ranges are not served'.format(url))
+        return None
+
+    try:
+        return bundle_utils.conf(RangeFile(opener, url, int(response.headers['Content-Length']), validator))
+    except (BadZipFile, SegmentNotSupportedError, URLError) as e:
+        log.debug('Unable to read the bundle.conf of {} ahead of its download: {}'.format(url, e))
+        return None
+
+
 def load_bundle_from_cache(cache_dir, uri):
     # When the supplied uri is a local filesystem, don't load from cache so file can be used as is
     parsed = urlparse(uri, scheme='file')
@@ -47,6 +240,12 @@ def load_bundle_from_cache(cache_dir, uri):
 
         cached_file = cache_path(cache_dir, uri)
         if os.path.exists(cached_file):
+            if not resolve_cache.verify_cached_file(cached_file):
+                log.warning('Discarding {} from cache as it does not match the digest of its name'.format(cached_file))
+                resolve_cache.remove(cached_file)
+                return False, None, None
+
+            resolve_cache.touch(cached_file)
             bundle_name = os.path.basename(cached_file)
             log.info('Retrieving from cache {}'.format(cached_file))
             return True, bundle_name, cached_file
@@ -93,21 +292,187 @@ def download_bundle(log, bundle_url, tmp_download_path, auth):
     parsed = urlparse(bundle_url, scheme='file')
     is_http_download = parsed.scheme == 'http' or parsed.scheme == 'https'
 
-    if is_http_download and auth:
+    if log.is_progress_enabled() and is_http_download:
+        return retrieve(bundle_url, tmp_download_path, reporthook=show_progress(log), auth=auth)
+    else:
+        # File based download, no need to show progress bar
+        return retrieve(bundle_url, tmp_download_path, auth=auth)
+
+
+def retrieve(url, file_path, reporthook=None, block_size=bundle_utils.DIGEST_CHUNK_SIZE,
+             segments=DEFAULT_DOWNLOAD_SEGMENTS, auth=None):
+    """
+    Downloads the url to the file like `urlretrieve`, hashing the content as it is being written rather than reading
+    the file again afterwards.
+    The partial download of an http url is kept along with the validator of the response, i.e. its `ETag` or
+    `Last-Modified` header. Retrieving the same url again resumes the download with a range request, provided that
+    the server honours ranges and that the content hasn't changed since, or else downloads the content in full.
+    Large downloads from servers accepting ranges are split into segments fetched at once, see `segmented_download`.
+    :return: the SHA-256 digest of the content.
+    """
+    opener = build_opener(url, auth)
+    offset, response = open_download(url, file_path, opener)
+
+    if not offset:
+        record_resume_validator(url, file_path, response.headers)
+        validator = response_validator(url, response.headers)
+        segment_count = segmented_download.segment_count(response, validator, segments)
+        if segment_count > 1:
+            try:
+                digest = segmented_download.download(url, file_path, response, validator, segment_count, reporthook,
+                                                     block_size, opener)
+                remove_resume_record(file_path)
+                return digest
+            except SegmentNotSupportedError as e:
+                log = logging.getLogger(__name__)
+                log.debug('Downloading {} in a single stream: {}'.format(url, e.value))
+                response = opener.open(url)
+
+    sha256 = hashlib.sha256()
+    with closing(response):
+        if offset:
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(block_size), b''):
+                    sha256.update(block)
+
+        content_length = response.headers.get('Content-Length')
+        size = offset + int(content_length) if content_length is not None else -1
+        size_read = offset
+        if reporthook:
+            reporthook(blocks(size_read, block_size), block_size, size)
+
+        with open(file_path, 'ab' if offset else 'wb') as f:
+            while True:
+                block = response.read(block_size)
+                if not block:
+                    break
+                sha256.update(block)
+                f.write(block)
+                size_read += len(block)
+                if reporthook:
+                    reporthook(blocks(size_read, block_size), block_size, size)
+
+    if 0 <= size_read < size:
+        raise ContentTooShortError('retrieval incomplete: got only {} out of {} bytes'.format(size_read, size),
+                                   (file_path, response.headers))
+
+    remove_resume_record(file_path)
+    return sha256.hexdigest()
+
+
+def open_download(url, file_path, opener):
+    """
+    Opens the url with the opener, requesting the bytes following those already downloaded to the file if the
+    download is resumable.
+    :return: a tuple of (offset, response) where the offset is that of the first byte of the response, 0 unless the
+             download is resumed.
+    """
+    offset = os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+    validator = resume_validator(url, file_path) if offset else None
+    if validator is None:
+        return 0, opener.open(url)
+
+    log = logging.getLogger(__name__)
+    try:
+        response = opener.open(Request(url, headers={'Range': 'bytes={}-'.format(offset), 'If-Range': validator}))
+    except HTTPError as e:
+        if e.code != 416:
+            raise
+        # The partial download isn't part of the content any longer
+        e.close()
+        log.debug('Unable to resume the download of {}, downloading it again'.format(url))
+        return 0, opener.open(url)
+
+    match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+    if response.getcode() == 206 and match and int(match.group(1)) == offset:
+        log.info('Resuming the download of {} at byte {}'.format(url, offset))
+        return offset, response
+    elif response.getcode() == 206:
+        response.close()
+        return 0, opener.open(url)
+    else:
+        # The server doesn't honour ranges, or the content has changed since
+        return 0, response
+
+
+def blocks(size, block_size):
+    return -(-size // block_size)
+
+
+def resume_record_path(file_path):
+    return '{}{}'.format(file_path, RESUME_RECORD_SUFFIX)
+
+
+def record_resume_validator(url, file_path, headers):
+    """
+    Records the validator of the response being downloaded to the file, so that the download can be resumed.
+    """
+    validator = response_validator(url, headers)
+    if validator:
+        try:
+            fd = os.open(resume_record_path(file_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'url': url, 'validator': validator}, f)
+        except OSError:
+            pass
+    else:
+        remove_resume_record(file_path)
+
+
+def response_validator(url, headers):
+    """
+    :return: the validator of an http response which allows for range requests, if any. Weak entity tags don't, in
+             which case the last modification time is used.
+    """
+    if urlparse(url).scheme not in ['http', 'https']:
+        return None
+
+    etag = headers.get('ETag')
+    return etag if etag and not etag.startswith('W/') else headers.get('Last-Modified')
+
+
+def resume_validator(url, file_path):
+    """
+    :return: the validator of the partial download of the url to the file, or None if it isn't resumable.
+    """
+    try:
+        with open(resume_record_path(file_path), 'r') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return record.get('validator') if record.get('url') == url else None
+
+
+def remove_resume_record(file_path):
+    try:
+        os.remove(resume_record_path(file_path))
+    except OSError:
+        pass
+
+
+def verify_digest(url, file_name, digest):
+    expected_digest = bundle_utils.file_name_digest(file_name)
+    if expected_digest is not None and digest != expected_digest:
+        raise MalformedBundleError('Digest of {} is {} rather than {} as given by its name'
+                                   .format(url, digest, expected_digest))
+
+
+def build_opener(url, auth):
+    """
+    Builds the opener of the url, authenticating with the credentials of the resolver if any. The opener is specific
+    to the download rather than installed globally, so that the credentials given for one url aren't sent to others.
+    """
+    handlers = []
+    if auth:
         realm, username, password = auth
         authinfo = urllib.request.HTTPBasicAuthHandler()
         authinfo.add_password(realm=realm,
-                              uri=bundle_url,
+                              uri=url,
                               user=username,
                               passwd=password)
-        opener = urllib.request.build_opener(authinfo)
-        urllib.request.install_opener(opener)
-
-    if log.is_progress_enabled() and is_http_download:
-        urlretrieve(bundle_url, tmp_download_path, reporthook=show_progress(log))
-    else:
-        # File based download, no need to show progress bar
-        urlretrieve(bundle_url, tmp_download_path)
+        handlers.append(authinfo)
+    return urllib.request.build_opener(*(handlers + timings.url_handlers()))
 
 
 def show_progress(log):
@@ -5,7 +5,9 @@ import re
 from conductr_cli.sandbox_common import CONDUCTR_DEV_IMAGE, major_version
 from conductr_cli.sandbox_features import feature_names
 from conductr_cli.constants import DEFAULT_SANDBOX_ADDR_RANGE, DEFAULT_SANDBOX_IMAGE_DIR, DEFAULT_OFFLINE_MODE
-from conductr_cli import sandbox_run, sandbox_stop, sandbox_common, sandbox_logs, sandbox_ps, logging_setup, docker, version
+from conductr_cli import sandbox_run, sandbox_stop, sandbox_common, sandbox_logs, sandbox_ps, logging_setup, docker, \
+    timings, version
+from conductr_cli.conduct_main import add_timings
 from conductr_cli.sandbox_run_jvm import NR_OF_INSTANCE_EXPRESSION
 
 
@@ -168,6 +170,7 @@ def add_default_arguments(sub_parser):
                             default=True,
                             help=argparse.SUPPRESS)
     add_resolve_ip(sub_parser, True)
+    add_timings(sub_parser)
 
 
 def add_resolve_ip(sub_parser, default_value):
@@ -189,6 +192,8 @@ def run():
     parser = build_parser()
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    if vars(args).get('timings'):
+        timings.enable()
 
     # Print help or execute subparser function
     if not vars(args).get('func'):
@@ -219,6 +224,9 @@ def run():
             docker.validate_docker_vm(args.vm_type)
 
         result = args.func(args)
+        if vars(args).get('timings'):
+            timings.log_summary(args.timings_format)
+
         if not result:
             exit(1)
 
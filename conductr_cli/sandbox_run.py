@@ -1,5 +1,5 @@
 from conductr_cli import conduct_request, conduct_url, validation, sandbox_features, sandbox_proxy, \
-    sandbox_run_docker, sandbox_run_jvm
+    sandbox_run_docker, sandbox_run_jvm, sse_hub, timings
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 from conductr_cli.sandbox_common import major_version
 from requests.exceptions import ConnectionError
@@ -32,7 +32,8 @@ def run(args):
     features = sandbox_features.collect_features(args.features, args.image_version, args.offline_mode)
     sandbox = sandbox_run_docker if is_conductr_v1 else sandbox_run_jvm
 
-    run_result = sandbox.run(args, features)
+    with timings.phase('start sandbox'):
+        run_result = sandbox.run(args, features)
 
     is_started, wait_timeout = wait_for_start(args, run_result)
     if is_started:
@@ -45,14 +46,18 @@ def run(args):
             sandbox_proxy.start_proxy(proxy_bind_addr=run_result.core_addrs[0],
                                       proxy_ports=proxy_ports)
 
-        for feature in features:
-            feature.start()
+        # The features are loaded and run one after another, waiting on the same bundle events
+        with sse_hub.retained():
+            for feature in features:
+                with timings.phase('start feature {}'.format(feature.name)):
+                    feature.start()
 
     sandbox.log_run_attempt(args, run_result, is_started, wait_timeout)
 
     return True
 
 
+@timings.timed('wait for sandbox')
 def wait_for_start(args, run_result):
     if not args.no_wait:
         retries = int(os.getenv('CONDUCTR_SANDBOX_WAIT_RETRIES', DEFAULT_WAIT_RETRIES))
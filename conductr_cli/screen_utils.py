@@ -6,6 +6,14 @@ SEPARATION_CHAR = ' '
 LOADING_CHAR = '#'
 
 
+def format_size(size):
+    for unit in ['B', 'KiB', 'MiB']:
+        if size < 1024:
+            return '{:.1f} {}'.format(size, unit) if unit != 'B' else '{:.0f} B'.format(size)
+        size /= 1024
+    return '{:.1f} GiB'.format(size)
+
+
 def calc_column_widths(data):
     column_widths = {}
     for row in data:
@@ -1,13 +1,22 @@
 import argcomplete
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from conductr_cli import bundle_utils, logging_setup, screen_utils
+from contextlib import ExitStack
 from functools import partial
-from conductr_cli import logging_setup
+import fnmatch
 import hashlib
+import itertools
+import json
 import logging
 import os
-import shutil
+import stat
+import struct
 import tempfile
+import time
 import zipfile
+import zlib
 
 
 def run(argv=None):
@@ -25,38 +34,594 @@ def build_parser():
     parser.add_argument('--output-dir',
                         default='.',
                         help="The optional output directory, defaults to '.'")
+    parser.add_argument('-j', '--jobs',
+                        type=jobs_count,
+                        default=1,
+                        help='The number of processes compressing the files at once, defaults to 1. '
+                             '0 starts one per CPU')
+    parser.add_argument('--incremental',
+                        action='store_true',
+                        help='Reuse the compressed files of the archive previously created in the output directory '
+                             'which are unchanged, tracking them in an index next to the archive')
+    parser.add_argument('--reproducible',
+                        action='store_true',
+                        help='Create the same archive from the same files wherever and whenever it is created, '
+                             'leaving out their modification times and normalizing their permissions. '
+                             'Files are dated from SOURCE_DATE_EPOCH if set')
+    parser.add_argument('--compression-level',
+                        type=partial(compression_level, '--compression-level'),
+                        default=COMPRESSION_LEVEL,
+                        help='The level files are deflated at, from 1 (fastest) to 9 (smallest), or 0 to store them, '
+                             'defaults to {}, so that archives are the same as those created by earlier '
+                             'versions'.format(COMPRESSION_LEVEL))
+    parser.add_argument('--compression',
+                        type=compression_rule,
+                        action='append',
+                        default=[],
+                        dest='compression_rules',
+                        metavar='GLOB=LEVEL',
+                        help='The level files matching the glob are deflated at, 0 to store them. The first glob '
+                             'matching a file applies. Files not matched are stored if their content is already '
+                             'compressed, judging by their extension and a sample of it. May be specified multiple '
+                             'times')
     parser.add_argument('source',
                         help='Path to a bundle directory or bundle configuration file')
     parser.set_defaults(func=shazar)
     return parser
 
 
+# Files are stored unless a level is chosen, so that the same files are archived, and digested, as they were before
+COMPRESSION_LEVEL = 0
+
+# The deflate settings are fixed, so that the same files are compressed alike
+COMPRESSION_MEM_LEVEL = 8
+
+# Extensions of files whose content is already compressed
+COMPRESSED_EXTENSIONS = frozenset([
+    '.7z', '.bz2', '.ear', '.gif', '.gz', '.jar', '.jpeg', '.jpg', '.lz4', '.mp3', '.mp4', '.png', '.tbz2', '.tgz',
+    '.txz', '.war', '.webm', '.webp', '.woff', '.woff2', '.xz', '.zip', '.zst'
+])
+
+# Files as large as a sample are sampled, and stored if deflating the sample saves less than the ratio of its size
+COMPRESSION_SAMPLE_SIZE = 64 * 1024
+COMPRESSION_SAMPLE_MIN_RATIO = 0.05
+
+# Files larger than this are compressed as they are written to the archive rather than on the processes of --jobs,
+# so that their compressed data needn't be held in memory. Each process is handed at most this many files ahead.
+PARALLEL_COMPRESSION_MAX_SIZE = 4 * 1024 * 1024
+PARALLEL_COMPRESSION_FILES_PER_JOB = 2
+
+# The earliest date of a ZIP archive entry
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def jobs_count(value):
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError('{} is not a number of jobs'.format(value))
+    return jobs or os.cpu_count() or 1
+
+
+def compression_level(option, value):
+    try:
+        level = int(value)
+    except ValueError:
+        level = -1
+    if not 0 <= level <= 9:
+        raise argparse.ArgumentTypeError('{} {} is not a level from 0 to 9'.format(option, value))
+    return level
+
+
+def compression_rule(value):
+    glob, separator, level = value.rpartition('=')
+    if not glob:
+        raise argparse.ArgumentTypeError('--compression {} is not of the form GLOB=LEVEL'.format(value))
+    return glob, compression_level('--compression', level)
+
+
+class CompressionPolicy:
+    """
+    Decides how each file is compressed: at the level of the first glob matching its name in the archive, otherwise
+    at the default level, unless its content is already compressed.
+    """
+    def __init__(self, level=COMPRESSION_LEVEL, rules=()):
+        self.level = level
+        self.rules = list(rules)
+
+    def settings(self):
+        return {'level': self.level, 'rules': [[glob, level] for glob, level in self.rules]}
+
+    def compression(self, name, sample):
+        """
+        :return: the name of the policy applying to the file, along with the level to deflate it at, 0 to store it.
+        """
+        for glob, level in self.rules:
+            if fnmatch.fnmatchcase(name, glob):
+                return '{}={}'.format(glob, level), level
+
+        if not self.level:
+            return 'default', 0
+
+        if os.path.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS:
+            return 'compressed extension', 0
+
+        if len(sample) >= COMPRESSION_SAMPLE_SIZE and \
+                len(zlib.compress(sample, 1)) > len(sample) * (1 - COMPRESSION_SAMPLE_MIN_RATIO):
+            return 'incompressible sample', 0
+
+        return 'default', self.level
+
+
+class HashingWriter:
+    """
+    A file written from start to end, hashing the bytes as they are written. Not being seekable, the ZIP archive is
+    written in a single pass with the sizes of its entries following their data, which `ZipFile` supports as of
+    Python 3.5.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.position = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.sha256.update(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        self.file.flush()
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+class RawZipEntries:
+    """
+    Appends entries whose data is compressed ahead to an archive being written by `ZipFile`, and locates the data of
+    the entries of an archive, neither of which `ZipFile` supports. This is the only code relying on the internals of
+    `zipfile`, as of Python 3.5.
+    """
+    DATA_DESCRIPTOR_FLAG = 0x08
+    DATA_DESCRIPTOR_SIGNATURE = 0x08074b50
+
+    @staticmethod
+    def append(zip_file, writer, zip_info, blocks):
+        """
+        Appends an entry to the archive the way `ZipFile.write` writes to an unseekable file: the local header
+        followed by the data, the central directory starting after it. The blocks of data are compressed as told by
+        `zip_info`. If its data descriptor flag is set, the CRC and compressed size of the entry follow its data rather
+        than preceding it, so that they may be filled in while the blocks are iterated. The size of the file must be
+        known ahead nonetheless, for the sizes of an entry to be recorded as 64 bit if they may exceed 4 GiB.
+        """
+        zip64 = RawZipEntries.requires_zip64(zip_info)
+        zip_info.header_offset = writer.tell()
+        writer.write(zip_info.FileHeader(zip64))
+        for block in blocks:
+            writer.write(block)
+        if zip_info.flag_bits & RawZipEntries.DATA_DESCRIPTOR_FLAG:
+            if not zip64 and max(zip_info.file_size, zip_info.compress_size) > zipfile.ZIP64_LIMIT:
+                raise zipfile.LargeZipFile('{} grew larger than 4 GiB while being archived'.format(zip_info.filename))
+            writer.write(struct.pack('<LLQQ' if zip64 else '<LLLL', RawZipEntries.DATA_DESCRIPTOR_SIGNATURE,
+                                     zip_info.CRC, zip_info.compress_size, zip_info.file_size))
+        zip_file.filelist.append(zip_info)
+        zip_file.NameToInfo[zip_info.filename] = zip_info
+        zip_file.start_dir = writer.tell()
+        zip_file._didModify = True
+
+    @staticmethod
+    def requires_zip64(zip_info):
+        """
+        :return: whether the sizes of the entry are recorded as 64 bit. As with `ZipFile.write`, deflating a file is
+                 assumed to grow it by 5% at most, so that this only depends on the size of the file.
+        """
+        return zip_info.file_size * 1.05 > zipfile.ZIP64_LIMIT or zip_info.compress_size > zipfile.ZIP64_LIMIT
+
+    @staticmethod
+    def data_offset(file, zip_info):
+        """
+        :return: the offset of the data of an entry within the archive file, following its local header.
+        """
+        file.seek(zip_info.header_offset)
+        header = struct.unpack(zipfile.structFileHeader, file.read(zipfile.sizeFileHeader))
+        file_name_length, extra_length = header[zipfile._FH_FILENAME_LENGTH], header[zipfile._FH_EXTRA_FIELD_LENGTH]
+        return zip_info.header_offset + zipfile.sizeFileHeader + file_name_length + extra_length
+
+
+class PreviousArchive:
+    """
+    The archive previously created from the same source, as recorded by its index. Its entries are reused as long as
+    the files they were created from are unchanged.
+    """
+    def __init__(self, output_dir, index):
+        self.path = os.path.join(output_dir, index['archive'])
+        self.index = index
+        self.zip_file = None
+        self.file = None
+
+    def __enter__(self):
+        try:
+            st = os.stat(self.path)
+            if st.st_size == self.index['size'] and st.st_mtime_ns == self.index['mtime_ns']:
+                self.zip_file = zipfile.ZipFile(self.path)
+                self.file = open(self.path, 'rb')
+        except (OSError, zipfile.BadZipFile):
+            self.close()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        for f in [self.zip_file, self.file]:
+            if f:
+                f.close()
+        self.zip_file = None
+        self.file = None
+
+    def unchanged_entry(self, entry):
+        """
+        :return: the `ZipInfo` of the entry in the previous archive, along with its index entry, if the file is
+                 unchanged since. A file of the same size and modification time is unchanged, otherwise its content
+                 is compared with the digest indexed.
+        """
+        path, name = entry
+        index_entry = self.index['entries'].get(name)
+        if not self.zip_file or not index_entry:
+            return None, None
+
+        try:
+            zip_info = self.zip_file.getinfo(name)
+        except KeyError:
+            return None, None
+
+        st = os.stat(path)
+        if st.st_size != index_entry['size'] or zip_info.file_size != index_entry['size']:
+            return None, None
+        if st.st_mtime_ns != index_entry['mtime_ns']:
+            with open(path, 'rb') as f:
+                if bundle_utils.hash_file(f) != index_entry['sha256']:
+                    return None, None
+            index_entry = dict(index_entry, mtime_ns=st.st_mtime_ns)
+
+        return zip_info, index_entry
+
+    def compressed_blocks(self, zip_info, block_size=64 * 1024):
+        """
+        :return: the compressed data of the entry in the previous archive, read in blocks of up to `block_size`.
+        """
+        self.file.seek(RawZipEntries.data_offset(self.file, zip_info))
+        remaining = zip_info.compress_size
+        while remaining > 0:
+            block = self.file.read(min(block_size, remaining))
+            if not block:
+                raise zipfile.BadZipFile('Truncated entry {} in {}'.format(zip_info.filename, self.path))
+            remaining -= len(block)
+            yield block
+
+
 def shazar(args):
     log = logging.getLogger(__name__)
     source_base_name = os.path.basename(args.source.rstrip('\\/'))
-    # Create an empty tempfile
-    temp_file = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
-    temp_file.close()
-    temp_file_name = temp_file.name
-
-    with zipfile.ZipFile(temp_file_name, 'w') as zip_file:
-        if os.path.isdir(args.source):
-            for (dir_path, dir_names, file_names) in os.walk(args.source):
-                for file_name in file_names:
-                    path = os.path.join(dir_path, file_name)
-                    name = os.path.join(source_base_name, os.path.relpath(path, start=args.source))
-                    zip_file.write(path, name)
-        else:
-            zip_file.write(args.source, source_base_name)
+    entries = archive_entries(args.source, source_base_name)
+    policy = CompressionPolicy(args.compression_level, args.compression_rules)
+    previous_index = read_index(args.output_dir, source_base_name) if args.incremental else None
+    if previous_index and previous_index.get('compression') != policy.settings():
+        # Files were compressed differently
+        previous_index = None
+    # The archive is written next to its destination, so that it is moved into place by renaming it
+    temp_file = tempfile.NamedTemporaryFile(dir=args.output_dir, prefix='.{}-'.format(source_base_name),
+                                            suffix='.zip.tmp', delete=False)
+    try:
+        with temp_file:
+            writer = HashingWriter(temp_file)
+            with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                index_entries, summary = write_entries(zip_file, writer, entries, args.jobs, args.output_dir,
+                                                       previous_index, policy, args.reproducible)
+
+        dest = os.path.join(args.output_dir, '{}-{}.zip'.format(source_base_name, writer.hexdigest()))
+        os.replace(temp_file.name, dest)
+    except BaseException:
+        if os.path.exists(temp_file.name):
+            os.remove(temp_file.name)
+        raise
+
+    if args.incremental:
+        write_index(args.output_dir, source_base_name, dest, index_entries, policy)
 
-    dest = os.path.join(args.output_dir, '{}-{}.zip'.format(source_base_name, create_digest(temp_file_name)))
-    shutil.move(temp_file_name, dest)
+    log_summary(log, summary)
     log.info('Created digested ZIP archive at {}'.format(dest))
 
 
+def write_entries(zip_file, writer, entries, jobs, output_dir, previous_index, policy, reproducible=False):
+    """
+    Writes the entries to the archive, copying the compressed data of those unchanged since the previous archive
+    indexed, and compressing the other small files on `jobs` processes. Large files are compressed as they are
+    written.
+    :return: the index entries of the files archived, by name, along with the summary of the files archived by each
+             policy.
+    """
+    with ExitStack() as stack:
+        previous_archive = stack.enter_context(PreviousArchive(output_dir, previous_index)) if previous_index else None
+
+        index_entries = {}
+        summary = {}
+        unchanged_entries = {}
+        if previous_archive:
+            for entry in entries:
+                previous_info, index_entry = previous_archive.unchanged_entry(entry)
+                if previous_info:
+                    unchanged_entries[entry] = previous_info
+                    index_entries[entry[1]] = index_entry
+
+        # Whether a file is streamed only depends on its size, so that the archive is the same whatever the jobs
+        streamed_entries = set(entry for entry in entries
+                               if entry not in unchanged_entries and
+                               os.stat(entry[0]).st_size > PARALLEL_COMPRESSION_MAX_SIZE)
+        compressed_entries = [entry for entry in entries
+                              if entry not in unchanged_entries and entry not in streamed_entries]
+        compress = partial(compress_entry, policy=policy, reproducible=reproducible)
+        if jobs > 1 and len(compressed_entries) > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=jobs))
+            compressed_entries = bounded_map(executor, compress, compressed_entries,
+                                             jobs * PARALLEL_COMPRESSION_FILES_PER_JOB)
+        else:
+            compressed_entries = map(compress, compressed_entries)
+
+        for entry in entries:
+            if entry in unchanged_entries:
+                previous_info = unchanged_entries[entry]
+                zip_info = entry_info(*entry, reproducible=reproducible)
+                zip_info.compress_type = previous_info.compress_type
+                zip_info.CRC = previous_info.CRC
+                zip_info.file_size = previous_info.file_size
+                zip_info.compress_size = previous_info.compress_size
+                zip_info.flag_bits |= previous_info.flag_bits & RawZipEntries.DATA_DESCRIPTOR_FLAG
+                RawZipEntries.append(zip_file, writer, zip_info, previous_archive.compressed_blocks(previous_info))
+                policy_name, elapsed = 'unchanged', 0.0
+            elif entry in streamed_entries:
+                zip_info, index_entries[entry[1]], policy_name, elapsed = stream_entry(zip_file, writer, entry, policy,
+                                                                                       reproducible=reproducible)
+            else:
+                zip_info, data, index_entries[entry[1]], policy_name, elapsed = next(compressed_entries)
+                write_entry(zip_file, writer, zip_info, data)
+
+            policy_summary = summary.setdefault(policy_name, {'files': 0, 'size': 0, 'compressed_size': 0,
+                                                              'time': 0.0})
+            policy_summary['files'] += 1
+            policy_summary['size'] += zip_info.file_size
+            policy_summary['compressed_size'] += zip_info.compress_size
+            policy_summary['time'] += elapsed
+
+    return index_entries, summary
+
+
+def bounded_map(executor, fn, items, max_pending):
+    """
+    Like `executor.map`, except that at most `max_pending` items are submitted ahead of the results consumed, so
+    that the results awaiting to be consumed are bounded.
+    """
+    items = iter(items)
+    futures = deque(executor.submit(fn, item) for item in itertools.islice(items, max_pending))
+    while futures:
+        result = futures.popleft().result()
+        futures.extend(executor.submit(fn, item) for item in itertools.islice(items, 1))
+        yield result
+
+
+def log_summary(log, summary):
+    """
+    Logs the bytes saved and the time spent compressing the files archived by each policy.
+    """
+    data = [
+        {
+            'policy': policy_name,
+            'files': policy_summary['files'],
+            'size': screen_utils.format_size(policy_summary['size']),
+            'compressed_size': screen_utils.format_size(policy_summary['compressed_size']),
+            'saved': screen_utils.format_size(policy_summary['size'] - policy_summary['compressed_size']),
+            'time': '{:.2f}s'.format(policy_summary['time'])
+        } for policy_name, policy_summary in sorted(summary.items())
+    ]
+    data.insert(0, {'policy': 'POLICY', 'files': 'FILES', 'size': 'SIZE', 'compressed_size': 'ARCHIVED',
+                    'saved': 'SAVED', 'time': 'TIME'})
+
+    padding = 2
+    column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
+    for row in data:
+        log.info('{policy: <{policy_width}}{padding}'
+                 '{files: >{files_width}}{padding}'
+                 '{size: >{size_width}}{padding}'
+                 '{compressed_size: >{compressed_size_width}}{padding}'
+                 '{saved: >{saved_width}}{padding}'
+                 '{time: >{time_width}}'.format(**dict(row, **column_widths)))
+
+
+def archive_entries(source, source_base_name):
+    """
+    :return: the paths of the files to archive paired with their names in the archive, in the order that they are
+             archived. Directories are walked in sorted order, so that the same tree is always archived alike.
+    """
+    if not os.path.isdir(source):
+        return [(source, source_base_name)]
+
+    entries = []
+    for (dir_path, dir_names, file_names) in os.walk(source):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            path = os.path.join(dir_path, file_name)
+            entries.append((path, os.path.join(source_base_name, os.path.relpath(path, start=source))))
+    return entries
+
+
+def entry_info(path, name, st=None, reproducible=False):
+    """
+    :return: the `ZipInfo` of a file. A reproducible entry is dated from SOURCE_DATE_EPOCH, or else from the earliest
+             date possible, and is readable by all, executable if the file is executable by anyone.
+    """
+    st = st or os.stat(path)
+    if not reproducible:
+        zip_info = zipfile.ZipInfo(name, time.localtime(st.st_mtime)[0:6])
+        zip_info.external_attr = (st.st_mode & 0xFFFF) << 16
+        return zip_info
+
+    zip_info = zipfile.ZipInfo(name, reproducible_date_time())
+    zip_info.create_system = 3
+    zip_info.external_attr = (stat.S_IFREG | (0o755 if st.st_mode & 0o111 else 0o644)) << 16
+    return zip_info
+
+
+def reproducible_date_time():
+    try:
+        source_date_epoch = int(os.environ['SOURCE_DATE_EPOCH'])
+    except (KeyError, ValueError):
+        return REPRODUCIBLE_DATE_TIME
+    return max(REPRODUCIBLE_DATE_TIME, time.gmtime(source_date_epoch)[0:6])
+
+
+def compress_entry(entry, policy=CompressionPolicy(), block_size=64 * 1024, reproducible=False):
+    """
+    Compresses a file on its own as decided by the policy, so that files are compressed by separate processes.
+    :return: the `ZipInfo` of the file, its CRC and sizes filled in, along with its compressed data, its index entry,
+             the name of the policy applied and the time spent compressing it.
+    """
+    start = time.perf_counter()
+    path, name = entry
+    st = os.stat(path)
+    zip_info = entry_info(path, name, st, reproducible)
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        sample = f.read(COMPRESSION_SAMPLE_SIZE)
+        policy_name, level = policy.compression(name, sample)
+        compressor = entry_compressor(zip_info, level)
+        data = b''.join(compress_blocks(zip_info, file_blocks(f, sample, block_size), compressor, sha256))
+
+    index_entry = {'size': zip_info.file_size, 'mtime_ns': st.st_mtime_ns, 'sha256': sha256.hexdigest()}
+    return zip_info, data, index_entry, policy_name, time.perf_counter() - start
+
+
+def stream_entry(zip_file, writer, entry, policy=CompressionPolicy(), block_size=64 * 1024, reproducible=False):
+    """
+    Compresses a file as decided by the policy while appending it to the archive, so that its compressed data isn't
+    held in memory. The CRC and sizes of a deflated file follow its data. Those of a stored file precede it, as
+    readers of stored entries expect, so the file is read twice.
+    :return: the `ZipInfo` of the file, along with its index entry, the name of the policy applied and the time
+             spent compressing and writing it.
+    """
+    start = time.perf_counter()
+    path, name = entry
+    st = os.stat(path)
+    zip_info = entry_info(path, name, st, reproducible)
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        sample = f.read(COMPRESSION_SAMPLE_SIZE)
+        policy_name, level = policy.compression(name, sample)
+        compressor = entry_compressor(zip_info, level)
+        blocks = compress_blocks(zip_info, file_blocks(f, sample, block_size), compressor, sha256)
+        if compressor:
+            zip_info.flag_bits |= RawZipEntries.DATA_DESCRIPTOR_FLAG
+            zip_info.file_size = st.st_size
+        else:
+            for _ in blocks:
+                pass
+            f.seek(0)
+            blocks = iter(partial(f.read, block_size), b'')
+        RawZipEntries.append(zip_file, writer, zip_info, blocks)
+
+    index_entry = {'size': zip_info.file_size, 'mtime_ns': st.st_mtime_ns, 'sha256': sha256.hexdigest()}
+    return zip_info, index_entry, policy_name, time.perf_counter() - start
+
+
+def file_blocks(f, sample, block_size):
+    return itertools.chain([sample], iter(partial(f.read, block_size), b''))
+
+
+def entry_compressor(zip_info, level):
+    """
+    Sets the compression of an entry: deflated at the level, or stored if 0.
+    :return: the compressor deflating the entry, or None if it is stored.
+    """
+    if level:
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        return zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, COMPRESSION_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY)
+    else:
+        zip_info.compress_type = zipfile.ZIP_STORED
+        return None
+
+
+def compress_blocks(zip_info, blocks, compressor, sha256):
+    """
+    Compresses the blocks of a file as they are iterated, unless the compressor is None. The file is hashed along the
+    way, and the CRC and sizes of `zip_info` are filled in once all the blocks have been iterated.
+    """
+    crc = 0
+    file_size = 0
+    compress_size = 0
+    for block in blocks:
+        crc = zlib.crc32(block, crc)
+        sha256.update(block)
+        file_size += len(block)
+        if compressor:
+            block = compressor.compress(block)
+        compress_size += len(block)
+        yield block
+    if compressor:
+        block = compressor.flush()
+        compress_size += len(block)
+        yield block
+
+    zip_info.CRC = crc
+    zip_info.file_size = file_size
+    zip_info.compress_size = compress_size
+
+
+def write_entry(zip_file, writer, zip_info, data):
+    """
+    Appends an entry compressed by `compress_entry` to the archive, `ZipFile` only writing the data it compresses
+    itself.
+    """
+    RawZipEntries.append(zip_file, writer, zip_info, [data])
+
+
+def index_path(output_dir, source_base_name):
+    return os.path.join(output_dir, '.{}.shazar-index.json'.format(source_base_name))
+
+
+def read_index(output_dir, source_base_name):
+    """
+    :return: the index of the archive last created incrementally from the source, or None if there is none.
+    """
+    try:
+        with open(index_path(output_dir, source_base_name), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(output_dir, source_base_name, archive_path, index_entries, policy):
+    """
+    Records the size, modification time and digest of the files of the archive, so that the next archive compressed
+    by the same policy reuses the entries of the files unchanged since.
+    """
+    st = os.stat(archive_path)
+    index = {
+        'archive': os.path.basename(archive_path),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'compression': policy.settings(),
+        'entries': index_entries
+    }
+    path = index_path(output_dir, source_base_name)
+    with open('{}.tmp'.format(path), 'w') as f:
+        json.dump(index, f)
+    os.replace('{}.tmp'.format(path), path)
+
+
 def create_digest(file_name):
     with open(file_name, mode='rb') as f:
-        d = hashlib.sha256()
-        for buf in iter(partial(f.read, 128), b''):
-            d.update(buf)
-    return d.hexdigest()
+        return bundle_utils.hash_file(f)
@@ -1,5 +1,8 @@
 from conductr_cli import conduct_request
+from requests.exceptions import ChunkedEncodingError, ConnectionError
+import logging
 import re
+import time
 
 
 SSE_REQUEST_INPUT = {
@@ -10,7 +13,23 @@ SSE_REQUEST_INPUT = {
 }
 
 
-SSE_END_OF_FIELD = re.compile(r'\r\n\r\n|\r\r|\n\n')
+SSE_END_OF_FIELD = re.compile(rb'\r\n\r\n|\r\r|\n\n')
+
+SSE_END_OF_LINE = re.compile(r'\r\n|\r|\n')
+
+# The number of bytes to read from the response at a time. Chunked responses yield each chunk as soon as it arrives,
+# up to this size, so heartbeats are not held back.
+SSE_CHUNK_SIZE = 8192
+
+# The number of trailing bytes which must be scanned again once more data arrives, as the longest end of field
+# delimiter may have been split across two chunks.
+SSE_END_OF_FIELD_OVERLAP = 3
+
+# The reconnection time in milliseconds used until the server suggests otherwise using the `retry` field.
+SSE_DEFAULT_RETRY = 3000
+
+# The number of attempts made to reconnect a dropped stream before giving up, reset whenever an event is received.
+SSE_RECONNECT_ATTEMPTS = 3
 
 
 def is_event_complete(buf):
@@ -18,22 +37,37 @@ def is_event_complete(buf):
 
 
 def parse_event(raw_sse_string):
-    event, data = None, None
-    lines = raw_sse_string.split('\n')
+    event, data, event_id, retry = None, None, None, None
+    lines = re.split(SSE_END_OF_LINE, raw_sse_string)
     for line in lines:
-        if line.rstrip():
-            key, value = line.split(':')
-            if key == 'event':
-                event = value
-            elif key == 'data':
-                data = value
-    return Event(event, data)
+        # Lines starting with a colon are comments
+        if not line or line.startswith(':'):
+            continue
+
+        key, colon, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+
+        if key == 'event':
+            event = value
+        elif key == 'data':
+            data = value if data is None else '{}\n{}'.format(data, value)
+        elif key == 'id':
+            # The id must not contain the null character, otherwise it is ignored
+            if '\0' not in value:
+                event_id = value
+        elif key == 'retry':
+            if value.isdigit():
+                retry = int(value)
+    return Event(event, data, event_id, retry)
 
 
 class Event:
-    def __init__(self, event, data):
+    def __init__(self, event, data, id=None, retry=None):
         self.event = event
         self.data = data
+        self.id = id
+        self.retry = retry
 
     def __eq__(self, other):
         if type(other) is type(self):
@@ -56,45 +90,108 @@ class Client:
 
     Changes introduced as part of the backport:
     - Support for Python 3.2 (i.e. do not use u'')
-    - Parse only for event and data string within SSE
-    - No support for retries and last event id
+    - The response is read in chunks of bytes, and only newly received bytes are scanned for the end of an event.
+      Bytes following the end of an event are kept for the next event.
+    - Support for multi-line data, as well as the id and retry fields.
+    - Reconnection is attempted when the stream is dropped, at most `reconnect_attempts` times without receiving an
+      event in between. The last received event id is sent using the `Last-Event-ID` header, and the reconnection
+      time suggested by the server using the `retry` field is honoured.
     """
-    def __init__(self, dcos_mode, host, url, headers=None, **kwargs):
+    def __init__(self, dcos_mode, host, url, headers=None, reconnect_attempts=SSE_RECONNECT_ATTEMPTS, **kwargs):
         self.dcos_mode = dcos_mode
         self.host = host
         self.url = url
         self.headers = headers
+        self.reconnect_attempts = reconnect_attempts
+        self.response = None
         self.responseIter = None
         self.kwargs = kwargs
+        self.buf = bytearray()
+        self.buf_start = 0
+        self.scan_start = 0
+        self.last_event_id = None
+        self.retry = SSE_DEFAULT_RETRY
+        self.reconnections = 0
+        self.connection_count = 0
 
     def connect(self):
-        sse_request_input = dict(SSE_REQUEST_INPUT)
+        headers = dict(SSE_REQUEST_INPUT['headers'])
         if self.headers:
-            sse_request_input['headers'].update(self.headers)
+            headers.update(self.headers)
+        if self.last_event_id:
+            headers['Last-Event-ID'] = self.last_event_id
 
         kwargs_all = {}
         kwargs_all.update(self.kwargs)
-        kwargs_all.update(sse_request_input)
+        kwargs_all.update({'headers': headers})
 
-        response = conduct_request.get(self.dcos_mode, self.host, self.url, stream=True, **kwargs_all)
+        self.close()
+        # Dropped connections are reconnected from the last event received rather than retried by the request
+        response = conduct_request.get(self.dcos_mode, self.host, self.url, retry=False, stream=True, **kwargs_all)
         response.raise_for_status()
-        self.responseIter = response.iter_content(decode_unicode=True)
+        self.response = response
+        self.responseIter = response.iter_content(chunk_size=SSE_CHUNK_SIZE)
+        self.connection_count += 1
+
+        # Any incomplete event received prior to a reconnection is discarded
+        del self.buf[:]
+        self.buf_start = 0
+        self.scan_start = 0
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+            self.response = None
+        self.responseIter = None
+
+    def reconnect(self):
+        log = logging.getLogger(__name__)
+        log.debug('Reconnecting to {} in {}ms'.format(self.url, self.retry))
+        time.sleep(self.retry / 1000.0)
+        self.connect()
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        buf = ''
-        while not is_event_complete(buf):
-            next_char = next(self.responseIter)
-            buf += next_char
-
-        split = re.split(SSE_END_OF_FIELD, buf)
-        raw_sse = split[0]
-        return parse_event(raw_sse)
+        while True:
+            match = SSE_END_OF_FIELD.search(self.buf, max(self.buf_start, self.scan_start))
+            if match:
+                raw_sse = self.buf[self.buf_start:match.start()].decode('utf-8')
+                self.buf_start = match.end()
+                self.scan_start = self.buf_start
+                event = parse_event(raw_sse)
+                if event.id is not None:
+                    self.last_event_id = event.id
+                if event.retry is not None:
+                    self.retry = event.retry
+                self.reconnections = 0
+                return event
+
+            # Discard the bytes of the events already returned before appending the next chunk
+            del self.buf[:self.buf_start]
+            self.buf_start = 0
+            self.scan_start = max(0, len(self.buf) - SSE_END_OF_FIELD_OVERLAP)
+            try:
+                if self.responseIter is None:
+                    self.reconnect()
+                self.buf.extend(next(self.responseIter))
+            except (StopIteration, ChunkedEncodingError, ConnectionError):
+                if self.reconnections >= self.reconnect_attempts:
+                    raise
+                self.reconnections += 1
+                self.responseIter = None
 
 
 def get_events(dcos_mode, host, url, headers=None, **kwargs):
     client = Client(dcos_mode, host, url, headers, **kwargs)
     client.connect()
     return client
+
+
+def connection_count(events):
+    """
+    Returns the number of times the stream of events has been connected, including reconnections.
+    Events may have been missed whenever this number changes.
+    """
+    return getattr(events, 'connection_count', 1)
@@ -0,0 +1,262 @@
+from conductr_cli import conduct_request, sse_client
+from conductr_cli.exceptions import WaitTimeoutError
+from concurrent.futures import Future
+from contextlib import contextmanager
+from collections import deque
+from datetime import datetime
+import threading
+
+
+# Hubs keyed by (dcos_mode, host, url, auth key, verify), each owning the only connection to its event endpoint.
+HUBS = {}
+HUBS_LOCK = threading.Lock()
+# The number of `retained` blocks being executed, during which hubs are kept open without subscriptions.
+RETAIN_COUNT = 0
+
+
+class Hub:
+    """
+    Shares a single connection to an SSE endpoint between any number of subscriptions and predicates.
+
+    The hub has no thread of its own: whichever subscription requires the next event reads it off the stream, and
+    the event is then fanned out to every subscription and evaluated against every registered predicate.
+    The stream is read without holding the lock of the hub, so that subscribing, registering predicates and closing
+    subscriptions aren't held up by a slow stream. Subscriptions requiring an event while another one reads the stream
+    wait for that read instead.
+    The connection is closed once the last subscription has been closed, unless hubs are retained, in which case the
+    stream is drained by a thread of its own until a subscription requires it again.
+    """
+    def __init__(self, key, events):
+        self.key = key
+        self.events = events
+        self.event_iterator = iter(events)
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)
+        self.subscriptions = []
+        self.predicates = []
+        self.connection_count = sse_client.connection_count(events)
+        self.is_reading = False
+        self.is_draining = False
+        self.is_closed = False
+        self.error = None
+
+    def subscribe(self):
+        """
+        :return: a new subscription, or None if the hub has been closed in the meantime.
+        """
+        with self.lock:
+            if self.is_closed:
+                return None
+            subscription = Subscription(self)
+            self.subscriptions.append(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+            if self.subscriptions or self.is_closed:
+                return
+            for predicate, future in self.predicates:
+                future.cancel()
+            self.predicates = []
+            if RETAIN_COUNT > 0 and not self.error:
+                if not self.is_draining:
+                    self.is_draining = True
+                    threading.Thread(target=self.drain, daemon=True).start()
+                return
+
+        self.release()
+
+    def drain(self):
+        """
+        Reads the events of a hub without subscriptions, so that subscriptions made later only receive the events
+        occurring from then on. The hub is closed should the stream fail.
+        """
+        while True:
+            with self.lock:
+                if self.is_closed or self.subscriptions:
+                    self.is_draining = False
+                    return
+            try:
+                self.pull()
+            except BaseException:
+                with self.lock:
+                    self.is_draining = False
+                    is_idle = not self.subscriptions
+                if is_idle:
+                    self.release()
+                return
+
+    def is_idle(self):
+        with self.lock:
+            return not self.subscriptions
+
+    def release(self):
+        """
+        Closes the hub, unless subscribed to in the meantime.
+        """
+        with self.lock:
+            if self.subscriptions or self.is_closed:
+                return
+            self.is_closed = True
+            self.condition.notify_all()
+
+        self.close()
+
+    def when(self, predicate):
+        with self.lock:
+            future = Future()
+            self.predicates.append((predicate, future))
+            return future
+
+    def pull(self):
+        """
+        Reads the next event off the stream and dispatches it, or waits for the subscription reading the stream to
+        do so.
+        """
+        with self.lock:
+            if self.error:
+                raise self.error
+            if self.is_reading:
+                self.condition.wait()
+                return
+            self.is_reading = True
+
+        try:
+            event = next(self.event_iterator)
+        except BaseException as e:
+            with self.lock:
+                if isinstance(e, Exception):
+                    self.error = e
+                self.is_reading = False
+                self.condition.notify_all()
+            raise
+
+        with self.lock:
+            self.dispatch(event)
+            self.is_reading = False
+            self.condition.notify_all()
+
+    def dispatch(self, event):
+        connection_count = sse_client.connection_count(self.events)
+        is_reconnected = connection_count != self.connection_count
+        self.connection_count = connection_count
+
+        for subscription in self.subscriptions:
+            subscription.queue.append((event, connection_count))
+
+        pending_predicates = []
+        for predicate, future in self.predicates:
+            try:
+                if predicate(event, is_reconnected):
+                    future.set_result(event)
+                else:
+                    pending_predicates.append((predicate, future))
+            except Exception as e:
+                future.set_exception(e)
+        self.predicates = pending_predicates
+
+    def close(self):
+        with HUBS_LOCK:
+            if HUBS.get(self.key) is self:
+                del HUBS[self.key]
+        if isinstance(self.events, sse_client.Client):
+            self.events.close()
+
+
+class Subscription:
+    """
+    Iterates the events of a hub received from the time of subscribing, in the same way as `sse_client.Client`.
+    """
+    def __init__(self, hub):
+        self.hub = hub
+        self.queue = deque()
+        self.connection_count = hub.connection_count
+
+    def when(self, predicate):
+        """
+        Registers a predicate which is evaluated with each event and whether the stream has been reconnected since
+        the previous event. The returned future is completed with the first event satisfying the predicate.
+        """
+        return self.hub.when(predicate)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            with self.hub.lock:
+                if self.queue:
+                    event, self.connection_count = self.queue.popleft()
+                    return event
+            self.hub.pull()
+
+
+def subscribe(dcos_mode, host, url, **kwargs):
+    key = (dcos_mode, host, url, conduct_request.auth_key(kwargs.get('auth')), kwargs.get('verify'))
+
+    while True:
+        with HUBS_LOCK:
+            hub = HUBS.get(key)
+
+        if hub is None:
+            # Connecting is done without holding the lock, so that subscribing to other endpoints isn't held up
+            connected_hub = Hub(key, sse_client.get_events(dcos_mode, host, url, **kwargs))
+            with HUBS_LOCK:
+                hub = HUBS.setdefault(key, connected_hub)
+            if hub is not connected_hub and isinstance(connected_hub.events, sse_client.Client):
+                connected_hub.events.close()
+
+        subscription = hub.subscribe()
+        if subscription:
+            return subscription
+
+
+@contextmanager
+def retained():
+    """
+    Keeps the connections of hubs open between subscriptions until the block exits, so that a sequence of commands
+    each waiting on events, e.g. `sandbox run` starting its features, shares one connection per endpoint.
+    """
+    global RETAIN_COUNT
+
+    with HUBS_LOCK:
+        RETAIN_COUNT += 1
+    try:
+        yield
+    finally:
+        with HUBS_LOCK:
+            RETAIN_COUNT -= 1
+            hubs = list(HUBS.values()) if RETAIN_COUNT == 0 else []
+        for hub in hubs:
+            if hub.is_idle():
+                hub.release()
+
+
+def wait_for_all(subscription, futures, timeout, timeout_message):
+    """
+    Reads the events of the subscription until all futures are done, sharing one timeout budget between them.
+    :return: the results of the futures
+    """
+    start_time = datetime.now()
+    while not all(future.done() for future in futures):
+        elapsed = (datetime.now() - start_time).total_seconds()
+        if elapsed > timeout:
+            raise WaitTimeoutError(timeout_message)
+
+        try:
+            next(subscription)
+        except StopIteration:
+            raise WaitTimeoutError(timeout_message)
+
+    return [future.result() for future in futures]
@@ -0,0 +1,92 @@
+"""
+Benchmark of `shazar` on a synthetic bundle tree, compressing the files serially and then on a process pool, and then
+re-packaging the tree incrementally after changing one of its files.
+
+Run with: python -m conductr_cli.test.benchmark_shazar [--files 300] [--file-size 1048576] [--jobs 4]
+"""
+from conductr_cli import shazar_main
+from unittest.mock import MagicMock
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+# Files are deflated, as they are by `shazar --compression-level 6`
+COMPRESSION_LEVEL = 6
+
+
+def create_bundle(bundle_dir, files, file_size):
+    """
+    Writes files half made of random bytes, compressing roughly as well as the assets of a bundle do. Their extension
+    and the text they start with have them deflated rather than stored.
+    """
+    rng = random.Random(0)
+    words = [bytes(rng.choice(b'abcdefghijklmnopqrstuvwxyz') for _ in range(8)) for _ in range(256)]
+    os.makedirs(os.path.join(bundle_dir, 'lib'))
+    with open(os.path.join(bundle_dir, 'bundle.conf'), 'w') as f:
+        f.write('name = "benchmark"\n')
+    for index in range(files):
+        text = b' '.join(rng.choice(words) for _ in range(file_size // 18))
+        with open(os.path.join(bundle_dir, 'lib', 'lib-{}.bin'.format(index)), 'wb') as f:
+            f.write(text)
+            f.write(os.urandom(file_size // 2))
+
+
+def time_shazar(source, output_dir, jobs, incremental=False):
+    start = time.perf_counter()
+    shazar_main.shazar(MagicMock(source=source, output_dir=output_dir, jobs=jobs, incremental=incremental,
+                                 reproducible=False, compression_level=COMPRESSION_LEVEL, compression_rules=[]))
+    return time.perf_counter() - start
+
+
+def time_archive(source, jobs):
+    output_dir = tempfile.mkdtemp()
+    try:
+        elapsed = time_shazar(source, output_dir, jobs)
+        [file_name] = os.listdir(output_dir)
+        return elapsed, file_name
+    finally:
+        shutil.rmtree(output_dir)
+
+
+def time_incremental(source, jobs):
+    output_dir = tempfile.mkdtemp()
+    try:
+        time_shazar(source, output_dir, jobs, incremental=True)
+        with open(os.path.join(source, 'lib', 'lib-0.bin'), 'ab') as f:
+            f.write(b'changed')
+        return time_shazar(source, output_dir, jobs, incremental=True)
+    finally:
+        shutil.rmtree(output_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=300)
+    parser.add_argument('--file-size', type=int, default=1024 * 1024)
+    parser.add_argument('--jobs', type=shazar_main.jobs_count, default=0)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(work_dir, 'benchmark')
+        create_bundle(source, args.files, args.file_size)
+
+        serial, serial_file_name = time_archive(source, 1)
+        parallel, parallel_file_name = time_archive(source, args.jobs)
+        incremental = time_incremental(source, args.jobs)
+
+        print('{} files of {} bytes'.format(args.files, args.file_size))
+        print('--jobs 1: {:.2f}s'.format(serial))
+        print('--jobs {}: {:.2f}s ({:.1f}x)'.format(args.jobs, parallel, serial / parallel))
+        print('Identical archives: {}'.format(serial_file_name == parallel_file_name))
+        print('--incremental after changing one file: {:.2f}s'.format(incremental))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark of the SSE client parsing a recorded `bundles/events` stream.
+
+Run with: python -m conductr_cli.test.benchmark_sse_client [repetitions]
+"""
+from conductr_cli import sse_client
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import time
+
+
+RECORDED_STREAM = os.path.join(os.path.dirname(__file__), 'data', 'bundle_events.sse')
+
+# Sizes in which the recorded stream is delivered to the client, i.e. byte by byte, a typical TCP segment and a full
+# read buffer.
+CHUNK_SIZES = [1, 1460, sse_client.SSE_CHUNK_SIZE]
+
+
+def recorded_stream(repetitions):
+    with open(RECORDED_STREAM, 'rb') as f:
+        return f.read() * repetitions
+
+
+def as_chunks(stream, chunk_size):
+    return [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+
+def events_per_second(stream, chunk_size):
+    response_mock = MagicMock()
+    response_mock.iter_content = MagicMock(return_value=iter(as_chunks(stream, chunk_size)))
+
+    with patch('conductr_cli.conduct_request.get', MagicMock(return_value=response_mock)):
+        events = sse_client.get_events(False, '127.0.0.1', 'http://127.0.0.1:9005/bundles/events')
+        start_time = time.perf_counter()
+        count = sum(1 for _ in events)
+        elapsed = time.perf_counter() - start_time
+
+    return count, count / elapsed
+
+
+def run(repetitions=10000):
+    stream = recorded_stream(repetitions)
+    print('Recorded stream of {} bytes'.format(len(stream)))
+    for chunk_size in CHUNK_SIZES:
+        count, rate = events_per_second(stream, chunk_size)
+        print('chunk size {: >5}: {} events, {:.0f} events/second'.format(chunk_size, count, rate))
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:]])
@@ -1,15 +1,38 @@
+import copy
 import os
 import shutil
 import tempfile
 from unittest import TestCase
 from requests.exceptions import ConnectionError, HTTPError, ReadTimeout
+from conductr_cli import conduct_request
+from conductr_cli.resolvers import bintray_resolver
 from conductr_cli.ansi_colors import RED, YELLOW, UNDERLINE, ENDC
-from unittest.mock import MagicMock
+from unittest.mock import patch, MagicMock
 
 
 class CliTestCase(TestCase):
     """Provides test case common functionality"""
 
+    def setUp(self):  # noqa
+        # Failed requests aren't retried, and failures don't open circuits of subsequent tests
+        retry_policies = {method: copy.copy(policy) for method, policy in conduct_request.RETRY_POLICIES.items()}
+        for policy in retry_policies.values():
+            policy.retries = 0
+        retry_policies_patch = patch.dict(conduct_request.RETRY_POLICIES, retry_policies)
+        retry_policies_patch.start()
+        self.addCleanup(retry_policies_patch.stop)
+
+        conduct_request.reset_circuit_breakers()
+        self.addCleanup(conduct_request.reset_circuit_breakers)
+
+        # Bintray resolutions and credentials are neither shared between tests nor written to the settings directory
+        resolution_cache_file_patch = patch.object(bintray_resolver, 'RESOLUTION_CACHE_FILE', None)
+        resolution_cache_file_patch.start()
+        self.addCleanup(resolution_cache_file_patch.stop)
+
+        bintray_resolver.reset_caches()
+        self.addCleanup(bintray_resolver.reset_caches)
+
     @property
     def default_connection_error(self):
         return as_error(strip_margin("""|Error: Unable to contact ConductR.
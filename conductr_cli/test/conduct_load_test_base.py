@@ -40,6 +40,16 @@ class ConductLoadTestBase(CliTestCase):
         self.conductr_auth = ('username', 'password')
         self.server_verification_file = MagicMock(name='server_verification_file')
 
+    def setUp(self):  # noqa
+        super().setUp()
+        # ConductR neither holds the bundle nor supports resumable uploads unless a test says otherwise
+        find_loaded_bundle_patcher = patch('conductr_cli.conduct_load.find_loaded_bundle', MagicMock(return_value=None))
+        find_loaded_bundle_patcher.start()
+        self.addCleanup(find_loaded_bundle_patcher.stop)
+        bundle_upload_patcher = patch('conductr_cli.bundle_upload.upload', MagicMock(return_value=None))
+        bundle_upload_patcher.start()
+        self.addCleanup(bundle_upload_patcher.stop)
+
     @property
     def default_response(self):
         return strip_margin("""|{
@@ -68,7 +78,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -86,7 +96,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(self.default_output(), self.output(stdout))
 
@@ -124,7 +134,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(self.default_output(command=self.default_args['command']), self.output(stdout))
 
@@ -144,7 +154,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -162,7 +172,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(self.default_output(verbose=self.default_response), self.output(stdout))
 
@@ -182,7 +192,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -200,7 +210,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual('45e0c477d3e5ea92aa8d85c0d8f3e25c\n', self.output(stdout))
 
@@ -220,7 +230,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -238,7 +248,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(self.default_output(bundle_id='45e0c477d3e5ea92aa8d85c0d8f3e25c'), self.output(stdout))
 
@@ -259,7 +269,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -277,7 +287,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(
             self.default_output(params=cli_parameters),
@@ -300,7 +310,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -318,7 +328,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(
             self.default_output(params=cli_parameters),
@@ -342,7 +352,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -360,7 +370,7 @@ class ConductLoadTestBase(CliTestCase):
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(self.default_output(), self.output(stdout))
 
@@ -379,7 +389,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_load.load(input_args)
@@ -395,7 +405,7 @@ class ConductLoadTestBase(CliTestCase):
                                        verify=self.server_verification_file,
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(self.default_output(), self.output(stdout))
 
@@ -415,7 +425,7 @@ class ConductLoadTestBase(CliTestCase):
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
                 patch('conductr_cli.conduct_load.cleanup_old_bundles', cleanup_old_bundles_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -432,7 +442,7 @@ class ConductLoadTestBase(CliTestCase):
                                        verify=self.server_verification_file,
                                        headers={'Content-Type': self.multipart_content_type, 'Host': '127.0.0.1'})
         cleanup_old_bundles_mock.assert_called_with(self.bundle_resolve_cache_dir, self.bundle_file_name,
-                                                    excluded=self.bundle_file)
+                                                    excluded=self.bundle_file, configuration_file=None)
 
         self.assertEqual(self.default_output(), self.output(stdout))
 
@@ -447,7 +457,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**self.default_args)
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(input_args, stdout, stderr)
             result = conduct_load.load(input_args)
@@ -479,7 +489,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**self.default_args)
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(input_args, stdout, stderr)
             result = conduct_load.load(input_args)
@@ -510,7 +520,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**self.default_args)
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(input_args, stdout, stderr)
             result = conduct_load.load(input_args)
@@ -643,7 +653,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**self.default_args)
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.conduct_load.create_multipart', create_multipart_mock), \
-                patch('requests.post', http_method), \
+                patch('requests.Session.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, err_output=stderr)
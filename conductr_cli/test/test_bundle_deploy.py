@@ -41,7 +41,7 @@ class TestGetDeploymentStateIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_deploy.get_deployment_state('abc-def', input_args)
             self.assertEqual(json.loads(deployment_state), result)
 
@@ -62,7 +62,7 @@ class TestGetDeploymentStateIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_deploy.get_deployment_state('abc-def', input_args)
             self.assertIsNone(result)
 
@@ -97,7 +97,7 @@ class TestGetDeploymentStateHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_deploy.get_deployment_state('abc-def', input_args)
             self.assertEqual(json.loads(deployment_state), result)
 
@@ -118,7 +118,7 @@ class TestGetDeploymentStateHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_deploy.get_deployment_state('abc-def', input_args)
             self.assertIsNone(result)
 
@@ -1,5 +1,5 @@
 from conductr_cli.test.cli_test_case import CliTestCase, strip_margin
-from conductr_cli import bundle_installation, logging_setup
+from conductr_cli import bundle_installation, logging_setup, sse_client
 from conductr_cli.exceptions import WaitTimeoutError
 from unittest.mock import call, patch, MagicMock
 
@@ -10,6 +10,10 @@ def create_test_event(event_name):
     return sse_mock
 
 
+def create_bundle_event(event_name, bundle_id):
+    return sse_client.Event(event_name, bundle_id)
+
+
 def create_heartbeat_event():
     return create_test_event(None)
 
@@ -46,7 +50,7 @@ class TestCountInstallationIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -80,7 +84,7 @@ class TestCountInstallationIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -103,7 +107,7 @@ class TestCountInstallationIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -126,7 +130,7 @@ class TestCountInstallationIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -166,7 +170,7 @@ class TestCountInstallationHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -200,7 +204,7 @@ class TestCountInstallationHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -223,7 +227,7 @@ class TestCountInstallationHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -246,7 +250,7 @@ class TestCountInstallationHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_installation.count_installations(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -431,6 +435,85 @@ class TestWaitForInstallation(CliTestCase):
             call.flush(),
         ])
 
+    def test_wait_for_installation_using_event_data(self):
+        count_installations_mock = MagicMock(side_effect=[0, 0])
+        url_mock = MagicMock(return_value='/bundle-events/endpoint')
+        conductr_host = '10.0.0.1'
+        conductr_host_mock = MagicMock(return_value=conductr_host)
+        bundle_id = 'a101449418187d92c789d1adc240b6d6'
+        other_bundle_id = '45e0c477d3e5ea92aa8d85c0d8f3e25c'
+        get_events_mock = MagicMock(return_value=[
+            create_bundle_event('bundleInstallationAdded', other_bundle_id),
+            create_heartbeat_event(),
+            create_heartbeat_event(),
+            create_heartbeat_event(),
+            create_bundle_event('bundleInstallationAdded', other_bundle_id),
+            create_bundle_event('bundleInstallationAdded', bundle_id)
+        ])
+
+        stdout = MagicMock()
+
+        args = MagicMock(**{
+            'dcos_mode': False,
+            'wait_timeout': 10,
+            'conductr_auth': self.conductr_auth,
+            'server_verification_file': self.server_verification_file
+        })
+        with patch('conductr_cli.conduct_url.url', url_mock), \
+                patch('conductr_cli.conduct_url.conductr_host', conductr_host_mock), \
+                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            logging_setup.configure_logging(args, stdout)
+            bundle_installation.wait_for_installation(bundle_id, args)
+
+        # The bundles are fetched initially and upon the first event identifying a bundle, and the installations
+        # are tracked using the event data afterwards.
+        self.assertEqual(count_installations_mock.call_args_list, [
+            call(bundle_id, args),
+            call(bundle_id, args)
+        ])
+
+        self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to be installed
+                                         |Bundle a101449418187d92c789d1adc240b6d6 still waiting to be installed\r\
+Bundle a101449418187d92c789d1adc240b6d6 still waiting to be installed
+                                         |Bundle a101449418187d92c789d1adc240b6d6 installed
+                                         |"""), self.output(stdout))
+
+    def test_reconcile_after_reconnection(self):
+        count_installations_mock = MagicMock(side_effect=[0, 0, 1])
+        url_mock = MagicMock(return_value='/bundle-events/endpoint')
+        conductr_host_mock = MagicMock(return_value='10.0.0.1')
+        bundle_id = 'a101449418187d92c789d1adc240b6d6'
+        other_bundle_id = '45e0c477d3e5ea92aa8d85c0d8f3e25c'
+        connection_count_mock = MagicMock(side_effect=[1, 1, 1, 2])
+        get_events_mock = MagicMock(return_value=[
+            create_bundle_event('bundleInstallationAdded', other_bundle_id),
+            create_bundle_event('bundleInstallationAdded', other_bundle_id),
+            create_heartbeat_event()
+        ])
+
+        stdout = MagicMock()
+
+        args = MagicMock(**{
+            'dcos_mode': False,
+            'wait_timeout': 10,
+            'conductr_auth': self.conductr_auth,
+            'server_verification_file': self.server_verification_file
+        })
+        with patch('conductr_cli.conduct_url.url', url_mock), \
+                patch('conductr_cli.conduct_url.conductr_host', conductr_host_mock), \
+                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock), \
+                patch('conductr_cli.sse_client.connection_count', connection_count_mock):
+            logging_setup.configure_logging(args, stdout)
+            bundle_installation.wait_for_installation(bundle_id, args)
+
+        self.assertEqual(count_installations_mock.call_args_list, [
+            call(bundle_id, args),
+            call(bundle_id, args),
+            call(bundle_id, args)
+        ])
+
     def test_return_immediately_if_installed(self):
         count_installations_mock = MagicMock(side_effect=[3])
         conductr_host = '10.0.0.1'
@@ -561,6 +644,121 @@ class TestWaitForInstallation(CliTestCase):
         ])
 
 
+class TestWaitForInstallations(CliTestCase):
+
+    conductr_auth = ('username', 'password')
+    server_verification_file = MagicMock(name='server_verification_file')
+
+    def test_wait_for_installations(self):
+        installed_id = 'c52e3f8d0c58d8aa29ae5e3d774c0e54'
+        first_id = 'a101449418187d92c789d1adc240b6d6'
+        second_id = '45e0c477d3e5ea92aa8d85c0d8f3e25c'
+        count_all_installations_mock = MagicMock(side_effect=[
+            {installed_id: 1, first_id: 0, second_id: 0},
+            {first_id: 0, second_id: 0}
+        ])
+        url_mock = MagicMock(return_value='/bundle-events/endpoint')
+        conductr_host_mock = MagicMock(return_value='10.0.0.1')
+        get_events_mock = MagicMock(return_value=[
+            create_heartbeat_event(),
+            create_bundle_event('bundleInstallationAdded', second_id),
+            create_bundle_event('bundleInstallationAdded', first_id),
+            create_heartbeat_event()
+        ])
+
+        stdout = MagicMock()
+
+        args = MagicMock(**{
+            'dcos_mode': False,
+            'wait_timeout': 10,
+            'conductr_auth': self.conductr_auth,
+            'server_verification_file': self.server_verification_file
+        })
+        with patch('conductr_cli.conduct_url.url', url_mock), \
+                patch('conductr_cli.conduct_url.conductr_host', conductr_host_mock), \
+                patch('conductr_cli.bundle_installation.count_all_installations', count_all_installations_mock), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            logging_setup.configure_logging(args, stdout)
+            bundle_installation.wait_for_installations([installed_id, first_id, second_id], args)
+
+        get_events_mock.assert_called_once_with(False, '10.0.0.1', '/bundle-events/endpoint',
+                                                auth=self.conductr_auth, verify=self.server_verification_file)
+        self.assertEqual(count_all_installations_mock.call_args_list, [
+            call([installed_id, first_id, second_id], args),
+            call([first_id, second_id], args)
+        ])
+
+        self.assertEqual(
+            strip_margin("""|Bundle c52e3f8d0c58d8aa29ae5e3d774c0e54 is installed
+                            |Bundles a101449418187d92c789d1adc240b6d6, 45e0c477d3e5ea92aa8d85c0d8f3e25c waiting to be installed
+                            |Bundle a101449418187d92c789d1adc240b6d6 installed
+                            |Bundle 45e0c477d3e5ea92aa8d85c0d8f3e25c installed
+                            |"""), self.output(stdout))
+
+    def test_wait_timeout(self):
+        bundle_id = 'a101449418187d92c789d1adc240b6d6'
+        count_all_installations_mock = MagicMock(return_value={bundle_id: 0})
+        count_installations_mock = MagicMock(return_value=0)
+        get_events_mock = MagicMock(return_value=[
+            create_bundle_event('bundleInstallationAdded', '45e0c477d3e5ea92aa8d85c0d8f3e25c'),
+            create_test_event('bundleExecutionAdded')
+        ])
+
+        stdout = MagicMock()
+
+        args = MagicMock(**{
+            'dcos_mode': False,
+            'wait_timeout': 10,
+            'conductr_auth': self.conductr_auth,
+            'server_verification_file': self.server_verification_file
+        })
+        with patch('conductr_cli.conduct_url.url', MagicMock(return_value='/bundle-events/endpoint')), \
+                patch('conductr_cli.conduct_url.conductr_host', MagicMock(return_value='10.0.0.1')), \
+                patch('conductr_cli.bundle_installation.count_all_installations', count_all_installations_mock), \
+                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            logging_setup.configure_logging(args, stdout)
+            self.assertRaises(WaitTimeoutError, bundle_installation.wait_for_installations, [bundle_id], args)
+
+        # Only the event not identifying its bundle requires the bundles to be fetched
+        count_installations_mock.assert_called_once_with(bundle_id, args)
+
+
+class TestInstallationPredicate(CliTestCase):
+
+    bundle_id = 'a101449418187d92c789d1adc240b6d6'
+
+    def test_periodic_check_between_events(self):
+        count_installations_mock = MagicMock(side_effect=[0, 1])
+        progress_mock = MagicMock()
+        args = MagicMock()
+
+        predicate = bundle_installation.installation_predicate(self.bundle_id, 0, bundle_installation.is_installed,
+                                                               args, on_progress=progress_mock)
+        with patch('conductr_cli.bundle_installation.count_installations', count_installations_mock):
+            results = [predicate(create_heartbeat_event(), False) for _ in range(6)]
+
+        self.assertEqual([False, False, False, False, False, True], results)
+        self.assertEqual([call(self.bundle_id, args), call(self.bundle_id, args)],
+                         count_installations_mock.call_args_list)
+        progress_mock.assert_called_once_with(0)
+
+    def test_event_data_driven(self):
+        count_installations_mock = MagicMock()
+        args = MagicMock()
+
+        predicate = bundle_installation.installation_predicate(self.bundle_id, 0, bundle_installation.is_installed,
+                                                               args, is_event_data_driven=True)
+        with patch('conductr_cli.bundle_installation.count_installations', count_installations_mock):
+            results = [predicate(create_heartbeat_event(), False) for _ in range(3)] + [
+                predicate(create_bundle_event('bundleInstallationAdded', '45e0c477d3e5ea92aa8d85c0d8f3e25c'), False),
+                predicate(create_bundle_event('bundleInstallationAdded', self.bundle_id), False)
+            ]
+
+        self.assertEqual([False, False, False, False, True], results)
+        count_installations_mock.assert_not_called()
+
+
 class TestWaitForUninstallation(CliTestCase):
 
     conductr_auth = ('username', 'password')
@@ -1,6 +1,7 @@
 from conductr_cli.test.cli_test_case import CliTestCase, strip_margin
-from conductr_cli import bundle_scale, logging_setup
+from conductr_cli import bundle_scale, logging_setup, sse_client
 from conductr_cli.exceptions import WaitTimeoutError
+from collections import OrderedDict
 from unittest.mock import call, patch, MagicMock
 
 
@@ -51,7 +52,7 @@ class TestGetScaleIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -100,7 +101,7 @@ class TestGetScaleIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -123,7 +124,7 @@ class TestGetScaleIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -146,7 +147,7 @@ class TestGetScaleIp(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -201,7 +202,7 @@ class TestGetScaleHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -250,7 +251,7 @@ class TestGetScaleHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(1, result)
 
@@ -273,7 +274,7 @@ class TestGetScaleHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -296,7 +297,7 @@ class TestGetScaleHost(CliTestCase):
             'server_verification_file': self.server_verification_file
         }
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             result = bundle_scale.get_scale(bundle_id, input_args)
             self.assertEqual(0, result)
 
@@ -379,6 +380,55 @@ class TestWaitForScale(CliTestCase):
             call.flush()
         ])
 
+    def test_wait_for_scale_using_event_data(self):
+        get_scale_mock = MagicMock(side_effect=[0, 1, 2])
+        url_mock = MagicMock(return_value='/bundle-events/endpoint')
+        conductr_host_mock = MagicMock(return_value='10.0.0.1')
+        bundle_id = 'a101449418187d92c789d1adc240b6d6'
+        other_bundle_id = '45e0c477d3e5ea92aa8d85c0d8f3e25c'
+        get_events_mock = MagicMock(return_value=[
+            sse_client.Event('bundleExecutionAdded', bundle_id),
+            sse_client.Event(None, ''),
+            sse_client.Event(None, ''),
+            sse_client.Event(None, ''),
+            sse_client.Event('bundleExecutionAdded', other_bundle_id),
+            sse_client.Event('bundleExecutionAdded', bundle_id),
+            sse_client.Event('bundleExecutionAdded', '{{"bundleId": "{}", "bundleExecutions": '
+                                                     '[{{"isStarted": true}}, {{"isStarted": true}}, '
+                                                     '{{"isStarted": true}}]}}'.format(bundle_id))
+        ])
+
+        stdout = MagicMock()
+
+        args = MagicMock(**{
+            'dcos_mode': False,
+            'wait_timeout': 10,
+            'conductr_auth': self.conductr_auth,
+            'server_verification_file': self.server_verification_file
+        })
+        with patch('conductr_cli.conduct_url.url', url_mock), \
+                patch('conductr_cli.conduct_url.conductr_host', conductr_host_mock), \
+                patch('conductr_cli.bundle_scale.get_scale', get_scale_mock), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            logging_setup.configure_logging(args, stdout)
+            bundle_scale.wait_for_scale(bundle_id, 3, args)
+
+        # Heartbeats and events of other bundles do not cause the bundles to be fetched, and the scale carried by
+        # the event data is used when available.
+        self.assertEqual(get_scale_mock.call_args_list, [
+            call(bundle_id, args),
+            call(bundle_id, args),
+            call(bundle_id, args)
+        ])
+
+        self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to reach expected scale 3
+                                         |Bundle a101449418187d92c789d1adc240b6d6 has scale 1, expected 3\r\
+Bundle a101449418187d92c789d1adc240b6d6 has scale 1, expected 3
+                                         |Bundle a101449418187d92c789d1adc240b6d6 has scale 2, expected 3\r\
+Bundle a101449418187d92c789d1adc240b6d6 has scale 2, expected 3
+                                         |Bundle a101449418187d92c789d1adc240b6d6 expected scale 3 is met
+                                         |"""), self.output(stdout))
+
     def test_periodic_check_between_events(self):
         get_scale_mock = MagicMock(side_effect=[0, 1, 2, 2, 2, 3])
         url_mock = MagicMock(return_value='/bundle-events/endpoint')
@@ -648,3 +698,80 @@ class TestWaitForScale(CliTestCase):
         sse_mock = MagicMock()
         sse_mock.event = event_name
         return sse_mock
+
+
+class TestWaitForScales(CliTestCase):
+
+    conductr_auth = ('username', 'password')
+    server_verification_file = MagicMock(name='server_verification_file')
+
+    def test_wait_for_scales(self):
+        met_id = 'c52e3f8d0c58d8aa29ae5e3d774c0e54'
+        first_id = 'a101449418187d92c789d1adc240b6d6'
+        second_id = '45e0c477d3e5ea92aa8d85c0d8f3e25c'
+        count_all_scales_mock = MagicMock(side_effect=[
+            {met_id: 1, first_id: 0, second_id: 0},
+            {first_id: 0, second_id: 0}
+        ])
+        get_scale_mock = MagicMock(side_effect=lambda bundle_id, args: {first_id: 1, second_id: 1}[bundle_id])
+        get_events_mock = MagicMock(return_value=[
+            sse_client.Event(None, ''),
+            sse_client.Event('bundleExecutionAdded', second_id),
+            sse_client.Event('bundleExecutionAdded', '{{"bundleId": "{}", "bundleExecutions": '
+                                                     '[{{"isStarted": true}}, {{"isStarted": true}}]}}'
+                                                     .format(first_id)),
+            sse_client.Event(None, '')
+        ])
+
+        stdout = MagicMock()
+
+        args = MagicMock(**{
+            'dcos_mode': False,
+            'wait_timeout': 10,
+            'conductr_auth': self.conductr_auth,
+            'server_verification_file': self.server_verification_file
+        })
+        with patch('conductr_cli.conduct_url.url', MagicMock(return_value='/bundle-events/endpoint')), \
+                patch('conductr_cli.conduct_url.conductr_host', MagicMock(return_value='10.0.0.1')), \
+                patch('conductr_cli.bundle_scale.count_all_scales', count_all_scales_mock), \
+                patch('conductr_cli.bundle_scale.get_scale', get_scale_mock), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            logging_setup.configure_logging(args, stdout)
+            bundle_scale.wait_for_scales(OrderedDict([(met_id, 1), (first_id, 2), (second_id, 1)]), args)
+
+        get_events_mock.assert_called_once_with(False, '10.0.0.1', '/bundle-events/endpoint',
+                                                auth=self.conductr_auth, verify=self.server_verification_file)
+        self.assertEqual(count_all_scales_mock.call_args_list, [
+            call([met_id, first_id, second_id], args),
+            call([first_id, second_id], args)
+        ])
+        # The scale of the first bundle is taken from the event data once events identify their bundle
+        self.assertEqual(get_scale_mock.call_args_list, [
+            call(first_id, args),
+            call(second_id, args)
+        ])
+
+        self.assertEqual(
+            strip_margin("""|Bundle c52e3f8d0c58d8aa29ae5e3d774c0e54 expected scale 1 is met
+                            |Bundles a101449418187d92c789d1adc240b6d6, 45e0c477d3e5ea92aa8d85c0d8f3e25c waiting to reach their expected scale
+                            |Bundle a101449418187d92c789d1adc240b6d6 expected scale 2 is met
+                            |Bundle 45e0c477d3e5ea92aa8d85c0d8f3e25c expected scale 1 is met
+                            |"""), self.output(stdout))
+
+    def test_wait_timeout(self):
+        bundle_id = 'a101449418187d92c789d1adc240b6d6'
+        get_events_mock = MagicMock(return_value=[sse_client.Event('bundleExecutionAdded', bundle_id)])
+
+        args = MagicMock(**{
+            'dcos_mode': False,
+            'wait_timeout': 10,
+            'conductr_auth': self.conductr_auth,
+            'server_verification_file': self.server_verification_file
+        })
+        with patch('conductr_cli.conduct_url.url', MagicMock(return_value='/bundle-events/endpoint')), \
+                patch('conductr_cli.conduct_url.conductr_host', MagicMock(return_value='10.0.0.1')), \
+                patch('conductr_cli.bundle_scale.count_all_scales', MagicMock(return_value={bundle_id: 0})), \
+                patch('conductr_cli.bundle_scale.get_scale', MagicMock(return_value=1)), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            logging_setup.configure_logging(args, MagicMock())
+            self.assertRaises(WaitTimeoutError, bundle_scale.wait_for_scales, OrderedDict([(bundle_id, 2)]), args)
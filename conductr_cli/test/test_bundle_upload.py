@@ -0,0 +1,260 @@
+from conductr_cli.test.cli_test_case import CliTestCase
+from conductr_cli import bundle_upload, conduct_request, logging_setup
+from argparse import Namespace
+from dcos import http
+from dcos.errors import DCOSHTTPException
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from requests_toolbelt.multipart.decoder import MultipartDecoder
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from socketserver import ThreadingMixIn
+from unittest.mock import patch, MagicMock
+import io
+import json
+import os
+import requests
+import shutil
+import tempfile
+import threading
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Implements the resumable upload protocol. Faults are injected by the index of the PATCH request they apply to:
+    'drop' keeps half of the chunk and closes the connection without responding, 'lose' discards all bytes received.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # noqa
+        self.server.requests.append(('POST', self.path))
+        if not self.server.is_supported:
+            self.respond(404)
+        elif self.path == '/v2/bundles/uploads':
+            self.server.length = int(self.headers['Upload-Length'])
+            self.server.content_type = self.headers['Upload-Content-Type']
+            self.respond(201, headers={'Location': '/v2/bundles/uploads/1'})
+        else:
+            self.respond(404)
+
+    def do_HEAD(self):  # noqa
+        self.server.requests.append(('HEAD', self.path))
+        with self.server.lock:
+            self.respond(200, headers={'Upload-Offset': str(len(self.server.received))})
+
+    def do_PATCH(self):  # noqa
+        chunk = self.rfile.read(int(self.headers['Content-Length']))
+        offset = int(self.headers['Upload-Offset'])
+        self.server.requests.append(('PATCH', offset))
+
+        with self.server.lock:
+            fault = self.server.faults.pop(len(self.server.requests) - 1, None)
+            if fault == 'drop':
+                self.server.received += chunk[:len(chunk) // 2]
+                self.close_connection = True
+                return
+            elif fault == 'lose':
+                self.server.received = b''
+
+            if offset != len(self.server.received):
+                self.respond(409)
+                return
+
+            self.server.received += chunk
+            if len(self.server.received) < self.server.length:
+                self.respond(204, headers={'Upload-Offset': str(len(self.server.received))})
+            else:
+                self.respond(200, json.dumps({'bundleId': 'a1b2c3d4e5f6'}).encode('utf-8'))
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestUpload(CliTestCase):
+
+    chunk_size = 16 * 1024
+
+    def setUp(self):  # noqa
+        super().setUp()
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = []
+        self.server.faults = {}
+        self.server.is_supported = True
+        self.server.received = b''
+        self.server.lock = threading.Lock()
+        self.server_thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05},
+                                              daemon=True)
+        self.server_thread.start()
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.bundle_content = os.urandom(100 * 1024)
+        self.bundle_file = os.path.join(self.tmpdir, 'bundle.zip')
+        with open(self.bundle_file, 'wb') as f:
+            f.write(self.bundle_content)
+
+        self.args = Namespace(dcos_mode=False, scheme='http', host='127.0.0.1', port=self.server.server_address[1],
+                              base_path='/', api_version='2', conductr_auth=None, server_verification_file=None,
+                              verbose=False, quiet=False)
+        logging_setup.configure_logging(self.args, MagicMock())
+        bundle_upload.reset_unsupported_endpoints()
+
+    def tearDown(self):  # noqa
+        self.server.shutdown()
+        self.server.server_close()
+        conduct_request.close_sessions()
+        bundle_upload.reset_unsupported_endpoints()
+        shutil.rmtree(self.tmpdir)
+
+    def upload(self, files):
+        progress = MagicMock()
+        with patch('time.sleep'):
+            result = bundle_upload.upload(self.args, files, progress, chunk_size=self.chunk_size)
+        return result, progress
+
+    def files(self):
+        return [
+            ('bundleName', 'test-bundle'),
+            ('bundleConf', ('bundle.conf', io.StringIO('name = test-bundle'))),
+            ('bundle', ('bundle.zip', open(self.bundle_file, 'rb')))
+        ]
+
+    def assert_received(self):
+        parts = MultipartDecoder(self.server.received, self.server.content_type).parts
+        self.assertEqual([b'test-bundle', b'name = test-bundle', self.bundle_content], [part.content for part in parts])
+
+    def test_upload_in_chunks(self):
+        files = self.files()
+        result, progress = self.upload(files)
+        files[2][1][1].close()
+
+        self.assertEqual({'bundleId': 'a1b2c3d4e5f6'}, result)
+        self.assert_received()
+        patches = [offset for method, offset in self.server.requests if method == 'PATCH']
+        self.assertEqual(list(range(0, self.server.length, self.chunk_size)), patches)
+        self.assertEqual((self.server.length, self.server.length), progress.call_args[0])
+
+    def test_resume_after_dropped_connection(self):
+        self.server.faults = {3: 'drop'}
+
+        files = self.files()
+        result, progress = self.upload(files)
+        files[2][1][1].close()
+
+        self.assertEqual({'bundleId': 'a1b2c3d4e5f6'}, result)
+        self.assert_received()
+        # The third chunk is resumed from half of it, rather than the upload started again
+        self.assertEqual(('HEAD', '/v2/bundles/uploads/1'), self.server.requests[4])
+        self.assertEqual(('PATCH', self.chunk_size * 2 + self.chunk_size // 2), self.server.requests[5])
+
+    def test_resume_after_acknowledged_bytes_lost(self):
+        self.server.faults = {3: 'lose'}
+
+        files = self.files()
+        result, progress = self.upload(files)
+        files[2][1][1].close()
+
+        self.assertEqual({'bundleId': 'a1b2c3d4e5f6'}, result)
+        self.assert_received()
+        self.assertEqual([('PATCH', 2 * self.chunk_size), ('HEAD', '/v2/bundles/uploads/1'), ('PATCH', 0)],
+                         self.server.requests[3:6])
+
+    def test_unsupported(self):
+        self.server.is_supported = False
+
+        files = self.files()
+        result, progress = self.upload(files)
+        files[2][1][1].close()
+
+        self.assertIsNone(result)
+        self.assertEqual([('POST', '/v2/bundles/uploads')], self.server.requests)
+        progress.assert_not_called()
+
+    def test_unsupported_remembered(self):
+        self.server.is_supported = False
+
+        for attempt in range(2):
+            files = self.files()
+            result, progress = self.upload(files)
+            files[2][1][1].close()
+            self.assertIsNone(result)
+
+        self.assertEqual([('POST', '/v2/bundles/uploads')], self.server.requests)
+
+    def test_unsupported_in_dcos_mode(self):
+        self.server.is_supported = False
+        self.args.dcos_mode = True
+
+        def dcos_post(url, is_success=http._default_is_success, **kwargs):
+            response = requests.post(url, **kwargs)
+            if not is_success(response.status_code):
+                raise DCOSHTTPException(response)
+            return response
+
+        files = self.files()
+        with patch('dcos.http.post', MagicMock(side_effect=dcos_post)), \
+                patch('conductr_cli.dcos_auth.get_cached_auth', MagicMock(return_value=(False, None))), \
+                patch('conductr_cli.dcos_auth.save_auth_scheme'):
+            result, progress = self.upload(files)
+        files[2][1][1].close()
+
+        self.assertIsNone(result)
+        self.assertEqual([('POST', '/v2/bundles/uploads')], self.server.requests)
+
+    def test_small_bundle(self):
+        result, progress = self.upload([('bundle', ('bundle.zip', io.BytesIO(b'small')))])
+
+        self.assertIsNone(result)
+        self.assertEqual([], self.server.requests)
+
+
+class TestMultipartBody(CliTestCase):
+
+    def test_read_at_offsets(self):
+        content = os.urandom(10000)
+        body = bundle_upload.MultipartBody([('bundle', ('bundle.zip', io.BytesIO(content)))])
+        expected = MultipartEncoder([('bundle', ('bundle.zip', io.BytesIO(content)))], boundary=body.boundary).read()
+
+        self.assertEqual(expected[0:4000], body.read(0, 4000))
+        # Partially acknowledged, read ahead, and lost
+        self.assertEqual(expected[1000:5000], body.read(1000, 4000))
+        self.assertEqual(expected[8000:], body.read(8000, 4000))
+        self.assertEqual(expected[500:4500], body.read(500, 4000))
+        self.assertEqual(len(expected), body.len)
+
+
+class TestMultipartStream(CliTestCase):
+
+    def test_stream(self):
+        content = os.urandom(200 * 1024)
+        chunks = []
+
+        def bundle_conf():
+            # The content of the bundle.conf is only obtained once the bundle has been sent
+            self.assertIn(content, b''.join(chunks))
+            return 'name = test-bundle'
+
+        fields = [('bundleName', 'test-bundle'),
+                  ('bundle', ('bundle.zip', io.BytesIO(content))),
+                  ('bundleConf', ('bundle.conf', bundle_conf))]
+        stream = bundle_upload.MultipartStream(fields)
+
+        for chunk in stream:
+            chunks.append(chunk)
+        body = b''.join(chunks)
+
+        expected = MultipartEncoder([('bundleName', 'test-bundle'),
+                                     ('bundle', ('bundle.zip', io.BytesIO(content))),
+                                     ('bundleConf', ('bundle.conf', 'name = test-bundle'))],
+                                    boundary=stream.boundary).read()
+        self.assertEqual(expected, body)
+        self.assertEqual('multipart/form-data; boundary={}'.format(stream.boundary), stream.content_type)
@@ -1,6 +1,9 @@
 from unittest import TestCase
-from conductr_cli import bundle_utils
+from conductr_cli import bundle_utils, sse_client
 from conductr_cli.test.cli_test_case import create_temp_bundle
+from unittest.mock import MagicMock
+import hashlib
+import io
 import shutil
 
 
@@ -27,3 +30,42 @@ class Conf(TestCase):
 
     def tearDown(self):  # noqa
         shutil.rmtree(self.tmpdir)
+
+
+class Digest(TestCase):
+
+    def test_digest_from_file_name(self):
+        digest = 'e0d3aab1bd4e1d6b0e6d2c3bc11bd1b3a4f9c7b0d35e8c0c5f0c8a8be36ff2ec'
+        file = MagicMock()
+        self.assertEqual(bundle_utils.digest('visualizer-v1-{}.zip'.format(digest), file), digest)
+        file.read.assert_not_called()
+
+    def test_digest_computed(self):
+        content = b'bundle contents' * 10000
+        file = io.BytesIO(content)
+        self.assertEqual(bundle_utils.digest('visualizer.zip', file), hashlib.sha256(content).hexdigest())
+        self.assertEqual(file.tell(), 0)
+
+
+class BundleEventData(TestCase):
+
+    def test_bundle_id(self):
+        self.assertEqual(
+            bundle_utils.bundle_event_data(sse_client.Event('bundleInstallationAdded',
+                                                            'c1ab77e63b722ef8c6ea8a1c274be053-3cc322b62e7608b5cdf37185240f7853')),
+            ('c1ab77e63b722ef8c6ea8a1c274be053-3cc322b62e7608b5cdf37185240f7853', None))
+
+    def test_bundle_json(self):
+        self.assertEqual(
+            bundle_utils.bundle_event_data(sse_client.Event('bundleExecutionAdded',
+                                                            '{"bundleId": "45e0c477d3e5ea92aa8d85c0d8f3e25c", '
+                                                            '"bundleExecutions": [{"isStarted": true}]}')),
+            ('45e0c477d3e5ea92aa8d85c0d8f3e25c', {'bundleId': '45e0c477d3e5ea92aa8d85c0d8f3e25c',
+                                                  'bundleExecutions': [{'isStarted': True}]}))
+
+    def test_no_bundle(self):
+        self.assertEqual(bundle_utils.bundle_event_data(sse_client.Event(None, '')), (None, None))
+        self.assertEqual(bundle_utils.bundle_event_data(sse_client.Event('otherEvent', None)), (None, None))
+        self.assertEqual(bundle_utils.bundle_event_data(sse_client.Event('otherEvent', 'some text')), (None, None))
+        self.assertEqual(bundle_utils.bundle_event_data(sse_client.Event('otherEvent', '{"other": 1}')), (None, None))
+        self.assertEqual(bundle_utils.bundle_event_data(sse_client.Event('otherEvent', '{malformed')), (None, None))
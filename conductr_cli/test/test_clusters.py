@@ -0,0 +1,99 @@
+from conductr_cli.test.cli_test_case import CliTestCase
+from conductr_cli import clusters, conduct_request_async
+from argparse import Namespace
+from pyhocon import ConfigFactory
+from unittest.mock import patch, MagicMock
+import threading
+import time
+
+
+class TestResolveClusters(CliTestCase):
+
+    custom_settings = ConfigFactory.parse_string(
+        """
+        conductr {
+          clusters {
+            prod-eu { host = "10.0.1.10", port = 9006, scheme = "https" }
+          }
+          auth {
+            "10.0.2.10" { enabled = true, username = "steve", password = "letmein" }
+          }
+        }
+        """
+    )
+
+    def create_args(self, hosts):
+        return Namespace(dcos_mode=False, scheme='http', host='127.0.0.1', ip=None, port=9005, base_path='/',
+                         api_version='2', hosts=hosts, cluster_timeout=5, custom_settings=self.custom_settings,
+                         conductr_auth=None, server_verification_file=None)
+
+    def test_resolve_host_and_port(self):
+        result = clusters.resolve_clusters(self.create_args(['10.0.0.1', '10.0.0.2:9006', '[::1]:9007']))
+
+        self.assertEqual([('10.0.0.1', '10.0.0.1', 9005, 'http'),
+                          ('10.0.0.2:9006', '10.0.0.2', 9006, 'http'),
+                          ('[::1]:9007', '::1', 9007, 'http')],
+                         [(args.cluster, args.host, args.port, args.scheme) for args in result])
+
+    def test_resolve_named_cluster(self):
+        with patch('conductr_cli.custom_settings.load_from_file', MagicMock(return_value=self.custom_settings)):
+            result = clusters.resolve_clusters(self.create_args(['prod-eu', '10.0.2.10']))
+
+        prod_eu, secured = result
+        self.assertEqual(('prod-eu', '10.0.1.10', 9006, 'https', '/'),
+                         (prod_eu.cluster, prod_eu.host, prod_eu.port, prod_eu.scheme, prod_eu.base_path))
+        self.assertEqual(('https', ('steve', 'letmein')), (secured.scheme, secured.conductr_auth))
+        self.assertIsNone(prod_eu.conductr_auth)
+
+
+class TestGetBundles(CliTestCase):
+
+    def tearDown(self):  # noqa
+        conduct_request_async.shutdown_executor()
+
+    def test_query_clusters_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def get(url, **kwargs):
+            barrier.wait()
+            return MagicMock(status_code=200, text='[{{"url": "{}"}}]'.format(url))
+
+        args = Namespace(dcos_mode=False, scheme='http', host='127.0.0.1', ip=None, port=9005, base_path='/',
+                         api_version='2', hosts=['10.0.0.1', '10.0.0.2'], cluster_timeout=5, custom_settings=None,
+                         custom_settings_file=None, conductr_auth=None, server_verification_file=None)
+
+        get_logger_mock, log_mock = self.create_logger()
+        with patch('requests.Session.get', MagicMock(side_effect=get)), \
+                patch('logging.getLogger', get_logger_mock):
+            result, is_all_fetched = clusters.get_bundles(args)
+
+        self.assertTrue(is_all_fetched)
+        self.assertEqual([('10.0.0.1', [{'url': 'http://10.0.0.1:9005/v2/bundles'}]),
+                          ('10.0.0.2', [{'url': 'http://10.0.0.2:9005/v2/bundles'}])],
+                         result)
+
+    def test_cluster_timeout(self):
+        def get(url, **kwargs):
+            if url.startswith('http://10.0.0.2'):
+                time.sleep(0.5)
+            return MagicMock(status_code=200, text='[]')
+
+        args = Namespace(dcos_mode=False, scheme='http', host='127.0.0.1', ip=None, port=9005, base_path='/',
+                         api_version='2', hosts=['10.0.0.1', '10.0.0.2'], cluster_timeout=0.1, custom_settings=None,
+                         custom_settings_file=None, conductr_auth=None, server_verification_file=None)
+
+        get_logger_mock, log_mock = self.create_logger()
+        start_time = time.monotonic()
+        with patch('requests.Session.get', MagicMock(side_effect=get)), \
+                patch('logging.getLogger', get_logger_mock):
+            result, is_all_fetched = clusters.get_bundles(args)
+
+        self.assertTrue(time.monotonic() - start_time < 0.5)
+        self.assertFalse(is_all_fetched)
+        self.assertEqual([('10.0.0.1', [])], result)
+        log_mock.error.assert_called_once_with('Unable to get bundles of cluster 10.0.0.2: no response within 0.1s')
+
+    @staticmethod
+    def create_logger():
+        log_mock = MagicMock(**{'is_verbose_enabled.return_value': False})
+        return MagicMock(return_value=log_mock), log_mock
@@ -0,0 +1,87 @@
+from conductr_cli.test.cli_test_case import CliTestCase, as_warn
+from conductr_cli import conduct_cache, logging_setup, resolve_cache
+from unittest.mock import MagicMock
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+class TestConductCacheCommand(CliTestCase):
+
+    def setUp(self):  # noqa
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.content = b'bundle contents'
+        self.digest = hashlib.sha256(self.content).hexdigest()
+        self.default_args = {
+            'resolve_cache_dir': self.cache_dir,
+            'verify': False,
+            'prune': False,
+            'max_size': 1024,
+            'verbose': False,
+            'quiet': False
+        }
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def write_file(self, file_name, content):
+        file_path = os.path.join(self.cache_dir, file_name)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return file_path
+
+    def run_cache(self, **kwargs):
+        stdout = MagicMock()
+        stderr = MagicMock()
+        args = MagicMock(**dict(self.default_args, **kwargs))
+        logging_setup.configure_logging(args, stdout, stderr)
+        result = conduct_cache.cache(args)
+        return result, self.output(stdout), self.output(stderr)
+
+    def test_inspect(self):
+        self.write_file('visualizer-v1-{}.zip'.format(self.digest), self.content)
+
+        result, stdout, stderr = self.run_cache()
+
+        self.assertTrue(result)
+        lines = stdout.splitlines()
+        self.assertRegex(lines[0], r'^FILE +SIZE +LAST USED +VERIFIED$')
+        self.assertRegex(lines[1], r'^visualizer-v1-[0-9a-f]{64}\.zip +15 B +[0-9-]+ [0-9:]+ +No$')
+        self.assertEqual('1 files, 15 B of 1.0 KiB in {}'.format(self.cache_dir), lines[2])
+
+    def test_verify(self):
+        valid_file = self.write_file('visualizer-v1-{}.zip'.format(self.digest), self.content)
+        corrupted_file = self.write_file('eslite-v1-{}.zip'.format(self.digest), b'corrupted')
+
+        result, stdout, stderr = self.run_cache(verify=True)
+
+        self.assertFalse(result)
+        self.assertFalse(os.path.exists(corrupted_file))
+        self.assertEqual(self.digest, resolve_cache.recorded_digest(valid_file))
+        lines = stdout.splitlines()
+        self.assertEqual(as_warn('Warning: Removing {} as it does not match the digest of its name'
+                                 .format(corrupted_file)), lines[0])
+        self.assertRegex(lines[2], r'^visualizer-v1-[0-9a-f]{64}\.zip +15 B +[0-9-]+ [0-9:]+ +Yes$')
+
+    def test_prune(self):
+        self.write_file('visualizer-v1-digest.zip', b'1' * 1000)
+        self.write_file('eslite-v1-digest.zip', b'2' * 1000)
+        resolve_cache.touch(os.path.join(self.cache_dir, 'eslite-v1-digest.zip'))
+
+        result, stdout, stderr = self.run_cache(prune=True)
+
+        self.assertTrue(result)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'visualizer-v1-digest.zip')))
+        lines = stdout.splitlines()
+        self.assertEqual('Evicted {}'.format(os.path.join(self.cache_dir, 'visualizer-v1-digest.zip')), lines[0])
+        self.assertRegex(lines[2], r'^eslite-v1-digest\.zip ')
+        self.assertEqual('1 files, 1000 B of 1.0 KiB in {}'.format(self.cache_dir), lines[3])
+
+    def test_no_cache_dir(self):
+        cache_dir = os.path.join(self.cache_dir, 'missing')
+        result, stdout, stderr = self.run_cache(resolve_cache_dir=cache_dir)
+
+        self.assertTrue(result)
+        self.assertEqual('The cache {} is empty\n'.format(cache_dir), stdout)
@@ -36,7 +36,7 @@ class TestConductEventsCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method), \
+        with patch('requests.Session.get', http_method), \
                 patch('urllib.parse.quote', quote_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_events.events(input_args)
@@ -66,7 +66,7 @@ class TestConductEventsCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method), \
+        with patch('requests.Session.get', http_method), \
                 patch('urllib.parse.quote', quote_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_events.events(input_args)
@@ -87,7 +87,7 @@ class TestConductEventsCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method), \
+        with patch('requests.Session.get', http_method), \
                 patch('urllib.parse.quote', quote_method):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_events.events(input_args)
@@ -112,7 +112,7 @@ class TestConductEventsCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method), \
+        with patch('requests.Session.get', http_method), \
                 patch('urllib.parse.quote', quote_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_events.events(input_args)
@@ -1,6 +1,7 @@
-from conductr_cli.test.cli_test_case import CliTestCase, strip_margin
+from conductr_cli.test.cli_test_case import CliTestCase, as_error, strip_margin
 from conductr_cli import conduct_info, logging_setup
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
+from requests.exceptions import ConnectionError
 from unittest.mock import patch, MagicMock
 
 
@@ -30,7 +31,7 @@ class TestConductInfoCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -54,7 +55,7 @@ class TestConductInfoCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -91,7 +92,7 @@ class TestConductInfoCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -127,7 +128,7 @@ class TestConductInfoCommand(CliTestCase):
         args.update({'verbose': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -191,7 +192,7 @@ class TestConductInfoCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'long_ids': True})
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -216,7 +217,7 @@ class TestConductInfoCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -242,7 +243,7 @@ class TestConductInfoCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -261,7 +262,7 @@ class TestConductInfoCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_info.info(input_args)
             self.assertFalse(result)
@@ -284,7 +285,7 @@ class TestConductInfoCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_info.info(input_args)
             self.assertTrue(result)
@@ -295,3 +296,71 @@ class TestConductInfoCommand(CliTestCase):
             strip_margin("""|ID  NAME  #REP  #STR  #RUN
                             |"""),
             self.output(stdout))
+
+    def test_hosts(self):
+        responses = {
+            'http://10.0.0.1:9005/bundles': self.respond_with(text="""[
+                {
+                    "attributes": { "bundleName": "test-bundle-1" },
+                    "bundleId": "45e0c477d3e5ea92aa8d85c0d8f3e25c",
+                    "bundleExecutions": [{"isStarted": true}],
+                    "bundleInstallations": [1]
+                }
+            ]""").return_value,
+            'http://10.0.0.2:9006/bundles': self.respond_with(text="""[
+                {
+                    "attributes": { "bundleName": "test-bundle-2" },
+                    "bundleId": "c52e3f8d0c58d8aa29ae5e3d774c0e54",
+                    "bundleExecutions": [],
+                    "bundleInstallations": [1, 2]
+                }
+            ]""").return_value
+        }
+        http_method = MagicMock(side_effect=lambda url, **kwargs: responses[url])
+        stdout = MagicMock()
+
+        args = dict(self.default_args, hosts=['10.0.0.1', '10.0.0.2:9006'], cluster_timeout=5, custom_settings=None,
+                    custom_settings_file=None)
+        input_args = MagicMock(**args)
+        with patch('requests.Session.get', http_method):
+            logging_setup.configure_logging(input_args, stdout)
+            result = conduct_info.info(input_args)
+            self.assertTrue(result)
+
+        self.assertEqual(2, http_method.call_count)
+        self.assertEqual(
+            strip_margin("""|CLUSTER        ID       NAME           #REP  #STR  #RUN
+                            |10.0.0.1       45e0c47  test-bundle-1     1     0     1
+                            |10.0.0.2:9006  c52e3f8  test-bundle-2     2     0     0
+                            |"""),
+            self.output(stdout))
+
+    def test_hosts_with_unreachable_cluster(self):
+        responses = {
+            'http://10.0.0.1:9005/bundles': self.respond_with(text='[]').return_value
+        }
+
+        def get(url, **kwargs):
+            if url in responses:
+                return responses[url]
+            raise ConnectionError('test reason', request=MagicMock(url=url))
+
+        stdout = MagicMock()
+        stderr = MagicMock()
+
+        args = dict(self.default_args, hosts=['10.0.0.1', '10.0.0.2'], cluster_timeout=5, custom_settings=None,
+                    custom_settings_file=None)
+        input_args = MagicMock(**args)
+        with patch('requests.Session.get', MagicMock(side_effect=get)):
+            logging_setup.configure_logging(input_args, stdout, stderr)
+            result = conduct_info.info(input_args)
+            self.assertFalse(result)
+
+        self.assertEqual(
+            strip_margin("""|CLUSTER  ID  NAME  #REP  #STR  #RUN
+                            |"""),
+            self.output(stdout))
+        self.assertEqual(
+            as_error(strip_margin("""|Error: Unable to get bundles of cluster 10.0.0.2: unable to contact ConductR at http://10.0.0.2:9005/bundles
+                                     |""")),
+            self.output(stderr))
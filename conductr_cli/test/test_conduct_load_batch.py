@@ -0,0 +1,277 @@
+from conductr_cli.test.cli_test_case import CliTestCase, create_temp_bundle, strip_margin, as_error
+from conductr_cli import conduct_load_batch, logging_setup
+from conductr_cli.exceptions import BundleResolutionError, WaitTimeoutError
+from collections import OrderedDict
+from unittest.mock import patch, MagicMock
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+
+class TestConductLoadBatchCommand(CliTestCase):
+
+    def setUp(self):  # noqa
+        super().setUp()
+        find_loaded_bundle_patcher = patch('conductr_cli.conduct_load.find_loaded_bundle', MagicMock(return_value=None))
+        find_loaded_bundle_patcher.start()
+        self.addCleanup(find_loaded_bundle_patcher.stop)
+        bundle_upload_patcher = patch('conductr_cli.bundle_upload.upload', MagicMock(return_value=None))
+        bundle_upload_patcher.start()
+        self.addCleanup(bundle_upload_patcher.stop)
+        self.tmpdir = tempfile.mkdtemp()
+        self.bundle_tmpdir, self.bundle_file = create_temp_bundle('name = test-bundle')
+        self.resolve_cache_dir = os.path.join(self.tmpdir, 'cache')
+        self.manifest_file = os.path.join(self.tmpdir, 'manifest.conf')
+        self.write_manifest("""
+            bundles = [
+              { bundle = "visualizer", configuration = "visualizer-config", scale = 2 },
+              { bundle = "eslite" }
+            ]
+            """)
+
+        self.default_args = {
+            'dcos_mode': False,
+            'scheme': 'http',
+            'host': '127.0.0.1',
+            'port': 9005,
+            'base_path': '/',
+            'api_version': '2',
+            'verbose': False,
+            'quiet': False,
+            'no_wait': False,
+            'offline_mode': False,
+            'long_ids': False,
+            'custom_settings': None,
+            'resolve_cache_dir': self.resolve_cache_dir,
+            'manifest': self.manifest_file,
+            'resolve_jobs': 2,
+            'upload_jobs': 2,
+            'wait_timeout': 10,
+            'conductr_auth': None,
+            'server_verification_file': None
+        }
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.tmpdir)
+        shutil.rmtree(self.bundle_tmpdir)
+
+    def write_manifest(self, content):
+        with open(self.manifest_file, 'w') as f:
+            f.write(content)
+
+    def resolved(self, bundle_file_name):
+        return bundle_file_name, self.bundle_file, None, [
+            ('bundleConf', ('bundle.conf', io.StringIO('name = test-bundle'))),
+            ('bundle', (bundle_file_name, open(self.bundle_file, 'rb')))
+        ]
+
+    def test_success(self):
+        # Both bundles are resolved at once
+        barrier = threading.Barrier(2, timeout=5)
+
+        def resolve_v2(args, bundle, configuration):
+            barrier.wait()
+            return self.resolved('{}-v1-digest.zip'.format(bundle))
+
+        bundle_ids = {'visualizer-v1-digest.zip': 'a1b2c3d4e5f6', 'eslite-v1-digest.zip': 'f6e5d4c3b2a1'}
+
+        def post_bundle(args, multipart):
+            file_name = [name for field, (name, file) in multipart.fields if field == 'bundle'][0]
+            return {'bundleId': bundle_ids[file_name]}
+
+        wait_for_installations_mock = MagicMock()
+        wait_for_scales_mock = MagicMock()
+        put_mock = self.respond_with(200, '{"bundleId": "a1b2c3d4e5f6"}')
+        stdout = MagicMock()
+
+        input_args = MagicMock(**self.default_args)
+        with patch('conductr_cli.conduct_load.resolve_v2', MagicMock(side_effect=resolve_v2)), \
+                patch('conductr_cli.conduct_load.post_bundle', MagicMock(side_effect=post_bundle)), \
+                patch('conductr_cli.bundle_installation.wait_for_installations', wait_for_installations_mock), \
+                patch('conductr_cli.bundle_scale.wait_for_scales', wait_for_scales_mock), \
+                patch('requests.Session.put', put_mock):
+            logging_setup.configure_logging(input_args, stdout)
+            result = conduct_load_batch.load_batch(input_args)
+
+        self.assertTrue(result)
+        wait_for_installations_mock.assert_called_once_with(['a1b2c3d4e5f6', 'f6e5d4c3b2a1'], input_args)
+        put_mock.assert_called_once_with('http://127.0.0.1:9005/v2/bundles/a1b2c3d4e5f6?scale=2',
+                                         headers={'Host': '127.0.0.1'})
+        wait_for_scales_mock.assert_called_once_with(OrderedDict([('a1b2c3d4e5f6', 2)]), input_args)
+
+        lines = self.output(stdout).splitlines()
+        self.assertEqual('Loading 2 bundles..', lines[0])
+        self.assertRegex(lines[-4], r'^BUNDLE +ID +SIZE +RESOLVE +UPLOAD +STATUS$')
+        self.assertRegex(lines[-3], r'^visualizer +a1b2c3d +\d+ B +\d+\.\d\ds +\d+\.\d\ds +Running \(2\)$')
+        self.assertRegex(lines[-2], r'^eslite +f6e5d4c +\d+ B +\d+\.\d\ds +\d+\.\d\ds +Installed$')
+
+    def test_duplicate_bundles(self):
+        self.write_manifest("""
+            bundles = [
+              { bundle = "eslite" },
+              { bundle = "visualizer", scale = 2 },
+              { bundle = "eslite" }
+            ]
+            """)
+        resolve_v2_mock = MagicMock(side_effect=lambda args, bundle, configuration:
+                                    self.resolved('{}-v1-digest.zip'.format(bundle)))
+        bundle_ids = {'visualizer-v1-digest.zip': 'a1b2c3d4e5f6', 'eslite-v1-digest.zip': 'f6e5d4c3b2a1'}
+
+        def post_bundle(args, multipart):
+            file_name = [name for field, (name, file) in multipart.fields if field == 'bundle'][0]
+            return {'bundleId': bundle_ids[file_name]}
+
+        post_bundle_mock = MagicMock(side_effect=post_bundle)
+        wait_for_installations_mock = MagicMock()
+        stdout = MagicMock()
+
+        input_args = MagicMock(**self.default_args)
+        with patch('conductr_cli.conduct_load.resolve_v2', resolve_v2_mock), \
+                patch('conductr_cli.conduct_load.post_bundle', post_bundle_mock), \
+                patch('conductr_cli.bundle_installation.wait_for_installations', wait_for_installations_mock), \
+                patch('conductr_cli.bundle_scale.wait_for_scales', MagicMock()), \
+                patch('requests.Session.put', self.respond_with(200, '{"bundleId": "a1b2c3d4e5f6"}')):
+            logging_setup.configure_logging(input_args, stdout)
+            result = conduct_load_batch.load_batch(input_args)
+
+        self.assertTrue(result)
+        self.assertEqual(2, resolve_v2_mock.call_count)
+        self.assertEqual(2, post_bundle_mock.call_count)
+        wait_for_installations_mock.assert_called_once_with(['f6e5d4c3b2a1', 'a1b2c3d4e5f6'], input_args)
+
+        lines = self.output(stdout).splitlines()
+        self.assertRegex(lines[-4], r'^eslite +f6e5d4c +\d+ B +\d+\.\d\ds +\d+\.\d\ds +Installed$')
+        self.assertRegex(lines[-3], r'^visualizer +a1b2c3d +\d+ B +\d+\.\d\ds +\d+\.\d\ds +Running \(2\)$')
+        self.assertRegex(lines[-2], r'^eslite +f6e5d4c +\d+\.\d\ds +Installed$')
+        self.assertRegex(lines[-1], r'^Loaded 3 of 3 bundles')
+
+    def test_failed_bundle(self):
+        def resolve_v2(args, bundle, configuration):
+            if bundle == 'eslite':
+                raise BundleResolutionError('eslite')
+            return self.resolved('visualizer-v1-digest.zip')
+
+        wait_for_installations_mock = MagicMock()
+        stdout = MagicMock()
+
+        input_args = MagicMock(**dict(self.default_args, no_wait=True))
+        with patch('conductr_cli.conduct_load.resolve_v2', MagicMock(side_effect=resolve_v2)), \
+                patch('conductr_cli.conduct_load.post_bundle', MagicMock(return_value={'bundleId': 'a1b2c3d4e5f6'})), \
+                patch('conductr_cli.bundle_installation.wait_for_installations', wait_for_installations_mock):
+            logging_setup.configure_logging(input_args, stdout)
+            result = conduct_load_batch.load_batch(input_args)
+
+        self.assertFalse(result)
+        wait_for_installations_mock.assert_not_called()
+
+        lines = self.output(stdout).splitlines()
+        self.assertRegex(lines[-3], r'^visualizer +a1b2c3d +\d+ B +\d+\.\d\ds +\d+\.\d\ds +Loaded$')
+        self.assertRegex(lines[-2], r'^eslite +\d+\.\d\ds +Unable to resolve: eslite$')
+        self.assertRegex(lines[-1], r'^Loaded 1 of 2 bundles, \d+ B in \d+\.\d\ds \(.+/s\)$')
+
+    def test_already_loaded(self):
+        stdout = MagicMock()
+        self.write_manifest('{"bundles": [{"bundle": "eslite"}]}')
+        post_bundle_mock = MagicMock()
+
+        input_args = MagicMock(**dict(self.default_args, no_wait=True))
+        with patch('conductr_cli.conduct_load.resolve_v2', MagicMock(return_value=self.resolved('eslite.zip'))), \
+                patch('conductr_cli.conduct_load.find_loaded_bundle', MagicMock(return_value='a1b2c3d4e5f6')), \
+                patch('conductr_cli.conduct_load.post_bundle', post_bundle_mock):
+            logging_setup.configure_logging(input_args, stdout)
+            result = conduct_load_batch.load_batch(input_args)
+
+        self.assertTrue(result)
+        post_bundle_mock.assert_not_called()
+        self.assertRegex(self.output(stdout).splitlines()[-2], r'^eslite +a1b2c3d +\d+\.\d\ds +\d+\.\d\ds +Already loaded$')
+
+    def test_installation_timeout(self):
+        stdout = MagicMock()
+        stderr = MagicMock()
+        self.write_manifest('{"bundles": [{"bundle": "eslite"}]}')
+
+        input_args = MagicMock(**self.default_args)
+        with patch('conductr_cli.conduct_load.resolve_v2', MagicMock(return_value=self.resolved('eslite.zip'))), \
+                patch('conductr_cli.conduct_load.post_bundle', MagicMock(return_value={'bundleId': 'a1b2c3d4e5f6'})), \
+                patch('conductr_cli.bundle_installation.wait_for_installations',
+                      MagicMock(side_effect=WaitTimeoutError('Bundles a1b2c3d4e5f6 waiting to be installed'))):
+            logging_setup.configure_logging(input_args, stdout, stderr)
+            result = conduct_load_batch.load_batch(input_args)
+
+        self.assertFalse(result)
+        self.assertRegex(self.output(stdout).splitlines()[-2], r' Loaded$')
+        self.assertEqual(as_error('Error: Timed out: Bundles a1b2c3d4e5f6 waiting to be installed\n'),
+                         self.output(stderr))
+
+    def test_malformed_manifest(self):
+        stderr = MagicMock()
+        self.write_manifest('bundles = [{ configuration = "visualizer-config" }]')
+
+        input_args = MagicMock(**self.default_args)
+        logging_setup.configure_logging(input_args, err_output=stderr)
+        result = conduct_load_batch.load_batch(input_args)
+
+        self.assertFalse(result)
+        self.assertEqual(
+            as_error(strip_margin("""|Error: Problem with the manifest: Each bundle of {} requires a `bundle`
+                                     |""".format(self.manifest_file))),
+            self.output(stderr))
+
+    def test_unparseable_manifest(self):
+        stderr = MagicMock()
+        self.write_manifest('bundles = [{ bundle = "visualizer" ')
+
+        input_args = MagicMock(**self.default_args)
+        logging_setup.configure_logging(input_args, err_output=stderr)
+        result = conduct_load_batch.load_batch(input_args)
+
+        self.assertFalse(result)
+        self.assertEqual(
+            as_error('Error: Problem with the manifest: Unable to parse {}: '
+                     'Expected "}}" (at char 35), (line:1, col:36)\n'.format(self.manifest_file)),
+            self.output(stderr))
+
+    def test_invalid_scale(self):
+        stderr = MagicMock()
+        self.write_manifest('bundles = [{ bundle = "visualizer", scale = "two" }]')
+
+        input_args = MagicMock(**self.default_args)
+        logging_setup.configure_logging(input_args, err_output=stderr)
+        result = conduct_load_batch.load_batch(input_args)
+
+        self.assertFalse(result)
+        self.assertEqual(
+            as_error('Error: Problem with the manifest: The scale of visualizer in {} must be a positive integer\n'
+                     .format(self.manifest_file)),
+            self.output(stderr))
+
+    def test_missing_manifest(self):
+        stderr = MagicMock()
+        os.remove(self.manifest_file)
+
+        input_args = MagicMock(**self.default_args)
+        logging_setup.configure_logging(input_args, err_output=stderr)
+        result = conduct_load_batch.load_batch(input_args)
+
+        self.assertFalse(result)
+        self.assertEqual(as_error('Error: File not found: {}\n'.format(self.manifest_file)), self.output(stderr))
+
+    def test_api_version_1(self):
+        stderr = MagicMock()
+
+        input_args = MagicMock(**dict(self.default_args, api_version='1'))
+        logging_setup.configure_logging(input_args, err_output=stderr)
+        result = conduct_load_batch.load_batch(input_args)
+
+        self.assertFalse(result)
+        self.assertEqual(
+            as_error('Error: Loading bundles from a manifest is only available for v2 onwards of ConductR\n'),
+            self.output(stderr))
+
+
+class TestFormatSize(CliTestCase):
+    def test_format_size(self):
+        self.assertEqual(['512 B', '1.5 KiB', '2.0 MiB', '3.0 GiB'],
+                         [conduct_load_batch.format_size(size) for size in [512, 1536, 2 * 1024 ** 2, 3 * 1024 ** 3]])
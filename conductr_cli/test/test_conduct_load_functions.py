@@ -1,10 +1,14 @@
 from unittest import TestCase
 from unittest.mock import call, patch, MagicMock
-from conductr_cli import conduct_load
+from conductr_cli import conduct_load, constants
+from conductr_cli.test.cli_test_case import create_temp_bundle
+from dcos.errors import DCOSHTTPException
+from requests.exceptions import ConnectionError
+from requests_toolbelt.multipart.decoder import MultipartDecoder
 from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
 
-import datetime
 import io
+import shutil
 
 
 class TestCommonFunctions(TestCase):
@@ -75,53 +79,57 @@ class TestCommonFunctions(TestCase):
         cache_dir = '/home/user/.conductr/cache'
         recently_loaded_bundle = '{}/reactive-maps-frontend-v1-recent.zip'.format(cache_dir)
         files_in_cache = [
-            '{}/reactive-maps-frontend-v1-oldest.zip'.format(cache_dir),
-            '{}/reactive-maps-frontend-v1-older.zip'.format(cache_dir),
+            recently_loaded_bundle,
             '{}/reactive-maps-frontend-v1-old.zip'.format(cache_dir),
-            recently_loaded_bundle
+            '{}/reactive-maps-frontend-v1-older.zip'.format(cache_dir),
+            '{}/reactive-maps-frontend-v1-oldest.zip'.format(cache_dir)
         ]
-        glob_mock = MagicMock(return_value=files_in_cache)
-        is_same_path_mock = MagicMock(side_effect=[False, False, False, True])
-        isfile_mock = MagicMock(return_value=True)
-
-        today = datetime.date.today()
-        yesterday = today - datetime.timedelta(1)
-        last_week = today - datetime.timedelta(7)
-        last_month = today - datetime.timedelta(30)
-        getmtime_mock = MagicMock(side_effect=[last_month, last_week, yesterday])
-
+        find_files_mock = MagicMock(return_value=files_in_cache)
         remove_mock = MagicMock()
+        evict_mock = MagicMock()
 
-        with patch('glob.glob', glob_mock), \
-                patch('os.path.isfile', isfile_mock), \
-                patch('os.path.getmtime', getmtime_mock), \
-                patch('os.remove', remove_mock), \
-                patch('conductr_cli.conduct_load.is_same_path', is_same_path_mock):
+        with patch('conductr_cli.resolve_cache.find_files', find_files_mock), \
+                patch('conductr_cli.resolve_cache.remove', remove_mock), \
+                patch('conductr_cli.resolve_cache.evict', evict_mock):
             conduct_load.cleanup_old_bundles(cache_dir, 'reactive-maps-frontend-v1-recent.zip',
                                              excluded=recently_loaded_bundle)
 
-        glob_mock.assert_called_with('{}/*.zip'.format(cache_dir))
-        self.assertEqual(isfile_mock.call_args_list, [
-            call('{}/reactive-maps-frontend-v1-oldest.zip'.format(cache_dir)),
-            call('{}/reactive-maps-frontend-v1-older.zip'.format(cache_dir)),
-            call('{}/reactive-maps-frontend-v1-old.zip'.format(cache_dir)),
-            call(recently_loaded_bundle)
-        ])
-        self.assertEqual(is_same_path_mock.call_args_list, [
-            call('{}/reactive-maps-frontend-v1-oldest.zip'.format(cache_dir), recently_loaded_bundle),
-            call('{}/reactive-maps-frontend-v1-older.zip'.format(cache_dir), recently_loaded_bundle),
-            call('{}/reactive-maps-frontend-v1-old.zip'.format(cache_dir), recently_loaded_bundle),
-            call(recently_loaded_bundle, recently_loaded_bundle)
-        ])
-        self.assertEqual(getmtime_mock.call_args_list, [
-            call('{}/reactive-maps-frontend-v1-oldest.zip'.format(cache_dir)),
-            call('{}/reactive-maps-frontend-v1-older.zip'.format(cache_dir)),
-            call('{}/reactive-maps-frontend-v1-old.zip'.format(cache_dir))
-        ])
+        find_files_mock.assert_called_once_with(cache_dir, 'reactive-maps-frontend', 'v1')
         self.assertEqual(remove_mock.call_args_list, [
-            call('{}/reactive-maps-frontend-v1-oldest.zip'.format(cache_dir)),
-            call('{}/reactive-maps-frontend-v1-older.zip'.format(cache_dir))
+            call('{}/reactive-maps-frontend-v1-older.zip'.format(cache_dir)),
+            call('{}/reactive-maps-frontend-v1-oldest.zip'.format(cache_dir))
         ])
+        evict_mock.assert_called_once_with(cache_dir, constants.DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE,
+                                           excluded=[recently_loaded_bundle])
+
+    def test_cleanup_old_bundles_without_compatibility_version(self):
+        cache_dir = '/home/user/.conductr/cache'
+        digest = 'e' * 64
+        recently_loaded_file = '{}/my-config-{}.zip'.format(cache_dir, digest)
+        find_files_mock = MagicMock(return_value=[recently_loaded_file])
+
+        with patch('conductr_cli.resolve_cache.find_files', find_files_mock), \
+                patch('conductr_cli.resolve_cache.remove', MagicMock()), \
+                patch('conductr_cli.resolve_cache.evict', MagicMock()):
+            conduct_load.cleanup_old_bundles(cache_dir, 'my-config-{}.zip'.format(digest),
+                                             excluded=recently_loaded_file)
+
+        find_files_mock.assert_called_once_with(cache_dir, 'my-config', None)
+
+    def test_cleanup_old_bundles_with_configuration(self):
+        cache_dir = '/home/user/.conductr/cache'
+        recently_loaded_bundle = '{}/reactive-maps-frontend-v1-recent.zip'.format(cache_dir)
+        configuration_file = '{}/reactive-maps-frontend-config.zip'.format(cache_dir)
+        evict_mock = MagicMock()
+
+        with patch('conductr_cli.resolve_cache.find_files', MagicMock(return_value=[recently_loaded_bundle])), \
+                patch('conductr_cli.resolve_cache.remove', MagicMock()), \
+                patch('conductr_cli.resolve_cache.evict', evict_mock):
+            conduct_load.cleanup_old_bundles(cache_dir, 'reactive-maps-frontend-v1-recent.zip',
+                                             excluded=recently_loaded_bundle, configuration_file=configuration_file)
+
+        evict_mock.assert_called_once_with(cache_dir, constants.DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE,
+                                           excluded=[recently_loaded_bundle, configuration_file])
 
     def test_is_same_path(self):
         file_a = "path-a.zip"
@@ -139,3 +147,119 @@ class TestCommonFunctions(TestCase):
             call(file_a), call(file_b),
             call(file_a), call(file_b)
         ])
+
+
+class TestFindLoadedBundle(TestCase):
+    bundle_digest = 'a' * 64
+    configuration_digest = 'b' * 64
+
+    args = MagicMock(dcos_mode=False, scheme='http', host='127.0.0.1', port=9005, base_path='/', api_version='2',
+                     conductr_auth=None, server_verification_file=None)
+
+    def files(self):
+        return [
+            ('bundleConf', ('bundle.conf', io.StringIO('name = test-bundle'))),
+            ('bundle', ('visualizer-v1-{}.zip'.format(self.bundle_digest), io.BytesIO(b'bundle'))),
+            ('configuration', ('config-{}.zip'.format(self.configuration_digest), io.BytesIO(b'config')))
+        ]
+
+    def test_loaded(self):
+        bundle_id = '{}-{}'.format(self.bundle_digest, self.configuration_digest)
+        response = MagicMock(status_code=200, text='[{{"bundleId": "{}"}}]'.format(bundle_id))
+
+        with patch('conductr_cli.conduct_request.conditional_get', MagicMock(return_value=response)):
+            self.assertEqual(conduct_load.find_loaded_bundle(self.args, self.files()), bundle_id)
+
+    def test_not_loaded(self):
+        response = MagicMock(status_code=200, text='[{{"bundleId": "{}"}}]'.format(self.bundle_digest))
+
+        with patch('conductr_cli.conduct_request.conditional_get', MagicMock(return_value=response)):
+            self.assertIsNone(conduct_load.find_loaded_bundle(self.args, self.files()))
+
+    def test_connection_error(self):
+        with patch('conductr_cli.conduct_request.conditional_get', MagicMock(side_effect=ConnectionError('refused'))):
+            self.assertIsNone(conduct_load.find_loaded_bundle(self.args, self.files()))
+
+    def test_dcos_http_error(self):
+        args = MagicMock(dcos_mode=True, scheme='http', host='127.0.0.1', port=9005, base_path='/', api_version='2',
+                         conductr_auth=None, server_verification_file=None)
+        error = DCOSHTTPException(MagicMock(status_code=500, reason='Internal Server Error'))
+
+        with patch('conductr_cli.conduct_request.conditional_get', MagicMock(side_effect=error)):
+            self.assertIsNone(conduct_load.find_loaded_bundle(args, self.files()))
+
+    def test_upload_skipped(self):
+        files = self.files()
+        post_bundle_mock = MagicMock()
+
+        with patch('conductr_cli.conduct_load.find_loaded_bundle', MagicMock(return_value='a1b2c3')), \
+                patch('conductr_cli.conduct_load.post_bundle', post_bundle_mock):
+            self.assertEqual(conduct_load.upload(self.args, files), {'bundleId': 'a1b2c3'})
+
+        post_bundle_mock.assert_not_called()
+        self.assertTrue(files[2][1][1].closed)
+
+
+class TestStreamV2(TestCase):
+
+    def setUp(self):  # noqa
+        self.tmpdir, self.bundle_file = create_temp_bundle('name = test-bundle')
+        with open(self.bundle_file, 'rb') as f:
+            self.bundle_content = f.read()
+        self.args = MagicMock(dcos_mode=False, scheme='http', host='127.0.0.1', port=9005, base_path='/',
+                              api_version='2', conductr_auth=None, server_verification_file=None,
+                              custom_settings=None, resolve_cache_dir=self.tmpdir, offline_mode=False,
+                              bundle='http://some-host/bundle.zip', configuration=None)
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.tmpdir)
+
+    def test_stream(self):
+        download = MagicMock(read=io.BytesIO(self.bundle_content).read, bundle_conf='name = test-bundle')
+        parts = []
+
+        def post_bundle(args, multipart):
+            body = b''.join(multipart)
+            parts.extend((part.headers[b'Content-Disposition'], part.content)
+                         for part in MultipartDecoder(body, multipart.content_type).parts)
+            return {'bundleId': 'a1b2c3'}
+
+        with patch('conductr_cli.resolver.stream_bundle',
+                   MagicMock(return_value=('bundle.zip', self.bundle_file, download))), \
+                patch('conductr_cli.conduct_load.post_bundle', MagicMock(side_effect=post_bundle)):
+            result = conduct_load.stream_v2(self.args)
+
+        self.assertEqual(('bundle.zip', self.bundle_file, None, {'bundleId': 'a1b2c3'}), result)
+        self.assertEqual([(b'form-data; name="bundleConf"; filename="bundle.conf"', b'name = test-bundle'),
+                          (b'form-data; name="bundle"; filename="bundle.zip"', self.bundle_content)],
+                         parts)
+        download.close.assert_called_once_with()
+
+    def test_already_loaded(self):
+        bundle_file_name = 'bundle-v1-{}.zip'.format('a' * 64)
+        download = MagicMock(bundle_conf='name = test-bundle')
+        post_bundle_mock = MagicMock()
+
+        with patch('conductr_cli.resolver.stream_bundle',
+                   MagicMock(return_value=(bundle_file_name, self.bundle_file, download))), \
+                patch('conductr_cli.conduct_load.find_loaded_bundle', MagicMock(return_value='a' * 64)), \
+                patch('conductr_cli.conduct_load.post_bundle', post_bundle_mock):
+            result = conduct_load.stream_v2(self.args)
+
+        self.assertEqual((bundle_file_name, self.bundle_file, None, {'bundleId': 'a' * 64}), result)
+        post_bundle_mock.assert_not_called()
+        download.read.assert_not_called()
+        download.close.assert_called_once_with()
+
+    def test_cached(self):
+        upload_mock = MagicMock(return_value={'bundleId': 'a1b2c3'})
+
+        with patch('conductr_cli.resolver.stream_bundle',
+                   MagicMock(return_value=('bundle.zip', self.bundle_file, None))), \
+                patch('conductr_cli.conduct_load.upload', upload_mock):
+            result = conduct_load.stream_v2(self.args)
+
+        self.assertEqual(('bundle.zip', self.bundle_file, None, {'bundleId': 'a1b2c3'}), result)
+        files = upload_mock.call_args[0][1]
+        self.assertEqual(['bundleConf', 'bundle'], [field for field, value in files])
+        conduct_load.close_files(files)
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 from conductr_cli.conduct_main import build_parser, get_cli_parameters
+from conductr_cli.constants import DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE
 from argparse import Namespace
 import os
 
@@ -79,6 +80,27 @@ class TestConduct(TestCase):
         self.assertEqual(args.wait_timeout, 60)
         self.assertEqual(args.bundle, 'path-to-bundle')
         self.assertEqual(args.configuration, 'path-to-conf')
+        self.assertFalse(args.stream)
+        self.assertFalse(args.timings)
+
+    def test_parser_load_with_stream(self):
+        args = self.parser.parse_args('load --stream path-to-bundle'.split())
+
+        self.assertEqual(args.func.__name__, 'load')
+        self.assertTrue(args.stream)
+
+    def test_parser_load_with_timings(self):
+        args = self.parser.parse_args('load --timings visualizer'.split())
+
+        self.assertEqual(args.bundle, 'visualizer')
+        self.assertTrue(args.timings)
+        self.assertEqual(args.timings_format, 'text')
+
+        args = self.parser.parse_args('load --timings --timings-format json visualizer'.split())
+
+        self.assertEqual(args.bundle, 'visualizer')
+        self.assertTrue(args.timings)
+        self.assertEqual(args.timings_format, 'json')
 
     def test_parser_load_with_custom_resolve_cache_dir(self):
         args = self.parser.parse_args('load --resolve-cache-dir /somewhere path-to-bundle path-to-conf'.split())
@@ -97,6 +119,22 @@ class TestConduct(TestCase):
         self.assertEqual(args.configuration, 'path-to-conf')
         self.assertFalse(args.quiet)
 
+    def test_parser_cache(self):
+        args = self.parser.parse_args('cache'.split())
+
+        self.assertEqual(args.func.__name__, 'cache')
+        self.assertFalse(args.verify)
+        self.assertFalse(args.prune)
+        self.assertEqual(args.max_size, DEFAULT_BUNDLE_RESOLVE_CACHE_MAX_SIZE)
+
+    def test_parser_cache_prune(self):
+        args = self.parser.parse_args('cache --verify --prune --max-size 1024 --resolve-cache-dir /somewhere'.split())
+
+        self.assertTrue(args.verify)
+        self.assertTrue(args.prune)
+        self.assertEqual(args.max_size, 1024)
+        self.assertEqual(args.resolve_cache_dir, '/somewhere')
+
     def test_parser_run(self):
         args = self.parser.parse_args('run --scale 5 path-to-bundle'.split())
 
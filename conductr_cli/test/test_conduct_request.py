@@ -1,6 +1,15 @@
 from unittest import TestCase
-from unittest.mock import patch, MagicMock
+from unittest.mock import call, patch, MagicMock
 from conductr_cli import conduct_request
+from conductr_cli.exceptions import CircuitOpenError
+from dcos import http
+from dcos.errors import DCOSException, DCOSHTTPException
+from requests.auth import HTTPBasicAuth
+import os
+import requests
+import shutil
+import tempfile
+import time
 
 
 class TestRequest(TestCase):
@@ -13,15 +22,15 @@ class TestRequest(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.get', dcos_http_mock), \
-                patch('requests.get', requests_http_mock):
+                patch('requests.Session.get', requests_http_mock):
             result = conduct_request.get(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(requests_http_response, result)
 
@@ -33,15 +42,15 @@ class TestRequest(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.post', dcos_http_mock), \
-                patch('requests.post', requests_http_mock):
+                patch('requests.Session.post', requests_http_mock):
             result = conduct_request.post(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(requests_http_response, result)
 
@@ -53,15 +62,15 @@ class TestRequest(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.put', dcos_http_mock), \
-                patch('requests.put', requests_http_mock):
+                patch('requests.Session.put', requests_http_mock):
             result = conduct_request.put(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(requests_http_response, result)
 
@@ -73,15 +82,15 @@ class TestRequest(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.delete', dcos_http_mock), \
-                patch('requests.delete', requests_http_mock):
+                patch('requests.Session.delete', requests_http_mock):
             result = conduct_request.delete(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(requests_http_response, result)
 
@@ -100,15 +109,15 @@ class TestRequestDcosMode(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.get', dcos_http_mock), \
-                patch('requests.get', requests_http_mock):
+                patch('requests.Session.get', requests_http_mock):
             result = conduct_request.get(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(dcos_http_response, result)
 
@@ -120,15 +129,15 @@ class TestRequestDcosMode(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.post', dcos_http_mock), \
-                patch('requests.post', requests_http_mock):
+                patch('requests.Session.post', requests_http_mock):
             result = conduct_request.post(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(dcos_http_response, result)
 
@@ -140,15 +149,15 @@ class TestRequestDcosMode(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.put', dcos_http_mock), \
-                patch('requests.put', requests_http_mock):
+                patch('requests.Session.put', requests_http_mock):
             result = conduct_request.put(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(dcos_http_response, result)
 
@@ -160,15 +169,15 @@ class TestRequestDcosMode(TestCase):
         enriched_args = {'enriched': 'args'}
         enrich_args_mock = MagicMock(return_value=enriched_args)
 
-        dcos_http_response = 'dcos_http_response'
+        dcos_http_response = MagicMock(status_code=200)
         dcos_http_mock = MagicMock(return_value=dcos_http_response)
 
-        requests_http_response = 'requests_http_response'
+        requests_http_response = MagicMock(status_code=200)
         requests_http_mock = MagicMock(return_value=requests_http_response)
 
         with patch('conductr_cli.conduct_request.enrich_args', enrich_args_mock), \
                 patch('dcos.http.delete', dcos_http_mock), \
-                patch('requests.delete', requests_http_mock):
+                patch('requests.Session.delete', requests_http_mock):
             result = conduct_request.delete(self.dcos_mode, self.host, self.url, **self.kwargs)
             self.assertEqual(dcos_http_response, result)
 
@@ -224,3 +233,336 @@ class TestEnrichKwargs(TestCase):
             'auth': self.auth
         }
         self.assertEqual(expected_result, result)
+
+
+class TestGetSession(TestCase):
+    auth = ('username', 'password')
+    verify = '/path/to/pem.file'
+
+    def setUp(self):  # noqa
+        conduct_request.close_sessions()
+
+    def tearDown(self):  # noqa
+        conduct_request.close_sessions()
+
+    def test_reuse_session_for_same_endpoint(self):
+        session_1 = conduct_request.get_session('https://10.0.0.1:9005/bundles', auth=self.auth, verify=self.verify)
+        session_2 = conduct_request.get_session('https://10.0.0.1:9005/bundles/events', auth=self.auth,
+                                                verify=self.verify)
+        self.assertIs(session_1, session_2)
+
+    def test_separate_session_per_endpoint_and_credentials(self):
+        session = conduct_request.get_session('https://10.0.0.1:9005/bundles', auth=self.auth, verify=self.verify)
+        self.assertIsNot(session, conduct_request.get_session('https://10.0.0.2:9005/bundles', auth=self.auth,
+                                                              verify=self.verify))
+        self.assertIsNot(session, conduct_request.get_session('http://10.0.0.1:9005/bundles', auth=self.auth,
+                                                              verify=self.verify))
+        self.assertIsNot(session, conduct_request.get_session('https://10.0.0.1:9006/bundles', auth=self.auth,
+                                                              verify=self.verify))
+        self.assertIsNot(session, conduct_request.get_session('https://10.0.0.1:9005/bundles', verify=self.verify))
+        self.assertIsNot(session, conduct_request.get_session('https://10.0.0.1:9005/bundles', auth=self.auth))
+
+    def test_unhashable_auth(self):
+        session = conduct_request.get_session('https://10.0.0.1:9005/bundles',
+                                              auth=HTTPBasicAuth('username', 'password'))
+        self.assertIs(session, conduct_request.get_session('https://10.0.0.1:9005/bundles',
+                                                           auth=HTTPBasicAuth('username', 'password')))
+        self.assertIsNot(session, conduct_request.get_session('https://10.0.0.1:9005/bundles',
+                                                              auth=HTTPBasicAuth('username', 'other')))
+        self.assertIsNot(session, conduct_request.get_session('https://10.0.0.1:9005/bundles', auth=self.auth))
+
+    def test_pool_size(self):
+        session = conduct_request.get_session('http://10.0.0.1:9005/bundles', pool_connections=2, pool_maxsize=20)
+        adapter = session.get_adapter('http://10.0.0.1:9005/bundles')
+        self.assertEqual(2, adapter._pool_connections)
+        self.assertEqual(20, adapter._pool_maxsize)
+
+
+class TestConditionalGet(TestCase):
+    host = '10.0.0.1'
+    url = 'http://10.0.0.1:9005/bundles'
+    text = '[{"bundleId": "a101449418187d92c789d1adc240b6d6"}]'
+
+    def setUp(self):  # noqa
+        conduct_request.clear_response_cache()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):  # noqa
+        conduct_request.clear_response_cache()
+        shutil.rmtree(self.tmpdir)
+
+    @staticmethod
+    def create_response(status_code, text='', headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = text.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.headers.update(headers or {})
+        return response
+
+    def test_revalidate_with_etag(self):
+        response = self.create_response(200, self.text, {'ETag': '"1"'})
+        http_method = MagicMock(side_effect=[response, self.create_response(304)])
+
+        with patch('requests.Session.get', http_method):
+            first = conduct_request.conditional_get(False, self.host, self.url, cache_file=None)
+            first_json = conduct_request.response_json(first)
+            second = conduct_request.conditional_get(False, self.host, self.url, cache_file=None)
+            second_json = conduct_request.response_json(second)
+
+        self.assertIs(response, first)
+        self.assertIs(response, second)
+        self.assertEqual([{'bundleId': 'a101449418187d92c789d1adc240b6d6'}], first_json)
+        self.assertIs(first_json, second_json)
+        self.assertEqual([
+            call(self.url, headers={'Host': self.host}),
+            call(self.url, headers={'Host': self.host, 'If-None-Match': '"1"'})
+        ], http_method.call_args_list)
+
+    def test_revalidate_in_dcos_mode(self):
+        responses = [self.create_response(200, self.text, {'ETag': '"1"'}), self.create_response(304)]
+
+        def dcos_get(url, is_success=http._default_is_success, **kwargs):
+            response = responses.pop(0)
+            if not is_success(response.status_code):
+                raise DCOSHTTPException(response)
+            return response
+
+        with patch('dcos.http.get', MagicMock(side_effect=dcos_get)) as dcos_get_mock, \
+                patch('conductr_cli.dcos_auth.get_cached_auth', MagicMock(return_value=(False, None))), \
+                patch('conductr_cli.dcos_auth.save_auth_scheme'):
+            first = conduct_request.conditional_get(True, self.host, self.url, cache_file=None)
+            second = conduct_request.conditional_get(True, self.host, self.url, cache_file=None)
+
+        self.assertIs(first, second)
+        self.assertEqual('"1"', dcos_get_mock.call_args[1]['headers']['If-None-Match'])
+
+    def test_replace_modified_response(self):
+        modified_text = '[]'
+        http_method = MagicMock(side_effect=[
+            self.create_response(200, self.text, {'Last-Modified': 'Mon, 17 Oct 2016 10:00:00 GMT'}),
+            self.create_response(200, modified_text, {'Last-Modified': 'Mon, 17 Oct 2016 10:00:05 GMT'}),
+            self.create_response(304)
+        ])
+
+        with patch('requests.Session.get', http_method):
+            conduct_request.conditional_get(False, self.host, self.url, cache_file=None)
+            conduct_request.conditional_get(False, self.host, self.url, cache_file=None)
+            result = conduct_request.conditional_get(False, self.host, self.url, cache_file=None)
+
+        self.assertEqual([], conduct_request.response_json(result))
+        self.assertEqual(call(self.url, headers={'Host': self.host,
+                                                 'If-Modified-Since': 'Mon, 17 Oct 2016 10:00:05 GMT'}),
+                         http_method.call_args)
+
+    def test_no_validators(self):
+        http_method = MagicMock(side_effect=[self.create_response(200, self.text),
+                                             self.create_response(200, self.text)])
+
+        with patch('requests.Session.get', http_method):
+            conduct_request.conditional_get(False, self.host, self.url, cache_file=None)
+            conduct_request.conditional_get(False, self.host, self.url, cache_file=None)
+
+        self.assertEqual(call(self.url, headers={'Host': self.host}), http_method.call_args)
+
+    def test_persist_responses(self):
+        cache_file = os.path.join(self.tmpdir, 'http-cache.json')
+        http_method = MagicMock(side_effect=[self.create_response(200, self.text, {'ETag': '"1"'}),
+                                             self.create_response(304)])
+
+        with patch('requests.Session.get', http_method):
+            conduct_request.conditional_get(False, self.host, self.url, cache_file=cache_file)
+            conduct_request.clear_response_cache()
+            result = conduct_request.conditional_get(False, self.host, self.url, cache_file=cache_file)
+
+        self.assertEqual(200, result.status_code)
+        self.assertEqual(self.text, result.text)
+        self.assertEqual(call(self.url, headers={'Host': self.host, 'If-None-Match': '"1"'}), http_method.call_args)
+
+
+class TestRetry(TestCase):
+    host = '10.0.0.1'
+    url = 'http://10.0.0.1:9005/bundles'
+
+    def setUp(self):  # noqa
+        conduct_request.reset_circuit_breakers()
+
+    def tearDown(self):  # noqa
+        conduct_request.reset_circuit_breakers()
+
+    def test_retry_get(self):
+        response = MagicMock(status_code=200)
+        unavailable_response = MagicMock(status_code=503, reason='Service Unavailable')
+        http_method = MagicMock(side_effect=[requests.exceptions.ConnectionError('test reason'),
+                                             unavailable_response,
+                                             response])
+        sleep_mock = MagicMock()
+
+        with patch('requests.Session.get', http_method), patch('time.sleep', sleep_mock):
+            result = conduct_request.get(False, self.host, self.url)
+
+        self.assertEqual(response, result)
+        self.assertEqual(3, http_method.call_count)
+        self.assertEqual(2, sleep_mock.call_count)
+        unavailable_response.close.assert_called_once_with()
+
+    def test_retries_exhausted(self):
+        http_method = MagicMock(side_effect=requests.exceptions.ConnectionError('test reason'))
+        sleep_mock = MagicMock()
+
+        with patch('requests.Session.get', http_method), patch('time.sleep', sleep_mock):
+            self.assertRaises(requests.exceptions.ConnectionError, conduct_request.get, False, self.host, self.url)
+
+        self.assertEqual(4, http_method.call_count)
+        for delay, in [args for args, kwargs in sleep_mock.call_args_list]:
+            self.assertTrue(0 <= delay <= 8)
+
+    def test_no_retry_without_retry(self):
+        http_method = MagicMock(side_effect=requests.exceptions.ConnectionError('test reason'))
+
+        with patch('requests.Session.get', http_method):
+            self.assertRaises(requests.exceptions.ConnectionError, conduct_request.get, False, self.host, self.url,
+                              retry=False)
+
+        http_method.assert_called_once_with(self.url, headers={'Host': self.host})
+
+    def test_no_retry_upon_read_timeout(self):
+        http_method = MagicMock(side_effect=requests.exceptions.ReadTimeout('test reason'))
+        sleep_mock = MagicMock()
+
+        with patch('requests.Session.get', http_method), patch('time.sleep', sleep_mock):
+            self.assertRaises(requests.exceptions.ReadTimeout, conduct_request.get, False, self.host, self.url)
+
+        http_method.assert_called_once()
+        sleep_mock.assert_not_called()
+        self.assertEqual(1, conduct_request.get_circuit_breaker(self.url).failures)
+
+    def test_retry_upon_connect_timeout(self):
+        response = MagicMock(status_code=200)
+        http_method = MagicMock(side_effect=[requests.exceptions.ConnectTimeout('test reason'), response])
+
+        with patch('requests.Session.get', http_method), patch('time.sleep', MagicMock()):
+            result = conduct_request.get(False, self.host, self.url)
+
+        self.assertEqual(response, result)
+        self.assertEqual(2, http_method.call_count)
+
+    def test_retry_post_with_replayable_body(self):
+        response = MagicMock(status_code=200)
+        http_method = MagicMock(side_effect=[requests.exceptions.ConnectionError('test reason'), response])
+
+        with patch('requests.Session.post', http_method), patch('time.sleep', MagicMock()):
+            result = conduct_request.post(False, self.host, self.url, data=b'payload')
+
+        self.assertEqual(response, result)
+        self.assertEqual(2, http_method.call_count)
+
+    def test_no_retry_post_with_streamed_body(self):
+        http_method = MagicMock(side_effect=requests.exceptions.ConnectionError('test reason'))
+
+        with patch('requests.Session.post', http_method):
+            self.assertRaises(requests.exceptions.ConnectionError, conduct_request.post, False, self.host, self.url,
+                              data=MagicMock())
+
+        http_method.assert_called_once()
+
+    def test_no_retry_post_upon_unavailable(self):
+        response = MagicMock(status_code=503)
+        http_method = MagicMock(return_value=response)
+
+        with patch('requests.Session.post', http_method):
+            result = conduct_request.post(False, self.host, self.url, data=b'payload')
+
+        self.assertEqual(response, result)
+        http_method.assert_called_once()
+
+    def test_retry_dcos_get(self):
+        response = MagicMock(status_code=200)
+        unreachable = dcos_exception('URL [{}] is unreachable'.format(self.url),
+                                     requests.exceptions.ConnectionError('test reason'))
+        unavailable = DCOSHTTPException(MagicMock(status_code=503, reason='Service Unavailable'))
+        request_mock = MagicMock(side_effect=[unreachable, unavailable, response])
+        sleep_mock = MagicMock()
+
+        with patch('conductr_cli.dcos_auth.request', request_mock), patch('time.sleep', sleep_mock):
+            result = conduct_request.get(True, self.host, self.url)
+
+        self.assertEqual(response, result)
+        self.assertEqual(3, request_mock.call_count)
+        self.assertEqual(2, sleep_mock.call_count)
+        unavailable.response.close.assert_called_once_with()
+
+    def test_dcos_retries_exhausted(self):
+        unavailable = DCOSHTTPException(MagicMock(status_code=503, reason='Service Unavailable'))
+        request_mock = MagicMock(side_effect=unavailable)
+
+        with patch('conductr_cli.dcos_auth.request', request_mock), patch('time.sleep', MagicMock()):
+            self.assertRaises(DCOSHTTPException, conduct_request.get, True, self.host, self.url)
+
+        self.assertEqual(4, request_mock.call_count)
+        self.assertEqual(1, conduct_request.get_circuit_breaker(self.url).failures)
+
+    def test_no_retry_dcos_upon_read_timeout(self):
+        timed_out = dcos_exception('Request to URL [{}] timed out.'.format(self.url),
+                                   requests.exceptions.ReadTimeout('test reason'))
+        request_mock = MagicMock(side_effect=timed_out)
+        sleep_mock = MagicMock()
+
+        with patch('conductr_cli.dcos_auth.request', request_mock), patch('time.sleep', sleep_mock):
+            self.assertRaises(DCOSException, conduct_request.get, True, self.host, self.url)
+
+        request_mock.assert_called_once()
+        sleep_mock.assert_not_called()
+        self.assertEqual(1, conduct_request.get_circuit_breaker(self.url).failures)
+
+    def test_no_retry_dcos_upon_not_found(self):
+        not_found = DCOSHTTPException(MagicMock(status_code=404, reason='Not Found'))
+        request_mock = MagicMock(side_effect=not_found)
+
+        with patch('conductr_cli.dcos_auth.request', request_mock):
+            self.assertRaises(DCOSHTTPException, conduct_request.get, True, self.host, self.url)
+
+        request_mock.assert_called_once()
+        self.assertEqual(0, conduct_request.get_circuit_breaker(self.url).failures)
+
+    def test_open_circuit(self):
+        http_method = MagicMock(side_effect=requests.exceptions.ConnectionError('test reason'))
+
+        with patch('requests.Session.get', http_method), patch('time.sleep', MagicMock()):
+            for attempt in range(5):
+                self.assertRaises(requests.exceptions.ConnectionError, conduct_request.get, False, self.host,
+                                  self.url)
+            http_method.reset_mock()
+
+            self.assertRaises(CircuitOpenError, conduct_request.get, False, self.host, self.url)
+            self.assertRaises(CircuitOpenError, conduct_request.get, False, self.host,
+                              'http://10.0.0.1:9005/deployments/a1')
+            http_method.assert_not_called()
+
+            # Other endpoints are unaffected
+            http_method.side_effect = None
+            http_method.return_value = MagicMock(status_code=200)
+            conduct_request.get(False, '10.0.0.2', 'http://10.0.0.2:9005/bundles')
+
+    def test_close_circuit_after_reset_timeout(self):
+        response = MagicMock(status_code=200)
+        circuit_breaker = conduct_request.get_circuit_breaker(self.url)
+        circuit_breaker.failures = circuit_breaker.threshold
+        circuit_breaker.opened_at = time.monotonic() - circuit_breaker.reset_timeout
+
+        with patch('requests.Session.get', MagicMock(return_value=response)):
+            result = conduct_request.get(False, self.host, self.url)
+
+        self.assertEqual(response, result)
+        self.assertEqual((0, None), (circuit_breaker.failures, circuit_breaker.opened_at))
+
+
+def dcos_exception(message, cause):
+    # dcos.http raises its exception while handling the one of requests
+    try:
+        raise cause
+    except type(cause):
+        try:
+            raise DCOSException(message)
+        except DCOSException as e:
+            return e
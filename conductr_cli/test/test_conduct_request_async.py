@@ -0,0 +1,140 @@
+from unittest import TestCase
+from conductr_cli import conduct_request, conduct_request_async, timings
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import asyncio
+import json
+import threading
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # noqa
+        self.server.requests.append(('GET', self.path, self.headers['Host'], self.headers['Authorization']))
+
+        if self.path == '/bundles/events':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(b'event:bundleInstallationAdded\ndata:a1\n\n:heartbeat\n\nevent:bundleExecutionAdded\n'
+                             b'data:a1\n\n')
+            self.close_connection = True
+        elif self.path.startswith('/bundles'):
+            # Concurrent requests are held until all of them have arrived
+            self.server.barrier.wait(timeout=5)
+            self.respond(200, json.dumps([{'path': self.path}]).encode('utf-8'))
+        else:
+            self.respond(404, b'')
+
+    def do_POST(self):  # noqa
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append(('POST', self.path, self.headers['Host'], self.headers['Authorization']))
+        self.respond(200, json.dumps({'received': body.decode('utf-8')}).encode('utf-8'))
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestConductRequestAsync(TestCase):
+
+    def setUp(self):  # noqa
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = []
+        self.server.barrier = threading.Barrier(1)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05},
+                                              daemon=True)
+        self.server_thread.start()
+        self.host = '127.0.0.1'
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        self.loop = asyncio.new_event_loop()
+        conduct_request.reset_circuit_breakers()
+
+    def tearDown(self):  # noqa
+        self.loop.close()
+        self.server.shutdown()
+        self.server.server_close()
+        conduct_request.close_sessions()
+        conduct_request_async.shutdown_executor()
+
+    def test_concurrent_requests(self):
+        self.server.barrier = threading.Barrier(3)
+
+        async def get_all():
+            return await asyncio.gather(*[
+                conduct_request_async.get(False, self.host, '{}/bundles/{}'.format(self.url, bundle_id), timeout=5)
+                for bundle_id in ['a1', 'b2', 'c3']
+            ])
+
+        responses = self.loop.run_until_complete(get_all())
+
+        self.assertEqual([[{'path': '/bundles/a1'}], [{'path': '/bundles/b2'}], [{'path': '/bundles/c3'}]],
+                         [response.json() for response in responses])
+        self.assertEqual({self.host}, {host for method, path, host, auth in self.server.requests})
+
+    def test_enrich_args(self):
+        response = self.loop.run_until_complete(
+            conduct_request_async.post(False, self.host, '{}/bundles'.format(self.url), data='payload',
+                                       auth=('user', 'password'), verify=None, timeout=5))
+
+        self.assertEqual({'received': 'payload'}, response.json())
+        method, path, host, auth = self.server.requests[0]
+        self.assertEqual(('POST', '/bundles', self.host), (method, path, host))
+        self.assertTrue(auth.startswith('Basic '))
+
+    def test_reuse_pooled_connections(self):
+        async def get_twice():
+            await conduct_request_async.get(False, self.host, '{}/bundles'.format(self.url), timeout=5)
+            return await conduct_request_async.get(False, self.host, '{}/bundles'.format(self.url), timeout=5)
+
+        response = self.loop.run_until_complete(get_twice())
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(conduct_request.SESSIONS))
+
+    def test_not_found(self):
+        response = self.loop.run_until_complete(
+            conduct_request_async.get(False, self.host, '{}/unknown'.format(self.url), timeout=5))
+
+        self.assertEqual(404, response.status_code)
+
+    def test_attribute_requests_to_phase(self):
+        timings.reset()
+        timings.ENABLED = True
+
+        async def get_bundles():
+            with timings.phase('get bundles'):
+                await conduct_request_async.get(False, self.host, '{}/bundles'.format(self.url), timeout=5)
+
+        try:
+            self.loop.run_until_complete(get_bundles())
+            self.assertEqual(['get bundles'], [record['phase'] for record in timings.summary()['requests']])
+        finally:
+            timings.reset()
+            timings.ENABLED = False
+
+    def test_events(self):
+        async def read_events():
+            result = []
+            async with conduct_request_async.get_events(False, self.host, '{}/bundles/events'.format(self.url),
+                                                        reconnect_attempts=0, timeout=5) as events:
+                async for event in events:
+                    result.append((event.event, event.data))
+                return result, events.connection_count
+
+        result, connection_count = self.loop.run_until_complete(read_events())
+
+        self.assertEqual([('bundleInstallationAdded', 'a1'), (None, None), ('bundleExecutionAdded', 'a1')], result)
+        self.assertEqual(1, connection_count)
@@ -24,7 +24,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -41,7 +41,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -68,7 +68,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -90,7 +90,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -112,7 +112,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'long_ids': True})
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -135,7 +135,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'long_ids': True})
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -152,7 +152,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -170,7 +170,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
@@ -195,7 +195,7 @@ class TestConductServiceNamesCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**args)
-        with patch('requests.get', http_method):
+        with patch('requests.Session.get', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_service_names.service_names(input_args)
             self.assertTrue(result)
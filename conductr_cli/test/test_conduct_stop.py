@@ -54,7 +54,7 @@ class TestConductStopCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.put', http_method), \
+        with patch('requests.Session.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -74,7 +74,7 @@ class TestConductStopCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'verbose': True})
         input_args = MagicMock(**args)
-        with patch('requests.put', http_method), \
+        with patch('requests.Session.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -94,7 +94,7 @@ class TestConductStopCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'long_ids': True})
         input_args = MagicMock(**args)
-        with patch('requests.put', http_method), \
+        with patch('requests.Session.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -116,7 +116,7 @@ class TestConductStopCommand(CliTestCase):
         args.update({'cli_parameters': cli_parameters})
         input_args = MagicMock(**args)
 
-        with patch('requests.put', http_method), \
+        with patch('requests.Session.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -135,7 +135,7 @@ class TestConductStopCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.put', http_method):
+        with patch('requests.Session.put', http_method):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_stop.stop(input_args)
             self.assertFalse(result)
@@ -153,7 +153,7 @@ class TestConductStopCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.put', http_method):
+        with patch('requests.Session.put', http_method):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_stop.stop(input_args)
             self.assertFalse(result)
@@ -171,7 +171,7 @@ class TestConductStopCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.put', http_method), \
+        with patch('requests.Session.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_stop.stop(input_args)
@@ -199,7 +199,7 @@ class TestConductStopCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**args)
-        with patch('requests.put', http_method), \
+        with patch('requests.Session.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
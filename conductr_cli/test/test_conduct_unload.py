@@ -49,7 +49,7 @@ class TestConductUnloadCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.delete', http_method), \
+        with patch('requests.Session.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -70,7 +70,7 @@ class TestConductUnloadCommand(CliTestCase):
         args.update({'verbose': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.delete', http_method), \
+        with patch('requests.Session.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -91,7 +91,7 @@ class TestConductUnloadCommand(CliTestCase):
         args.update({'quiet': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.delete', http_method), \
+        with patch('requests.Session.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -113,7 +113,7 @@ class TestConductUnloadCommand(CliTestCase):
         args.update({'cli_parameters': cli_parameters})
         input_args = MagicMock(**args)
 
-        with patch('requests.delete', http_method), \
+        with patch('requests.Session.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -134,7 +134,7 @@ class TestConductUnloadCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'no_wait': True})
         input_args = MagicMock(**args)
-        with patch('requests.delete', http_method):
+        with patch('requests.Session.delete', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
             self.assertTrue(result)
@@ -149,7 +149,7 @@ class TestConductUnloadCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.delete', http_method):
+        with patch('requests.Session.delete', http_method):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_unload.unload(input_args)
             self.assertFalse(result)
@@ -167,7 +167,7 @@ class TestConductUnloadCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.delete', http_method):
+        with patch('requests.Session.delete', http_method):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_unload.unload(input_args)
             self.assertFalse(result)
@@ -192,7 +192,7 @@ class TestConductUnloadCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**args)
-        with patch('requests.delete', http_method), \
+        with patch('requests.Session.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -0,0 +1,156 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from conductr_cli import dcos_auth
+from dcos import http
+import requests
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+
+class TestRequest(TestCase):
+    url = 'https://10.0.0.1/service/conductr/bundles'
+    token = 'test-token'
+
+    def setUp(self):  # noqa
+        dcos_auth.AUTH_SCHEMES = None
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmpdir, 'settings', 'dcos-auth.json')
+
+    def tearDown(self):  # noqa
+        dcos_auth.AUTH_SCHEMES = None
+        shutil.rmtree(self.tmpdir)
+
+    def write_cache(self, expires, auth_scheme='acsjwt'):
+        os.makedirs(os.path.dirname(self.cache_file))
+        with open(self.cache_file, 'w') as f:
+            json.dump({'10.0.0.1': {'auth_scheme': auth_scheme, 'realm': auth_scheme, 'expires': expires}}, f)
+
+    def read_cache(self):
+        with open(self.cache_file, 'r') as f:
+            return json.load(f)
+
+    def test_discover_and_cache_auth_scheme(self):
+        response = MagicMock(status_code=200)
+        dcos_http_mock = MagicMock(return_value=response)
+
+        with patch('dcos.http.get', dcos_http_mock), \
+                patch.dict(http.AUTH_CREDS, {('10.0.0.1', 'acsjwt', 'acsjwt'): http.DCOSAcsAuth(self.token)}):
+            result = dcos_auth.request('get', self.url, cache_file=self.cache_file, cache_ttl=60,
+                                       headers={'Host': '10.0.0.1'})
+
+        self.assertEqual(response, result)
+        dcos_http_mock.assert_called_once_with(self.url, headers={'Host': '10.0.0.1'})
+
+        cache = self.read_cache()
+        self.assertEqual(['10.0.0.1'], list(cache.keys()))
+        self.assertEqual('acsjwt', cache['10.0.0.1']['auth_scheme'])
+        self.assertEqual('acsjwt', cache['10.0.0.1']['realm'])
+        self.assertTrue(time.time() < cache['10.0.0.1']['expires'] <= time.time() + 60)
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.cache_file).st_mode))
+
+    def test_use_cached_auth_scheme(self):
+        self.write_cache(time.time() + 60)
+        response = MagicMock(status_code=200)
+        request_mock = MagicMock(return_value=response)
+        dcos_http_mock = MagicMock()
+
+        with patch('dcos.http.get', dcos_http_mock), \
+                patch('dcos.http._request', request_mock), \
+                patch('dcos.http._verify_ssl', MagicMock(return_value=None)), \
+                patch('dcos.config.get_config_val', MagicMock(return_value=self.token)):
+            result = dcos_auth.request('get', self.url, cache_file=self.cache_file, headers={'Host': '10.0.0.1'})
+
+        self.assertEqual(response, result)
+        dcos_http_mock.assert_not_called()
+
+        method, url, is_success, timeout, auth, verify = request_mock.call_args[0]
+        self.assertEqual(('get', self.url, None, None), (method, url, timeout, verify))
+        self.assertEqual(self.token, auth.token)
+        self.assertEqual({'headers': {'Host': '10.0.0.1'}}, request_mock.call_args[1])
+
+    def test_cache_no_auth_scheme(self):
+        response = MagicMock(status_code=200)
+        response.request.headers = requests.structures.CaseInsensitiveDict({'Host': '10.0.0.1'})
+        dcos_http_mock = MagicMock(return_value=response)
+
+        with patch('dcos.http.get', dcos_http_mock), \
+                patch.dict(http.AUTH_CREDS, {('10.0.0.1', None, None): None}):
+            dcos_auth.request('get', self.url, cache_file=self.cache_file, headers={'Host': '10.0.0.1'})
+
+        cache = self.read_cache()
+        self.assertIsNone(cache['10.0.0.1']['auth_scheme'])
+        self.assertIsNone(cache['10.0.0.1']['realm'])
+
+    def test_use_cached_no_auth_scheme(self):
+        self.write_cache(time.time() + 60, auth_scheme=None)
+        response = MagicMock(status_code=200)
+        request_mock = MagicMock(return_value=response)
+        dcos_http_mock = MagicMock()
+
+        with patch('dcos.http.get', dcos_http_mock), \
+                patch('dcos.http._request', request_mock), \
+                patch('dcos.http._verify_ssl', MagicMock(return_value=None)):
+            result = dcos_auth.request('get', self.url, cache_file=self.cache_file)
+
+        self.assertEqual(response, result)
+        dcos_http_mock.assert_not_called()
+        method, url, is_success, timeout, auth, verify = request_mock.call_args[0]
+        self.assertIsNone(auth)
+
+    def test_not_cached_when_authenticated_without_retained_credentials(self):
+        response = MagicMock(status_code=201)
+        response.request.headers = {'Authorization': 'token=test-token'}
+
+        with patch('dcos.http.post', MagicMock(return_value=response)):
+            dcos_auth.request('post', self.url, cache_file=self.cache_file, data='{}')
+
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_rediscover_when_rejected(self):
+        self.write_cache(time.time() + 60)
+        response = MagicMock(status_code=200)
+        request_mock = MagicMock(return_value=MagicMock(status_code=401))
+        dcos_http_mock = MagicMock(return_value=response)
+
+        with patch('dcos.http.get', dcos_http_mock), \
+                patch('dcos.http._request', request_mock), \
+                patch('dcos.http._verify_ssl', MagicMock(return_value=None)), \
+                patch('dcos.config.get_config_val', MagicMock(return_value=self.token)):
+            result = dcos_auth.request('get', self.url, cache_file=self.cache_file)
+
+        self.assertEqual(response, result)
+        request_mock.assert_called_once()
+        dcos_http_mock.assert_called_once_with(self.url)
+        self.assertEqual({}, self.read_cache())
+
+    def test_rediscover_when_expired(self):
+        self.write_cache(time.time() - 1)
+        response = MagicMock(status_code=200)
+        request_mock = MagicMock()
+        dcos_http_mock = MagicMock(return_value=response)
+
+        with patch('dcos.http.get', dcos_http_mock), \
+                patch('dcos.http._request', request_mock):
+            result = dcos_auth.request('get', self.url, cache_file=self.cache_file)
+
+        self.assertEqual(response, result)
+        request_mock.assert_not_called()
+
+    def test_rediscover_for_streamed_body(self):
+        self.write_cache(time.time() + 60)
+        response = MagicMock(status_code=200)
+        request_mock = MagicMock()
+        dcos_http_mock = MagicMock(return_value=response)
+        multipart = MagicMock()
+
+        with patch('dcos.http.post', dcos_http_mock), \
+                patch('dcos.http._request', request_mock):
+            result = dcos_auth.request('post', self.url, cache_file=self.cache_file, data=multipart)
+
+        self.assertEqual(response, result)
+        request_mock.assert_not_called()
+        dcos_http_mock.assert_called_once_with(self.url, data=multipart)
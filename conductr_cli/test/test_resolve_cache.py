@@ -0,0 +1,163 @@
+from conductr_cli.test.cli_test_case import CliTestCase
+from conductr_cli import resolve_cache
+from unittest.mock import patch
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+class ResolveCacheTestCase(CliTestCase):
+
+    def setUp(self):  # noqa
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.content = b'bundle contents'
+        self.digest = hashlib.sha256(self.content).hexdigest()
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def write_file(self, file_name, content, mtime=None):
+        file_path = os.path.join(self.cache_dir, file_name)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(file_path, (mtime, mtime))
+        return file_path
+
+
+class TestResolveCache(ResolveCacheTestCase):
+
+    def test_record_digest(self):
+        file_path = self.write_file('bundle.zip', self.content)
+        self.assertIsNone(resolve_cache.recorded_digest(file_path))
+        # Reading a record doesn't create the index
+        self.assertFalse(os.path.exists(resolve_cache.index_path(self.cache_dir)))
+
+        resolve_cache.record_digest(file_path, self.digest)
+        self.assertEqual(self.digest, resolve_cache.recorded_digest(file_path))
+        self.assertEqual('600', oct(os.stat(resolve_cache.index_path(self.cache_dir)).st_mode)[-3:])
+
+        resolve_cache.remove_record(file_path)
+        self.assertIsNone(resolve_cache.recorded_digest(file_path))
+
+    def test_record_outdated_by_change(self):
+        file_path = self.write_file('bundle.zip', self.content)
+        resolve_cache.record_digest(file_path, self.digest)
+
+        self.write_file('bundle.zip', b'other contents', mtime=0)
+        self.assertIsNone(resolve_cache.recorded_digest(file_path))
+
+    def test_verify_cached_file(self):
+        file_path = self.write_file('bundle-v1-{}.zip'.format(self.digest), self.content)
+
+        self.assertTrue(resolve_cache.verify_cached_file(file_path))
+        self.assertEqual(self.digest, resolve_cache.recorded_digest(file_path))
+
+        # Once recorded, the digest is trusted rather than the file read again
+        with patch('conductr_cli.bundle_utils.hash_file') as hash_file_mock:
+            self.assertTrue(resolve_cache.verify_cached_file(file_path))
+        hash_file_mock.assert_not_called()
+
+    def test_verify_corrupted_cached_file(self):
+        file_path = self.write_file('bundle-v1-{}.zip'.format(self.digest), b'corrupted')
+        self.assertFalse(resolve_cache.verify_cached_file(file_path))
+
+    def test_verify_cached_file_without_digest(self):
+        file_path = self.write_file('bundle.zip', self.content)
+        self.assertTrue(resolve_cache.verify_cached_file(file_path))
+        self.assertIsNone(resolve_cache.recorded_digest(file_path))
+
+    def test_parse_file_name(self):
+        self.assertEqual(('reactive-maps-frontend', 'v1'),
+                         resolve_cache.parse_file_name('reactive-maps-frontend-v1-{}.zip'.format(self.digest)))
+        self.assertEqual(('visualizer', None), resolve_cache.parse_file_name('visualizer.zip'))
+        self.assertEqual(('my-config', None), resolve_cache.parse_file_name('my-config-{}.zip'.format(self.digest)))
+
+
+class TestFindFiles(ResolveCacheTestCase):
+
+    def test_files_in_cache_are_indexed(self):
+        older = self.write_file('visualizer-v1-older.zip', self.content, mtime=1000)
+        latest = self.write_file('visualizer-v1-latest.zip', self.content, mtime=2000)
+        other_version = self.write_file('visualizer-v2-other.zip', self.content, mtime=3000)
+        self.write_file('visualizer-config-v1-other.zip', self.content)
+
+        self.assertEqual([other_version, latest, older], resolve_cache.find_files(self.cache_dir, 'visualizer'))
+        self.assertEqual([latest, older], resolve_cache.find_files(self.cache_dir, 'visualizer', 'v1'))
+
+        # The cache directory is only listed once, when the index is created
+        with patch('os.scandir') as scandir_mock:
+            self.assertEqual([latest, older], resolve_cache.find_files(self.cache_dir, 'visualizer', 'v1'))
+        scandir_mock.assert_not_called()
+
+    def test_files_without_compatibility_version(self):
+        older = self.write_file('my-config-{}.zip'.format('0' * 64), self.content, mtime=1000)
+        latest = self.write_file('my-config-{}.zip'.format(self.digest), self.content, mtime=2000)
+
+        self.assertEqual([latest, older], resolve_cache.find_files(self.cache_dir, 'my-config'))
+
+    def test_missing_files_are_removed(self):
+        file_path = self.write_file('visualizer-v1-digest.zip', self.content)
+        self.assertEqual([file_path], resolve_cache.find_files(self.cache_dir, 'visualizer'))
+
+        os.remove(file_path)
+        self.assertEqual([], resolve_cache.find_files(self.cache_dir, 'visualizer'))
+
+    def test_no_cache_dir(self):
+        self.assertEqual([], resolve_cache.find_files(os.path.join(self.cache_dir, 'missing'), 'visualizer'))
+
+
+class TestEvict(ResolveCacheTestCase):
+
+    def test_evict_least_recently_used(self):
+        first = self.write_file('first-v1-digest.zip', b'1' * 100)
+        second = self.write_file('second-v1-digest.zip', b'2' * 100)
+        third = self.write_file('third-v1-digest.zip', b'3' * 100)
+        with patch('time.time', side_effect=[1000.0, 2000.0, 3000.0, 4000.0]):
+            resolve_cache.touch(second)
+            resolve_cache.touch(first)
+            resolve_cache.touch(third)
+            resolve_cache.touch(second)
+
+        self.assertEqual([first], resolve_cache.evict(self.cache_dir, 250))
+        self.assertFalse(os.path.exists(first))
+        self.assertEqual([third], resolve_cache.evict(self.cache_dir, 150))
+        self.assertTrue(os.path.exists(second))
+
+    def test_evict_excluded(self):
+        first = self.write_file('first-v1-digest.zip', b'1' * 100)
+        second = self.write_file('second-v1-digest.zip', b'2' * 100)
+        with patch('time.time', side_effect=[1000.0, 2000.0]):
+            resolve_cache.touch(first)
+            resolve_cache.touch(second)
+
+        self.assertEqual([second], resolve_cache.evict(self.cache_dir, 100, excluded=[first]))
+        self.assertTrue(os.path.exists(first))
+
+    def test_no_limit(self):
+        file_path = self.write_file('first-v1-digest.zip', b'1' * 100)
+        resolve_cache.touch(file_path)
+
+        self.assertEqual([], resolve_cache.evict(self.cache_dir, 0))
+        self.assertTrue(os.path.exists(file_path))
+
+
+class TestListFiles(ResolveCacheTestCase):
+
+    def test_index_brought_in_line(self):
+        kept = self.write_file('kept-v1-digest.zip', self.content)
+        removed = self.write_file('removed-v1-digest.zip', self.content)
+        resolve_cache.record_digest(kept, self.digest)
+        resolve_cache.touch(removed)
+
+        os.remove(removed)
+        self.write_file('added-v1-digest.zip', self.content)
+        self.write_file('added-v1-digest.zip.tmp', self.content)
+
+        records = resolve_cache.list_files(self.cache_dir)
+        self.assertEqual(['added-v1-digest.zip', 'kept-v1-digest.zip'],
+                         sorted(record['file_name'] for record in records))
+        self.assertEqual({'added-v1-digest.zip': 0, 'kept-v1-digest.zip': 1},
+                         {record['file_name']: record['verified'] for record in records})
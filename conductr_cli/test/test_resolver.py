@@ -133,6 +133,58 @@ class TestResolver(TestCase):
         first_resolver_mock.load_bundle_configuration_from_cache('/some-cache-dir', '/some-bundle-path')
 
 
+class TestResolverStreamBundle(TestCase):
+
+    def test_stream_bundle(self):
+        download = MagicMock()
+
+        non_streaming_resolver_mock = Mock(spec=['load_bundle_from_cache', 'resolve_bundle'])
+        non_streaming_resolver_mock.load_bundle_from_cache = MagicMock(return_value=(False, None, None))
+        non_streaming_resolver_mock.resolve_bundle = MagicMock(return_value=(False, None, None))
+
+        streaming_resolver_mock = Mock()
+        streaming_resolver_mock.load_bundle_from_cache = MagicMock(return_value=(False, None, None))
+        streaming_resolver_mock.stream_bundle = MagicMock(return_value=(True, 'bundle_name', 'cached_file', download))
+
+        with patch('conductr_cli.resolver.resolver_chain',
+                   MagicMock(return_value=[non_streaming_resolver_mock, streaming_resolver_mock])):
+            result = resolver.stream_bundle(Mock(), '/some-cache-dir', 'http://some-host/some-bundle.zip')
+
+        self.assertEqual(('bundle_name', 'cached_file', download), result)
+        streaming_resolver_mock.stream_bundle.assert_called_with('/some-cache-dir', 'http://some-host/some-bundle.zip')
+        streaming_resolver_mock.resolve_bundle.assert_not_called()
+
+    def test_stream_bundle_not_streamed(self):
+        resolver_mock = Mock()
+        resolver_mock.load_bundle_from_cache = MagicMock(return_value=(False, None, None))
+        resolver_mock.stream_bundle = MagicMock(return_value=(False, None, None, None))
+        resolver_mock.resolve_bundle = MagicMock(return_value=(True, 'bundle_name', 'bundle_file'))
+
+        with patch('conductr_cli.resolver.resolver_chain', MagicMock(return_value=[resolver_mock])):
+            result = resolver.stream_bundle(Mock(), '/some-cache-dir', '/some-bundle-path')
+
+        self.assertEqual(('bundle_name', 'bundle_file', None), result)
+
+    def test_stream_bundle_from_cache(self):
+        resolver_mock = Mock()
+        resolver_mock.load_bundle_from_cache = MagicMock(return_value=(True, 'bundle_name', 'cached_file'))
+
+        with patch('conductr_cli.resolver.resolver_chain', MagicMock(return_value=[resolver_mock])):
+            result = resolver.stream_bundle(Mock(), '/some-cache-dir', 'http://some-host/some-bundle.zip')
+
+        self.assertEqual(('bundle_name', 'cached_file', None), result)
+        resolver_mock.stream_bundle.assert_not_called()
+
+    def test_stream_bundle_failure(self):
+        resolver_mock = Mock()
+        resolver_mock.load_bundle_from_cache = MagicMock(return_value=(False, None, None))
+        resolver_mock.stream_bundle = MagicMock(return_value=(False, None, None, None))
+        resolver_mock.resolve_bundle = MagicMock(return_value=(False, None, None))
+
+        with patch('conductr_cli.resolver.resolver_chain', MagicMock(return_value=[resolver_mock])):
+            self.assertRaises(BundleResolutionError, resolver.stream_bundle, Mock(), '/some-cache-dir', 'bundle')
+
+
 class TestResolverResolveBundleVersion(TestCase):
     def test_resolve_bundle_version_success(self):
         custom_settings = Mock()
@@ -1,14 +1,35 @@
 from unittest import TestCase
+import hashlib
+import io
+import json
 import shutil
+import struct
 import tempfile
 import os
+import zipfile
+import zlib
 from os import remove
 from conductr_cli import logging_setup
-from conductr_cli.shazar_main import create_digest, build_parser, run
+from conductr_cli import shazar_main
+from conductr_cli.shazar_main import CompressionPolicy, HashingWriter, PreviousArchive, RawZipEntries, bounded_map, \
+    create_digest, build_parser, run, shazar
 from conductr_cli.test.cli_test_case import CliTestCase
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
 
 
+def shazar_args(source, output_dir, **kwargs):
+    return MagicMock(**dict({
+        'source': source,
+        'output_dir': output_dir,
+        'jobs': 1,
+        'incremental': False,
+        'reproducible': False,
+        'compression_level': 6,
+        'compression_rules': []
+    }, **kwargs))
+
+
 class TestShazar(TestCase):
 
     def test_create_digest(self):
@@ -28,6 +49,25 @@ class TestShazar(TestCase):
 
         self.assertEqual(args.output_dir, 'output-dir')
         self.assertEqual(args.source, 'source')
+        self.assertEqual(args.jobs, 1)
+
+    def test_parser_compression(self):
+        parser = build_parser()
+        args = parser.parse_args('--compression-level 9 --compression *.jar=0 --compression a=b=1 source'.split())
+        self.assertEqual(args.compression_level, 9)
+        self.assertEqual(args.compression_rules, [('*.jar', 0), ('a=b', 1)])
+        self.assertEqual(build_parser().parse_args(['source']).compression_level, 0)
+        self.assertEqual(build_parser().parse_args(['source']).compression_rules, [])
+
+        with patch('sys.stderr'):
+            for argv in ['--compression-level 10 source', '--compression *.jar source', '--compression =1 source']:
+                self.assertRaises(SystemExit, parser.parse_args, argv.split())
+
+    def test_parser_jobs(self):
+        parser = build_parser()
+        self.assertEqual(parser.parse_args('--jobs 4 source'.split()).jobs, 4)
+        with patch('os.cpu_count', return_value=8):
+            self.assertEqual(parser.parse_args('-j 0 source'.split()).jobs, 8)
 
 
 class TestIntegration(CliTestCase):
@@ -38,6 +78,7 @@ class TestIntegration(CliTestCase):
         self.tmpdir = tempfile.mkdtemp()
 
     def setUp(self):  # noqa
+        super().setUp()
         self.tmpfile.write(b'test file data')
         self.tmpfile.close()
 
@@ -62,3 +103,494 @@ class TestIntegration(CliTestCase):
     def tearDown(self):  # noqa
         shutil.rmtree(self.tmpdir)
         remove(self.tmpfile.name)
+
+
+class TestSinglePass(TestCase):
+
+    def setUp(self):  # noqa
+        self.source_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.source_dir, 'bundle')
+        os.makedirs(os.path.join(self.source, 'lib'))
+        with open(os.path.join(self.source, 'bundle.conf'), 'wb') as f:
+            f.write(b'name = "bundle"')
+        with open(os.path.join(self.source, 'lib', 'bundle.jar'), 'wb') as f:
+            f.write(b'jar' * 1024)
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.source_dir)
+        shutil.rmtree(self.output_dir)
+
+    def args(self, jobs=1, incremental=False):
+        return shazar_args(self.source, self.output_dir, jobs=jobs, incremental=incremental)
+
+    def test_digest_of_archive(self):
+        shazar(self.args())
+
+        [file_name] = os.listdir(self.output_dir)
+        with open(os.path.join(self.output_dir, file_name), 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self.assertEqual('bundle-{}.zip'.format(digest), file_name)
+
+        with zipfile.ZipFile(os.path.join(self.output_dir, file_name)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(['bundle/bundle.conf', 'bundle/lib/bundle.jar'], sorted(zip_file.namelist()))
+            self.assertEqual(b'jar' * 1024, zip_file.read('bundle/lib/bundle.jar'))
+
+    def test_stored_by_default(self):
+        shazar(build_parser().parse_args(['--output-dir', self.output_dir, self.source]))
+
+        # The files are archived as `ZipFile.write` archives them, and as earlier versions did
+        expected_archive = os.path.join(self.source_dir, 'expected.zip')
+        with zipfile.ZipFile(expected_archive, 'w') as zip_file:
+            for path, name in shazar_main.archive_entries(self.source, 'bundle'):
+                zip_file.write(path, name)
+        [file_name] = os.listdir(self.output_dir)
+        self.assertEqual('bundle-{}.zip'.format(create_digest(expected_archive)), file_name)
+
+    def test_archive_written_in_output_dir(self):
+        with patch('tempfile.NamedTemporaryFile', wraps=tempfile.NamedTemporaryFile) as temp_file_mock, \
+                patch('os.replace', wraps=os.replace) as replace_mock:
+            shazar(self.args())
+
+        self.assertEqual(self.output_dir, temp_file_mock.call_args[1]['dir'])
+        temp_name, dest = replace_mock.call_args[0]
+        self.assertEqual(self.output_dir, os.path.dirname(temp_name))
+        self.assertEqual([os.path.basename(dest)], os.listdir(self.output_dir))
+
+    def test_temp_file_removed_on_failure(self):
+        with patch('conductr_cli.shazar_main.write_entry', side_effect=OSError('Disk full')):
+            self.assertRaises(OSError, shazar, self.args())
+
+        self.assertEqual([], os.listdir(self.output_dir))
+
+    def test_parallel_compression(self):
+        shazar(self.args(jobs=1))
+        [serial_output] = os.listdir(self.output_dir)
+        os.remove(os.path.join(self.output_dir, serial_output))
+
+        with patch('conductr_cli.shazar_main.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as executor_mock:
+            shazar(self.args(jobs=2))
+        executor_mock.assert_called_once_with(max_workers=2)
+
+        # Compressing in parallel archives the files in the same order and as the same bytes
+        self.assertEqual([serial_output], os.listdir(self.output_dir))
+
+    def test_large_files_streamed(self):
+        with open(os.path.join(self.source, 'lib', 'app.js'), 'wb') as f:
+            f.write(b'js' * 1024)
+
+        with patch('conductr_cli.shazar_main.PARALLEL_COMPRESSION_MAX_SIZE', 1024):
+            shazar(self.args(jobs=1))
+            [serial_output] = os.listdir(self.output_dir)
+            os.remove(os.path.join(self.output_dir, serial_output))
+
+            with patch('conductr_cli.shazar_main.compress_entry', wraps=shazar_main.compress_entry) as compress_mock:
+                shazar(self.args(jobs=2))
+
+        # Only the small file is compressed by the processes, the archive being the same nonetheless
+        self.assertEqual(['bundle/bundle.conf'], [call[0][0][1] for call in compress_mock.call_args_list])
+        self.assertEqual([serial_output], os.listdir(self.output_dir))
+
+        with zipfile.ZipFile(os.path.join(self.output_dir, serial_output)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(b'js' * 1024, zip_file.read('bundle/lib/app.js'))
+            # The sizes of a deflated file follow its data, whereas those of a stored file precede it
+            app_js = zip_file.getinfo('bundle/lib/app.js')
+            self.assertEqual(zipfile.ZIP_DEFLATED, app_js.compress_type)
+            self.assertTrue(app_js.flag_bits & RawZipEntries.DATA_DESCRIPTOR_FLAG)
+            with open(os.path.join(self.output_dir, serial_output), 'rb') as f:
+                f.seek(app_js.header_offset)
+                local_header = struct.unpack(zipfile.structFileHeader, f.read(zipfile.sizeFileHeader))
+            self.assertEqual(zipfile.ZIP_DEFLATED, local_header[zipfile._FH_COMPRESSION_METHOD])
+            bundle_jar = zip_file.getinfo('bundle/lib/bundle.jar')
+            self.assertEqual(zipfile.ZIP_STORED, bundle_jar.compress_type)
+            self.assertFalse(bundle_jar.flag_bits & RawZipEntries.DATA_DESCRIPTOR_FLAG)
+
+    def test_large_files_zip64(self):
+        with open(os.path.join(self.source, 'lib', 'app.js'), 'wb') as f:
+            f.write(b'js' * 1024)
+
+        # Files over the zip64 limit are as large as the files streamed
+        with patch('conductr_cli.shazar_main.PARALLEL_COMPRESSION_MAX_SIZE', 1024), \
+                patch('zipfile.ZIP64_LIMIT', 1024):
+            shazar(self.args())
+
+            [file_name] = os.listdir(self.output_dir)
+            with zipfile.ZipFile(os.path.join(self.output_dir, file_name)) as zip_file:
+                self.assertIsNone(zip_file.testzip())
+                self.assertEqual(b'js' * 1024, zip_file.read('bundle/lib/app.js'))
+                self.assertEqual(b'jar' * 1024, zip_file.read('bundle/lib/bundle.jar'))
+
+    def test_compression_policy(self):
+        with open(os.path.join(self.source, 'lib', 'app.js'), 'wb') as f:
+            f.write(b'js' * 1024)
+        with open(os.path.join(self.source, 'lib', 'random.bin'), 'wb') as f:
+            f.write(os.urandom(128 * 1024))
+
+        shazar(self.args())
+
+        [file_name] = os.listdir(self.output_dir)
+        with zipfile.ZipFile(os.path.join(self.output_dir, file_name)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            app_js = zip_file.getinfo('bundle/lib/app.js')
+            self.assertEqual(zipfile.ZIP_DEFLATED, app_js.compress_type)
+            self.assertLess(app_js.compress_size, app_js.file_size)
+            self.assertEqual(zipfile.ZIP_STORED, zip_file.getinfo('bundle/lib/bundle.jar').compress_type)
+            self.assertEqual(zipfile.ZIP_STORED, zip_file.getinfo('bundle/lib/random.bin').compress_type)
+
+    def test_compression_rules(self):
+        shazar(shazar_args(self.source, self.output_dir, compression_rules=[('*.jar', 9)], compression_level=0))
+
+        [file_name] = os.listdir(self.output_dir)
+        with zipfile.ZipFile(os.path.join(self.output_dir, file_name)) as zip_file:
+            self.assertEqual(zipfile.ZIP_DEFLATED, zip_file.getinfo('bundle/lib/bundle.jar').compress_type)
+            self.assertEqual(zipfile.ZIP_STORED, zip_file.getinfo('bundle/bundle.conf').compress_type)
+
+
+class TestRawZipEntries(TestCase):
+
+    def setUp(self):  # noqa
+        self.tmpdir = tempfile.mkdtemp()
+        self.archive = os.path.join(self.tmpdir, 'archive.zip')
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.tmpdir)
+
+    def append(self, zip_file, writer, name, data, compress_type, data_descriptor=False):
+        zip_info = zipfile.ZipInfo(name)
+        zip_info.compress_type = compress_type
+        if compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+            compressed_data = compressor.compress(data) + compressor.flush()
+        else:
+            compressed_data = data
+
+        def blocks():
+            yield compressed_data
+            zip_info.CRC = zlib.crc32(data)
+            zip_info.file_size = len(data)
+            zip_info.compress_size = len(compressed_data)
+
+        if data_descriptor:
+            zip_info.flag_bits |= RawZipEntries.DATA_DESCRIPTOR_FLAG
+            RawZipEntries.append(zip_file, writer, zip_info, blocks())
+        else:
+            zip_info.CRC = zlib.crc32(data)
+            zip_info.file_size = len(data)
+            zip_info.compress_size = len(compressed_data)
+            RawZipEntries.append(zip_file, writer, zip_info, [compressed_data])
+        return compressed_data
+
+    def test_append(self):
+        with open(self.archive, 'wb') as f:
+            writer = HashingWriter(f)
+            with zipfile.ZipFile(writer, 'w') as zip_file:
+                zip_file.writestr('written.txt', b'written by ZipFile')
+                stored = self.append(zip_file, writer, 'stored.bin', b'stored' * 100, zipfile.ZIP_STORED)
+                deflated = self.append(zip_file, writer, 'deflated.txt', b'deflated' * 100, zipfile.ZIP_DEFLATED)
+                streamed = self.append(zip_file, writer, 'streamed.txt', b'streamed' * 100, zipfile.ZIP_DEFLATED,
+                                       data_descriptor=True)
+
+        with zipfile.ZipFile(self.archive) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(['written.txt', 'stored.bin', 'deflated.txt', 'streamed.txt'], zip_file.namelist())
+            self.assertEqual(b'streamed' * 100, zip_file.read('streamed.txt'))
+
+            # The data of each entry is located as it was appended
+            with open(self.archive, 'rb') as f:
+                for name, data in [('stored.bin', stored), ('deflated.txt', deflated), ('streamed.txt', streamed)]:
+                    zip_info = zip_file.getinfo(name)
+                    f.seek(RawZipEntries.data_offset(f, zip_info))
+                    self.assertEqual(data, f.read(zip_info.compress_size))
+
+    def test_append_zip64(self):
+        file_size = 5 * 1024 * 1024 * 1024
+        zip_info = zipfile.ZipInfo('bundle/layer.tar')
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        zip_info.flag_bits |= RawZipEntries.DATA_DESCRIPTOR_FLAG
+        zip_info.file_size = file_size
+
+        def blocks():
+            yield b'data'
+            zip_info.CRC = 1
+            zip_info.compress_size = file_size - 1
+
+        output = io.BytesIO()
+        writer = HashingWriter(output)
+        with zipfile.ZipFile(writer, 'w') as zip_file:
+            RawZipEntries.append(zip_file, writer, zip_info, blocks())
+
+        # The local header has a zip64 extra field, the sizes being recorded as 64 bit in the data descriptor
+        archive = output.getvalue()
+        header = struct.unpack(zipfile.structFileHeader, archive[:zipfile.sizeFileHeader])
+        self.assertEqual(20, header[zipfile._FH_EXTRA_FIELD_LENGTH])
+        extra_offset = zipfile.sizeFileHeader + len(zip_info.filename)
+        self.assertEqual(1, struct.unpack('<H', archive[extra_offset:extra_offset + 2])[0])
+        data_offset = extra_offset + 20
+        self.assertEqual(b'data', archive[data_offset:data_offset + 4])
+        self.assertEqual((RawZipEntries.DATA_DESCRIPTOR_SIGNATURE, 1, file_size - 1, file_size),
+                         struct.unpack('<LLQQ', archive[data_offset + 4:data_offset + 28]))
+
+    def test_append_grown_larger_than_zip64_limit(self):
+        zip_info = zipfile.ZipInfo('bundle/layer.tar')
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        zip_info.flag_bits |= RawZipEntries.DATA_DESCRIPTOR_FLAG
+        zip_info.file_size = 1024
+
+        def blocks():
+            yield b'data'
+            zip_info.file_size = 5 * 1024 * 1024 * 1024
+
+        writer = HashingWriter(io.BytesIO())
+        with zipfile.ZipFile(writer, 'w') as zip_file:
+            self.assertRaises(zipfile.LargeZipFile, RawZipEntries.append, zip_file, writer, zip_info, blocks())
+            zip_file.filelist.clear()
+
+
+class TestBoundedMap(TestCase):
+
+    def test_bounded(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        submit_mock = MagicMock(wraps=executor.submit)
+        with executor, patch.object(executor, 'submit', submit_mock):
+            results = bounded_map(executor, lambda item: item * 2, range(10), 3)
+            self.assertEqual(0, next(results))
+            self.assertEqual(4, submit_mock.call_count)
+            self.assertEqual([2, 4, 6, 8, 10, 12, 14, 16, 18], list(results))
+        self.assertEqual(10, submit_mock.call_count)
+
+
+class TestCompressionPolicy(TestCase):
+
+    def test_first_rule_matching(self):
+        policy = CompressionPolicy(6, [('*/static/*', 9), ('*.js', 1), ('*.jar', 3)])
+        self.assertEqual(('*/static/*=9', 9), policy.compression('bundle/static/app.js', b''))
+        self.assertEqual(('*.js=1', 1), policy.compression('bundle/lib/app.js', b''))
+        self.assertEqual(('*.jar=3', 3), policy.compression('bundle/lib/app.jar', b''))
+
+    def test_stored_by_default(self):
+        policy = CompressionPolicy(rules=[('*.js', 1)])
+        self.assertEqual(('default', 0), policy.compression('bundle/lib/app.jar', b''))
+        self.assertEqual(('default', 0), policy.compression('bundle/layer.tar', b'layer' * 16 * 1024))
+        self.assertEqual(('*.js=1', 1), policy.compression('bundle/lib/app.js', b''))
+
+    def test_compressed_extension(self):
+        policy = CompressionPolicy(6)
+        for name in ['bundle/lib/app.jar', 'bundle/static/logo.PNG', 'bundle/layers/layer.tar.gz']:
+            self.assertEqual(('compressed extension', 0), policy.compression(name, b''))
+
+    def test_sample(self):
+        policy = CompressionPolicy(6)
+        self.assertEqual(('incompressible sample', 0), policy.compression('bundle/layer.tar', os.urandom(64 * 1024)))
+        self.assertEqual(('default', 6), policy.compression('bundle/layer.tar', b'layer' * 16 * 1024))
+        # Small files aren't sampled
+        self.assertEqual(('default', 6), policy.compression('bundle/random.bin', os.urandom(1024)))
+
+
+class TestCompressionSummary(CliTestCase):
+
+    def test_summary(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            source = os.path.join(source_dir, 'bundle')
+            os.makedirs(source)
+            with open(os.path.join(source, 'app.jar'), 'wb') as f:
+                f.write(b'jar' * 1024)
+            with open(os.path.join(source, 'app.js'), 'wb') as f:
+                f.write(b'js' * 1024)
+
+            stdout = MagicMock()
+            logging_setup.configure_logging(MagicMock(), stdout)
+            shazar(shazar_args(source, output_dir))
+
+            lines = self.output(stdout).splitlines()
+            self.assertRegex(lines[0], r'^POLICY +FILES +SIZE +ARCHIVED +SAVED +TIME$')
+            self.assertRegex(lines[1], r'^compressed extension +1 +3.0 KiB +3.0 KiB +0 B +\d+\.\d\ds$')
+            self.assertRegex(lines[2], r'^default +1 +2.0 KiB +\d+ B +2.0 KiB +\d+\.\d\ds$')
+            self.assertRegex(lines[3], r'^Created digested ZIP archive at ')
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+
+class TestIncremental(TestCase):
+
+    def setUp(self):  # noqa
+        self.source_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.source_dir, 'bundle')
+        os.makedirs(os.path.join(self.source, 'lib'))
+        self.write_file('bundle.conf', b'name = "bundle"')
+        self.write_file('lib/first.jar', b'first' * 1024)
+        self.write_file('lib/second.jar', b'second' * 1024)
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.source_dir)
+        shutil.rmtree(self.output_dir)
+
+    def write_file(self, name, content, mtime=None):
+        path = os.path.join(self.source, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        os.utime(path, (mtime, mtime) if mtime else None)
+
+    def shazar(self, incremental=True, **kwargs):
+        with patch('conductr_cli.shazar_main.compress_entry', wraps=shazar_main.compress_entry) as compress_mock:
+            shazar(shazar_args(self.source, self.output_dir, incremental=incremental, **kwargs))
+        archives = sorted(name for name in os.listdir(self.output_dir) if name.endswith('.zip'))
+        compressed = sorted(call[0][0][1] for call in compress_mock.call_args_list)
+        return archives, compressed
+
+    def test_unchanged_entries_reused(self):
+        [first_archive], compressed = self.shazar()
+        self.assertEqual(['bundle/bundle.conf', 'bundle/lib/first.jar', 'bundle/lib/second.jar'], compressed)
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, '.bundle.shazar-index.json')))
+
+        self.write_file('lib/second.jar', b'changed' * 1024, mtime=2000000000)
+        archives, compressed = self.shazar()
+        self.assertEqual(['bundle/lib/second.jar'], compressed)
+
+        [archive] = [name for name in archives if name != first_archive]
+        with zipfile.ZipFile(os.path.join(self.output_dir, archive)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(b'first' * 1024, zip_file.read('bundle/lib/first.jar'))
+            self.assertEqual(b'changed' * 1024, zip_file.read('bundle/lib/second.jar'))
+
+        # An incremental archive is the same as an archive created from scratch
+        os.remove(os.path.join(self.output_dir, archive))
+        archives, compressed = self.shazar(incremental=False)
+        self.assertIn(archive, archives)
+
+    def test_streamed_entries_reused(self):
+        self.write_file('lib/app.js', b'js' * 1024)
+        with patch('conductr_cli.shazar_main.PARALLEL_COMPRESSION_MAX_SIZE', 1024):
+            [first_archive], compressed = self.shazar()
+            self.assertEqual(['bundle/bundle.conf'], compressed)
+
+            self.write_file('lib/second.jar', b'changed' * 1024, mtime=2000000000)
+            archives, compressed = self.shazar()
+            [archive] = [name for name in archives if name != first_archive]
+
+            # An incremental archive reusing streamed entries is the same as an archive created from scratch
+            os.remove(os.path.join(self.output_dir, archive))
+            archives, compressed = self.shazar(incremental=False)
+            self.assertIn(archive, archives)
+
+    def test_zip64_entries_reused(self):
+        self.write_file('lib/app.js', b'js' * 1024)
+        # Files over the zip64 limit are as large as the files streamed, both stored and deflated
+        with patch('conductr_cli.shazar_main.PARALLEL_COMPRESSION_MAX_SIZE', 1024), \
+                patch('zipfile.ZIP64_LIMIT', 1024):
+            [first_archive], compressed = self.shazar()
+
+            self.write_file('lib/second.jar', b'changed' * 1024, mtime=2000000000)
+            archives, compressed = self.shazar()
+            [archive] = [name for name in archives if name != first_archive]
+            with zipfile.ZipFile(os.path.join(self.output_dir, archive)) as zip_file:
+                self.assertIsNone(zip_file.testzip())
+                self.assertEqual(b'js' * 1024, zip_file.read('bundle/lib/app.js'))
+                self.assertEqual(b'first' * 1024, zip_file.read('bundle/lib/first.jar'))
+                # The reused entries have a zip64 extra field in their local header
+                with open(os.path.join(self.output_dir, archive), 'rb') as f:
+                    for name in ['bundle/lib/app.js', 'bundle/lib/first.jar']:
+                        f.seek(zip_file.getinfo(name).header_offset)
+                        header = struct.unpack(zipfile.structFileHeader, f.read(zipfile.sizeFileHeader))
+                        self.assertEqual(20, header[zipfile._FH_EXTRA_FIELD_LENGTH])
+
+            # An incremental archive reusing zip64 entries is the same as an archive created from scratch
+            os.remove(os.path.join(self.output_dir, archive))
+            archives, compressed = self.shazar(incremental=False)
+            self.assertIn(archive, archives)
+
+    def test_entries_copied_in_blocks(self):
+        content = os.urandom(8 * 1024)
+        self.write_file('lib/app.js', content)
+        [archive], compressed = self.shazar()
+
+        with open(os.path.join(self.output_dir, '.bundle.shazar-index.json'), 'r') as f:
+            index = json.load(f)
+        with PreviousArchive(self.output_dir, index) as previous_archive, \
+                zipfile.ZipFile(os.path.join(self.output_dir, archive)) as zip_file:
+            zip_info = zip_file.getinfo('bundle/lib/app.js')
+            blocks = list(previous_archive.compressed_blocks(zip_info, block_size=1024))
+
+        self.assertEqual(zipfile.ZIP_DEFLATED, zip_info.compress_type)
+        self.assertGreater(len(blocks), 1)
+        self.assertTrue(all(len(block) <= 1024 for block in blocks))
+        self.assertEqual(content, zlib.decompress(b''.join(blocks), -zlib.MAX_WBITS))
+
+    def test_touched_entries_compared_by_content(self):
+        self.shazar()
+
+        self.write_file('lib/first.jar', b'first' * 1024, mtime=2000000000)
+        self.write_file('lib/second.jar', b'SECOND' * 1024, mtime=2000000000)
+        archives, compressed = self.shazar()
+        self.assertEqual(['bundle/lib/second.jar'], compressed)
+
+    def test_compression_changed(self):
+        self.shazar()
+
+        archives, compressed = self.shazar(compression_level=9)
+        self.assertEqual(3, len(compressed))
+
+    def test_previous_archive_missing(self):
+        [archive], compressed = self.shazar()
+        os.remove(os.path.join(self.output_dir, archive))
+
+        archives, compressed = self.shazar()
+        self.assertEqual([archive], archives)
+        self.assertEqual(3, len(compressed))
+
+
+class TestReproducible(TestCase):
+
+    def setUp(self):  # noqa
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.work_dir)
+
+    def create_bundle(self, dir_name, file_names, mtime, mode):
+        source = os.path.join(self.work_dir, dir_name, 'bundle')
+        os.makedirs(os.path.join(source, 'bin'))
+        for file_name in file_names:
+            path = os.path.join(source, file_name)
+            with open(path, 'wb') as f:
+                f.write(file_name.encode('utf-8') * 100)
+            os.chmod(path, 0o755 if file_name.startswith('bin') else mode)
+            os.utime(path, (mtime, mtime))
+        return source
+
+    def shazar(self, source, reproducible=True):
+        output_dir = tempfile.mkdtemp(dir=self.work_dir)
+        shazar(shazar_args(source, output_dir, reproducible=reproducible))
+        [file_name] = os.listdir(output_dir)
+        return os.path.join(output_dir, file_name)
+
+    def test_same_files_same_digest(self):
+        file_names = ['bundle.conf', 'bin/start', 'lib.jar', 'assets.js']
+        first = self.create_bundle('first', file_names, 1000000000, 0o644)
+        second = self.create_bundle('second', list(reversed(file_names)), 1500000000, 0o600)
+
+        first_archive = self.shazar(first)
+        self.assertEqual(os.path.basename(first_archive), os.path.basename(self.shazar(second)))
+        self.assertNotEqual(os.path.basename(self.shazar(first, reproducible=False)),
+                            os.path.basename(self.shazar(second, reproducible=False)))
+
+        with zipfile.ZipFile(first_archive) as zip_file:
+            self.assertEqual(['bundle/assets.js', 'bundle/bundle.conf', 'bundle/lib.jar', 'bundle/bin/start'],
+                             zip_file.namelist())
+            self.assertEqual((1980, 1, 1, 0, 0, 0), zip_file.getinfo('bundle/lib.jar').date_time)
+            self.assertEqual(0o100644, zip_file.getinfo('bundle/lib.jar').external_attr >> 16)
+            self.assertEqual(0o100755, zip_file.getinfo('bundle/bin/start').external_attr >> 16)
+
+    def test_source_date_epoch(self):
+        source = self.create_bundle('bundle', ['bundle.conf'], 1000000000, 0o644)
+
+        with patch.dict('os.environ', {'SOURCE_DATE_EPOCH': '1500000000'}):
+            archive = self.shazar(source)
+
+        with zipfile.ZipFile(archive) as zip_file:
+            self.assertEqual((2017, 7, 14, 2, 40, 0), zip_file.getinfo('bundle/bundle.conf').date_time)
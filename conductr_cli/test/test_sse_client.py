@@ -1,7 +1,14 @@
 from unittest import TestCase
 from conductr_cli.test.cli_test_case import strip_margin
 from conductr_cli import sse_client
-from unittest.mock import patch, MagicMock
+from requests.exceptions import ChunkedEncodingError, ConnectionError
+from unittest.mock import call, patch, MagicMock
+
+
+def create_response_mock(raw_sse_chunks):
+    response_mock = MagicMock()
+    response_mock.iter_content = MagicMock(return_value=iter(raw_sse_chunks))
+    return response_mock
 
 
 class TestSSEClient(TestCase):
@@ -14,7 +21,7 @@ class TestSSEClient(TestCase):
                                   |data:
                                   |
                                   |""")
-        raw_sse_iterators = [iter(list(raw_sse))]
+        raw_sse_iterators = [iter([raw_sse.encode('utf-8')])]
         iter_content_mock = MagicMock(side_effect=raw_sse_iterators)
 
         raise_for_status_mock = MagicMock()
@@ -26,8 +33,8 @@ class TestSSEClient(TestCase):
         request_get_mock = MagicMock(return_value=response_mock)
 
         result = []
-        with patch('requests.get', request_get_mock):
-            events = sse_client.get_events(False, '127.0.0.1', 'http://host.com')
+        with patch('requests.Session.get', request_get_mock):
+            events = sse_client.get_events(False, '127.0.0.1', 'http://host.com', reconnect_attempts=0)
             for event in events:
                 result.append(event)
 
@@ -37,6 +44,94 @@ class TestSSEClient(TestCase):
             sse_client.Event(event=None, data='')
         ], result)
 
-        request_get_mock.assert_called_with('http://host.com', stream=True, **sse_client.SSE_REQUEST_INPUT)
+        expected_headers = dict(sse_client.SSE_REQUEST_INPUT['headers'], Host='127.0.0.1')
+        request_get_mock.assert_called_with('http://host.com', stream=True, headers=expected_headers)
         raise_for_status_mock.assert_called_with()
-        iter_content_mock.assert_called_with(decode_unicode=True)
+        iter_content_mock.assert_called_with(chunk_size=sse_client.SSE_CHUNK_SIZE)
+
+    def test_sse_events_split_across_chunks(self):
+        raw_sse_chunks = [
+            b'data:\r\n\r',
+            b'\nevent:My Test Event\ndata:My Test Data\r\n',
+            b'\r\nevent:Other Event\r\rdata:\n',
+            b'\ndata:\n\nevent:Caf\xc3',
+            b'\xa9\n\n'
+        ]
+        request_get_mock = MagicMock(return_value=create_response_mock(raw_sse_chunks))
+
+        result = []
+        with patch('requests.Session.get', request_get_mock):
+            events = sse_client.get_events(False, '127.0.0.1', 'http://host.com', reconnect_attempts=0)
+            for event in events:
+                result.append(event)
+
+        self.assertEqual([
+            sse_client.Event(event=None, data=''),
+            sse_client.Event(event='My Test Event', data='My Test Data'),
+            sse_client.Event(event='Other Event', data=None),
+            sse_client.Event(event=None, data=''),
+            sse_client.Event(event=None, data=''),
+            sse_client.Event(event='Café', data=None)
+        ], result)
+
+    def test_reconnect_with_last_event_id(self):
+        first_response = create_response_mock([
+            b'retry: 500\nid: 1\nevent: bundleInstallationAdded\ndata: a101449418187d92c789d1adc240b6d6\n\n',
+            b'event: incompleteEvent\n'
+        ])
+        second_response = create_response_mock([b'id: 2\nevent: bundleExecutionAdded\n\n'])
+        request_get_mock = MagicMock(side_effect=[first_response, ConnectionError('test reason'), second_response,
+                                                  create_response_mock([]), create_response_mock([])])
+        sleep_mock = MagicMock()
+
+        result = []
+        with patch('requests.Session.get', request_get_mock), \
+                patch('time.sleep', sleep_mock):
+            events = sse_client.get_events(False, '127.0.0.1', 'http://host.com', reconnect_attempts=2)
+            result.append(next(events))
+            result.append(next(events))
+            self.assertRaises(StopIteration, next, events)
+
+        self.assertEqual([
+            sse_client.Event(event='bundleInstallationAdded', data='a101449418187d92c789d1adc240b6d6', id='1',
+                             retry=500),
+            sse_client.Event(event='bundleExecutionAdded', data=None, id='2')
+        ], result)
+
+        expected_headers = dict(sse_client.SSE_REQUEST_INPUT['headers'], Host='127.0.0.1')
+        self.assertEqual([
+            call('http://host.com', stream=True, headers=expected_headers),
+            call('http://host.com', stream=True, headers=dict(expected_headers, **{'Last-Event-ID': '1'})),
+            call('http://host.com', stream=True, headers=dict(expected_headers, **{'Last-Event-ID': '1'})),
+            call('http://host.com', stream=True, headers=dict(expected_headers, **{'Last-Event-ID': '2'})),
+            call('http://host.com', stream=True, headers=dict(expected_headers, **{'Last-Event-ID': '2'}))
+        ], request_get_mock.call_args_list)
+        self.assertEqual([call(0.5), call(0.5), call(0.5), call(0.5)], sleep_mock.call_args_list)
+
+    def test_reconnect_attempts_exhausted(self):
+        dropped_response = MagicMock()
+        dropped_response.iter_content = MagicMock(return_value=MagicMock(
+            __next__=MagicMock(side_effect=ChunkedEncodingError('test reason'))))
+        request_get_mock = MagicMock(side_effect=[dropped_response, ConnectionError('test reason'),
+                                                  ConnectionError('test reason')])
+
+        with patch('requests.Session.get', request_get_mock), \
+                patch('time.sleep', MagicMock()):
+            events = sse_client.get_events(False, '127.0.0.1', 'http://host.com', reconnect_attempts=2)
+            self.assertRaises(ConnectionError, next, events)
+
+        self.assertEqual(3, request_get_mock.call_count)
+
+
+class TestParseEvent(TestCase):
+    def test_multi_line_data(self):
+        self.assertEqual(sse_client.Event(event='test', data='line 1\nline 2\n'),
+                         sse_client.parse_event('event: test\r\ndata: line 1\r\ndata:line 2\rdata'))
+
+    def test_value_containing_colons(self):
+        self.assertEqual(sse_client.Event(event=None, data='{"time": "12:30:00"}'),
+                         sse_client.parse_event('data: {"time": "12:30:00"}'))
+
+    def test_ignore_comments_and_invalid_fields(self):
+        self.assertEqual(sse_client.Event(event=None, data='data'),
+                         sse_client.parse_event(':comment\nunknown: field\nid: with\0null\nretry: 1s\ndata: data'))
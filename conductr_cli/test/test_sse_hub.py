@@ -0,0 +1,238 @@
+from unittest import TestCase
+from conductr_cli import sse_client, sse_hub
+from conductr_cli.exceptions import WaitTimeoutError
+from unittest.mock import patch, MagicMock
+import queue
+import threading
+import time
+
+
+def create_event(event_name, data=None):
+    return sse_client.Event(event_name, data)
+
+
+class TestSubscribe(TestCase):
+    def test_share_connection_between_subscriptions(self):
+        events = [create_event('first'), create_event('second'), create_event('third')]
+        get_events_mock = MagicMock(return_value=events)
+
+        with patch('conductr_cli.sse_client.get_events', get_events_mock):
+            first = sse_hub.subscribe(False, '10.0.0.1', '/bundles/events', auth=None, verify=None)
+            second = sse_hub.subscribe(False, '10.0.0.1', '/bundles/events', auth=None, verify=None)
+
+            self.assertEqual(events[0], next(first))
+            self.assertEqual(events[1], next(first))
+            self.assertEqual(events[0], next(second))
+
+            # Subscribing later only receives the events read off the stream from then on
+            third = sse_hub.subscribe(False, '10.0.0.1', '/bundles/events', auth=None, verify=None)
+            self.assertEqual(events[2], next(third))
+            self.assertEqual(events[1], next(second))
+            self.assertEqual(events[2], next(second))
+            self.assertEqual(events[2], next(first))
+            self.assertRaises(StopIteration, next, first)
+            self.assertRaises(StopIteration, next, second)
+
+            for subscription in [first, second, third]:
+                subscription.close()
+
+        get_events_mock.assert_called_once_with(False, '10.0.0.1', '/bundles/events', auth=None, verify=None)
+        self.assertEqual({}, sse_hub.HUBS)
+
+    def test_close_connection_after_last_subscription(self):
+        client_mock = MagicMock(spec=sse_client.Client, connection_count=1)
+        client_mock.__iter__ = MagicMock(return_value=iter([create_event('first')]))
+        get_events_mock = MagicMock(return_value=client_mock)
+
+        with patch('conductr_cli.sse_client.get_events', get_events_mock):
+            with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as first:
+                with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events'):
+                    next(first)
+                client_mock.close.assert_not_called()
+
+            client_mock.close.assert_called_once_with()
+
+            with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events'):
+                pass
+
+        self.assertEqual(2, get_events_mock.call_count)
+
+    def test_separate_connections_per_endpoint(self):
+        get_events_mock = MagicMock(side_effect=[[create_event('bundle')], [create_event('deployment')]])
+
+        with patch('conductr_cli.sse_client.get_events', get_events_mock):
+            with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as bundle_events, \
+                    sse_hub.subscribe(False, '10.0.0.1', '/deployments/events') as deployment_events:
+                self.assertEqual('bundle', next(bundle_events).event)
+                self.assertEqual('deployment', next(deployment_events).event)
+
+
+class TestSlowStream(TestCase):
+    def blocking_events(self, is_released, events):
+        is_released.wait(10)
+        yield from events
+
+    def test_read_without_holding_the_hub(self):
+        is_released = threading.Event()
+        event = create_event('first')
+        get_events_mock = MagicMock(return_value=self.blocking_events(is_released, [event]))
+
+        with patch('conductr_cli.sse_client.get_events', get_events_mock):
+            first = sse_hub.subscribe(False, '10.0.0.1', '/bundles/events')
+            second = sse_hub.subscribe(False, '10.0.0.1', '/bundles/events')
+            results = {}
+            readers = [threading.Thread(target=lambda name, subscription: results.update({name: next(subscription)}),
+                                        args=(name, subscription))
+                       for name, subscription in [('first', first), ('second', second)]]
+            for reader in readers:
+                reader.start()
+
+            # Subscribing and registering predicates while the stream is being read
+            third = sse_hub.subscribe(False, '10.0.0.1', '/bundles/events')
+            future = third.when(lambda event, is_reconnected: True)
+            self.assertEqual({}, results)
+
+            is_released.set()
+            for reader in readers:
+                reader.join(10)
+
+            self.assertEqual({'first': event, 'second': event}, results)
+            self.assertEqual(event, future.result(0))
+            for subscription in [first, second, third]:
+                subscription.close()
+
+        get_events_mock.assert_called_once_with(False, '10.0.0.1', '/bundles/events')
+
+    def test_connect_without_holding_other_endpoints(self):
+        is_connecting = threading.Event()
+        is_released = threading.Event()
+
+        def get_events(dcos_mode, host, url):
+            if url == '/bundles/events':
+                is_connecting.set()
+                is_released.wait(10)
+            return [create_event(url)]
+
+        with patch('conductr_cli.sse_client.get_events', MagicMock(side_effect=get_events)):
+            subscriptions = []
+            connecting = threading.Thread(target=lambda: subscriptions.append(
+                sse_hub.subscribe(False, '10.0.0.1', '/bundles/events')))
+            connecting.start()
+            is_connecting.wait(10)
+
+            with sse_hub.subscribe(False, '10.0.0.1', '/deployments/events') as deployment_events:
+                self.assertEqual('/deployments/events', next(deployment_events).event)
+
+            is_released.set()
+            connecting.join(10)
+            subscriptions[0].close()
+
+        self.assertEqual({}, sse_hub.HUBS)
+
+
+class TestRetained(TestCase):
+    def setUp(self):  # noqa
+        self.queue = queue.Queue()
+        self.read_count = 0
+        self.client_mock = MagicMock(spec=sse_client.Client, connection_count=1)
+        self.client_mock.__iter__ = MagicMock(return_value=self.events())
+        self.client_mock.close = MagicMock(side_effect=lambda: self.queue.put(None))
+
+    def events(self):
+        while True:
+            self.read_count += 1
+            event = self.queue.get()
+            if event is None:
+                return
+            yield event
+
+    def wait_for_reads(self, read_count):
+        deadline = time.monotonic() + 10
+        while self.read_count < read_count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_keep_connection_between_subscriptions(self):
+        get_events_mock = MagicMock(return_value=self.client_mock)
+
+        with patch('conductr_cli.sse_client.get_events', get_events_mock):
+            with sse_hub.retained():
+                with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as first:
+                    self.queue.put(create_event('first'))
+                    self.assertEqual('first', next(first).event)
+
+                # Events occurring without subscriptions are drained
+                self.queue.put(create_event('drained'))
+                self.wait_for_reads(3)
+                self.client_mock.close.assert_not_called()
+
+                with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as second:
+                    self.queue.put(create_event('second'))
+                    self.assertEqual('second', next(second).event)
+
+                self.client_mock.close.assert_not_called()
+
+            self.client_mock.close.assert_called_once_with()
+
+        get_events_mock.assert_called_once_with(False, '10.0.0.1', '/bundles/events')
+        self.assertEqual({}, sse_hub.HUBS)
+
+    def test_reconnect_after_stream_ended(self):
+        get_events_mock = MagicMock(return_value=self.client_mock)
+
+        with patch('conductr_cli.sse_client.get_events', get_events_mock):
+            with sse_hub.retained():
+                with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events'):
+                    pass
+                self.queue.put(None)
+                self.wait_for_reads(1)
+                deadline = time.monotonic() + 10
+                while sse_hub.HUBS and time.monotonic() < deadline:
+                    time.sleep(0.01)
+
+                self.assertEqual({}, sse_hub.HUBS)
+
+
+class TestWaitForAll(TestCase):
+    def test_complete_futures_with_matching_events(self):
+        events = [create_event('a'), create_event(None), create_event('b'), create_event('c')]
+        predicate_b = MagicMock(side_effect=lambda event, is_reconnected: event.event == 'b')
+
+        with patch('conductr_cli.sse_client.get_events', MagicMock(return_value=events)):
+            with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as subscription:
+                futures = [subscription.when(lambda event, is_reconnected: event.event == 'a'),
+                           subscription.when(predicate_b)]
+                result = sse_hub.wait_for_all(subscription, futures, 10, 'timeout')
+
+        self.assertEqual([events[0], events[2]], result)
+        # The predicate is no longer evaluated once satisfied
+        self.assertEqual(3, predicate_b.call_count)
+
+    def test_report_reconnection_to_predicates(self):
+        events = [create_event('a'), create_event('b')]
+        connection_count_mock = MagicMock(side_effect=[1, 1, 2])
+        predicate = MagicMock(side_effect=lambda event, is_reconnected: is_reconnected)
+
+        with patch('conductr_cli.sse_client.get_events', MagicMock(return_value=events)), \
+                patch('conductr_cli.sse_client.connection_count', connection_count_mock):
+            with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as subscription:
+                result = sse_hub.wait_for_all(subscription, [subscription.when(predicate)], 10, 'timeout')
+
+        self.assertEqual([events[1]], result)
+
+    def test_timeout_when_stream_ends(self):
+        events = [create_event('a')]
+
+        with patch('conductr_cli.sse_client.get_events', MagicMock(return_value=events)):
+            with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as subscription:
+                future = subscription.when(lambda event, is_reconnected: False)
+                self.assertRaises(WaitTimeoutError, sse_hub.wait_for_all, subscription, [future], 10, 'timeout')
+
+            self.assertTrue(future.cancelled())
+
+    def test_timeout(self):
+        events = [create_event('a')]
+
+        with patch('conductr_cli.sse_client.get_events', MagicMock(return_value=events)):
+            with sse_hub.subscribe(False, '10.0.0.1', '/bundles/events') as subscription:
+                future = subscription.when(lambda event, is_reconnected: False)
+                self.assertRaises(WaitTimeoutError, sse_hub.wait_for_all, subscription, [future], -1, 'timeout')
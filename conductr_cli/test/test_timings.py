@@ -0,0 +1,192 @@
+from conductr_cli.test.cli_test_case import CliTestCase
+from conductr_cli import conduct_request, logging_setup, timings
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from requests.packages.urllib3 import connection, connectionpool
+from requests.packages.urllib3.exceptions import NewConnectionError
+from requests.packages.urllib3.util.connection import allowed_gai_family
+from unittest.mock import patch, MagicMock
+import json
+import requests
+import socket
+import threading
+import urllib.request
+
+
+def create_response(status_code=200, content=b'', body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.elapsed = timedelta(milliseconds=20)
+    response.request = MagicMock(body=body)
+    return response
+
+
+def create_handler(content):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):  # noqa
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    return Handler
+
+
+class TestTimings(CliTestCase):
+
+    def setUp(self):  # noqa
+        super().setUp()
+        timings.reset()
+        timings.enable()
+
+    def tearDown(self):  # noqa
+        timings.reset()
+        timings.ENABLED = False
+        connectionpool.HTTPConnectionPool.ConnectionCls = connection.HTTPConnection
+        connectionpool.HTTPSConnectionPool.ConnectionCls = connection.HTTPSConnection
+
+    def test_record_requests_per_phase(self):
+        get_mock = MagicMock(return_value=create_response(content=b'[]'))
+        post_mock = MagicMock(return_value=create_response(content=b'{"bundleId": "a1"}', body=b'bundle'))
+
+        @timings.timed('wait for installation')
+        def wait():
+            conduct_request.get(False, '10.0.0.1', 'http://10.0.0.1:9005/bundles')
+
+        with patch('requests.Session.get', get_mock), patch('requests.Session.post', post_mock):
+            with timings.phase('upload'):
+                conduct_request.post(False, '10.0.0.1', 'http://10.0.0.1:9005/bundles', data=b'bundle')
+            wait()
+            wait()
+
+        result = timings.summary()
+
+        self.assertEqual(['upload', 'wait for installation'], [entry['phase'] for entry in result['phases']])
+        upload, wait_for_installation = result['phases']
+        self.assertEqual((1, 1, 6, 18), (upload['count'], upload['requests'], upload['bytes_sent'],
+                                         upload['bytes_received']))
+        self.assertEqual((2, 2, 0, 4), (wait_for_installation['count'], wait_for_installation['requests'],
+                                        wait_for_installation['bytes_sent'], wait_for_installation['bytes_received']))
+
+        post_record = result['requests'][0]
+        self.assertEqual(('upload', 'POST', 'http://10.0.0.1:9005/bundles', 200),
+                         (post_record['phase'], post_record['method'], post_record['url'], post_record['status']))
+        self.assertEqual(0.02, post_record['first_byte'])
+        self.assertTrue(post_record['total'] >= 0.0)
+        self.assertEqual(0, post_record['retries'])
+
+    def test_record_failed_request(self):
+        get_mock = MagicMock(side_effect=requests.exceptions.ConnectionError('test reason'))
+
+        with patch('requests.Session.get', get_mock):
+            self.assertRaises(requests.exceptions.ConnectionError, conduct_request.get, False, '10.0.0.1',
+                              'http://10.0.0.1:9005/bundles')
+
+        record = timings.summary()['requests'][0]
+        self.assertEqual((None, None, 'GET'), (record['phase'], record['status'], record['method']))
+
+    def test_record_connection(self):
+        record = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+        addresses = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 9005)),
+                     (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.2', 9005))]
+        conn = timings.TimedHTTPConnection('conductr.example.com', 9005)
+        connected_hosts = []
+
+        def new_conn(self):
+            connected_hosts.append(self._dns_host)
+            if self._dns_host == '10.0.0.1':
+                raise NewConnectionError(self, 'test reason')
+            return 'socket'
+
+        timings.STATE.request = record
+        try:
+            with patch('socket.getaddrinfo', MagicMock(return_value=addresses)) as getaddrinfo_mock, \
+                    patch('requests.packages.urllib3.connection.HTTPConnection._new_conn', new_conn):
+                result = conn._new_conn()
+        finally:
+            timings.STATE.request = None
+
+        self.assertEqual('socket', result)
+        getaddrinfo_mock.assert_called_once_with('conductr.example.com', 9005, allowed_gai_family(), socket.SOCK_STREAM)
+        self.assertEqual(['10.0.0.1', '10.0.0.2'], connected_hosts)
+        self.assertEqual('conductr.example.com', conn._dns_host)
+        self.assertTrue(record['dns'] >= 0.0)
+        self.assertTrue(record['connect'] >= 0.0)
+
+    def test_record_unresolved_connection(self):
+        timings.STATE.request = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+        try:
+            conn = timings.TimedHTTPConnection('conductr.example.com', 9005)
+            with patch('socket.getaddrinfo', MagicMock(side_effect=socket.gaierror('test reason'))):
+                self.assertRaises(NewConnectionError, conn._new_conn)
+        finally:
+            timings.STATE.request = None
+
+    def test_record_url_request(self):
+        content = b'bundle contents'
+        server = HTTPServer(('127.0.0.1', 0), create_handler(content))
+        server_thread = threading.Thread(target=server.handle_request, daemon=True)
+        server_thread.start()
+        url = 'http://127.0.0.1:{}/bundle.zip'.format(server.server_address[1])
+
+        try:
+            with timings.phase('resolve bundle'):
+                opener = urllib.request.build_opener(*timings.url_handlers())
+                with opener.open(url) as response:
+                    self.assertEqual(content, response.read())
+        finally:
+            server_thread.join()
+            server.server_close()
+
+        [record] = timings.summary()['requests']
+        self.assertEqual(('resolve bundle', 'GET', url, 200, 0, len(content)),
+                         (record['phase'], record['method'], record['url'], record['status'], record['bytes_sent'],
+                          record['bytes_received']))
+        self.assertTrue(record['dns'] >= 0.0)
+        self.assertTrue(record['connect'] > 0.0)
+        self.assertTrue(record['first_byte'] > 0.0)
+
+    def test_url_handlers_disabled(self):
+        timings.ENABLED = False
+
+        self.assertEqual([], timings.url_handlers())
+
+    def test_disabled(self):
+        timings.ENABLED = False
+        get_mock = MagicMock(return_value=create_response(content=b'[]'))
+
+        with patch('requests.Session.get', get_mock), timings.phase('upload'):
+            conduct_request.get(False, '10.0.0.1', 'http://10.0.0.1:9005/bundles')
+
+        self.assertEqual({'phases': [], 'requests': []}, timings.summary())
+
+    def test_log_summary_json(self):
+        with timings.phase('resolve bundle'):
+            pass
+
+        stdout = MagicMock()
+        logging_setup.configure_logging(MagicMock(), stdout)
+        timings.log_summary('json')
+
+        result = json.loads(self.output(stdout))
+        self.assertEqual(['resolve bundle'], [entry['phase'] for entry in result['phases']])
+        self.assertEqual([], result['requests'])
+
+    def test_log_summary_text(self):
+        get_mock = MagicMock(return_value=create_response(content=b'[]'))
+        with patch('requests.Session.get', get_mock), timings.phase('resolve bundle'):
+            conduct_request.get(False, '10.0.0.1', 'http://10.0.0.1:9005/bundles')
+
+        stdout = MagicMock()
+        logging_setup.configure_logging(MagicMock(), stdout)
+        timings.log_summary('text')
+
+        lines = self.output(stdout).splitlines()
+        self.assertEqual('Timings:', lines[0])
+        self.assertRegex(lines[1], r'^  resolve bundle: \d+\.\d{3}s \(1x\), 1 requests, 0 bytes sent, 2 bytes received$')
+        self.assertRegex(lines[2], r'^  GET http://10.0.0.1:9005/bundles 200: total \d+\.\d{3}s, dns 0.000s, '
+                                   r'connect 0.000s, tls 0.000s, first byte 0.020s, sent 0, received 2, retries 0$')
@@ -0,0 +1,339 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from requests.packages.urllib3 import connection, connectionpool
+from requests.packages.urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from requests.packages.urllib3.util.connection import allowed_gai_family
+import http.client
+import json
+import logging
+import socket
+import threading
+import time
+import urllib.request
+
+
+# Timings are only recorded once enabled using the `--timings` option.
+ENABLED = False
+
+# Time spent within each phase of a command keyed by phase name, in the order the phases were first entered.
+PHASES = OrderedDict()
+
+# Record of each HTTP request made by the command.
+REQUESTS = []
+
+LOCK = threading.Lock()
+
+# The current phases and request of each thread, allowing connections to attribute their timings to the request.
+STATE = threading.local()
+
+OUTPUT_FORMATS = ['text', 'json']
+
+
+class TimedConnectionMixin:
+    """
+    Records the time taken to resolve the host, to connect, and to perform the TLS handshake against the request being
+    made by the current thread.
+    The host is resolved once, and the connection is made to the resolved addresses, so that resolution and connection
+    are timed separately.
+    """
+    def _new_conn(self):
+        record = current_request()
+        if record is None:
+            return super()._new_conn()
+
+        start_time = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NewConnectionError(self, 'Failed to establish a new connection: {}'.format(e))
+        resolved_time = time.perf_counter()
+        record['dns'] += resolved_time - start_time
+
+        try:
+            return connect_first(addresses, self.connect_address, ConnectTimeoutError)
+        finally:
+            connected_time = time.perf_counter()
+            record['connect'] += connected_time - resolved_time
+            self.new_conn_duration = connected_time - start_time
+
+    def connect_address(self, address):
+        host = self._dns_host
+        self._dns_host = address[0]
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        record = current_request()
+        self.new_conn_duration = 0.0
+        start_time = time.perf_counter()
+        super().connect()
+        if record is not None and self.is_tls:
+            record['tls'] += max(0.0, time.perf_counter() - start_time - self.new_conn_duration)
+
+
+class TimedHTTPConnection(TimedConnectionMixin, connection.HTTPConnection):
+    is_tls = False
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, connection.HTTPSConnection):
+    is_tls = True
+
+
+class TimedClientConnectionMixin:
+    """
+    Records the connections of urllib like `TimedConnectionMixin` does for those of requests.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = self.create_connection
+
+    def create_connection(self, address, *args):
+        record = current_request()
+        if record is None:
+            return socket.create_connection(address, *args)
+
+        host, port = address
+        start_time = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        resolved_time = time.perf_counter()
+        record['dns'] += resolved_time - start_time
+
+        try:
+            return connect_first(addresses, lambda resolved: socket.create_connection(resolved, *args), OSError)
+        finally:
+            connected_time = time.perf_counter()
+            record['connect'] += connected_time - resolved_time
+            self.new_conn_duration = connected_time - start_time
+
+    def connect(self):
+        record = current_request()
+        self.new_conn_duration = 0.0
+        start_time = time.perf_counter()
+        super().connect()
+        if record is not None and self.is_tls:
+            record['tls'] += max(0.0, time.perf_counter() - start_time - self.new_conn_duration)
+
+
+class TimedHTTPClientConnection(TimedClientConnectionMixin, http.client.HTTPConnection):
+    is_tls = False
+
+
+class TimedHTTPSClientConnection(TimedClientConnectionMixin, http.client.HTTPSConnection):
+    is_tls = True
+
+
+class TimedHandlerMixin:
+    """
+    Records each request made through a urllib opener, see `url_handlers`. As the body of the response is read by the
+    caller, the bytes received are those given by its `Content-Length`.
+    """
+    def timed_open(self, http_class, req, **http_conn_args):
+        with request(req.get_method(), req.full_url) as record:
+            start_time = time.perf_counter()
+            response = super().do_open(http_class, req, **http_conn_args)
+            record['status'] = response.status
+            record['first_byte'] = time.perf_counter() - start_time
+            record['bytes_sent'] = body_length(req.data)
+            content_length = response.headers.get('Content-Length')
+            record['bytes_received'] = int(content_length) if content_length else None
+            return response
+
+
+class TimedHTTPHandler(TimedHandlerMixin, urllib.request.HTTPHandler):
+    def do_open(self, http_class, req, **http_conn_args):
+        return self.timed_open(TimedHTTPClientConnection, req, **http_conn_args)
+
+
+class TimedHTTPSHandler(TimedHandlerMixin, urllib.request.HTTPSHandler):
+    def do_open(self, http_class, req, **http_conn_args):
+        return self.timed_open(TimedHTTPSClientConnection, req, **http_conn_args)
+
+
+def connect_first(addresses, connect, errors):
+    """
+    Connects to the first of the resolved addresses accepting the connection, like `socket.create_connection` does.
+    """
+    error = None
+    for family, socket_type, proto, canonical_name, address in addresses:
+        try:
+            return connect(address[:2])
+        except errors as e:
+            error = e
+
+    raise error if error is not None else OSError('getaddrinfo returns an empty list')
+
+
+def url_handlers():
+    """
+    :return: the handlers recording the requests of a urllib opener if timings are enabled, to be given to
+             `urllib.request.build_opener`.
+    """
+    return [TimedHTTPHandler(), TimedHTTPSHandler()] if ENABLED else []
+
+
+def enable():
+    global ENABLED
+
+    connectionpool.HTTPConnectionPool.ConnectionCls = TimedHTTPConnection
+    connectionpool.HTTPSConnectionPool.ConnectionCls = TimedHTTPSConnection
+    ENABLED = True
+
+
+def reset():
+    with LOCK:
+        PHASES.clear()
+        del REQUESTS[:]
+
+
+def current_phases():
+    if not hasattr(STATE, 'phases'):
+        STATE.phases = []
+    return STATE.phases
+
+
+def current_request():
+    return getattr(STATE, 'request', None)
+
+
+@contextmanager
+def phase(name):
+    """
+    Records the time spent within the block as the phase `name`. Requests made within the block are attributed to the
+    innermost phase.
+    """
+    if not ENABLED:
+        yield
+        return
+
+    phases = current_phases()
+    phases.append(name)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_time
+        phases.pop()
+        with LOCK:
+            entry = PHASES.setdefault(name, {'phase': name, 'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += duration
+
+
+def timed(name):
+    """
+    Decorator recording each call of the function as the phase `name`.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def request(method, url):
+    """
+    Records the request made within the block. Yields the record, or None if timings aren't enabled.
+    """
+    if not ENABLED:
+        yield None
+        return
+
+    phases = current_phases()
+    record = {
+        'phase': phases[-1] if phases else None,
+        'method': method.upper(),
+        'url': url,
+        'status': None,
+        'dns': 0.0,
+        'connect': 0.0,
+        'tls': 0.0,
+        'first_byte': None,
+        'total': None,
+        'bytes_sent': 0,
+        'bytes_received': None,
+        'retries': 0
+    }
+    STATE.request = record
+    start_time = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['total'] = time.perf_counter() - start_time
+        STATE.request = None
+        with LOCK:
+            REQUESTS.append(record)
+
+
+def record_response(record, response, stream=False):
+    if record is None:
+        return
+
+    record['status'] = response.status_code
+    record['first_byte'] = response.elapsed.total_seconds()
+    record['bytes_sent'] = body_length(response.request.body)
+    if stream:
+        content_length = response.headers.get('Content-Length')
+        record['bytes_received'] = int(content_length) if content_length else None
+    else:
+        record['bytes_received'] = len(response.content)
+
+
+def record_retry():
+    record = current_request()
+    if record is not None:
+        record['retries'] += 1
+
+
+def body_length(body):
+    if body is None:
+        return 0
+    elif isinstance(body, (bytes, str)):
+        return len(body)
+    else:
+        # Streamed bodies such as the multipart encoder of `conduct load` report their length
+        return getattr(body, 'len', 0)
+
+
+def summary():
+    with LOCK:
+        phases = [dict(entry) for entry in PHASES.values()]
+        requests = [dict(record) for record in REQUESTS]
+
+    for entry in phases:
+        phase_requests = [record for record in requests if record['phase'] == entry['phase']]
+        entry['requests'] = len(phase_requests)
+        entry['bytes_sent'] = sum(record['bytes_sent'] for record in phase_requests)
+        entry['bytes_received'] = sum(record['bytes_received'] or 0 for record in phase_requests)
+
+    return {'phases': phases, 'requests': requests}
+
+
+def log_summary(output_format):
+    log = logging.getLogger(__name__)
+    timings = summary()
+
+    if output_format == 'json':
+        log.screen(json.dumps(timings, sort_keys=True))
+        return
+
+    log.screen('Timings:')
+    for entry in timings['phases']:
+        log.screen('  {phase}: {seconds:.3f}s ({count}x), {requests} requests, '
+                   '{bytes_sent} bytes sent, {bytes_received} bytes received'.format(**entry))
+
+    for record in timings['requests']:
+        log.screen('  {method} {url} {status}: total {total:.3f}s, dns {dns:.3f}s, connect {connect:.3f}s, '
+                   'tls {tls:.3f}s, first byte {first_byte}, sent {bytes_sent}, received {bytes_received}, '
+                   'retries {retries}'.format(**dict(record, first_byte=format_seconds(record['first_byte']))))
+
+
+def format_seconds(seconds):
+    return '{:.3f}s'.format(seconds) if seconds is not None else '-'
@@ -11,7 +11,7 @@ from requests.exceptions import ConnectionError, HTTPError, ReadTimeout
 from urllib.error import URLError
 from zipfile import BadZipFile
 from conductr_cli.exceptions import BindAddressNotFound, \
-    InstanceCountError, MalformedBundleError, \
+    InstanceCountError, MalformedBundleError, MalformedManifestError, \
     BintrayCredentialsNotFoundError, MalformedBintrayCredentialsError, BintrayUnreachableError, BundleResolutionError, \
     WaitTimeoutError, InsecureFilePermissions, SandboxImageNotFoundError, JavaCallError, \
     JavaUnsupportedVendorError, JavaUnsupportedVersionError, JavaVersionParseError, DockerValidationError, \
@@ -95,6 +95,10 @@ def handle_no_file(func):
             log = get_logger_for_func(func)
             log.error('File not found: {}'.format(err.args[0]))
             return False
+        except FileNotFoundError as err:
+            log = get_logger_for_func(func)
+            log.error('File not found: {}'.format(err.filename))
+            return False
 
     # Do not change the wrapped function name,
     # so argparse configuration can be tested.
@@ -135,6 +139,22 @@ def handle_malformed_bundle(func):
     return handler
 
 
+def handle_malformed_manifest(func):
+    def handler(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except MalformedManifestError as err:
+            log = get_logger_for_func(func)
+            log.error('Problem with the manifest: {}'.format(err.args[0]))
+            return False
+
+    # Do not change the wrapped function name,
+    # so argparse configuration can be tested.
+    handler.__name__ = func.__name__
+
+    return handler
+
+
 def handle_bundle_resolution_error(func):
     def handler(*args, **kwargs):
         try:
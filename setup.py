@@ -72,6 +72,7 @@ setup(
         ],
     },
 
+    python_requires='>=3.5',
     install_requires=install_requires,
     tests_require=['tox'],
     test_suite='conductr_cli.test',